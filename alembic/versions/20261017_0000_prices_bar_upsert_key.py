@@ -0,0 +1,56 @@
+"""Unique (exchange, symbol, timestamp) index on prices.
+
+The live bar builder upserts closed bars into `prices` with
+ON CONFLICT (exchange, symbol, timestamp), which needs a unique index on
+those columns. The model always declared one, but migrated databases only
+had the non-unique `ix_prices_exchange_symbol_time`. Duplicates are removed
+first, keeping the highest id. The index is descending on timestamp so it
+also serves "latest bars of one market" reads (see 20261017_0004).
+
+Revision ID: 20261017_0000
+Revises: 20260427_0006
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0000"
+down_revision = "20260427_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            """
+            DELETE FROM prices p
+            USING prices newer
+            WHERE p.exchange = newer.exchange
+              AND p.symbol = newer.symbol
+              AND p.timestamp = newer.timestamp
+              AND p.id < newer.id
+            """
+        )
+    else:
+        op.execute(
+            """
+            DELETE FROM prices
+            WHERE id NOT IN (SELECT max(id) FROM prices GROUP BY exchange, symbol, timestamp)
+            """
+        )
+    op.create_index(
+        "uix_price_exchange_symbol_timestamp",
+        "prices",
+        ["exchange", "symbol", sa.text("timestamp DESC")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uix_price_exchange_symbol_timestamp", table_name="prices")
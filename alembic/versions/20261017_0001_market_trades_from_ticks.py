@@ -0,0 +1,89 @@
+"""Serve market_trades reads from ticks.
+
+Creates the `market_trades_ticks` view (ticks + assets shaped like
+market_trades) used by raw SQL when STREAM_TRADE_STORAGE=ticks, and copies
+market_trades rows that have no matching tick into ticks so switching the
+writer to ticks-only storage keeps the existing history readable.
+
+Revision ID: 20261017_0001
+Revises: 20261017_0000
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261017_0001"
+down_revision = "20261017_0000"
+branch_labels = None
+depends_on = None
+
+
+VIEW_SQL = """
+    CREATE VIEW market_trades_ticks AS
+    SELECT
+      t.id AS id,
+      a.exchange AS exchange,
+      a.symbol AS symbol,
+      t.time AS timestamp,
+      t.received_at AS receipt_timestamp,
+      t.price AS price,
+      t.volume AS amount,
+      t.side AS side
+    FROM ticks t
+    JOIN assets a ON a.id = t.asset_id
+    WHERE t.owner_id IS NULL
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute(VIEW_SQL)
+
+    if bind.dialect.name != "postgresql":
+        return
+
+    # Assets for symbols only ever seen in market_trades.
+    op.execute(
+        """
+        INSERT INTO assets (symbol, exchange, base, quote, active)
+        SELECT DISTINCT m.symbol, m.exchange, split_part(m.symbol, '-', 1), split_part(m.symbol, '-', 2), TRUE
+        FROM market_trades m
+        WHERE NOT EXISTS (
+            SELECT 1 FROM assets a WHERE a.exchange = m.exchange AND a.symbol = m.symbol
+        )
+        """
+    )
+    # Stream trades written before the writer stored ticks (or outside it).
+    op.execute(
+        """
+        INSERT INTO ticks (time, asset_id, price, volume, side, received_at, ingest_source, is_aggregated)
+        SELECT
+          m.timestamp,
+          a.id,
+          CAST(m.price AS double precision),
+          CAST(m.amount AS double precision),
+          m.side,
+          m.receipt_timestamp,
+          'market_trades',
+          FALSE
+        FROM market_trades m
+        JOIN assets a ON a.exchange = m.exchange AND a.symbol = m.symbol
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ticks t
+            WHERE t.asset_id = a.id
+              AND t.time = m.timestamp
+              AND t.price = CAST(m.price AS double precision)
+              AND t.volume = CAST(m.amount AS double precision)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.execute("DROP VIEW IF EXISTS market_trades_ticks")
+    if bind.dialect.name == "postgresql":
+        op.execute("DELETE FROM ticks WHERE ingest_source = 'market_trades'")
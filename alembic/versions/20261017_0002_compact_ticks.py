@@ -0,0 +1,111 @@
+"""Compact tick columns.
+
+Adds `tick_sources` and the compact `ticks` columns (side_code smallint,
+trade_id bigint, source_id smallint) plus a unique index on numeric trade
+ids, and points `market_trades_ticks` at the new columns. New rows only fill
+the compact columns; the legacy side/received_at/ingest_source values are
+converted and NULLed online, window by window, by
+
+    python -m app.services.imports.compact
+
+so this migration only changes the catalog and never rewrites `ticks`.
+
+Revision ID: 20261017_0002
+Revises: 20261017_0001
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0002"
+down_revision = "20261017_0001"
+branch_labels = None
+depends_on = None
+
+
+SOURCES = ("stream", "binance_vision", "dukascopy", "csv", "market_trades")
+
+VIEW_SQL = """
+    CREATE VIEW market_trades_ticks AS
+    SELECT
+      t.id AS id,
+      a.exchange AS exchange,
+      a.symbol AS symbol,
+      t.time AS timestamp,
+      t.received_at AS receipt_timestamp,
+      t.price AS price,
+      t.volume AS amount,
+      CASE t.side_code WHEN 1 THEN 'buy' WHEN 2 THEN 'sell' ELSE t.side END AS side
+    FROM ticks t
+    JOIN assets a ON a.id = t.asset_id
+    WHERE t.owner_id IS NULL
+"""
+
+LEGACY_VIEW_SQL = """
+    CREATE VIEW market_trades_ticks AS
+    SELECT
+      t.id AS id,
+      a.exchange AS exchange,
+      a.symbol AS symbol,
+      t.time AS timestamp,
+      t.received_at AS receipt_timestamp,
+      t.price AS price,
+      t.volume AS amount,
+      t.side AS side
+    FROM ticks t
+    JOIN assets a ON a.id = t.asset_id
+    WHERE t.owner_id IS NULL
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    sources = op.create_table(
+        "tick_sources",
+        sa.Column("id", sa.SmallInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(length=32), nullable=False, unique=True),
+    )
+    op.bulk_insert(sources, [{"name": name} for name in SOURCES])
+
+    # Nullable columns without defaults: catalog-only, no table rewrite.
+    op.add_column("ticks", sa.Column("side_code", sa.SmallInteger(), nullable=True))
+    op.add_column("ticks", sa.Column("trade_id", sa.BigInteger(), nullable=True))
+    op.add_column("ticks", sa.Column("source_id", sa.SmallInteger(), sa.ForeignKey("tick_sources.id"), nullable=True))
+
+    op.execute("DROP VIEW IF EXISTS market_trades_ticks")
+    op.execute(VIEW_SQL)
+
+    if bind.dialect.name == "postgresql":
+        # One transaction per chunk so the index build does not lock the whole
+        # hypertable; that cannot run inside the migration's transaction.
+        with op.get_context().autocommit_block():
+            op.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_ticks_asset_trade_id_time
+                ON ticks (asset_id, trade_id, time)
+                WITH (timescaledb.transaction_per_chunk)
+                WHERE trade_id IS NOT NULL
+                """
+            )
+        return
+
+    op.create_index(
+        "ux_ticks_asset_trade_id_time",
+        "ticks",
+        ["asset_id", "trade_id", "time"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_ticks_asset_trade_id_time", table_name="ticks")
+    op.execute("DROP VIEW IF EXISTS market_trades_ticks")
+    op.execute(LEGACY_VIEW_SQL)
+    op.drop_column("ticks", "source_id")
+    op.drop_column("ticks", "trade_id")
+    op.drop_column("ticks", "side_code")
+    op.drop_table("tick_sources")
@@ -0,0 +1,132 @@
+"""Hierarchical tick candle aggregates and working refresh windows.
+
+Adds real-time continuous aggregates ticks_1m (on ticks) and ticks_5m,
+ticks_15m, ticks_1h, ticks_4h, ticks_1d, each built on the level below, with
+refresh policies that cover recent data. The ticks_1s..ticks_7s policies from
+20260106_0001 refreshed windows years in the past and never materialized
+anything current; they now refresh the last day.
+
+Older ticks (imports) are materialized with `python -m app.services.tick_aggregates`.
+
+Revision ID: 20261017_0003
+Revises: 20261017_0002
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0003"
+down_revision = "20261017_0002"
+branch_labels = None
+depends_on = None
+
+
+# view, bucket, source, refresh start offset, end offset, schedule, compress after
+AGGREGATES = (
+    ("ticks_1m", "1 minute", "ticks", "1 day", "1 minute", "1 minute", "7 days"),
+    ("ticks_5m", "5 minutes", "ticks_1m", "2 days", "5 minutes", "5 minutes", "7 days"),
+    ("ticks_15m", "15 minutes", "ticks_5m", "3 days", "15 minutes", "15 minutes", "7 days"),
+    ("ticks_1h", "1 hour", "ticks_15m", "7 days", "1 hour", "30 minutes", "30 days"),
+    ("ticks_4h", "4 hours", "ticks_1h", "14 days", "4 hours", "1 hour", "30 days"),
+    ("ticks_1d", "1 day", "ticks_4h", "60 days", "1 day", "1 hour", "90 days"),
+)
+
+# view, start offset, end offset, schedule
+SECOND_AGGREGATES = (
+    ("ticks_1s", "1 day", "10 seconds", "1 minute"),
+    ("ticks_3s", "1 day", "30 seconds", "1 minute"),
+    ("ticks_5s", "1 day", "30 seconds", "1 minute"),
+    ("ticks_7s", "1 day", "1 minute", "1 minute"),
+)
+LEGACY_SECOND_POLICIES = (
+    ("ticks_1s", "5 years", "3 years"),
+    ("ticks_3s", "7 years", "5 years"),
+    ("ticks_5s", "10 years", "7 years"),
+    ("ticks_7s", "15 years", "10 years"),
+)
+
+
+def _create_aggregate(view: str, bucket: str, source: str) -> str:
+    if source == "ticks":
+        body = f"""
+          time_bucket('{bucket}', time) AS bucket,
+          asset_id,
+          first(price, time) AS open,
+          max(price) AS high,
+          min(price) AS low,
+          last(price, time) AS close,
+          sum(volume) AS volume,
+          count(*) AS trades
+        FROM ticks
+        """
+    else:
+        body = f"""
+          time_bucket('{bucket}', bucket) AS bucket,
+          asset_id,
+          first(open, bucket) AS open,
+          max(high) AS high,
+          min(low) AS low,
+          last(close, bucket) AS close,
+          sum(volume) AS volume,
+          sum(trades) AS trades
+        FROM {source}
+        """
+    return f"""
+    CREATE MATERIALIZED VIEW {view}
+    WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+    SELECT {body}
+    GROUP BY 1, asset_id
+    WITH NO DATA;
+    """
+
+
+def _refresh_policy(view: str, start: str, end: str, schedule: str) -> str:
+    return (
+        f"SELECT add_continuous_aggregate_policy('{view}', start_offset => INTERVAL '{start}', "
+        f"end_offset => INTERVAL '{end}', schedule_interval => INTERVAL '{schedule}');"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for view, bucket, source, start, end, schedule, compress_after in AGGREGATES:
+        op.execute(sa.text(_create_aggregate(view, bucket, source)))
+        op.execute(sa.text(_refresh_policy(view, start, end, schedule)))
+        op.execute(
+            sa.text(
+                f"ALTER MATERIALIZED VIEW {view} SET (timescaledb.compress, "
+                "timescaledb.compress_segmentby = 'asset_id', "
+                "timescaledb.compress_orderby = 'bucket');"
+            )
+        )
+        # Must be older than the refresh start offset.
+        op.execute(sa.text(f"SELECT add_compression_policy('{view}', INTERVAL '{compress_after}');"))
+
+    for view, start, end, schedule in SECOND_AGGREGATES:
+        op.execute(sa.text(f"SELECT remove_continuous_aggregate_policy('{view}', if_exists => true);"))
+        op.execute(sa.text(_refresh_policy(view, start, end, schedule)))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for view, start, end in LEGACY_SECOND_POLICIES:
+        op.execute(sa.text(f"SELECT remove_continuous_aggregate_policy('{view}', if_exists => true);"))
+        op.execute(
+            sa.text(
+                f"SELECT add_continuous_aggregate_policy('{view}', "
+                f"INTERVAL '{start}', INTERVAL '{end}', INTERVAL '1 day');"
+            )
+        )
+
+    for view, *_ in reversed(AGGREGATES):
+        op.execute(sa.text(f"DROP MATERIALIZED VIEW IF EXISTS {view};"))
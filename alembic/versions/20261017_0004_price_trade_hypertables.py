@@ -0,0 +1,152 @@
+"""Compressed prices/market_trades hypertables with (exchange, symbol, time) indexes.
+
+Almost every read of `prices` and `market_trades` is "latest N rows of one
+(exchange, symbol)". Both tables get a composite (exchange, symbol,
+timestamp DESC) index that serves those reads as ordered index scans, and the
+single-column exchange/symbol/timestamp indexes are dropped (timestamp-only
+scans use the hypertable's own `<table>_timestamp_idx`). The `prices` index is
+the unique live bar upsert key from 20261017_0000; it is only created here for
+tables that do not have it yet.
+
+Tables that are not hypertables yet (created outside these migrations) are
+converted with their data. Compression segments by (exchange, symbol) on
+both tables; `prices` was segmented by symbol only, so its compressed chunks
+are decompressed before the setting changes and recompressed by the policy.
+Retention drops market_trades after 1 year (trades are also kept in `ticks`)
+and prices after 5 years.
+
+Revision ID: 20261017_0004
+Revises: 20261017_0003
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0004"
+down_revision = "20261017_0003"
+branch_labels = None
+depends_on = None
+
+
+# table, composite index, unique, single-column indexes it replaces, compress after, retention
+TABLES = (
+    (
+        "market_trades",
+        "ix_market_trades_exchange_symbol_time",
+        False,
+        ("ix_market_trades_exchange", "ix_market_trades_symbol", "ix_market_trades_timestamp"),
+        "7 days",
+        "1 year",
+    ),
+    (
+        "prices",
+        "uix_price_exchange_symbol_timestamp",
+        True,
+        ("ix_prices_exchange", "ix_prices_symbol", "ix_prices_timestamp", "ix_prices_exchange_symbol_time"),
+        "14 days",
+        "5 years",
+    ),
+)
+
+
+SEGMENT_BY = "exchange,symbol"
+
+
+def _is_hypertable(bind, table: str) -> bool:
+    return bool(
+        bind.execute(
+            sa.text("SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = :table"),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def _segment_by(bind, table: str) -> str | None:
+    """Current compress_segmentby, or None when compression is not enabled."""
+    return bind.execute(
+        sa.text(
+            """
+            SELECT string_agg(attname, ',' ORDER BY segmentby_column_index)
+            FROM timescaledb_information.compression_settings
+            WHERE hypertable_name = :table AND segmentby_column_index IS NOT NULL
+            """
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def _ensure_hypertable(bind, table: str) -> None:
+    if _is_hypertable(bind, table):
+        return
+    # Unique indexes of a hypertable must include the time column.
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey")
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)")
+    op.execute(f"SELECT create_hypertable('{table}', 'timestamp', migrate_data => TRUE)")
+
+
+def _ensure_compression(bind, table: str) -> None:
+    current = _segment_by(bind, table)
+    if current == SEGMENT_BY:
+        return
+    if current is not None:
+        op.execute(f"SELECT remove_compression_policy('{table}', if_exists => TRUE)")
+        op.execute(f"SELECT decompress_chunk(c, if_compressed => TRUE) FROM show_chunks('{table}') c")
+    op.execute(
+        f"""
+        ALTER TABLE {table} SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = '{SEGMENT_BY}',
+            timescaledb.compress_orderby = 'timestamp'
+        )
+        """
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+
+    for table, index, unique, replaced, compress_after, retention in TABLES:
+        if not is_postgres:
+            op.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index} "
+                f"ON {table} (exchange, symbol, timestamp DESC)"
+            )
+            for name in replaced:
+                op.execute(f"DROP INDEX IF EXISTS {name}")
+            continue
+
+        _ensure_hypertable(bind, table)
+        _ensure_compression(bind, table)
+        op.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index} "
+            f"ON {table} (exchange, symbol, timestamp DESC)"
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS {table}_timestamp_idx ON {table} (timestamp DESC)")
+        for name in replaced:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(f"SELECT add_compression_policy('{table}', INTERVAL '{compress_after}', if_not_exists => TRUE)")
+        op.execute(f"SELECT add_retention_policy('{table}', INTERVAL '{retention}', if_not_exists => TRUE)")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+
+    if is_postgres:
+        for table, *_ in TABLES:
+            op.execute(f"SELECT remove_retention_policy('{table}', if_exists => TRUE)")
+
+    op.create_index("ix_market_trades_exchange", "market_trades", ["exchange"])
+    op.create_index("ix_market_trades_symbol", "market_trades", ["symbol"])
+    op.create_index("ix_market_trades_timestamp", "market_trades", ["timestamp"])
+    op.create_index("ix_prices_exchange", "prices", ["exchange"])
+    op.create_index("ix_prices_symbol", "prices", ["symbol"])
+    op.create_index("ix_prices_timestamp", "prices", ["timestamp"])
+    op.create_index("ix_prices_exchange_symbol_time", "prices", ["exchange", "symbol", "timestamp"])
+    op.drop_index("ix_market_trades_exchange_symbol_time", table_name="market_trades")
+    # uix_price_exchange_symbol_timestamp belongs to 20261017_0000.
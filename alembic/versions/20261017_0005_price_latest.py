@@ -0,0 +1,51 @@
+"""price_latest: newest prices bar per market.
+
+One row per (exchange, symbol) with the newest bar's close and timestamp, the
+number of stored bars and the writer that recorded it. Seeded from `prices`;
+afterwards maintained by every `prices` writer.
+
+Revision ID: 20261017_0005
+Revises: 20261017_0004
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_0005"
+down_revision = "20261017_0004"
+branch_labels = None
+depends_on = None
+
+
+SEED_SQL = """
+    INSERT INTO price_latest (exchange, symbol, timestamp, close, row_count, source, updated_at)
+    SELECT p.exchange, p.symbol, p.timestamp, p.close, s.row_count, 'prices', CURRENT_TIMESTAMP
+    FROM (
+      SELECT exchange, symbol, max(timestamp) AS latest, count(*) AS row_count
+      FROM prices
+      GROUP BY exchange, symbol
+    ) s
+    JOIN prices p ON p.exchange = s.exchange AND p.symbol = s.symbol AND p.timestamp = s.latest
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "price_latest",
+        sa.Column("exchange", sa.String(length=20), primary_key=True),
+        sa.Column("symbol", sa.String(length=50), primary_key=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("close", sa.Numeric(), nullable=True),
+        sa.Column("row_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("source", sa.String(length=32), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.execute(SEED_SQL)
+
+
+def downgrade() -> None:
+    op.drop_table("price_latest")
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+
+from app.config import settings
+from app.redis_client import RedisClient
+from app.services.live_bars import BAR_STREAM_KEY, bar_channel, open_bars_key, upsert_price_bars
+from app.services.market_candles import parse_timeframe_seconds
+from app.streaming.bars import Bar, BarAggregator, parse_intervals
+from app.streaming.stream_codec import (
+    BINARY_FORMAT,
+    advertise_forever,
+    binary_payload,
+    decode_batch,
+    entry_format,
+    text_fields,
+)
+from app.streaming.partitions import STREAM_KEY, partition_stream_keys
+from app.writer import ensure_consumer_group as _ensure_groups
+from database import init_db, session_scope
+
+
+logger = logging.getLogger("cryptoinsight.bar_builder")
+
+GROUP = "bar_builders"
+CONSUMER = "bar-builder-1"
+
+
+async def ensure_consumer_group(redis, stream_keys: list[str] | None = None) -> None:
+    await _ensure_groups(redis, stream_keys, group=GROUP)
+
+
+class BarBuilder:
+    """
+    Folds `market_trades` messages into live bars and ships them.
+
+    Closed bars are appended to `market_bars` and published on
+    `bars:{exchange}:{symbol}:{timeframe}`; closed bars of `prices_interval`
+    are upserted into `prices`. Open bars are mirrored into the
+    `bars:open:{exchange}` hashes at most once per `open_publish_seconds`.
+    """
+
+    def __init__(
+        self,
+        redis,
+        aggregator: BarAggregator,
+        *,
+        prices_interval: int | None = 60,
+        close_grace_seconds: float = 2.0,
+        open_publish_seconds: float = 0.5,
+        stream_maxlen: int = 100_000,
+    ) -> None:
+        self._redis = redis
+        self.aggregator = aggregator
+        self._prices_interval = prices_interval
+        self._close_grace_seconds = close_grace_seconds
+        self._open_publish_seconds = open_publish_seconds
+        self._stream_maxlen = stream_maxlen
+        self._dirty: set[tuple[str, str]] = set()
+        self._last_open_publish = 0.0
+
+    def handle(self, messages: list[tuple]) -> list[Bar]:
+        closed: list[Bar] = []
+        for message_id, fields in messages:
+            try:
+                if entry_format(fields) == BINARY_FORMAT:
+                    columns = decode_batch(binary_payload(fields))
+                    for exchange, symbol, ts, _recv_ts, price, amount, _side, _trade_id in columns.iter_trades():
+                        closed.extend(self._add(exchange, symbol, ts, price, amount))
+                    continue
+                fields = text_fields(fields)
+                exchange = str(fields.get("exchange", "")).strip().lower()
+                symbol = str(fields.get("symbol", "")).strip().upper()
+                ts = fields.get("ts")
+                if not exchange or not symbol or ts is None:
+                    continue
+                closed.extend(
+                    self._add(
+                        exchange,
+                        symbol,
+                        float(ts),
+                        float(fields.get("price", 0.0)),
+                        float(fields.get("amount", 0.0)),
+                    )
+                )
+            except Exception:
+                logger.exception("Skipping bad message id=%s fields=%s", message_id, fields)
+        return closed
+
+    def _add(self, exchange: str, symbol: str, ts: float, price: float, amount: float) -> list[Bar]:
+        self._dirty.add((exchange, symbol))
+        return self.aggregator.add(exchange, symbol, ts, price, amount)
+
+    async def publish(self, closed: list[Bar], now: float) -> None:
+        expired = self.aggregator.close_due(now, self._close_grace_seconds)
+        closed = closed + expired
+        publish_open = self._dirty and now - self._last_open_publish >= self._open_publish_seconds
+        if not closed and not publish_open:
+            return
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for bar in closed:
+                pipe.xadd(BAR_STREAM_KEY, bar.stream_fields(), maxlen=self._stream_maxlen, approximate=True)
+                pipe.publish(
+                    bar_channel(bar.exchange, bar.symbol, bar.timeframe),
+                    json.dumps(bar.to_dict(), separators=(",", ":")),
+                )
+            for bar in expired:
+                pipe.hdel(open_bars_key(bar.exchange), f"{bar.symbol}:{bar.timeframe}")
+            if publish_open:
+                by_exchange: dict[str, dict[str, str]] = {}
+                for bar in self.aggregator.open_bars():
+                    if (bar.exchange, bar.symbol) in self._dirty:
+                        by_exchange.setdefault(bar.exchange, {})[f"{bar.symbol}:{bar.timeframe}"] = json.dumps(
+                            bar.to_dict(), separators=(",", ":")
+                        )
+                for exchange, mapping in by_exchange.items():
+                    pipe.hset(open_bars_key(exchange), mapping=mapping)
+            await pipe.execute()
+
+        if publish_open:
+            self._dirty.clear()
+            self._last_open_publish = now
+        try:
+            self.persist(closed)
+        except Exception:
+            # The bars are already on market_bars; backfills fill the prices gap.
+            logger.exception("Failed to persist %d closed bars into prices", len(closed))
+
+    def persist(self, closed: list[Bar]) -> int:
+        if self._prices_interval is None:
+            return 0
+        bars = [bar for bar in closed if bar.interval == self._prices_interval]
+        if not bars:
+            return 0
+        with session_scope() as db:
+            return upsert_price_bars(db, bars)
+
+
+def build_bar_builder(redis) -> BarBuilder:
+    prices_timeframe = settings.STREAM_BAR_PRICES_TIMEFRAME.strip()
+    return BarBuilder(
+        redis,
+        BarAggregator(parse_intervals(settings.STREAM_BAR_INTERVALS)),
+        prices_interval=parse_timeframe_seconds(prices_timeframe) if prices_timeframe else None,
+        close_grace_seconds=settings.STREAM_BAR_CLOSE_GRACE_SECONDS,
+        open_publish_seconds=settings.STREAM_BAR_OPEN_PUBLISH_MS / 1000.0,
+    )
+
+
+async def run_bar_builder(batch_size: int = 1000) -> None:
+    init_db()
+    # Bytes replies: packed mt1 entries are not valid UTF-8.
+    redis = RedisClient.get_binary_redis()
+    # A single builder reads every partition: bars need all trades of a symbol.
+    stream_keys = partition_stream_keys(STREAM_KEY, settings.STREAM_PARTITIONS)
+    await ensure_consumer_group(redis, stream_keys)
+    advertise_task = asyncio.create_task(advertise_forever(redis, group=GROUP, consumer=CONSUMER))
+    builder = build_bar_builder(redis)
+    logger.info(
+        "Bar builder started: streams=%s group=%s intervals=%s",
+        ",".join(stream_keys),
+        GROUP,
+        ",".join(str(i) for i in builder.aggregator.intervals),
+    )
+
+    try:
+        while True:
+            streams = await redis.xreadgroup(
+                groupname=GROUP,
+                consumername=CONSUMER,
+                streams={stream_key: ">" for stream_key in stream_keys},
+                count=batch_size,
+                block=1000,
+            )
+            acks: list[tuple] = []
+            closed: list[Bar] = []
+            for stream_name, messages in streams or []:
+                acks.append((stream_name, [message_id for message_id, _fields in messages]))
+                closed.extend(builder.handle(messages))
+
+            await builder.publish(closed, time.time())
+
+            for stream_name, message_ids in acks:
+                if message_ids:
+                    await redis.xack(stream_name, GROUP, *message_ids)
+    finally:
+        advertise_task.cancel()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_bar_builder())
+
+
+if __name__ == "__main__":
+    main()
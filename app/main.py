@@ -9,14 +9,29 @@ import logging
 
 import pandas as pd
 from celery.result import AsyncResult
-from fastapi import APIRouter, BackgroundTasks, Depends, FastAPI, HTTPException, Query
-from sqlalchemy import func, text
+from fastapi import APIRouter, BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.analysis import add_technical_indicators
 from app.analysis_quant import calculate_risk_metrics
 from app.config import settings
 from app.services.backfill import StartupGapFiller, bootstrap_universe
+from app.services.candle_cache import candle_cache
+from app.services.candle_planner import coverage_cache
+from app.services.chart_format import (
+    COLUMNAR,
+    EXPOSED_HEADERS,
+    ROWS,
+    FastJSONResponse,
+    columns_arrays,
+    columns_response,
+    dumps,
+    frame_arrays,
+    json_arrays,
+    negotiate,
+)
+from app.services.market_candles import load_price_frame
 from app.services.asset_status import build_signal_status
 from app.services.price_selection import resolve_price_exchange
 from app.services.market_resolution import configured_exchange_priority
@@ -28,19 +43,31 @@ from app.connectors.coinpaprika import CoinPaprikaConnector
 from app.connectors.financialmodelingprep import FinancialModelingPrepConnector
 from app.connectors.newsdata_io import NewsDataIoConnector
 from app.redis_client import redis_client
-from app.models.market import MarketTrade
 from app.models.imports import ImportRun
 from app.models.instrument import Coin, Price
 from app.models.research import AssetDataStatus
-from app.models.ticks import Asset, Tick
+from app.models.ticks import Tick
 from celery_app import celery_app
 from app.signals.engine import SignalEngine
+from app.services.asset_registry import asset_registry, listen_for_invalidations
 from app.services.data_quality import detect_gaps_data
-from database import get_db, init_db
+from app.services import price_latest
+from app.services.latest_prices import get_latest, get_latest_many
+from app.services.live_bars import get_open_bar, merge_open_bar
+from app.services.trade_store import query_trades, trades_source
+from app.streaming.bars import interval_label, parse_intervals as parse_bar_intervals
+from app.streaming.ingest_queue import QUEUE_STATS_KEY
+from app.writer import METRICS_KEY as WRITER_METRICS_KEY
+from database import get_analytics_db, get_db, get_read_db, init_db, run_db, session_scope
 
 
 logger = logging.getLogger("cryptoinsight.main")
 
+_FORMAT_DESCRIPTION = (
+    "rows (list of objects) or columnar (parallel arrays, epoch-ms timestamps). "
+    "Accept: application/vnd.apache.arrow.stream or application/octet-stream selects a binary encoding."
+)
+
 
 def get_coingecko_connector() -> CoinGeckoConnector:
     return CoinGeckoConnector()
@@ -60,6 +87,15 @@ def get_fmp_connector() -> FinancialModelingPrepConnector:
 def get_newsdata_connector() -> NewsDataIoConnector:
     return NewsDataIoConnector()
 
+def _warm_asset_registry() -> None:
+    try:
+        with session_scope() as db:
+            count = asset_registry.warm(db)
+        logger.info(f"Asset registry warmed with {count} assets")
+    except Exception as e:
+        logger.warning(f"Asset registry warm-up failed: {e}")
+
+
 def create_app() -> FastAPI:
     @asynccontextmanager
     async def lifespan(app: FastAPI):
@@ -70,6 +106,9 @@ def create_app() -> FastAPI:
         
         # Run bootstrap in background (non-blocking)
         if os.getenv("PYTEST_CURRENT_TEST") is None:
+            _warm_asset_registry()
+            asyncio.create_task(listen_for_invalidations(redis_client))
+
             logger.info("📊 Triggering universe bootstrap...")
             asyncio.create_task(bootstrap_universe())
             
@@ -101,6 +140,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=list(EXPOSED_HEADERS),
     )
 
     api = APIRouter(prefix=settings.API_PREFIX)
@@ -210,11 +250,92 @@ def create_app() -> FastAPI:
 
     # --- Data Endpoints ---
 
+    def _load_coin_page(
+        db: Session,
+        *,
+        search: str | None,
+        offset: int,
+        limit: int,
+        exchange: str,
+    ) -> tuple | None:
+        """
+        Coins page with price exchange, exchange symbols, latest prices, bar
+        stats and data statuses; None when no coin matches. Blocking: call
+        through `run_db`.
+        """
+        query = db.query(Coin)
+        if search:
+            like = f"%{search.strip()}%"
+            query = query.filter(Coin.symbol.ilike(like) | Coin.name.ilike(like))
+
+        if query.count() == 0:
+            return None
+
+        rank_order = func.coalesce(Coin.market_cap_rank, 999999)
+        rows = (
+            query.order_by(rank_order.asc(), Coin.symbol.asc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+        symbols_base = []
+        for c in rows:
+            s = (c.symbol or "").strip().upper().replace("/", "-")
+            if s:
+                symbols_base.append(s)
+
+        requested_exchange = (exchange or "auto").strip().lower()
+        price_exchange = (
+            requested_exchange
+            if requested_exchange and requested_exchange != "auto"
+            else _select_exchange_for_symbols(db, symbols_base)
+        )
+
+        # Symbols to fetch (already normalized for exchange? No, these come from DB Coin/Gecko)
+        # DB Symbols are like "BTC", "ETH". But Price needs "BTC-USD".
+        # We inferred that logic in backfill, we do similar here.
+        # Heuristic: If symbol has no dash, append -USD for the signal check
+        symbols_page = []
+        for c in rows:
+            s = (c.symbol or "").strip().upper().replace("/", "-")
+            s = StartupGapFiller._normalize_symbol_for_exchange(s, price_exchange)
+            symbols_page.append(s)
+
+        # One price_latest lookup for the page: latest close keyed by coin
+        # symbol, bar stats keyed by exchange pair.
+        latest_bars = price_latest.get_latest_many(db, price_exchange, symbols_page + symbols_base)
+        latest_price = {
+            symbol: float(bar.close) if bar.close is not None else None
+            for symbol, bar in latest_bars.items()
+        }
+        price_stats = {
+            symbol: {
+                "row_count": int(latest_bars[symbol].row_count or 0),
+                "latest_ts": latest_bars[symbol].timestamp,
+            }
+            for symbol in symbols_page
+            if symbol in latest_bars
+        }
+
+        status_rows = (
+            db.query(AssetDataStatus)
+            .filter(
+                AssetDataStatus.exchange.in_([price_exchange, "auto"]),
+                AssetDataStatus.symbol.in_(symbols_page),
+            )
+            .all()
+            if symbols_page
+            else []
+        )
+        status_map = {(row.exchange, row.symbol): row for row in status_rows}
+        return rows, price_exchange, symbols_page, latest_price, price_stats, status_map
+
     @api.get("/coins", tags=["Data"])
     async def get_coins_list(
         background_tasks: BackgroundTasks,
         cg: CoinGeckoConnector = Depends(get_coingecko_connector),
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         limit: int = Query(default=500, ge=1, le=5000, description="Max coins to return."),
         offset: int = Query(default=0, ge=0, description="Pagination offset."),
         search: str | None = Query(default=None, description="Filter by symbol or name."),
@@ -232,110 +353,18 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=400, detail="source must be auto, db, or coingecko")
 
         if source_key in {"auto", "db"}:
-            query = db.query(Coin)
-            if search:
-                like = f"%{search.strip()}%"
-                query = query.filter(Coin.symbol.ilike(like) | Coin.name.ilike(like))
-
-            total = query.count()
-            if total > 0:
-                rank_order = func.coalesce(Coin.market_cap_rank, 999999)
-                rows = (
-                    query.order_by(rank_order.asc(), Coin.symbol.asc())
-                    .offset(offset)
-                    .limit(limit)
-                    .all()
-                )
-
-                symbols_base = []
-                for c in rows:
-                    s = (c.symbol or "").strip().upper().replace("/", "-")
-                    if s:
-                        symbols_base.append(s)
-
-                requested_exchange = (exchange or "auto").strip().lower()
-                price_exchange = (
-                    requested_exchange
-                    if requested_exchange and requested_exchange != "auto"
-                    else _select_exchange_for_symbols(db, symbols_base)
-                )
-
-                latest_sub = (
-                    db.query(
-                        Price.symbol.label("symbol"),
-                        func.max(Price.timestamp).label("max_ts"),
-                    )
-                    .filter(Price.exchange == price_exchange)
-                    .group_by(Price.symbol)
-                    .subquery()
-                )
-
-                latest_rows = (
-                    db.query(Price.symbol, Price.close)
-                    .join(
-                        latest_sub,
-                        (Price.symbol == latest_sub.c.symbol)
-                        & (Price.timestamp == latest_sub.c.max_ts)
-                        & (Price.exchange == price_exchange),
-                    )
-                    .all()
-                )
-                latest_price = {
-                    (symbol or "").upper(): float(close) if close is not None else None
-                    for symbol, close in latest_rows
-                }
+            page = await run_db(_load_coin_page, db, search=search, offset=offset, limit=limit, exchange=exchange)
+            if page is not None:
+                rows, price_exchange, symbols_page, latest_price, price_stats, status_map = page
 
                 # --- NEW: Fetch Featured Analysis (Signals/RSI) Efficiently ---
                 # Key format from get_trading_signal: f"signal:{exchange_key}:{symbol}:{lookback}:{latest_ts}"
                 # We'll rely on redis cache inside generation if possible, but here we run the engine batch.
-                
-                # Symbols to fetch (already normalized for exchange? No, these come from DB Coin/Gecko)
-                # DB Symbols are like "BTC", "ETH". But Price needs "BTC-USD".
-                # We inferred that logic in backfill, we do similar here.
-                # Heuristic: If symbol has no dash, append -USD for the signal check
-                symbols_page = []
-                for c in rows:
-                    s = (c.symbol or "").strip().upper().replace("/", "-")
-                    s = StartupGapFiller._normalize_symbol_for_exchange(s, price_exchange)
-                    symbols_page.append(s)
-
-                price_stat_rows = (
-                    db.query(
-                        Price.symbol,
-                        func.count(Price.id).label("row_count"),
-                        func.max(Price.timestamp).label("latest_ts"),
-                    )
-                    .filter(Price.exchange == price_exchange, Price.symbol.in_(symbols_page))
-                    .group_by(Price.symbol)
-                    .all()
-                    if symbols_page
-                    else []
-                )
-                price_stats = {
-                    row.symbol: {
-                        "row_count": int(row.row_count or 0),
-                        "latest_ts": row.latest_ts,
-                    }
-                    for row in price_stat_rows
-                }
-
-                status_rows = (
-                    db.query(AssetDataStatus)
-                    .filter(
-                        AssetDataStatus.exchange.in_([price_exchange, "auto"]),
-                        AssetDataStatus.symbol.in_(symbols_page),
-                    )
-                    .all()
-                    if symbols_page
-                    else []
-                )
-                status_map = {(row.exchange, row.symbol): row for row in status_rows}
-
                 analysis_map = {}
                 
                 # Run batch signal generation
                 # We limit lookback to 60 candles (enough for RSI/SMA50) for speed in this list view
-                # Using asyncio.to_thread to not block the event loop
+                # Using run_db to not block the event loop
                 # We also set a hard timeout of 5 seconds. If signals take too long, we return list without them.
                 # Signals Caching Logic
                 signals_cache_key = f"signals:batch:v2:{price_exchange}:{offset}:{limit}"
@@ -354,7 +383,7 @@ def create_app() -> FastAPI:
                         engine = SignalEngine(db)
                         exchange_map = {sym: price_exchange for sym in symbols_page}
                         batch_signals = await asyncio.wait_for(
-                            asyncio.to_thread(
+                            run_db(
                                 engine.generate_signals_batch,
                                 symbols_page,
                                 exchange_map,
@@ -613,17 +642,21 @@ def create_app() -> FastAPI:
             symbol = f"{base}-{quote}"
         if exchange == "binance" and symbol.endswith("-USD"):
             symbol = f"{symbol[:-4]}-USDT"
-        raw = await redis_client.get(f"latest:{exchange}:{symbol}")
-        if not raw:
+        payload = await get_latest(redis_client, exchange, symbol)
+        if not payload:
             raise HTTPException(status_code=404, detail="No live data yet for this exchange/symbol.")
-        return json.loads(raw)
+        return payload
 
     @api.get("/market/latest/{symbol:path}", tags=["Data"])
     async def get_latest_tick(symbol: str):
         raw = await redis_client.get(f"latest:{symbol}")
-        if not raw:
-            raise HTTPException(status_code=404, detail="No live data yet for this symbol.")
-        return json.loads(raw)
+        if raw:
+            return json.loads(raw)
+        for exchange in _priority_exchanges():
+            payload = await get_latest(redis_client, exchange, symbol)
+            if payload:
+                return payload
+        raise HTTPException(status_code=404, detail="No live data yet for this symbol.")
 
     @api.get("/exchanges", tags=["Meta"])
     async def list_exchanges():
@@ -648,7 +681,7 @@ def create_app() -> FastAPI:
     @api.get("/market/trades/{symbol:path}", tags=["Data"])
     async def get_recent_trades(
         symbol: str,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         exchange: str | None = None,
         since: datetime | None = None,
         until: datetime | None = None,
@@ -676,14 +709,11 @@ def create_app() -> FastAPI:
         if since and until and since > until:
             raise HTTPException(status_code=400, detail="Invalid time range: since must be <= until.")
 
-        query = db.query(MarketTrade).filter(MarketTrade.symbol == symbol)
-        if exchange:
-            query = query.filter(MarketTrade.exchange == exchange)
-        if since:
-            query = query.filter(MarketTrade.timestamp >= since)
-        if until:
-            query = query.filter(MarketTrade.timestamp <= until)
-        rows = query.order_by(MarketTrade.timestamp.desc()).limit(limit).all()
+        rows = await run_db(
+            lambda: query_trades(db, symbol=symbol, exchange=exchange, start=since, end=until, descending=True)
+            .limit(limit)
+            .all()
+        )
 
         # Return ascending time for charting.
         result = []
@@ -751,11 +781,7 @@ def create_app() -> FastAPI:
         return priority[0]
 
     def _resolve_asset_id(db: Session, exchange: str, symbol: str) -> int | None:
-        return (
-            db.query(Asset.id)
-            .filter(Asset.exchange == exchange, Asset.symbol == symbol)
-            .scalar()
-        )
+        return asset_registry.lookup(db, exchange, symbol)
 
     def _choose_bucket_seconds(range_seconds: float, max_points: int) -> int:
         max_points = max(1, max_points)
@@ -811,158 +837,42 @@ def create_app() -> FastAPI:
         epoch = int(dt.timestamp() // bucket_seconds) * bucket_seconds
         return datetime.fromtimestamp(epoch, tz=timezone.utc)
 
-    def _query_agg_series(
+    def _resolve_price_market(
         db: Session,
-        *,
-        asset_id: int,
-        start_dt: datetime,
-        end_dt: datetime,
-        bucket_seconds: int,
-        view_name: str,
-        view_bucket_seconds: int,
-    ) -> tuple[list[dict], int]:
-        effective_bucket = max(bucket_seconds, view_bucket_seconds)
-        bucket_interval = f"{effective_bucket} seconds"
-        sql = text(
-            f"""
-            SELECT
-              time_bucket(CAST(:bucket AS interval), bucket) AS bucket,
-              AVG(close) AS price,
-              SUM(volume) AS volume,
-              SUM(trades) AS trades
-            FROM {view_name}
-            WHERE asset_id = :asset_id
-              AND bucket >= :start
-              AND bucket <= :end
-            GROUP BY bucket
-            ORDER BY bucket ASC
-            """
-        )
-        try:
-            rows = (
-                db.execute(
-                    sql,
-                    {
-                        "bucket": bucket_interval,
-                        "asset_id": asset_id,
-                        "start": start_dt,
-                        "end": end_dt,
-                    },
-                )
-                .mappings()
-                .all()
-            )
-        except Exception:
-            return [], bucket_seconds
-
-        points: list[dict] = []
-        for row in rows:
-            bucket = row.get("bucket")
-            price = row.get("price")
-            volume = row.get("volume")
-            trades = row.get("trades")
-            if bucket is None or price is None:
-                continue
-            points.append(
-                {
-                    "timestamp": bucket.isoformat(),
-                    "price": float(price),
-                    "volume": float(volume) if volume is not None else 0.0,
-                    "trades": int(trades) if trades is not None else 0,
-                }
-            )
-        return points, effective_bucket
-
-    def _query_agg_candles(
-        db: Session,
-        *,
-        asset_id: int,
-        start_dt: datetime,
-        end_dt: datetime,
-        bucket_seconds: int,
-        view_name: str,
-        view_bucket_seconds: int,
-    ) -> tuple[list[dict], int]:
-        effective_bucket = max(bucket_seconds, view_bucket_seconds)
-        bucket_interval = f"{effective_bucket} seconds"
-        sql = text(
-            f"""
-            SELECT
-              time_bucket(CAST(:bucket AS interval), bucket) AS bucket,
-              first(open, bucket) AS open,
-              max(high) AS high,
-              min(low) AS low,
-              last(close, bucket) AS close,
-              SUM(volume) AS volume,
-              SUM(trades) AS trades
-            FROM {view_name}
-            WHERE asset_id = :asset_id
-              AND bucket >= :start
-              AND bucket <= :end
-            GROUP BY bucket
-            ORDER BY bucket ASC
-            """
-        )
-        try:
-            rows = (
-                db.execute(
-                    sql,
-                    {
-                        "bucket": bucket_interval,
-                        "asset_id": asset_id,
-                        "start": start_dt,
-                        "end": end_dt,
-                    },
-                )
-                .mappings()
-                .all()
-            )
-        except Exception:
-            return [], bucket_seconds
-
-        candles: list[dict] = []
-        for row in rows:
-            bucket = row.get("bucket")
-            open_p = row.get("open")
-            high_p = row.get("high")
-            low_p = row.get("low")
-            close_p = row.get("close")
-            volume = row.get("volume")
-            trades = row.get("trades")
-            if bucket is None or open_p is None or high_p is None or low_p is None or close_p is None:
-                continue
-            candles.append(
-                {
-                    "timestamp": bucket.isoformat(),
-                    "open": float(open_p),
-                    "high": float(high_p),
-                    "low": float(low_p),
-                    "close": float(close_p),
-                    "volume": float(volume) if volume is not None else 0.0,
-                    "trades": int(trades) if trades is not None else 0,
-                }
-            )
-        return candles, effective_bucket
+        symbol: str,
+        exchange: str | None,
+    ) -> tuple[str | None, str, datetime | None]:
+        """Price exchange, exchange symbol and latest bar time. Blocking: call through `run_db`."""
+        exchange_key = resolve_price_exchange(db, symbol, exchange)
+        symbol = _normalize_symbol_for_exchange(exchange_key, symbol)
+        latest = price_latest.get_latest(db, exchange_key, symbol) if exchange_key else None
+        return exchange_key, symbol, latest.timestamp if latest else None
 
     @api.get("/market/series/{exchange}/{symbol:path}", tags=["Data"])
     async def get_market_series(
         exchange: str,
         symbol: str,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         start: datetime | None = Query(default=None, description="Start time (ISO 8601). Defaults to 1h ago."),
         end: datetime | None = Query(default=None, description="End time (ISO 8601). Defaults to now (UTC)."),
         max_points: int = Query(default=2000, ge=100, le=5000, description="Max points returned (server will bucket)."),
+        format: str = Query(default="rows", description=_FORMAT_DESCRIPTION),
+        accept: str | None = Header(default=None),
     ):
         """
         Returns a downsampled market price series for an exchange+symbol over a time range.
 
-        Uses TimescaleDB `time_bucket` on Postgres; falls back to Python bucketing for SQLite/tests.
+        The source (tick aggregate, ticks or market_trades) is chosen by
+        `app.services.candle_planner` and returned as `plan`. Uses TimescaleDB
+        `time_bucket` on Postgres; Python bucketing for SQLite/tests. Encodings are
+        described in `app.services.chart_format`.
         """
+        encoding = negotiate(format, accept)
         exchange = exchange.strip().lower()
         base_symbol = symbol
         if exchange == "auto":
             base_symbol = _normalize_dash_symbol(symbol)
-            exchange = _select_exchange_for_symbols(db, [base_symbol])
+            exchange = await run_db(_select_exchange_for_symbols, db, [base_symbol])
         symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
 
         # Trigger live subscription for this symbol when possible.
@@ -982,252 +892,47 @@ def create_app() -> FastAPI:
         range_seconds = max(1.0, (end_dt - start_dt).total_seconds())
         bucket_seconds = _choose_bucket_seconds(range_seconds, max_points)
 
-        dialect = db.get_bind().dialect.name
-        points: list[dict] = []
-        asset_id = _resolve_asset_id(db, exchange, symbol)
-
-        if dialect == "postgresql" and asset_id:
-            bucket_interval = f"{bucket_seconds} seconds"
-            sql = text(
-                """
-                SELECT
-                  time_bucket(CAST(:bucket AS interval), time) AS bucket,
-                  AVG(price) AS price,
-                  SUM(volume) AS volume,
-                  COUNT(*) AS trades
-                FROM ticks
-                WHERE asset_id = :asset_id
-                  AND time >= :start
-                  AND time <= :end
-                GROUP BY bucket
-                ORDER BY bucket ASC
-                """
-            )
-            try:
-                rows = (
-                    db.execute(
-                        sql,
-                        {
-                            "bucket": bucket_interval,
-                            "asset_id": asset_id,
-                            "start": start_dt,
-                            "end": end_dt,
-                        },
-                    )
-                    .mappings()
-                    .all()
-                )
-                for row in rows:
-                    bucket = row.get("bucket")
-                    price = row.get("price")
-                    volume = row.get("volume")
-                    trades = row.get("trades")
-                    if bucket is None or price is None:
-                        continue
-                    points.append(
-                        {
-                            "timestamp": bucket.isoformat(),
-                            "price": float(price),
-                            "volume": float(volume) if volume is not None else 0.0,
-                            "trades": int(trades) if trades is not None else 0,
-                        }
-                    )
-            except Exception:
-                points = []
-
-        if not points and dialect == "postgresql" and asset_id:
-            for view_name, view_bucket in (
-                ("ticks_1s", 1),
-                ("ticks_3s", 3),
-                ("ticks_5s", 5),
-                ("ticks_7s", 7),
-            ):
-                points, candidate_bucket = _query_agg_series(
-                    db,
-                    asset_id=asset_id,
-                    start_dt=start_dt,
-                    end_dt=end_dt,
-                    bucket_seconds=bucket_seconds,
-                    view_name=view_name,
-                    view_bucket_seconds=view_bucket,
-                )
-                if points:
-                    bucket_seconds = candidate_bucket
-                    break
-
-        if not points and dialect == "postgresql":
-            bucket_interval = f"{bucket_seconds} seconds"
-            sql = text(
-                """
-                SELECT
-                  time_bucket(CAST(:bucket AS interval), timestamp) AS bucket,
-                  AVG(price) AS price,
-                  SUM(amount) AS volume,
-                  COUNT(*) AS trades
-                FROM market_trades
-                WHERE exchange = :exchange
-                  AND symbol = :symbol
-                  AND timestamp >= :start
-                  AND timestamp <= :end
-                GROUP BY bucket
-                ORDER BY bucket ASC
-                """
-            )
-            try:
-                rows = (
-                    db.execute(
-                        sql,
-                        {
-                            "bucket": bucket_interval,
-                            "exchange": exchange,
-                            "symbol": symbol,
-                            "start": start_dt,
-                            "end": end_dt,
-                        },
-                    )
-                    .mappings()
-                    .all()
-                )
-                for row in rows:
-                    bucket = row.get("bucket")
-                    price = row.get("price")
-                    volume = row.get("volume")
-                    trades = row.get("trades")
-                    if bucket is None or price is None:
-                        continue
-                    points.append(
-                        {
-                            "timestamp": bucket.isoformat(),
-                            "price": float(price),
-                            "volume": float(volume) if volume is not None else 0.0,
-                            "trades": int(trades) if trades is not None else 0,
-                        }
-                    )
-            except Exception:
-                # If Timescale functions are unavailable, fall back to Python bucketing.
-                points = []
-
-        if not points and asset_id:
-            rows = (
-                db.query(Tick)
-                .filter(
-                    Tick.asset_id == asset_id,
-                    Tick.time >= start_dt,
-                    Tick.time <= end_dt,
-                )
-                .order_by(Tick.time.asc())
-                .all()
-            )
-            buckets: dict[int, dict] = {}
-            for row in rows:
-                ts = row.time
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                bucket_idx = int((ts - start_dt).total_seconds() // bucket_seconds)
-                item = buckets.get(bucket_idx)
-                if item is None:
-                    item = {
-                        "timestamp": (start_dt + timedelta(seconds=bucket_idx * bucket_seconds)).isoformat(),
-                        "sum_price": float(row.price),
-                        "count": 1,
-                        "volume": float(row.volume),
-                    }
-                    buckets[bucket_idx] = item
-                else:
-                    item["sum_price"] += float(row.price)
-                    item["count"] += 1
-                    item["volume"] += float(row.volume)
-
-            for bucket_idx in sorted(buckets.keys()):
-                item = buckets[bucket_idx]
-                count = int(item["count"])
-                if count <= 0:
-                    continue
-                points.append(
-                    {
-                        "timestamp": item["timestamp"],
-                        "price": float(item["sum_price"]) / count,
-                        "volume": float(item["volume"]),
-                        "trades": count,
-                    }
-                )
+        columns, plan, cache = await candle_cache.load(db, "series", exchange, symbol, start_dt, end_dt, bucket_seconds)
 
-        if not points:
-            rows = (
-                db.query(MarketTrade)
-                .filter(
-                    MarketTrade.exchange == exchange,
-                    MarketTrade.symbol == symbol,
-                    MarketTrade.timestamp >= start_dt,
-                    MarketTrade.timestamp <= end_dt,
-                )
-                .order_by(MarketTrade.timestamp.asc())
-                .all()
-            )
-            buckets: dict[int, dict] = {}
-            for row in rows:
-                ts = row.timestamp
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                bucket_idx = int((ts - start_dt).total_seconds() // bucket_seconds)
-                item = buckets.get(bucket_idx)
-                if item is None:
-                    item = {
-                        "timestamp": (start_dt + timedelta(seconds=bucket_idx * bucket_seconds)).isoformat(),
-                        "sum_price": float(row.price),
-                        "count": 1,
-                        "volume": float(row.amount),
-                    }
-                    buckets[bucket_idx] = item
-                else:
-                    item["sum_price"] += float(row.price)
-                    item["count"] += 1
-                    item["volume"] += float(row.amount)
-
-            for bucket_idx in sorted(buckets.keys()):
-                item = buckets[bucket_idx]
-                count = int(item["count"])
-                if count <= 0:
-                    continue
-                points.append(
-                    {
-                        "timestamp": item["timestamp"],
-                        "price": float(item["sum_price"]) / count,
-                        "volume": float(item["volume"]),
-                        "trades": count,
-                    }
-                )
-
-        return {
+        payload = {
             "exchange": exchange,
             "symbol": symbol,
             "start": start_dt.isoformat(),
             "end": end_dt.isoformat(),
             "bucket_seconds": bucket_seconds,
-            "points": points,
+            "plan": {**plan.to_dict(), "cache": cache},
         }
+        if encoding == ROWS:
+            return FastJSONResponse({**payload, "points": columns.records()})
+        return columns_response(payload, "points", columns_arrays(columns), encoding)
 
     @api.get("/market/candles/{exchange}/{symbol:path}", tags=["Data"])
     async def get_market_candles(
         exchange: str,
         symbol: str,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         start: datetime | None = Query(default=None, description="Start time (ISO 8601). Defaults to 1h ago."),
         end: datetime | None = Query(default=None, description="End time (ISO 8601). Defaults to now (UTC)."),
         timeframe: str = Query(default="1m", description="Requested candle timeframe (e.g. 1m, 5m, 1h)."),
         max_points: int = Query(default=2000, ge=100, le=5000, description="Max candles returned (server may coarsen)."),
+        format: str = Query(default="rows", description=_FORMAT_DESCRIPTION),
+        accept: str | None = Header(default=None),
     ):
         """
-        Returns OHLCV candles derived from persisted tick trades in `ticks`.
+        Returns OHLCV candles for an exchange+symbol over a time range.
 
-        - Uses TimescaleDB `time_bucket` + `first/last` on Postgres.
-        - Falls back to market_trades and Python aggregation for SQLite/tests.
+        `app.services.candle_planner` picks the source from per-market coverage: the
+        coarsest tick aggregate (`ticks_1m` .. `ticks_1d`) or `ticks`, then
+        market_trades, then stored `prices` bars, in one `time_bucket` query on
+        Postgres (Python bucketing for SQLite/tests). The plan is returned as `plan`.
+        Encodings are described in `app.services.chart_format`.
         """
+        encoding = negotiate(format, accept)
         exchange = exchange.strip().lower()
         base_symbol = symbol
         if exchange == "auto":
             base_symbol = _normalize_dash_symbol(symbol)
-            exchange = _select_exchange_for_symbols(db, [base_symbol])
+            exchange = await run_db(_select_exchange_for_symbols, db, [base_symbol])
         symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
 
         end_dt = _to_utc(end) if end else datetime.now(timezone.utc)
@@ -1243,287 +948,18 @@ def create_app() -> FastAPI:
         range_seconds = max(1.0, (end_dt - start_dt).total_seconds())
         bucket_seconds = max(requested_bucket_seconds, _choose_bucket_seconds(range_seconds, max_points))
 
-        candles: list[dict] = []
-        dialect = db.get_bind().dialect.name
-        asset_id = _resolve_asset_id(db, exchange, symbol)
-        if dialect == "postgresql" and asset_id:
-            bucket_interval = f"{bucket_seconds} seconds"
-            sql = text(
-                """
-                SELECT
-                  time_bucket(CAST(:bucket AS interval), time) AS bucket,
-                  first(price, time) AS open,
-                  max(price) AS high,
-                  min(price) AS low,
-                  last(price, time) AS close,
-                  SUM(volume) AS volume,
-                  COUNT(*) AS trades
-                FROM ticks
-                WHERE asset_id = :asset_id
-                  AND time >= :start
-                  AND time <= :end
-                GROUP BY bucket
-                ORDER BY bucket ASC
-                """
-            )
-            try:
-                rows = (
-                    db.execute(
-                        sql,
-                        {
-                            "bucket": bucket_interval,
-                            "asset_id": asset_id,
-                            "start": start_dt,
-                            "end": end_dt,
-                        },
-                    )
-                    .mappings()
-                    .all()
-                )
-                for row in rows:
-                    bucket = row.get("bucket")
-                    open_p = row.get("open")
-                    high_p = row.get("high")
-                    low_p = row.get("low")
-                    close_p = row.get("close")
-                    volume = row.get("volume")
-                    trades = row.get("trades")
-                    if bucket is None or open_p is None or high_p is None or low_p is None or close_p is None:
-                        continue
-                    candles.append(
-                        {
-                            "timestamp": bucket.isoformat(),
-                            "open": float(open_p),
-                            "high": float(high_p),
-                            "low": float(low_p),
-                            "close": float(close_p),
-                            "volume": float(volume) if volume is not None else 0.0,
-                            "trades": int(trades) if trades is not None else 0,
-                        }
-                    )
-            except Exception:
-                candles = []
-
-        if not candles and dialect == "postgresql" and asset_id:
-            for view_name, view_bucket in (
-                ("ticks_1s", 1),
-                ("ticks_3s", 3),
-                ("ticks_5s", 5),
-                ("ticks_7s", 7),
-            ):
-                candles, candidate_bucket = _query_agg_candles(
-                    db,
-                    asset_id=asset_id,
-                    start_dt=start_dt,
-                    end_dt=end_dt,
-                    bucket_seconds=bucket_seconds,
-                    view_name=view_name,
-                    view_bucket_seconds=view_bucket,
-                )
-                if candles:
-                    bucket_seconds = candidate_bucket
-                    break
-
-        if not candles and dialect == "postgresql":
-            bucket_interval = f"{bucket_seconds} seconds"
-            sql = text(
-                """
-                SELECT
-                  time_bucket(CAST(:bucket AS interval), timestamp) AS bucket,
-                  first(price, timestamp) AS open,
-                  max(price) AS high,
-                  min(price) AS low,
-                  last(price, timestamp) AS close,
-                  SUM(amount) AS volume,
-                  COUNT(*) AS trades
-                FROM market_trades
-                WHERE exchange = :exchange
-                  AND symbol = :symbol
-                  AND timestamp >= :start
-                  AND timestamp <= :end
-                GROUP BY bucket
-                ORDER BY bucket ASC
-                """
-            )
-            try:
-                rows = (
-                    db.execute(
-                        sql,
-                        {
-                            "bucket": bucket_interval,
-                            "exchange": exchange,
-                            "symbol": symbol,
-                            "start": start_dt,
-                            "end": end_dt,
-                        },
-                    )
-                    .mappings()
-                    .all()
-                )
-                for row in rows:
-                    bucket = row.get("bucket")
-                    open_p = row.get("open")
-                    high_p = row.get("high")
-                    low_p = row.get("low")
-                    close_p = row.get("close")
-                    volume = row.get("volume")
-                    trades = row.get("trades")
-                    if bucket is None or open_p is None or high_p is None or low_p is None or close_p is None:
-                        continue
-                    candles.append(
-                        {
-                            "timestamp": bucket.isoformat(),
-                            "open": float(open_p),
-                            "high": float(high_p),
-                            "low": float(low_p),
-                            "close": float(close_p),
-                            "volume": float(volume) if volume is not None else 0.0,
-                            "trades": int(trades) if trades is not None else 0,
-                        }
-                    )
-            except Exception:
-                candles = []
-
-        if not candles and asset_id:
-            rows = (
-                db.query(Tick)
-                .filter(
-                    Tick.asset_id == asset_id,
-                    Tick.time >= start_dt,
-                    Tick.time <= end_dt,
-                )
-                .order_by(Tick.time.asc())
-                .all()
-            )
-            buckets: dict[int, dict] = {}
-            for row in rows:
-                ts = row.time
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                else:
-                    ts = ts.astimezone(timezone.utc)
-
-                # Align buckets to epoch boundaries to match time_bucket behavior.
-                bucket_epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
-                item = buckets.get(bucket_epoch)
-                price = float(row.price)
-                amount = float(row.volume)
-                if item is None:
-                    buckets[bucket_epoch] = {
-                        "timestamp": datetime.fromtimestamp(bucket_epoch, tz=timezone.utc).isoformat(),
-                        "open": price,
-                        "high": price,
-                        "low": price,
-                        "close": price,
-                        "volume": amount,
-                        "trades": 1,
-                    }
-                else:
-                    item["high"] = max(float(item["high"]), price)
-                    item["low"] = min(float(item["low"]), price)
-                    item["close"] = price
-                    item["volume"] = float(item["volume"]) + amount
-                    item["trades"] = int(item["trades"]) + 1
-
-            for bucket_epoch in sorted(buckets.keys()):
-                candles.append(buckets[bucket_epoch])
-
-        if not candles:
-            rows = (
-                db.query(MarketTrade)
-                .filter(
-                    MarketTrade.exchange == exchange,
-                    MarketTrade.symbol == symbol,
-                    MarketTrade.timestamp >= start_dt,
-                    MarketTrade.timestamp <= end_dt,
-                )
-                .order_by(MarketTrade.timestamp.asc())
-                .all()
-            )
-            buckets: dict[int, dict] = {}
-            for row in rows:
-                ts = row.timestamp
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                else:
-                    ts = ts.astimezone(timezone.utc)
-
-                # Align buckets to epoch boundaries to match time_bucket behavior.
-                bucket_epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
-                item = buckets.get(bucket_epoch)
-                price = float(row.price)
-                amount = float(row.amount)
-                if item is None:
-                    buckets[bucket_epoch] = {
-                        "timestamp": datetime.fromtimestamp(bucket_epoch, tz=timezone.utc).isoformat(),
-                        "open": price,
-                        "high": price,
-                        "low": price,
-                        "close": price,
-                        "volume": amount,
-                        "trades": 1,
-                    }
-                else:
-                    item["high"] = max(float(item["high"]), price)
-                    item["low"] = min(float(item["low"]), price)
-                    item["close"] = price
-                    item["volume"] = float(item["volume"]) + amount
-                    item["trades"] = int(item["trades"]) + 1
-
-            for bucket_epoch in sorted(buckets.keys()):
-                candles.append(buckets[bucket_epoch])
-
-        # Fallback: query the prices table (used by backfill) if no data in market_trades
-        if not candles:
-            prices_rows = (
-                db.query(Price)
-                .filter(
-                    Price.exchange == exchange,
-                    Price.symbol == symbol,
-                    Price.timestamp >= start_dt,
-                    Price.timestamp <= end_dt,
-                )
-                .order_by(Price.timestamp.asc())
-                .all()
-            )
-            buckets = {}
-            for row in prices_rows:
-                ts = row.timestamp
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                else:
-                    ts = ts.astimezone(timezone.utc)
-
-                bucket_epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
-                item = buckets.get(bucket_epoch)
-                open_p = float(row.open) if row.open else 0.0
-                high_p = float(row.high) if row.high else 0.0
-                low_p = float(row.low) if row.low else 0.0
-                close_p = float(row.close) if row.close else 0.0
-                volume = float(row.volume) if row.volume else 0.0
-                if item is None:
-                    buckets[bucket_epoch] = {
-                        "timestamp": datetime.fromtimestamp(bucket_epoch, tz=timezone.utc).isoformat(),
-                        "open": open_p,
-                        "high": high_p,
-                        "low": low_p,
-                        "close": close_p,
-                        "volume": volume,
-                        "trades": 1,
-                    }
-                else:
-                    # For aggregation, update OHLC properly
-                    item["high"] = max(item["high"], high_p)
-                    item["low"] = min(item["low"], low_p) if item["low"] > 0 else low_p
-                    item["close"] = close_p
-                    item["volume"] = item["volume"] + volume
-                    item["trades"] = item["trades"] + 1
+        candles, plan, cache = await candle_cache.load(db, "candles", exchange, symbol, start_dt, end_dt, bucket_seconds)
 
-            for bucket_epoch in sorted(buckets.keys()):
-                candles.append(buckets[bucket_epoch])
+        if end_dt >= datetime.now(timezone.utc) - timedelta(seconds=bucket_seconds):
+            try:
+                if bucket_seconds in parse_bar_intervals(settings.STREAM_BAR_INTERVALS):
+                    open_bar = await get_open_bar(redis_client, exchange, symbol, interval_label(bucket_seconds))
+                    candles = merge_open_bar(candles, open_bar, bucket_seconds=bucket_seconds)
+            except Exception as e:
+                logger.debug(f"Live open bar unavailable for {exchange}:{symbol}: {e}")
 
         backfill_status = None
-        if not candles and _should_enqueue_celery():
+        if not len(candles) and _should_enqueue_celery():
             try:
                 from celery_worker.tasks import backfill_historical_candles
                 range_days = max(1, int((end_dt - start_dt).total_seconds() // 86400) + 1)
@@ -1538,7 +974,7 @@ def create_app() -> FastAPI:
             except Exception:
                 backfill_status = {"queued": False}
 
-        return {
+        payload = {
             "exchange": exchange,
             "symbol": symbol,
             "start": start_dt.isoformat(),
@@ -1546,136 +982,79 @@ def create_app() -> FastAPI:
             "timeframe": timeframe,
             "requested_bucket_seconds": requested_bucket_seconds,
             "bucket_seconds": bucket_seconds,
-            "candles": candles,
             "backfill": backfill_status,
+            "plan": {**plan.to_dict(), "cache": cache},
         }
+        if encoding == ROWS:
+            return FastJSONResponse({**payload, "candles": candles.records()})
+        return columns_response(payload, "candles", columns_arrays(candles), encoding)
 
-    @api.get("/market/coverage/{exchange}/{symbol:path}", tags=["Data"])
-    async def get_market_coverage(exchange: str, symbol: str, db: Session = Depends(get_db)):
+    def _market_coverage(db: Session, exchange: str, symbol: str) -> dict:
         """
-        Returns what is currently persisted in TimescaleDB for a given exchange+symbol.
-
-        Useful for validating that the writer is storing trades and for estimating how much historic data you have.
+        Persisted trade range and count of one market, from the candle planner's
+        source coverage. Blocking: call through `run_db`.
         """
-        exchange = exchange.strip().lower()
         base_symbol = symbol
         if exchange == "auto":
             base_symbol = _normalize_dash_symbol(symbol)
             exchange = _select_exchange_for_symbols(db, [base_symbol])
         symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
-        dialect = db.get_bind().dialect.name
-        asset_id = _resolve_asset_id(db, exchange, symbol)
-
-        if asset_id:
-            if dialect == "postgresql":
-                sql = text(
-                    """
-                    SELECT
-                      min(time) AS first_ts,
-                      max(time) AS last_ts,
-                      count(*) AS trades
-                    FROM ticks
-                    WHERE asset_id = :asset_id
-                    """
-                )
-                try:
-                    row = (
-                        db.execute(sql, {"asset_id": asset_id})
-                        .mappings()
-                        .one()
-                    )
-                    first_ts = row.get("first_ts")
-                    last_ts = row.get("last_ts")
-                    count = row.get("trades")
-                except Exception:
-                    first_ts = last_ts = count = None
-            else:
-                first_ts, last_ts, count = (
-                    db.query(
-                        func.min(Tick.time),
-                        func.max(Tick.time),
-                        func.count(Tick.id),
-                    )
-                    .filter(Tick.asset_id == asset_id)
-                    .one()
-                )
-
-            if count:
-                return {
-                    "exchange": exchange,
-                    "symbol": symbol,
-                    "trades": int(count or 0),
-                    "first_timestamp": first_ts.isoformat() if first_ts else None,
-                    "last_timestamp": last_ts.isoformat() if last_ts else None,
-                    "source": "ticks",
-                }
-
-            if dialect == "postgresql":
-                for view_name, view_bucket in (
-                    ("ticks_1s", 1),
-                    ("ticks_3s", 3),
-                    ("ticks_5s", 5),
-                    ("ticks_7s", 7),
-                ):
-                    try:
-                        sql = text(
-                            f"""
-                            SELECT
-                              min(bucket) AS first_ts,
-                              max(bucket) AS last_ts,
-                              SUM(trades) AS trades
-                            FROM {view_name}
-                            WHERE asset_id = :asset_id
-                            """
-                        )
-                        row = (
-                            db.execute(sql, {"asset_id": asset_id})
-                            .mappings()
-                            .one()
-                        )
-                    except Exception:
-                        continue
-
-                    count = row.get("trades")
-                    if count:
-                        return {
-                            "exchange": exchange,
-                            "symbol": symbol,
-                            "trades": int(count or 0),
-                            "first_timestamp": row.get("first_ts").isoformat()
-                            if row.get("first_ts")
-                            else None,
-                            "last_timestamp": row.get("last_ts").isoformat()
-                            if row.get("last_ts")
-                            else None,
-                            "source": view_name,
-                            "granularity_seconds": view_bucket,
-                        }
-
-        first_ts, last_ts, count = (
-            db.query(
-                func.min(MarketTrade.timestamp),
-                func.max(MarketTrade.timestamp),
-                func.count(MarketTrade.id),
+        # A fresh read: this endpoint checks the writer, and the planner gets it too.
+        coverage = coverage_cache.get(db, exchange, symbol, refresh=True)
+
+        ticks = coverage.sources.get("ticks")
+        if ticks is not None and ticks.latest is not None:
+            source = "ticks"
+            count_query = db.query(func.count(Tick.id)).filter(Tick.asset_id == coverage.asset_id)
+        else:
+            source = "market_trades"
+            trades = trades_source().c
+            count_query = db.query(func.count(trades.id)).filter(
+                trades.exchange == exchange, trades.symbol == symbol
             )
-            .filter(MarketTrade.exchange == exchange, MarketTrade.symbol == symbol)
-            .one()
-        )
+        span = coverage.sources.get(source)
+        count = count_query.scalar() if span is not None and span.latest is not None else 0
 
         return {
             "exchange": exchange,
             "symbol": symbol,
             "trades": int(count or 0),
-            "first_timestamp": first_ts.isoformat() if first_ts else None,
-            "last_timestamp": last_ts.isoformat() if last_ts else None,
-            "source": "market_trades",
+            "first_timestamp": span.earliest.isoformat() if span and span.earliest else None,
+            "last_timestamp": span.latest.isoformat() if span and span.latest else None,
+            "source": source,
         }
 
+    @api.get("/market/coverage/{exchange}/{symbol:path}", tags=["Data"])
+    async def get_market_coverage(exchange: str, symbol: str, db: Session = Depends(get_analytics_db)):
+        """
+        Returns what is currently persisted in TimescaleDB for a given exchange+symbol.
+
+        Useful for validating that the writer is storing trades and for estimating how much historic data you have.
+        """
+        return await run_db(_market_coverage, db, exchange.strip().lower(), symbol)
+
+    def _detect_market_gaps(
+        db: Session,
+        exchange: str,
+        symbol: str,
+        **options,
+    ) -> tuple[str, str, dict]:
+        """
+        Resolved exchange, exchange symbol and `detect_gaps_data` result.
+        Blocking: call through `run_db`.
+        """
+        base_symbol = symbol
+        if exchange == "auto":
+            base_symbol = _normalize_dash_symbol(symbol)
+            exchange = _select_exchange_for_symbols(db, [base_symbol])
+        symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
+        return exchange, symbol, detect_gaps_data(db, exchange=exchange, symbol=symbol, **options)
+
     @api.get("/market/gaps/{exchange}/{symbol:path}", tags=["Data"])
     async def get_market_gaps(
         exchange: str,
         symbol: str,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_analytics_db),
         start: datetime | None = Query(default=None, description="Start time (ISO 8601). Defaults to 1h ago."),
         end: datetime | None = Query(default=None, description="End time (ISO 8601). Defaults to now (UTC)."),
         bucket_seconds: int = Query(default=1, ge=1, description="Gap bucket size in seconds."),
@@ -1691,22 +1070,16 @@ def create_app() -> FastAPI:
         Note: a gap means "no data recorded in the bucket" at the chosen resolution,
         not necessarily that trades were missing on the exchange.
         """
-        exchange = exchange.strip().lower()
-        base_symbol = symbol
-        if exchange == "auto":
-            base_symbol = _normalize_dash_symbol(symbol)
-            exchange = _select_exchange_for_symbols(db, [base_symbol])
-        symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
-
         end_dt = _to_utc(end) if end else datetime.now(timezone.utc)
         start_dt = _to_utc(start) if start else end_dt - timedelta(hours=1)
         if start_dt > end_dt:
             raise HTTPException(status_code=400, detail="Invalid time range: start must be <= end.")
 
-        gap_data = detect_gaps_data(
+        exchange, symbol, gap_data = await run_db(
+            _detect_market_gaps,
             db,
-            exchange=exchange,
-            symbol=symbol,
+            exchange.strip().lower(),
+            symbol,
             start_dt=start_dt,
             end_dt=end_dt,
             bucket_seconds=bucket_seconds,
@@ -1754,12 +1127,6 @@ def create_app() -> FastAPI:
         Note: bulk sources are coarse (daily or hourly). Small gaps may still result
         in large data pulls, but idempotency prevents duplicates.
         """
-        exchange = exchange.strip().lower()
-        base_symbol = symbol
-        if exchange == "auto":
-            base_symbol = _normalize_dash_symbol(symbol)
-            exchange = _select_exchange_for_symbols(db, [base_symbol])
-        symbol = _normalize_symbol_for_exchange(exchange, base_symbol)
         import_source = import_source.strip().lower()
         kind = kind.strip()
 
@@ -1768,10 +1135,11 @@ def create_app() -> FastAPI:
         if start_dt > end_dt:
             raise HTTPException(status_code=400, detail="Invalid time range: start must be <= end.")
 
-        gap_data = detect_gaps_data(
+        exchange, symbol, gap_data = await run_db(
+            _detect_market_gaps,
             db,
-            exchange=exchange,
-            symbol=symbol,
+            exchange.strip().lower(),
+            symbol,
             start_dt=start_dt,
             end_dt=end_dt,
             bucket_seconds=bucket_seconds,
@@ -1850,9 +1218,40 @@ def create_app() -> FastAPI:
             "skipped_gaps": max(0, len(gap_ranges) - max_ranges),
         }
 
+    def _latest_persisted(
+        db: Session,
+        exchange: str,
+        symbols: list[str],
+    ) -> dict[str, tuple[datetime | None, str | None]]:
+        """Latest stored trade time and its source per symbol. Blocking: call through `run_db`."""
+        latest: dict[str, tuple[datetime | None, str | None]] = {}
+        for sym in symbols:
+            asset_id = _resolve_asset_id(db, exchange, sym)
+            latest_db = None
+            source_used = None
+            if asset_id is not None:
+                latest_db = (
+                    db.query(func.max(Tick.time))
+                    .filter(Tick.asset_id == asset_id)
+                    .scalar()
+                )
+                if latest_db:
+                    source_used = "ticks"
+            if latest_db is None:
+                trades = trades_source().c
+                latest_db = (
+                    db.query(func.max(trades.timestamp))
+                    .filter(trades.exchange == exchange, trades.symbol == sym)
+                    .scalar()
+                )
+                if latest_db:
+                    source_used = "market_trades"
+            latest[sym] = (latest_db, source_used)
+        return latest
+
     @api.get("/system/ingestion/health", tags=["System"])
     async def get_ingestion_health(
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_analytics_db),
         exchange: str = Query(default="coinbase"),
         symbols: str | None = Query(default=None, description="Comma-separated symbols (e.g. BTC-USD,ETH-USD)"),
         lookback_hours: int = Query(default=24, ge=1, le=168),
@@ -1866,19 +1265,18 @@ def create_app() -> FastAPI:
         latest_stream: dict[str, datetime | None] = {}
 
         if symbol_list:
-            keys = [f"latest:{exchange}:{sym}" for sym in symbol_list]
             try:
-                raw_values = await redis_client.mget(keys)
+                latest_payloads = await get_latest_many(redis_client, exchange, symbol_list)
             except Exception:
                 redis_ok = False
-                raw_values = [None] * len(keys)
+                latest_payloads = {}
 
-            for sym, raw in zip(symbol_list, raw_values):
-                if not raw:
+            for sym in symbol_list:
+                payload = latest_payloads.get(sym)
+                if not payload:
                     latest_stream[sym] = None
                     continue
                 try:
-                    payload = json.loads(raw)
                     ts = payload.get("ts")
                     latest_stream[sym] = (
                         datetime.fromtimestamp(float(ts), tz=timezone.utc) if ts is not None else None
@@ -1886,28 +1284,10 @@ def create_app() -> FastAPI:
                 except Exception:
                     latest_stream[sym] = None
 
+        latest_persisted = await run_db(_latest_persisted, db, exchange, symbol_list)
         symbol_health: list[dict] = []
         for sym in symbol_list:
-            asset_id = _resolve_asset_id(db, exchange, sym)
-            latest_db = None
-            source_used = None
-            if asset_id is not None:
-                latest_db = (
-                    db.query(func.max(Tick.time))
-                    .filter(Tick.asset_id == asset_id)
-                    .scalar()
-                )
-                if latest_db:
-                    source_used = "ticks"
-            if latest_db is None:
-                latest_db = (
-                    db.query(func.max(MarketTrade.timestamp))
-                    .filter(MarketTrade.exchange == exchange, MarketTrade.symbol == sym)
-                    .scalar()
-                )
-                if latest_db:
-                    source_used = "market_trades"
-
+            latest_db, source_used = latest_persisted[sym]
             stream_ts = latest_stream.get(sym)
             if latest_db and latest_db.tzinfo is None:
                 latest_db = latest_db.replace(tzinfo=timezone.utc)
@@ -1925,6 +1305,33 @@ def create_app() -> FastAPI:
                 }
             )
 
+        stream_queues: list[dict] = []
+        try:
+            raw_queues = await redis_client.hgetall(QUEUE_STATS_KEY)
+        except Exception:
+            raw_queues = {}
+        if isinstance(raw_queues, dict):
+            prefix = f"{exchange.upper()}:"
+            for shard, raw in sorted(raw_queues.items()):
+                if not str(shard).startswith(prefix):
+                    continue
+                try:
+                    stream_queues.append({"shard": shard, **json.loads(raw)})
+                except (TypeError, ValueError):
+                    continue
+
+        stream_writers: list[dict] = []
+        try:
+            raw_writers = await redis_client.hgetall(WRITER_METRICS_KEY)
+        except Exception:
+            raw_writers = {}
+        if isinstance(raw_writers, dict):
+            for stream_key, raw in sorted(raw_writers.items()):
+                try:
+                    stream_writers.append({"stream": stream_key, **json.loads(raw)})
+                except (TypeError, ValueError):
+                    continue
+
         cutoff = now - timedelta(hours=lookback_hours)
         import_counts = (
             db.query(ImportRun.status, func.count(ImportRun.id))
@@ -1939,6 +1346,8 @@ def create_app() -> FastAPI:
             "exchange": exchange,
             "redis_ok": redis_ok,
             "symbols": symbol_health,
+            "stream_queues": stream_queues,
+            "stream_writers": stream_writers,
             "imports": {
                 "lookback_hours": lookback_hours,
                 "counts": import_summary,
@@ -1952,13 +1361,14 @@ def create_app() -> FastAPI:
             default="auto",
             description="Exchange to use (auto or exchange id).",
         ),
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
+        format: str = Query(default="rows", description=_FORMAT_DESCRIPTION),
+        accept: str | None = Header(default=None),
     ):
+        encoding = negotiate(format, accept)
         symbol = _normalize_dash_symbol(symbol)
-        exchange_key = resolve_price_exchange(db, symbol, exchange)
-        symbol = _normalize_symbol_for_exchange(exchange_key, symbol)
         # 1. Get Latest Timestamp (Lightweight Query)
-        latest_ts = db.query(func.max(Price.timestamp)).filter(Price.exchange == exchange_key, Price.symbol == symbol).scalar()
+        exchange_key, symbol, latest_ts = await run_db(_resolve_price_market, db, symbol, exchange)
         
         if not latest_ts:
             # Trigger On-Demand Backfill
@@ -1982,60 +1392,57 @@ def create_app() -> FastAPI:
             # Non-blocking failure; we don't want to fail the API call if Redis PubSub fails
             print(f"Failed to trigger dynamic subscription: {e}")
 
-        # 2. Check Cache (Keyed by Symbol + Timestamp)
+        # 2. Check Cache (Keyed by Symbol + Timestamp, rows or columnar)
         # This ensures we always serve fresh results without re-calculating if data hasn't changed
         cache_key = f"analysis:{exchange_key}:{symbol}:{int(latest_ts.timestamp())}"
+        if encoding != ROWS:
+            cache_key += ":columnar"
         try:
             cached_result = await redis_client.get(cache_key)
         except Exception:
             cached_result = None
-        
+
         if cached_result:
-             try:
-                 return json.loads(cached_result)
-             except (TypeError, ValueError, json.JSONDecodeError):
-                 pass
+            if encoding in (ROWS, COLUMNAR):
+                # Stored JSON is served as is, without a decode/encode round trip.
+                return Response(cached_result, media_type="application/json")
+            try:
+                cached = json.loads(cached_result)
+                arrays = json_arrays(cached["data"])
+                return columns_response({"calculated_at": cached["calculated_at"]}, "data", arrays, encoding)
+            except (TypeError, ValueError, KeyError, AttributeError):
+                pass
 
         # 3. Compute (Cache Miss)
-        price_data = (
-            db.query(Price)
-            .filter(Price.exchange == exchange_key, Price.symbol == symbol)
-            .order_by(Price.timestamp.desc())
-            .limit(500)
-            .all()
-        )
-
-        df = pd.DataFrame(
-            [(p.timestamp, float(p.high), float(p.low), float(p.open), float(p.close), float(p.volume) if p.volume else 0.0) for p in price_data],
-            columns=["timestamp", "high", "low", "open", "close", "volume"],
-        )
-        df = df.drop_duplicates(subset=["timestamp"], keep="last")
-        df = df.sort_values(by="timestamp")
-        
-        for col in ("close", "high", "low", "volume"):
-            df[col] = pd.to_numeric(df[col])
+        df = await run_db(load_price_frame, db, exchange_key, symbol, 500)
+        if not df.empty:
+            df = df.drop_duplicates(subset=["timestamp"], keep="last")
 
         # Run CPU-intensive analysis in threadpool to avoid blocking event loop
         analysis_df = await asyncio.to_thread(add_technical_indicators, df)
-        
-        # Ensure timestamps are serialized to strings
-        if "timestamp" in analysis_df.columns:
-            analysis_df["timestamp"] = analysis_df["timestamp"].astype(str)
-        
-        result = analysis_df.to_dict(orient="records")
-        
+
         # Add metadata for "Signal Age" feature
-        response = {
-            "calculated_at": datetime.now(timezone.utc).isoformat(),
-            "data": result
-        }
-        
+        calculated_at = datetime.now(timezone.utc).isoformat()
+        if encoding == ROWS:
+            # Ensure timestamps are serialized to strings
+            if "timestamp" in analysis_df.columns:
+                analysis_df["timestamp"] = analysis_df["timestamp"].astype(str)
+            body = dumps({"calculated_at": calculated_at, "data": analysis_df.to_dict(orient="records")})
+            response = Response(body, media_type="application/json")
+        else:
+            arrays = frame_arrays(analysis_df)
+            body = dumps({"calculated_at": calculated_at, "format": COLUMNAR, "data": arrays})
+            if encoding == COLUMNAR:
+                response = Response(body, media_type="application/json")
+            else:
+                response = columns_response({"calculated_at": calculated_at}, "data", arrays, encoding)
+
         # Cache for 24h (or until timestamp changes, effectively forever for this specific candle set)
         try:
-            await redis_client.setex(cache_key, 86400, json.dumps(response))
+            await redis_client.setex(cache_key, 86400, body.decode("utf-8"))
         except Exception:
             pass
-        
+
         return response
 
     @api.get("/coin/{symbol:path}/quant", tags=["Analysis"])
@@ -2045,16 +1452,14 @@ def create_app() -> FastAPI:
             default="auto",
             description="Exchange to use (auto or exchange id).",
         ),
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
     ):
         """
         Returns institutional-grade quantitative risk metrics (Sharpe, Sortino, Volatility, etc.)
         """
         symbol = _normalize_dash_symbol(symbol)
-        exchange_key = resolve_price_exchange(db, symbol, exchange)
-        symbol = _normalize_symbol_for_exchange(exchange_key, symbol)
         # 1. Get Latest Timestamp
-        latest_ts = db.query(func.max(Price.timestamp)).filter(Price.exchange == exchange_key, Price.symbol == symbol).scalar()
+        exchange_key, symbol, latest_ts = await run_db(_resolve_price_market, db, symbol, exchange)
         
         if not latest_ts:
              # Trigger On-Demand Backfill
@@ -2090,20 +1495,9 @@ def create_app() -> FastAPI:
                  pass
                  
         # 3. Compute (Cache Miss)
-        price_data = (
-            db.query(Price)
-            .filter(Price.exchange == exchange_key, Price.symbol == symbol)
-            .order_by(Price.timestamp.desc())
-            .limit(365) # 1 year lookback for quant metrics
-            .all()
-        )
-
-        df = pd.DataFrame(
-            [(p.timestamp, float(p.close)) for p in price_data],
-            columns=["timestamp", "close"],
-        ).sort_values(by="timestamp")
-        
-        df["close"] = pd.to_numeric(df["close"])
+        df = await run_db(load_price_frame, db, exchange_key, symbol, 365)  # 1 year lookback for quant metrics
+        if df.empty:
+            df = pd.DataFrame(columns=["timestamp", "close"])
         
         # Run calculation in threadpool
         metrics = await asyncio.to_thread(calculate_risk_metrics, df)
@@ -2285,7 +1679,7 @@ def create_app() -> FastAPI:
     # --- Signal Generation ---
     @api.get("/signals/batch", tags=["Analysis"])
     async def get_batch_signals(
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_analytics_db),
         symbols: str = Query(default="BTC-USD,ETH-USD,SOL-USD", description="Comma-separated symbols"),
         exchange: str | None = Query(
             default="auto",
@@ -2311,20 +1705,19 @@ def create_app() -> FastAPI:
         if not symbol_list:
             raise HTTPException(status_code=400, detail="No symbols provided")
         
-        exchange_map = {
-            sym: (exchange_key if exchange_key != "auto" else resolve_price_exchange(db, sym, exchange_key))
-            for sym in symbol_list
-        }
-        exchange_map = {sym: ex for sym, ex in exchange_map.items() if ex}
+        def _generate() -> list:
+            exchange_map = {
+                sym: (exchange_key if exchange_key != "auto" else resolve_price_exchange(db, sym, exchange_key))
+                for sym in symbol_list
+            }
+            exchange_map = {sym: ex for sym, ex in exchange_map.items() if ex}
+            return SignalEngine(db).generate_signals_batch(
+                symbol_list,
+                exchange_map=exchange_map,
+                include_externals=False,
+            )
 
-        engine = SignalEngine(db)
-        # Run in threadpool
-        signals = await asyncio.to_thread(
-            engine.generate_signals_batch,
-            symbol_list,
-            exchange_map=exchange_map,
-            include_externals=False,
-        )
+        signals = await run_db(_generate)
         
         response = {
             "count": len(signals),
@@ -2344,19 +1737,17 @@ def create_app() -> FastAPI:
             default="auto",
             description="Exchange to use (auto or exchange id).",
         ),
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         lookback: int = Query(default=500, ge=50, le=2000, description="Number of candles to analyze"),
     ):
         """
         Generate a trading signal for the given symbol.
         """
         symbol = symbol.strip().upper().replace("/", "-")
-        exchange_key = resolve_price_exchange(db, symbol, exchange)
-        symbol = _normalize_symbol_for_exchange(exchange_key, symbol)
+        # 1. Get Latest Timestamp
+        exchange_key, symbol, latest_ts = await run_db(_resolve_price_market, db, symbol, exchange)
         if not exchange_key:
             raise HTTPException(status_code=404, detail="No price data available for this symbol.")
-        # 1. Get Latest Timestamp
-        latest_ts = db.query(func.max(Price.timestamp)).filter(Price.exchange == exchange_key, Price.symbol == symbol).scalar()
         
         if not latest_ts:
              raise HTTPException(
@@ -2375,8 +1766,7 @@ def create_app() -> FastAPI:
 
         # 3. Compute (Cache Miss)
         engine = SignalEngine(db)
-        # Run in threadpool
-        signal = await asyncio.to_thread(engine.generate_signal, symbol, lookback=lookback, exchange=exchange_key)
+        signal = await run_db(engine.generate_signal, symbol, lookback=lookback, exchange=exchange_key)
         
         if signal is None:
             raise HTTPException(
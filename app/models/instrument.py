@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
     String,
     Text,
@@ -7,7 +8,8 @@ from sqlalchemy import (
     JSON,
     Integer,
     Float,
-    UniqueConstraint,
+    Index,
+    desc,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
@@ -46,19 +48,19 @@ class Price(Base):
     __tablename__ = "prices"
 
     __table_args__ = (
-        UniqueConstraint("exchange", "symbol", "timestamp", name="uix_price_exchange_symbol_timestamp"),
+        # Serves "latest bars of one market" reads and the live bar upsert.
+        Index("uix_price_exchange_symbol_timestamp", "exchange", "symbol", desc("timestamp"), unique=True),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    symbol = Column(String(20), nullable=False, index=True)
+    symbol = Column(String(20), nullable=False)
     exchange = Column(
         String(20),
         nullable=False,
-        index=True,
         default="coinbase",
         server_default="coinbase",
     )
-    timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
     open = Column(DECIMAL)
     high = Column(DECIMAL)
     low = Column(DECIMAL)
@@ -69,6 +71,27 @@ class Price(Base):
         return f"<Price(symbol='{self.symbol}', close={self.close}, timestamp='{self.timestamp}')>"
 
 
+class PriceLatest(Base):
+    """
+    SQLAlchemy ORM model for the `price_latest` table.
+    One row per market: the newest `prices` bar and how many bars are stored.
+    Maintained by `app.services.price_latest.record_prices`.
+    """
+
+    __tablename__ = "price_latest"
+
+    exchange = Column(String(20), primary_key=True)
+    symbol = Column(String(50), primary_key=True)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    close = Column(DECIMAL)
+    row_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    source = Column(String(32))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PriceLatest(exchange='{self.exchange}', symbol='{self.symbol}', close={self.close}, timestamp='{self.timestamp}')>"
+
+
 class Indicator(Base):
     """
     SQLAlchemy ORM model for the `indicators` table.
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import BigInteger, Column, DateTime, Integer, Numeric, String
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, Numeric, String, desc
 
 from database import Base
 
@@ -13,13 +13,17 @@ class MarketTrade(Base):
         primary_key=True,
         autoincrement=True,
     )
-    exchange = Column(String(20), nullable=False, index=True)
-    symbol = Column(String(50), nullable=False, index=True)
-    timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
+    exchange = Column(String(20), nullable=False)
+    symbol = Column(String(50), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
     receipt_timestamp = Column(DateTime(timezone=True), nullable=True)
     price = Column(Numeric, nullable=False)
     amount = Column(Numeric, nullable=False)
     side = Column(String(8), nullable=True)
 
+    __table_args__ = (
+        Index("ix_market_trades_exchange_symbol_time", "exchange", "symbol", desc("timestamp")),
+    )
+
     def __repr__(self):
         return f"<MarketTrade(exchange={self.exchange!r}, symbol={self.symbol!r}, price={self.price}, ts={self.timestamp})>"
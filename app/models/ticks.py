@@ -9,6 +9,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    SmallInteger,
     String,
     UniqueConstraint,
     text,
@@ -46,11 +47,29 @@ class Asset(Base):
     )
 
 
+class TickSource(Base):
+    """Small id for each tick ingest source (stream, binance_vision, ...)."""
+
+    __tablename__ = "tick_sources"
+
+    id = Column(
+        SmallInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    name = Column(String(32), nullable=False, unique=True)
+
+
 class Tick(Base):
     """
     Raw tick-level trades.
 
     owner_id is reserved for user-scoped imports; null indicates global data.
+
+    Compact layout: side_code (1 buy, 2 sell), numeric exchange trade ids in
+    trade_id with exchange_trade_id only as the fallback for non-numeric ids,
+    and source_id into `tick_sources`. side, received_at and ingest_source are
+    legacy columns that are no longer written (see `app.services.imports.compact`).
     """
 
     __tablename__ = "ticks"
@@ -64,12 +83,16 @@ class Tick(Base):
     asset_id = Column(Integer, ForeignKey("assets.id"), nullable=False, index=True)
     price = Column(Float, nullable=False)
     volume = Column(Float, nullable=False)
-    side = Column(String(4), nullable=True)
+    side_code = Column(SmallInteger, nullable=True)
+    trade_id = Column(BigInteger, nullable=True)
     exchange_trade_id = Column(String(64), nullable=True)
-    received_at = Column(DateTime(timezone=True), nullable=True)
-    ingest_source = Column(String(32), nullable=True)
+    source_id = Column(SmallInteger, ForeignKey("tick_sources.id"), nullable=True)
     is_aggregated = Column(Boolean, nullable=False, default=False)
     owner_id = Column(String(64), nullable=True)
+    # Legacy, NULL for rows written after migration 20261017_0002.
+    side = Column(String(4), nullable=True)
+    received_at = Column(DateTime(timezone=True), nullable=True)
+    ingest_source = Column(String(32), nullable=True)
 
     asset = relationship("Asset", back_populates="ticks")
 
@@ -84,6 +107,14 @@ class Tick(Base):
             unique=True,
             postgresql_where=text("exchange_trade_id IS NOT NULL"),
         ),
+        Index(
+            "ux_ticks_asset_trade_id_time",
+            "asset_id",
+            "trade_id",
+            "time",
+            unique=True,
+            postgresql_where=text("trade_id IS NOT NULL"),
+        ),
     )
 
 
@@ -8,6 +8,7 @@ class RedisClient:
     """
 
     _redis_pool = None
+    _binary_pool = None
 
     @classmethod
     def get_redis(cls) -> redis.Redis:
@@ -19,5 +20,15 @@ class RedisClient:
             cls._redis_pool = redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
         return cls._redis_pool
 
+    @classmethod
+    def get_binary_redis(cls) -> redis.Redis:
+        """
+        Returns a Redis connection that leaves replies as bytes, for reading
+        packed binary stream entries.
+        """
+        if cls._binary_pool is None:
+            cls._binary_pool = redis.from_url(settings.CELERY_BROKER_URL, decode_responses=False)
+        return cls._binary_pool
+
 
 redis_client = RedisClient.get_redis()
\ No newline at end of file
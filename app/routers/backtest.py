@@ -14,7 +14,7 @@ from app.models.backtest import BacktestRun, BacktestTrade, BacktestReport
 from app.models.user import User
 from app.routers.auth import get_current_user
 from app.services.market_candles import load_candles_df
-from database import get_db
+from database import get_analytics_db, get_db
 
 
 router = APIRouter(prefix="/backtests", tags=["Backtesting"])
@@ -47,6 +47,7 @@ class BacktestResponse(BaseModel):
     source: str
     requested_bucket_seconds: int
     bucket_seconds: int
+    plan: dict[str, Any] | None = None
     trades: list[dict] | None = None
     equity_curve: list[dict] | None = None
 
@@ -79,6 +80,7 @@ class WalkForwardResponse(BaseModel):
     report_id: int | None
     summary: dict[str, Any]
     windows: list[dict[str, Any]]
+    plan: dict[str, Any] | None = None
 
 
 @router.get("/strategies")
@@ -90,11 +92,12 @@ def get_strategies():
 def run_backtest(
     payload: BacktestRequest,
     db: Session = Depends(get_db),
+    analytics_db: Session = Depends(get_analytics_db),
     current_user: User = Depends(get_current_user),
 ):
     try:
         candles = load_candles_df(
-            db=db,
+            db=analytics_db,
             exchange=payload.exchange,
             symbol=payload.symbol,
             start=payload.start,
@@ -185,6 +188,7 @@ def run_backtest(
         source=candles.source,
         requested_bucket_seconds=candles.requested_bucket_seconds,
         bucket_seconds=candles.bucket_seconds,
+        plan=candles.plan.to_dict() if candles.plan else None,
         trades=trades_payload,
         equity_curve=equity_payload,
     )
@@ -194,11 +198,12 @@ def run_backtest(
 def run_walk_forward_backtest(
     payload: WalkForwardRequest,
     db: Session = Depends(get_db),
+    analytics_db: Session = Depends(get_analytics_db),
     current_user: User = Depends(get_current_user),
 ):
     try:
         candles = load_candles_df(
-            db=db,
+            db=analytics_db,
             exchange=payload.exchange,
             symbol=payload.symbol,
             start=payload.start,
@@ -261,7 +266,12 @@ def run_walk_forward_backtest(
         db.refresh(report)
         report_id = report.id
 
-    return WalkForwardResponse(report_id=report_id, summary=wf.summary, windows=wf.windows)
+    return WalkForwardResponse(
+        report_id=report_id,
+        summary=wf.summary,
+        windows=wf.windows,
+        plan=candles.plan.to_dict() if candles.plan else None,
+    )
 
 
 @router.get("/reports/{report_id}")
@@ -4,11 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session, joinedload
 
-from database import get_db
+from database import get_db, run_db
 from app.models.portfolio import Portfolio, Order, Holding, OrderSide, OrderStatus
 from app.models.user import User
 from app.routers.auth import get_current_user
 from app.redis_client import redis_client
+from app.services.latest_prices import get_latest_many
 import json
 
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
@@ -89,8 +90,8 @@ async def get_portfolio(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    pf = (
-        db.query(Portfolio)
+    pf = await run_db(
+        lambda: db.query(Portfolio)
         .options(joinedload(Portfolio.holdings))
         .filter(Portfolio.id == id, Portfolio.user_id == current_user.id)
         .first()
@@ -104,28 +105,40 @@ async def get_portfolio(
     total_cost = 0.0
 
     if pf.holdings:
-        # Batch fetch prices
-        symbols = [h.symbol for h in pf.holdings]
-        keys = [f"latest:{sym}" for sym in symbols]
-        
-        # Determine exchange-specific keys if possible (naive batching here)
-        # Ideally we'd use h.exchange, but let's stick to simple efficient latest:{symbol}
-        # or specific if recorded. For simplicity, just use latest:{symbol} as primary cache.
-        
-        try:
-            raw_values = await redis_client.mget(keys)
-        except Exception:
-            raw_values = [None] * len(keys)
+        # Batch fetch prices: one HMGET per exchange hash, with the legacy
+        # latest:{symbol} keys as a fallback for anything not cached there.
+        by_exchange: dict[str, list[str]] = {}
+        for h in pf.holdings:
+            by_exchange.setdefault((h.exchange or "coinbase").lower(), []).append(h.symbol)
+
         price_map = {}
-        for sym, raw in zip(symbols, raw_values):
-            if raw:
-                try:
-                    data = json.loads(raw)
-                    price_map[sym] = float(data.get("price", 0.0))
-                except (TypeError, ValueError, json.JSONDecodeError):
+        for exchange, symbols in by_exchange.items():
+            try:
+                payloads = await get_latest_many(redis_client, exchange, list(dict.fromkeys(symbols)))
+            except Exception:
+                payloads = {}
+            for sym, payload in payloads.items():
+                if payload and sym not in price_map:
+                    try:
+                        price_map[sym] = float(payload.get("price", 0.0))
+                    except (TypeError, ValueError):
+                        continue
+
+        missing = [h.symbol for h in pf.holdings if h.symbol not in price_map]
+        if missing:
+            try:
+                raw_values = await redis_client.mget([f"latest:{sym}" for sym in missing])
+            except Exception:
+                raw_values = [None] * len(missing)
+            for sym, raw in zip(missing, raw_values):
+                if raw:
+                    try:
+                        data = json.loads(raw)
+                        price_map[sym] = float(data.get("price", 0.0))
+                    except (TypeError, ValueError, json.JSONDecodeError):
+                        price_map[sym] = 0.0
+                else:
                     price_map[sym] = 0.0
-            else:
-                price_map[sym] = 0.0
 
         for h in pf.holdings:
             current_price = price_map.get(h.symbol, 0.0)
@@ -13,6 +13,7 @@ from app.redis_client import redis_client
 from app.services.asset_status import build_signal_status
 from app.services.exchange_markets import list_market_assets, queue_kraken_backfills, sync_exchange_markets
 from app.services.market_resolution import normalize_db_symbol
+from app.services.price_latest import get_latest
 from app.services.price_selection import resolve_price_exchange
 from app.signals.engine import SignalEngine
 from database import get_db
@@ -39,26 +40,10 @@ async def get_asset_research_snapshot(
 
     db_symbol = normalize_db_symbol(raw_symbol, exchange_key)
 
-    latest_ts = (
-        db.query(func.max(Price.timestamp))
-        .filter(Price.exchange == exchange_key, Price.symbol == db_symbol)
-        .scalar()
-    )
-    row_count = (
-        db.query(func.count(Price.id))
-        .filter(Price.exchange == exchange_key, Price.symbol == db_symbol)
-        .scalar()
-        or 0
-    )
-    latest_price = None
-    if latest_ts is not None:
-        latest_row = (
-            db.query(Price)
-            .filter(Price.exchange == exchange_key, Price.symbol == db_symbol, Price.timestamp == latest_ts)
-            .first()
-        )
-        if latest_row and latest_row.close is not None:
-            latest_price = float(latest_row.close)
+    latest = get_latest(db, exchange_key, db_symbol)
+    latest_ts = latest.timestamp if latest else None
+    row_count = int(latest.row_count or 0) if latest else 0
+    latest_price = float(latest.close) if latest and latest.close is not None else None
 
     status_record = (
         db.query(AssetDataStatus)
@@ -0,0 +1,200 @@
+"""
+Process-wide ``(exchange, symbol) -> asset id`` map.
+
+Asset ids never change once assigned, so each process keeps them in memory:
+`warm` loads the whole `assets` table with one query at startup, `lookup`
+only goes to the database for pairs it has not seen yet, and
+`get_or_create` inserts missing assets with
+``INSERT ... ON CONFLICT DO NOTHING RETURNING id`` instead of a SELECT first.
+Ids inserted inside a transaction stay private to that session until it
+commits, so a rolled back insert never leaks into the shared map.
+
+Nothing in the app deletes or re-keys assets today. Code that does (or an
+operator after editing `assets` by hand) must call `publish_invalidation`;
+every process running `listen_for_invalidations` then drops the affected
+entries.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.ticks import Asset
+from app.streaming.symbols import parse_symbol
+
+
+logger = logging.getLogger("cryptoinsight.asset_registry")
+
+INVALIDATE_CHANNEL = "assets:invalidate"
+_PENDING_KEY = "asset_registry_pending"
+_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+AssetKey = tuple[str, str]
+
+
+def normalize_symbol(symbol: str) -> str:
+    raw = symbol.strip().upper()
+    if "/" in raw:
+        base, quote = raw.split("/", 1)
+        return f"{base.strip()}-{quote.strip()}"
+    return raw
+
+
+def asset_key(exchange: str, symbol: str) -> AssetKey:
+    """Canonical key: lower-case exchange, BASE-QUOTE symbol."""
+    return exchange.strip().lower(), normalize_symbol(symbol)
+
+
+class AssetRegistry:
+    """
+    In-memory asset ids, kept per database engine.
+
+    `hits` and `misses` count lookups answered from memory and from the
+    database.
+    """
+
+    def __init__(self) -> None:
+        self._ids: "weakref.WeakKeyDictionary[object, dict[AssetKey, int]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _map(self, db: Session) -> dict[AssetKey, int]:
+        engine = db.get_bind().engine
+        with self._lock:
+            ids = self._ids.get(engine)
+            if ids is None:
+                ids = self._ids[engine] = {}
+            return ids
+
+    def _cached(self, db: Session, key: AssetKey) -> int | None:
+        asset_id = self._map(db).get(key)
+        if asset_id is None:
+            asset_id = db.info.get(_PENDING_KEY, {}).get(self, {}).get(key)
+        if asset_id is not None:
+            self.hits += 1
+        return asset_id
+
+    def warm(self, db: Session) -> int:
+        """Load every asset id with one query; returns the number of assets."""
+        rows = db.query(Asset.exchange, Asset.symbol, Asset.id).all()
+        self._map(db).update({(exchange, symbol): asset_id for exchange, symbol, asset_id in rows})
+        return len(rows)
+
+    def lookup(self, db: Session, exchange: str, symbol: str) -> int | None:
+        """Asset id for the pair, or None when no such asset exists."""
+        key = asset_key(exchange, symbol)
+        asset_id = self._cached(db, key)
+        if asset_id is not None:
+            return asset_id
+        self.misses += 1
+        asset_id = (
+            db.query(Asset.id)
+            .filter(Asset.exchange == key[0], Asset.symbol == key[1])
+            .scalar()
+        )
+        if asset_id is not None:
+            self._map(db)[key] = asset_id
+        return asset_id
+
+    def get_or_create(self, db: Session, exchange: str, symbol: str) -> int:
+        """Asset id for the pair, inserting the asset when it does not exist yet."""
+        key = asset_key(exchange, symbol)
+        asset_id = self._cached(db, key)
+        if asset_id is not None:
+            return asset_id
+        self.misses += 1
+        parsed = parse_symbol(key[1])
+        values = {
+            "exchange": key[0],
+            "symbol": key[1],
+            "base": parsed.base,
+            "quote": parsed.quote,
+            "active": True,
+        }
+        insert = _INSERTS.get(db.get_bind().dialect.name)
+        if insert is not None:
+            asset_id = db.execute(
+                insert(Asset)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=["exchange", "symbol"])
+                .returning(Asset.id)
+            ).scalar()
+        else:
+            asset_id = None
+            if db.query(Asset.id).filter(Asset.exchange == key[0], Asset.symbol == key[1]).scalar() is None:
+                asset = Asset(**values)
+                db.add(asset)
+                db.flush()
+                asset_id = asset.id
+        if asset_id is not None:
+            # Inserted by this transaction: shared once it commits.
+            db.info.setdefault(_PENDING_KEY, {}).setdefault(self, {})[key] = asset_id
+            return asset_id
+        return self.lookup(db, *key)
+
+    def invalidate(self, exchange: str | None = None, symbol: str | None = None) -> None:
+        """Forget one pair, every pair of an exchange, or (no arguments) everything."""
+        with self._lock:
+            maps = list(self._ids.values())
+        for ids in maps:
+            if exchange is None and symbol is None:
+                ids.clear()
+                continue
+            for key in [k for k in ids if (exchange is None or k[0] == exchange) and (symbol is None or k[1] == symbol)]:
+                ids.pop(key, None)
+
+    def _promote(self, db: Session, pending: dict[AssetKey, int]) -> None:
+        self._map(db).update(pending)
+
+
+asset_registry = AssetRegistry()
+
+
+@event.listens_for(Session, "after_commit")
+def _share_committed_assets(session: Session) -> None:
+    for registry, pending in session.info.pop(_PENDING_KEY, {}).items():
+        registry._promote(session, pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_assets(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _invalidation(exchange: str | None, symbol: str | None) -> dict:
+    if exchange is not None:
+        exchange = exchange.strip().lower()
+    if symbol is not None:
+        symbol = normalize_symbol(symbol)
+    return {"exchange": exchange, "symbol": symbol}
+
+
+async def publish_invalidation(redis, exchange: str | None = None, symbol: str | None = None) -> None:
+    """Drop the entries here and tell every other process to drop them too."""
+    message = _invalidation(exchange, symbol)
+    asset_registry.invalidate(**message)
+    await redis.publish(INVALIDATE_CHANNEL, json.dumps(message))
+
+
+async def listen_for_invalidations(redis, registry: AssetRegistry = asset_registry) -> None:
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(INVALIDATE_CHANNEL)
+    logger.info("Listening for asset invalidations on '%s'", INVALIDATE_CHANNEL)
+
+    async for message in pubsub.listen():
+        if message["type"] != "message":
+            continue
+        try:
+            data = json.loads(message["data"])
+            registry.invalidate(exchange=data.get("exchange"), symbol=data.get("symbol"))
+        except Exception as e:
+            logger.error(f"Bad asset invalidation message: {e}")
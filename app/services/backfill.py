@@ -4,10 +4,11 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import func
 from app.config import settings
-from app.models.instrument import Price, Coin
+from app.models.instrument import Coin
 from database import session_scope
 from celery_app import celery_app
 from app.services.asset_status import classify_asset
+from app.services.price_latest import get_latest
 
 logger = logging.getLogger("cryptoinsight.services.backfill")
 
@@ -92,10 +93,8 @@ class StartupGapFiller:
                 # CoinGecko usually returns "btc", "eth". We map to exchange pairs here.
                 symbol_pair = cls._normalize_symbol_for_exchange(symbol, exchange)
 
-                last_ts = db.query(func.max(Price.timestamp)).filter(
-                    Price.exchange == exchange,
-                    Price.symbol == symbol_pair
-                ).scalar()
+                latest = get_latest(db, exchange, symbol_pair)
+                last_ts = latest.timestamp if latest else None
 
                 now = datetime.now(timezone.utc)
                 
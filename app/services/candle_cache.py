@@ -0,0 +1,334 @@
+"""
+Redis cache of closed candle and series buckets.
+
+A chart poll re-aggregates its whole window although only the newest bucket can
+still change. `CandleCache.load` keeps the closed buckets of every (exchange,
+symbol, bucket_seconds, source) in Redis and queries the database only for the
+part of the window the cache does not cover: normally just the open tail.
+
+Layout: one hash per market, `candles:v1:{exchange}:{symbol}`, field
+`{kind}:{bucket_seconds}:{source}` (kind: candles or series). A value is a
+header (covered range [start_ns, end_ns), write time, row count) followed by
+the raw little-endian int64/float64 columns.
+
+- A bucket is cached once it closed CANDLE_CACHE_SETTLE_SECONDS ago, so late
+  trades and aggregate refreshes land first. While the trade writer lags
+  (`writer:metrics`, oldest pending entry) the window stretches to its lag.
+- An entry written more than CANDLE_CACHE_TTL_SECONDS ago is rebuilt from the
+  database; the hash expires after that long without writes.
+- At most CANDLE_CACHE_MAX_BUCKETS newest buckets are kept per field.
+- Tasks that write history (candle backfills, price ingests, tick imports,
+  the compact tick backfill) drop the affected markets with
+  `invalidate_market` / `invalidate_all` after they commit.
+
+Cached windows start on a bucket boundary: the first bucket of a response is
+whole even when `start` falls inside it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+
+import numpy as np
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.redis_client import RedisClient
+from app.services.bucketing import CANDLE_FIELDS, SERIES_FIELDS, Columns
+from app.services.candle_planner import (
+    SERIES_SOURCES,
+    SOURCES,
+    CandlePlan,
+    fetch_candle_columns,
+    fetch_series_columns,
+    load_candle_columns,
+    load_series_columns,
+    plan_range,
+)
+from app.writer import METRICS_KEY as WRITER_METRICS_KEY
+from database import run_db
+
+
+logger = logging.getLogger("cryptoinsight.candle_cache")
+
+_NS = 1_000_000_000
+_US = 1_000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_HEADER = struct.Struct("<4q")
+KEY_PREFIX = "candles:v1"
+_LAG_REFRESH_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class _Kind:
+    fields: tuple[str, ...]
+    sources: tuple[str, ...]
+    fetch: Callable[[Session, CandlePlan], Columns]
+    load: Callable[..., tuple[Columns, CandlePlan]]
+
+
+_KINDS = {
+    "candles": _Kind(CANDLE_FIELDS, SOURCES, fetch_candle_columns, load_candle_columns),
+    "series": _Kind(SERIES_FIELDS, SERIES_SOURCES, fetch_series_columns, load_series_columns),
+}
+
+
+def market_key(exchange: str, symbol: str) -> str:
+    return f"{KEY_PREFIX}:{exchange.strip().lower()}:{symbol.strip().upper()}"
+
+
+@dataclass(frozen=True)
+class CachedBuckets:
+    start_ns: int
+    end_ns: int
+    written_ns: int
+    columns: Columns
+
+
+def pack(entry: CachedBuckets) -> bytes:
+    columns = entry.columns
+    parts = [
+        _HEADER.pack(entry.start_ns, entry.end_ns, entry.written_ns, len(columns)),
+        columns.times_ns.astype("<i8").tobytes(),
+    ]
+    for name, values in columns.values.items():
+        parts.append(values.astype("<i8" if name == "trades" else "<f8").tobytes())
+    return b"".join(parts)
+
+
+def unpack(raw: bytes, fields: tuple[str, ...]) -> CachedBuckets:
+    """Inverse of `pack`; the columns are read-only views of `raw`."""
+    start_ns, end_ns, written_ns, rows = _HEADER.unpack_from(raw)
+    if len(raw) != _HEADER.size + 8 * rows * (len(fields) + 1):
+        raise ValueError("Malformed candle cache entry.")
+    offset = _HEADER.size
+    times = np.frombuffer(raw, dtype="<i8", count=rows, offset=offset)
+    values = {}
+    for name in fields:
+        offset += 8 * rows
+        values[name] = np.frombuffer(raw, dtype="<i8" if name == "trades" else "<f8", count=rows, offset=offset)
+    return CachedBuckets(start_ns, end_ns, written_ns, Columns(times, values))
+
+
+def _epoch_ns(dt: datetime) -> int:
+    return (dt - _EPOCH) // timedelta(microseconds=1) * _US
+
+
+def _datetime(ns: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=ns // _US)
+
+
+def _fetch_ranges(db: Session, plan: CandlePlan, fetch, ranges: list[tuple[int, int]]) -> list[Columns]:
+    """`fetch` for sub-ranges (inclusive epoch-ns bounds) of a plan."""
+    return [fetch(db, replace(plan, start=_datetime(start), end=_datetime(end))) for start, end in ranges]
+
+
+class CandleCache:
+    """Closed buckets in Redis plus database queries for the rest of the window."""
+
+    def __init__(
+        self,
+        redis=None,
+        *,
+        ttl_seconds: int | None = None,
+        max_buckets: int | None = None,
+        settle_seconds: float | None = None,
+    ) -> None:
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._max_buckets = max_buckets
+        self._settle_seconds = settle_seconds
+        self._writer_lag_seconds = 0.0
+        self._lag_checked_at = float("-inf")
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = RedisClient.get_binary_redis()
+        return self._redis
+
+    @property
+    def ttl_seconds(self) -> int:
+        return settings.CANDLE_CACHE_TTL_SECONDS if self._ttl_seconds is None else self._ttl_seconds
+
+    @property
+    def max_buckets(self) -> int:
+        return settings.CANDLE_CACHE_MAX_BUCKETS if self._max_buckets is None else self._max_buckets
+
+    @property
+    def settle_seconds(self) -> float:
+        return settings.CANDLE_CACHE_SETTLE_SECONDS if self._settle_seconds is None else self._settle_seconds
+
+    async def load(
+        self,
+        db: Session,
+        kind: str,
+        exchange: str,
+        symbol: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        bucket_seconds: int,
+    ) -> tuple[Columns, CandlePlan, dict | None]:
+        """
+        Candles or series points (`kind`) of a window, the plan, and what the
+        cache contributed (`None` when the request bypassed it).
+        """
+        spec = _KINDS[kind]
+        ttl = self.ttl_seconds
+        plan = None
+        if ttl > 0:
+            plan = await run_db(plan_range, db, exchange, symbol, start_dt, end_dt, bucket_seconds, sources=spec.sources)
+        if plan is None or plan.relation is None:
+            columns, plan = await run_db(spec.load, db, exchange, symbol, start_dt, end_dt, bucket_seconds)
+            return columns, plan, None
+
+        bucket_ns = bucket_seconds * _NS
+        start_ns = _epoch_ns(plan.start) // bucket_ns * bucket_ns
+        end_ns = _epoch_ns(plan.end)
+        now_ns = time.time_ns()
+        key, field = market_key(exchange, symbol), f"{kind}:{bucket_seconds}:{plan.source}"
+
+        cached = await self._read(key, field, spec.fields, min_written_ns=now_ns - ttl * _NS)
+        if cached is not None and (cached.start_ns > end_ns or cached.end_ns < start_ns):
+            cached = None
+        ranges: list[tuple[int, int]] = []
+        if cached is None:
+            ranges.append((start_ns, end_ns))
+        else:
+            if start_ns < cached.start_ns:
+                ranges.append((start_ns, cached.start_ns - _US))
+            if end_ns >= cached.end_ns:
+                ranges.append((max(start_ns, cached.end_ns), end_ns))
+        fetched = await run_db(_fetch_ranges, db, plan, spec.fetch, ranges)
+
+        head = fetched[0] if cached is not None and start_ns < cached.start_ns else None
+        tail = fetched[-1] if fetched and fetched[-1] is not head else None
+        if cached is None:
+            columns = tail
+        else:
+            window = cached.columns.between(start_ns, end_ns + 1)
+            columns = Columns.concat([part for part in (head, window, tail) if part is not None])
+        if not len(columns):
+            # Nothing here: let the planner fall back to raw ticks or re-plan with fresh coverage.
+            columns, plan = await run_db(spec.load, db, exchange, symbol, start_dt, end_dt, bucket_seconds)
+            return columns, plan, None
+
+        settle_seconds = max(self.settle_seconds, await self._writer_lag())
+        closed_ns = (now_ns - int(settle_seconds * _NS)) // bucket_ns * bucket_ns
+        await self._write(key, field, cached, head, tail, start_ns, min(closed_ns, end_ns // bucket_ns * bucket_ns), now_ns)
+        cached_rows = len(columns) - sum(len(part) for part in fetched)
+        return columns, plan, {"cached_buckets": cached_rows, "queries": len(ranges)}
+
+    async def invalidate(self, exchange: str, symbol: str) -> None:
+        await self.redis.delete(market_key(exchange, symbol))
+
+    async def _writer_lag(self) -> float:
+        """Seconds the trade writer is behind, from its published metrics (refreshed every few seconds)."""
+        now = time.monotonic()
+        if now - self._lag_checked_at < _LAG_REFRESH_SECONDS:
+            return self._writer_lag_seconds
+        self._lag_checked_at = now
+        try:
+            metrics = await self.redis.hgetall(WRITER_METRICS_KEY)
+        except Exception as e:
+            logger.debug(f"Writer metrics read failed: {e}")
+            return self._writer_lag_seconds
+        lag = 0.0
+        for raw in (metrics or {}).values():
+            try:
+                values = json.loads(raw)
+            except ValueError:
+                continue
+            age = values.get("oldest_pending_age_seconds")
+            if age is not None:
+                # The metrics are published periodically; the oldest entry kept aging since.
+                lag = max(lag, float(age) + max(0.0, time.time() - float(values.get("checked_at") or time.time())))
+        self._writer_lag_seconds = lag
+        return lag
+
+    async def _read(self, key: str, field: str, fields: tuple[str, ...], *, min_written_ns: int) -> CachedBuckets | None:
+        try:
+            raw = await self.redis.hget(key, field)
+            entry = unpack(raw, fields) if raw else None
+        except Exception as e:
+            logger.debug(f"Candle cache read failed for {key} {field}: {e}")
+            return None
+        if entry is None or entry.written_ns < min_written_ns:
+            return None
+        return entry
+
+    async def _write(
+        self,
+        key: str,
+        field: str,
+        cached: CachedBuckets | None,
+        head: Columns | None,
+        tail: Columns | None,
+        start_ns: int,
+        closed_ns: int,
+        now_ns: int,
+    ) -> None:
+        """Extend (or replace) the cached range with the closed buckets just fetched."""
+        if cached is None:
+            columns, new_start, new_end, written_ns = tail, start_ns, closed_ns, now_ns
+        else:
+            columns = Columns.concat([part for part in (head, cached.columns, tail) if part is not None])
+            new_start = min(start_ns, cached.start_ns)
+            new_end = max(cached.end_ns, closed_ns)
+            # Extending keeps the write time, so the TTL bounds the age of the oldest bucket.
+            written_ns = cached.written_ns
+        if new_end <= new_start:
+            return
+        columns = columns.between(new_start, new_end)
+        if len(columns) > self.max_buckets:
+            columns = columns.take(slice(len(columns) - self.max_buckets, None))
+            new_start = int(columns.times_ns[0])
+        if cached is not None and (new_start, new_end) == (cached.start_ns, cached.end_ns):
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, field, pack(CachedBuckets(new_start, new_end, written_ns, columns)))
+            pipe.expire(key, max(1, self.ttl_seconds))
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"Candle cache write failed for {key} {field}: {e}")
+
+
+candle_cache = CandleCache()
+
+
+def invalidate_market(exchange: str, symbol: str) -> None:
+    """Drop a market's cached buckets from synchronous code (e.g. a Celery backfill)."""
+    invalidate_markets([(exchange, symbol)])
+
+
+def invalidate_markets(markets: Iterable[tuple[str, str]]) -> None:
+    """Drop the cached buckets of several (exchange, symbol) markets in one round trip."""
+    keys = {market_key(exchange, symbol) for exchange, symbol in markets}
+    if not keys or settings.CANDLE_CACHE_TTL_SECONDS <= 0:
+        return
+    client = Redis.from_url(settings.CELERY_BROKER_URL)
+    try:
+        client.delete(*keys)
+    finally:
+        client.close()
+
+
+def invalidate_all() -> None:
+    """Drop every market's cached buckets, for writes that are not scoped to a market."""
+    if settings.CANDLE_CACHE_TTL_SECONDS <= 0:
+        return
+    client = Redis.from_url(settings.CELERY_BROKER_URL)
+    try:
+        keys = list(client.scan_iter(match=f"{KEY_PREFIX}:*", count=1000))
+        for i in range(0, len(keys), 1000):
+            client.delete(*keys[i : i + 1000])
+    finally:
+        client.close()
@@ -0,0 +1,538 @@
+"""
+Candle query planner: where candles and series points for a range come from.
+
+Sources, cheapest first:
+
+    ticks          the coarsest tick aggregate (ticks_1m .. ticks_1d) that tiles
+                   the bucket, else `time_bucket` over raw ticks
+    market_trades  `time_bucket` over `trades_relation()` (not a separate
+                   source when trades are read from ticks)
+    prices         stored OHLCV bars (backfill)
+
+Each market's coverage (earliest/latest row per source) is read with one
+statement of index-backed min/max lookups and cached for
+COVERAGE_TTL_SECONDS. The plan is the cheapest source whose coverage overlaps
+the range about as much as the best one, answered by a single query
+(`time_bucket` on PostgreSQL, Python bucketing elsewhere). An empty range
+costs the coverage lookup instead of every fallback query. Coverage is a
+hint: a plan that returns nothing from cached coverage is re-planned once
+with fresh coverage.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.instrument import Price
+from app.models.ticks import Tick
+from app.services.asset_registry import asset_registry
+from app.services.tick_aggregates import TICK_AGGREGATES, coarsest_aggregate
+from app.services import bucketing
+from app.services.bucketing import CANDLE_FIELDS, SERIES_FIELDS, Buckets, Columns
+from app.services.trade_store import ticks_only, trades_relation, trades_source
+
+
+SOURCES = ("ticks", "market_trades", "prices")
+SERIES_SOURCES = ("ticks", "market_trades")
+COVERAGE_TTL_SECONDS = 30.0
+
+# Sources whose overlap with the range is within this share of the best one
+# (or one bucket) count as covering it equally; the cheaper one wins.
+_OVERLAP_TOLERANCE = 0.05
+
+_AGGREGATE_VIEWS = {aggregate.view for aggregate in TICK_AGGREGATES}
+
+# relation kind -> (time column, open, high, low, close, volume, trades)
+_CANDLE_COLUMNS = {
+    "aggregate": (
+        "bucket",
+        "first(open, bucket)",
+        "max(high)",
+        "min(low)",
+        "last(close, bucket)",
+        "SUM(volume)",
+        "SUM(trades)",
+    ),
+    "ticks": ("time", "first(price, time)", "max(price)", "min(price)", "last(price, time)", "SUM(volume)", "COUNT(*)"),
+    "market_trades": (
+        "timestamp",
+        "first(price, timestamp)",
+        "max(price)",
+        "min(price)",
+        "last(price, timestamp)",
+        "SUM(amount)",
+        "COUNT(*)",
+    ),
+    "prices": (
+        "timestamp",
+        "first(open, timestamp)",
+        "max(high)",
+        "min(low)",
+        "last(close, timestamp)",
+        "SUM(volume)",
+        "COUNT(*)",
+    ),
+}
+# relation kind -> (time column, price, volume, trades)
+_SERIES_COLUMNS = {
+    "aggregate": ("bucket", "AVG(close)", "SUM(volume)", "SUM(trades)"),
+    "ticks": ("time", "AVG(price)", "SUM(volume)", "COUNT(*)"),
+    "market_trades": ("timestamp", "AVG(price)", "SUM(amount)", "COUNT(*)"),
+}
+
+
+def _to_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True)
+class SourceCoverage:
+    earliest: datetime | None = None
+    latest: datetime | None = None
+
+    def overlap_seconds(self, start: datetime, end: datetime, *, slack_seconds: float = 0.0) -> float | None:
+        """Seconds of [start, end] this source has rows for, or None when disjoint."""
+        if self.earliest is None or self.latest is None:
+            return None
+        low = max(start, self.earliest)
+        high = min(end, self.latest + timedelta(seconds=slack_seconds))
+        if high < low:
+            return None
+        return (high - low).total_seconds()
+
+    def to_dict(self) -> dict:
+        return {
+            "earliest": self.earliest.isoformat() if self.earliest else None,
+            "latest": self.latest.isoformat() if self.latest else None,
+        }
+
+
+@dataclass(frozen=True)
+class MarketCoverage:
+    asset_id: int | None
+    sources: dict[str, SourceCoverage]
+    checked_at: datetime
+    cached: bool = False
+
+
+def read_coverage(db: Session, exchange: str, symbol: str) -> MarketCoverage:
+    """Earliest/latest row of every source of one market, in one statement."""
+    asset_id = asset_registry.lookup(db, exchange, symbol)
+    bounds: dict[str, tuple] = {}
+    if asset_id is not None:
+        bounds["ticks"] = (Tick.time, Tick.asset_id == asset_id)
+    if not ticks_only():
+        trades = trades_source().c
+        bounds["market_trades"] = (trades.timestamp, (trades.exchange == exchange) & (trades.symbol == symbol))
+    bounds["prices"] = (Price.timestamp, (Price.exchange == exchange) & (Price.symbol == symbol))
+
+    columns = []
+    for column, condition in bounds.values():
+        columns.append(select(func.min(column)).where(condition).scalar_subquery())
+        columns.append(select(func.max(column)).where(condition).scalar_subquery())
+    row = db.execute(select(*columns)).one()
+
+    sources = {}
+    for index, source in enumerate(bounds):
+        earliest, latest = row[2 * index], row[2 * index + 1]
+        sources[source] = SourceCoverage(
+            earliest=_to_utc(earliest) if earliest is not None else None,
+            latest=_to_utc(latest) if latest is not None else None,
+        )
+    return MarketCoverage(asset_id=asset_id, sources=sources, checked_at=datetime.now(timezone.utc))
+
+
+class CoverageCache:
+    """Per-engine cache of `read_coverage`, entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float = COVERAGE_TTL_SECONDS) -> None:
+        self.ttl = ttl
+        self._entries: "weakref.WeakKeyDictionary[object, dict]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, exchange: str, symbol: str, *, refresh: bool = False) -> MarketCoverage:
+        engine = db.get_bind().engine
+        key = (exchange, symbol)
+        now = time.monotonic()
+        if not refresh:
+            with self._lock:
+                entry = self._entries.get(engine, {}).get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                return replace(entry[1], cached=True)
+        coverage = read_coverage(db, exchange, symbol)
+        with self._lock:
+            self._entries.setdefault(engine, {})[key] = (now, coverage)
+        return coverage
+
+    def invalidate(self, exchange: str | None = None, symbol: str | None = None) -> None:
+        with self._lock:
+            if exchange is None or symbol is None:
+                self._entries.clear()
+                return
+            key = (exchange, symbol)
+            for entries in self._entries.values():
+                entries.pop(key, None)
+
+
+coverage_cache = CoverageCache()
+
+
+@dataclass(frozen=True)
+class CandlePlan:
+    exchange: str
+    symbol: str
+    start: datetime
+    end: datetime
+    bucket_seconds: int
+    source: str
+    relation: str | None
+    method: str
+    asset_id: int | None = None
+    coverage: dict[str, SourceCoverage] = field(default_factory=dict)
+
+    @property
+    def kind(self) -> str:
+        if self.relation in _AGGREGATE_VIEWS:
+            return "aggregate"
+        return self.source
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "relation": self.relation,
+            "method": self.method,
+            "bucket_seconds": self.bucket_seconds,
+            "coverage": {source: coverage.to_dict() for source, coverage in self.coverage.items()},
+        }
+
+
+def plan_candles(
+    db: Session,
+    coverage: MarketCoverage,
+    *,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    sources: Iterable[str] = SOURCES,
+) -> CandlePlan:
+    """Cheapest source in `sources` that covers the range (about) as well as any other."""
+    slack = max(0.0, (datetime.now(timezone.utc) - coverage.checked_at).total_seconds())
+    overlaps: list[tuple[str, float]] = []
+    for source in sources:
+        source_coverage = coverage.sources.get(source)
+        if source_coverage is None:
+            continue
+        overlap = source_coverage.overlap_seconds(start_dt, end_dt, slack_seconds=slack)
+        if overlap is not None:
+            overlaps.append((source, overlap))
+
+    chosen = "none"
+    if overlaps:
+        range_seconds = (end_dt - start_dt).total_seconds()
+        floor = max(overlap for _, overlap in overlaps) - max(bucket_seconds, range_seconds * _OVERLAP_TOLERANCE)
+        chosen = next(source for source, overlap in overlaps if overlap >= floor)
+
+    postgres = db.get_bind().dialect.name == "postgresql"
+    relation = None
+    if chosen == "ticks":
+        aggregate = coarsest_aggregate(bucket_seconds) if postgres else None
+        relation = aggregate.view if aggregate is not None else "ticks"
+    elif chosen == "market_trades":
+        relation = trades_relation() if postgres else "market_trades"
+    elif chosen == "prices":
+        relation = "prices"
+
+    return CandlePlan(
+        exchange=exchange,
+        symbol=symbol,
+        start=start_dt,
+        end=end_dt,
+        bucket_seconds=bucket_seconds,
+        source=chosen,
+        relation=relation,
+        method="sql" if postgres else "python",
+        asset_id=coverage.asset_id,
+        coverage=coverage.sources,
+    )
+
+
+def plan_range(
+    db: Session,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    *,
+    sources: Iterable[str] = SOURCES,
+) -> CandlePlan:
+    """`plan_candles` from the market's cached coverage."""
+    return plan_candles(
+        db,
+        coverage_cache.get(db, exchange, symbol),
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=_to_utc(start_dt),
+        end_dt=_to_utc(end_dt),
+        bucket_seconds=bucket_seconds,
+        sources=tuple(sources),
+    )
+
+
+def _query_buckets(db: Session, plan: CandlePlan, columns: tuple[str, ...]):
+    time_column, *values = columns
+    if plan.source == "ticks":
+        where = "asset_id = :asset_id"
+        params = {"asset_id": plan.asset_id}
+    else:
+        where = "exchange = :exchange AND symbol = :symbol"
+        params = {"exchange": plan.exchange, "symbol": plan.symbol}
+    select_list = ",\n          ".join(f"{expression} AS c{index}" for index, expression in enumerate(values))
+    sql = text(
+        f"""
+        SELECT
+          time_bucket(CAST(:bucket AS interval), {time_column}) AS bucket,
+          {select_list}
+        FROM {plan.relation}
+        WHERE {where}
+          AND {time_column} >= :start
+          AND {time_column} <= :end
+        GROUP BY 1
+        ORDER BY 1 ASC
+        """
+    )
+    params.update({"bucket": f"{plan.bucket_seconds} seconds", "start": plan.start, "end": plan.end})
+    if plan.kind != "aggregate":
+        return db.execute(sql, params).all()
+    # Savepoint: a missing view must not abort the request's transaction.
+    try:
+        with db.begin_nested():
+            return db.execute(sql, params).all()
+    except Exception:
+        return []
+
+
+def _python_buckets(db: Session, plan: CandlePlan) -> Buckets:
+    """Bucket the plan's rows in numpy; only the needed columns are fetched."""
+    if plan.source == "ticks":
+        stmt = select(bucketing.time_text(Tick.time), Tick.price, Tick.volume).where(
+            Tick.asset_id == plan.asset_id, Tick.time >= plan.start, Tick.time <= plan.end
+        ).order_by(Tick.time.asc())
+    elif plan.source == "market_trades":
+        trades = trades_source().c
+        stmt = select(bucketing.time_text(trades.timestamp), trades.price, trades.amount).where(
+            trades.exchange == plan.exchange,
+            trades.symbol == plan.symbol,
+            trades.timestamp >= plan.start,
+            trades.timestamp <= plan.end,
+        ).order_by(trades.timestamp.asc())
+    else:
+        stmt = select(
+            bucketing.time_text(Price.timestamp),
+            Price.open,
+            Price.high,
+            Price.low,
+            Price.close,
+            Price.volume,
+        ).where(
+            Price.exchange == plan.exchange,
+            Price.symbol == plan.symbol,
+            Price.timestamp >= plan.start,
+            Price.timestamp <= plan.end,
+        ).order_by(Price.timestamp.asc())
+
+    times, *values = bucketing.fetch_columns(db, stmt)
+    if plan.source == "prices":
+        open_, high, low, close, volume = values
+        close = bucketing.as_float(close)
+        open_, high, low = (bucketing.as_float(column, close) for column in (open_, high, low))
+    else:
+        price, volume = values
+        open_ = high = low = close = bucketing.as_float(price)
+    return bucketing.bucket_ohlcv(
+        bucketing.epoch_ns(times),
+        open_,
+        high,
+        low,
+        close,
+        bucketing.as_float(volume),
+        plan.bucket_seconds,
+    )
+
+
+def _sql_columns(db: Session, plan: CandlePlan, names: tuple[str, ...]) -> Columns:
+    """Columns of the `time_bucket` query; buckets with a NULL price are dropped."""
+    expressions = (_CANDLE_COLUMNS if names == CANDLE_FIELDS else _SERIES_COLUMNS)[plan.kind]
+    times, *values = bucketing.columns(_query_buckets(db, plan, expressions), len(expressions))
+    arrays: dict[str, np.ndarray] = {}
+    for name, column in zip(names, values):
+        if name == "trades":
+            arrays[name] = bucketing.as_float(column).astype(np.int64)
+        elif name == "volume":
+            arrays[name] = bucketing.as_float(column)
+        else:
+            arrays[name] = np.asarray(column, dtype=np.float64)
+    columns = Columns(bucketing.epoch_ns(times), arrays)
+    valid = ~np.isnan(sum(arrays[name] for name in names if name not in ("volume", "trades")))
+    return columns if valid.all() else columns.take(valid)
+
+
+def fetch_candle_columns(db: Session, plan: CandlePlan) -> Columns:
+    """OHLCV candles of a plan as numpy columns (`CANDLE_FIELDS`)."""
+    if plan.relation is None:
+        return Columns.empty(CANDLE_FIELDS)
+    if plan.method == "python":
+        return _python_buckets(db, plan).candles()
+    return _sql_columns(db, plan, CANDLE_FIELDS)
+
+
+def fetch_series_columns(db: Session, plan: CandlePlan) -> Columns:
+    """Series points of a plan as numpy columns (`SERIES_FIELDS`)."""
+    if plan.relation is None:
+        return Columns.empty(SERIES_FIELDS)
+    if plan.method == "python":
+        return _python_buckets(db, plan).series()
+    return _sql_columns(db, plan, SERIES_FIELDS)
+
+
+def fetch_candles(db: Session, plan: CandlePlan) -> list[dict]:
+    """OHLCV candles (`timestamp`, open, high, low, close, volume, trades) for a plan."""
+    return fetch_candle_columns(db, plan).records()
+
+
+def fetch_series(db: Session, plan: CandlePlan) -> list[dict]:
+    """Series points (`timestamp`, average price, volume, trades) for a plan."""
+    return fetch_series_columns(db, plan).records()
+
+
+def fetch_planned(db: Session, plan: CandlePlan, fetch):
+    """`fetch` for a plan; an unavailable (or unmaterialized) aggregate view falls back to raw ticks."""
+    rows = fetch(db, plan)
+    if not rows and plan.kind == "aggregate":
+        plan = replace(plan, relation="ticks")
+        rows = fetch(db, plan)
+    return rows, plan
+
+
+def _load(db: Session, fetch, *, exchange, symbol, start_dt, end_dt, bucket_seconds, sources):
+    options = dict(
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=_to_utc(start_dt),
+        end_dt=_to_utc(end_dt),
+        bucket_seconds=bucket_seconds,
+        sources=tuple(sources),
+    )
+    coverage = coverage_cache.get(db, exchange, symbol)
+    rows, plan = fetch_planned(db, plan_candles(db, coverage, **options), fetch)
+    if not rows and coverage.cached:
+        fresh = plan_candles(db, coverage_cache.get(db, exchange, symbol, refresh=True), **options)
+        if fresh.source != plan.source:
+            plan = fresh
+            rows = fetch(db, plan)
+    return rows, plan
+
+
+def load_candles(
+    db: Session,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    *,
+    sources: Iterable[str] = SOURCES,
+) -> tuple[list[dict], CandlePlan]:
+    """Plan and run a candle query; returns the candles and the plan used."""
+    return _load(
+        db,
+        fetch_candles,
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        bucket_seconds=bucket_seconds,
+        sources=sources,
+    )
+
+
+def load_candle_columns(
+    db: Session,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    *,
+    sources: Iterable[str] = SOURCES,
+) -> tuple[Columns, CandlePlan]:
+    """`load_candles` as numpy columns, for callers that build DataFrames."""
+    return _load(
+        db,
+        fetch_candle_columns,
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        bucket_seconds=bucket_seconds,
+        sources=sources,
+    )
+
+
+def load_series(
+    db: Session,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    *,
+    sources: Iterable[str] = SERIES_SOURCES,
+) -> tuple[list[dict], CandlePlan]:
+    """Plan and run a series query; returns the points and the plan used."""
+    return _load(
+        db,
+        fetch_series,
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        bucket_seconds=bucket_seconds,
+        sources=sources,
+    )
+
+
+def load_series_columns(
+    db: Session,
+    exchange: str,
+    symbol: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: int,
+    *,
+    sources: Iterable[str] = SERIES_SOURCES,
+) -> tuple[Columns, CandlePlan]:
+    """`load_series` as numpy columns."""
+    return _load(
+        db,
+        fetch_series_columns,
+        exchange=exchange,
+        symbol=symbol,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        bucket_seconds=bucket_seconds,
+        sources=sources,
+    )
@@ -0,0 +1,155 @@
+"""
+Response encodings of the chart endpoints (`/market/candles`, `/market/series`,
+`/coin/{symbol}/analysis`).
+
+    rows      default; JSON list of per-point objects
+    columnar  `?format=columnar`; JSON object of parallel arrays with
+              `timestamp` in epoch milliseconds
+    arrow     `Accept: application/vnd.apache.arrow.stream`; Arrow IPC stream
+              (needs pyarrow, see requirements-optional.txt)
+    packed    `Accept: application/octet-stream`; the columns as consecutive
+              little-endian float64 arrays (timestamp in epoch ms), names in
+              `X-Columns` and the row count in `X-Rows`
+
+Binary responses carry the rest of the payload (exchange, plan, ...) as JSON in
+`X-Chart-Meta`. JSON is rendered with orjson when it is installed; returning a
+`FastJSONResponse` also skips FastAPI's `jsonable_encoder` pass.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+from app.services.bucketing import Columns
+
+try:  # pragma: no cover - exercised only when the optional backend is installed
+    import orjson as _orjson
+except ImportError:  # pragma: no cover
+    _orjson = None
+
+try:  # pragma: no cover - exercised only when the optional backend is installed
+    import pyarrow as _pa
+except ImportError:  # pragma: no cover
+    _pa = None
+
+
+ROWS = "rows"
+COLUMNAR = "columnar"
+ARROW = "arrow"
+PACKED = "packed"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PACKED_MEDIA_TYPE = "application/octet-stream"
+EXPOSED_HEADERS = ("X-Columns", "X-Rows", "X-Chart-Meta")
+
+_NS_PER_MS = 1_000_000
+
+
+def _default(value: Any):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON; numpy arrays and scalars are written as lists and numbers."""
+    if _orjson is not None:
+        return _orjson.dumps(content, option=_orjson.OPT_SERIALIZE_NUMPY | _orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode(
+        "utf-8"
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate(format: str | None, accept: str | None) -> str:
+    """Encoding of a chart response from `?format=` and the `Accept` header."""
+    accept = (accept or "").lower()
+    if ARROW_MEDIA_TYPE in accept:
+        if _pa is None:
+            raise HTTPException(status_code=406, detail="Arrow responses need pyarrow on the server.")
+        return ARROW
+    if PACKED_MEDIA_TYPE in accept:
+        return PACKED
+    encoding = (format or ROWS).strip().lower()
+    if encoding not in (ROWS, COLUMNAR):
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use rows or columnar.")
+    return encoding
+
+
+def columns_arrays(columns: Columns) -> dict[str, np.ndarray]:
+    """Chart columns of bucketed rows: epoch-ms `timestamp` plus the value arrays."""
+    return {"timestamp": columns.times_ns // _NS_PER_MS, **columns.values}
+
+
+def frame_arrays(df: pd.DataFrame) -> dict[str, np.ndarray | list]:
+    """
+    Chart columns of a DataFrame with a `timestamp` column (epoch ms); numeric
+    columns as numpy arrays, anything else as lists.
+    """
+    arrays: dict[str, np.ndarray | list] = {}
+    for name in df.columns:
+        if name == "timestamp":
+            arrays[name] = pd.DatetimeIndex(pd.to_datetime(df[name], utc=True)).as_unit("ms").asi8
+            continue
+        values = df[name].to_numpy()
+        arrays[str(name)] = np.ascontiguousarray(values) if values.dtype.kind in "biuf" else values.tolist()
+    return arrays
+
+
+def json_arrays(data: dict[str, list]) -> dict[str, np.ndarray]:
+    """Chart columns back from their columnar JSON form."""
+    return {name: np.asarray(values) for name, values in data.items()}
+
+
+def _numeric(arrays: dict[str, np.ndarray | list]) -> dict[str, np.ndarray]:
+    return {
+        name: values
+        for name, values in arrays.items()
+        if isinstance(values, np.ndarray) and values.dtype.kind in "biuf"
+    }
+
+
+def _packed(arrays: dict[str, np.ndarray]) -> bytes:
+    return b"".join(np.ascontiguousarray(values, dtype="<f8").tobytes() for values in arrays.values())
+
+
+def _arrow(arrays: dict[str, np.ndarray], meta: str) -> bytes:
+    fields = {
+        name: _pa.array(values, type=_pa.timestamp("ms", tz="UTC")) if name == "timestamp" else _pa.array(values)
+        for name, values in arrays.items()
+    }
+    table = _pa.table(fields).replace_schema_metadata({"meta": meta})
+    sink = _pa.BufferOutputStream()
+    with _pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def columns_response(payload: dict, key: str, arrays: dict[str, np.ndarray | list], encoding: str) -> Response:
+    """
+    `payload` with the points under `key` given as chart columns, in a
+    non-row `encoding` (columnar, arrow or packed).
+    """
+    if encoding == COLUMNAR:
+        return FastJSONResponse({**payload, "format": COLUMNAR, key: arrays})
+    meta = json.dumps(payload, separators=(",", ":"), default=_default)  # ASCII, safe as a header value
+    arrays = _numeric(arrays)
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+    if encoding == ARROW:
+        return Response(_arrow(arrays, meta), media_type=ARROW_MEDIA_TYPE, headers={"X-Chart-Meta": meta})
+    return Response(
+        _packed(arrays),
+        media_type=PACKED_MEDIA_TYPE,
+        headers={"X-Columns": ",".join(arrays), "X-Rows": str(rows), "X-Chart-Meta": meta},
+    )
@@ -7,8 +7,6 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.models.instrument import Price
-from app.models.market import MarketTrade
 from app.models.paper import PaperAccount, PaperOrder, PaperOrderSide, PaperPosition
 from app.models.research import (
     AgentBankrollReset,
@@ -19,6 +17,8 @@ from app.models.research import (
 )
 from app.models.user import User
 from app.services.crew_execution import audit, get_or_create_guardrails
+from app.services.price_latest import get_latest
+from app.services.trade_store import query_trades
 
 
 AI_ACCOUNT_NAME = "AI Team Bankroll"
@@ -77,33 +77,13 @@ def get_or_create_ai_account(db: Session, current_user: User) -> PaperAccount:
 def latest_price(db: Session, exchange: str, symbol: str) -> tuple[float | None, datetime | None]:
     exchange_key = exchange.strip().lower()
     symbol_key = symbol.strip().upper().replace("/", "-")
-    latest_ts = (
-        db.query(func.max(Price.timestamp))
-        .filter(Price.exchange == exchange_key, Price.symbol == symbol_key)
-        .scalar()
-    )
-    if latest_ts is not None:
-        row = (
-            db.query(Price)
-            .filter(Price.exchange == exchange_key, Price.symbol == symbol_key, Price.timestamp == latest_ts)
-            .first()
-        )
-        if row and row.close is not None:
-            return float(row.close), latest_ts
+    latest = get_latest(db, exchange_key, symbol_key)
+    if latest is not None and latest.close is not None:
+        return float(latest.close), latest.timestamp
 
-    trade_ts = (
-        db.query(func.max(MarketTrade.timestamp))
-        .filter(MarketTrade.exchange == exchange_key, MarketTrade.symbol == symbol_key)
-        .scalar()
-    )
-    if trade_ts is not None:
-        trade = (
-            db.query(MarketTrade)
-            .filter(MarketTrade.exchange == exchange_key, MarketTrade.symbol == symbol_key, MarketTrade.timestamp == trade_ts)
-            .first()
-        )
-        if trade and trade.price is not None:
-            return float(trade.price), trade_ts
+    trade = query_trades(db, exchange=exchange_key, symbol=symbol_key, descending=True).first()
+    if trade is not None and trade.price is not None:
+        return float(trade.price), trade.timestamp
 
     return None, None
 
@@ -7,14 +7,12 @@ from typing import Any, Literal
 
 from pydantic import BaseModel, Field, ValidationError, model_validator
 import requests
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.backtesting.engine import BacktestEngine
 from app.backtesting.strategies import create_strategy
 from app.config import settings
 from app.models.backtest import BacktestRun, BacktestTrade
-from app.models.instrument import Price
 from app.models.research import AgentPrediction, AgentRecommendation, AgentRun, AssetDataStatus, ResearchSnapshot
 from app.models.user import User
 from app.services.asset_status import build_signal_status
@@ -22,6 +20,7 @@ from app.services.crew_execution import attempt_autonomous_execution, audit, get
 from app.services.crew_models import effective_model, invoke_ollama_json, mark_invocation_validation_failed, runtime_payload
 from app.services.market_candles import load_candles_df
 from app.services.market_resolution import configured_exchange_priority
+from app.services.price_latest import get_latest
 from app.signals.engine import SignalEngine
 
 
@@ -313,20 +312,9 @@ def _build_snapshot(
     run: AgentRun,
     asset: AssetDataStatus,
 ) -> ResearchSnapshot | None:
-    latest_ts = (
-        db.query(func.max(Price.timestamp))
-        .filter(Price.exchange == asset.exchange, Price.symbol == asset.symbol)
-        .scalar()
-    )
-    latest_price = None
-    if latest_ts is not None:
-        latest_row = (
-            db.query(Price)
-            .filter(Price.exchange == asset.exchange, Price.symbol == asset.symbol, Price.timestamp == latest_ts)
-            .first()
-        )
-        if latest_row and latest_row.close is not None:
-            latest_price = float(latest_row.close)
+    latest = get_latest(db, asset.exchange, asset.symbol)
+    latest_ts = latest.timestamp if latest else None
+    latest_price = float(latest.close) if latest and latest.close is not None else None
 
     signal_payload = None
     try:
@@ -475,11 +463,8 @@ def _run_backtest_for_recommendation(
     recommendation: AgentRecommendation,
     decision: AgentDecision,
 ) -> tuple[BacktestRun | None, dict[str, Any]]:
-    latest_ts = (
-        db.query(func.max(Price.timestamp))
-        .filter(Price.exchange == recommendation.exchange, Price.symbol == recommendation.symbol)
-        .scalar()
-    )
+    latest = get_latest(db, recommendation.exchange, recommendation.symbol)
+    latest_ts = latest.timestamp if latest else None
     if latest_ts is None:
         return None, {"status": "failed", "reason": "No candle timestamp was available for backtest."}
     end = latest_ts if latest_ts.tzinfo else latest_ts.replace(tzinfo=timezone.utc)
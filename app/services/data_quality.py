@@ -1,10 +1,12 @@
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import text
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models.ticks import Tick, Asset
-from app.models.market import MarketTrade
+from app.models.ticks import Tick
+from app.services.asset_registry import asset_registry
+from app.services.bucketing import epoch_ns, fetch_columns, missing_buckets, time_text
+from app.services.trade_store import trades_relation, trades_source
 
 def _to_utc(dt: datetime) -> datetime:
     if dt.tzinfo is None:
@@ -67,33 +69,6 @@ def _coalesce_gap_ranges(missing: list[datetime], bucket_seconds: int) -> list[d
     )
     return ranges
 
-def _bucket_missing_python(
-    rows: list,
-    *,
-    time_getter,
-    start_dt: datetime,
-    end_dt: datetime,
-    bucket_seconds: int,
-) -> list[datetime]:
-    counts: dict[int, int] = {}
-    for row in rows:
-        ts = time_getter(row)
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        else:
-            ts = ts.astimezone(timezone.utc)
-        bucket_epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
-        counts[bucket_epoch] = counts.get(bucket_epoch, 0) + 1
-
-    missing: list[datetime] = []
-    bucket_epoch = int(start_dt.timestamp())
-    end_epoch = int(end_dt.timestamp())
-    while bucket_epoch <= end_epoch:
-        if counts.get(bucket_epoch, 0) == 0:
-            missing.append(datetime.fromtimestamp(bucket_epoch, tz=timezone.utc))
-        bucket_epoch += bucket_seconds
-    return missing
-
 def _fetch_gap_buckets_postgres(
     db: Session,
     *,
@@ -134,13 +109,13 @@ def _fetch_gap_buckets_postgres(
         }
     elif source == "market_trades":
         sql = text(
-            """
+            f"""
             WITH buckets AS (
                 SELECT generate_series(:start, :end, CAST(:bucket AS interval)) AS bucket
             ),
             counts AS (
                 SELECT time_bucket(CAST(:bucket AS interval), timestamp) AS bucket, COUNT(*) AS trades
-                FROM market_trades
+                FROM {trades_relation()}
                 WHERE exchange = :exchange
                   AND symbol = :symbol
                   AND timestamp >= :start
@@ -218,11 +193,7 @@ def detect_gaps_data(
 
     dialect = db.get_bind().dialect.name
     
-    asset_id = (
-        db.query(Asset.id)
-        .filter(Asset.exchange == exchange, Asset.symbol == symbol)
-        .scalar()
-    )
+    asset_id = asset_registry.lookup(db, exchange, symbol)
 
     source = (source or "auto").strip().lower()
     allowed_sources = {
@@ -272,8 +243,8 @@ def detect_gaps_data(
             return (
                 db.execute(
                     text(
-                        """
-                        SELECT 1 FROM market_trades
+                        f"""
+                        SELECT 1 FROM {trades_relation()}
                         WHERE exchange = :exchange
                           AND symbol = :symbol
                           AND timestamp >= :start
@@ -290,13 +261,14 @@ def detect_gaps_data(
                 ).scalar()
                 is not None
             )
+        trades = trades_source().c
         return (
-            db.query(MarketTrade.id)
+            db.query(trades.id)
             .filter(
-                MarketTrade.exchange == exchange,
-                MarketTrade.symbol == symbol,
-                MarketTrade.timestamp >= aligned_start,
-                MarketTrade.timestamp <= aligned_end,
+                trades.exchange == exchange,
+                trades.symbol == symbol,
+                trades.timestamp >= aligned_start,
+                trades.timestamp <= aligned_end,
             )
             .first()
             is not None
@@ -387,36 +359,33 @@ def detect_gaps_data(
             if selected_source == "ticks":
                 if asset_id is None:
                     raise HTTPException(status_code=404, detail="No asset found for symbol.")
-                rows = (
-                    db.query(Tick)
-                    .filter(
+                (times,) = fetch_columns(
+                    db,
+                    select(time_text(Tick.time)).where(
                         Tick.asset_id == asset_id,
                         Tick.time >= aligned_start,
                         Tick.time <= aligned_end,
-                    )
-                    .all()
+                    ),
                 )
-                missing = _bucket_missing_python(
-                    rows,
-                    time_getter=lambda row: row.time,
+                missing = missing_buckets(
+                    epoch_ns(times),
                     start_dt=aligned_start,
                     end_dt=aligned_end,
                     bucket_seconds=bucket_seconds,
                 )
             elif selected_source == "market_trades":
-                rows = (
-                    db.query(MarketTrade)
-                    .filter(
-                        MarketTrade.exchange == exchange,
-                        MarketTrade.symbol == symbol,
-                        MarketTrade.timestamp >= aligned_start,
-                        MarketTrade.timestamp <= aligned_end,
-                    )
-                    .all()
+                trades = trades_source().c
+                (times,) = fetch_columns(
+                    db,
+                    select(time_text(trades.timestamp)).where(
+                        trades.exchange == exchange,
+                        trades.symbol == symbol,
+                        trades.timestamp >= aligned_start,
+                        trades.timestamp <= aligned_end,
+                    ),
                 )
-                missing = _bucket_missing_python(
-                    rows,
-                    time_getter=lambda row: row.timestamp,
+                missing = missing_buckets(
+                    epoch_ns(times),
                     start_dt=aligned_start,
                     end_dt=aligned_end,
                     bucket_seconds=bucket_seconds,
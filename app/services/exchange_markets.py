@@ -5,13 +5,13 @@ from datetime import datetime, timezone
 from typing import Any
 
 import ccxt.async_support as ccxt
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.models.instrument import Coin, Price
+from app.models.instrument import Coin, PriceLatest
 from app.models.research import AssetDataStatus, ExchangeMarket
 from app.services.asset_status import classify_asset
+from app.services.price_latest import get_latest_many
 from app.signals.engine import SignalEngine
 from celery_app import celery_app
 
@@ -132,7 +132,7 @@ def list_market_assets(
     filtered = [market for market in markets if include_market(market)]
     total = len(filtered)
     page = filtered[offset : offset + limit]
-    latest_prices = _latest_prices(db, exchange_key, [market.db_symbol for market in page])
+    latest_prices = get_latest_many(db, exchange_key, [market.db_symbol for market in page])
     coin_map = _coin_metadata(db, [market.base for market in page])
     signal_map = _signal_map(db, exchange_key, page, status_map) if scope_key == "ready" else {}
 
@@ -279,30 +279,6 @@ def _fallback_markets_from_status(db: Session, exchange: str, search: str | None
     return markets
 
 
-def _latest_prices(db: Session, exchange: str, symbols: list[str]) -> dict[str, Price]:
-    if not symbols:
-        return {}
-    latest_rows = (
-        db.query(Price.symbol, func.max(Price.timestamp).label("latest_ts"))
-        .filter(Price.exchange == exchange, Price.symbol.in_(symbols))
-        .group_by(Price.symbol)
-        .all()
-    )
-    latest_by_symbol = {symbol: latest_ts for symbol, latest_ts in latest_rows if latest_ts is not None}
-    if not latest_by_symbol:
-        return {}
-    rows = (
-        db.query(Price)
-        .filter(
-            Price.exchange == exchange,
-            Price.symbol.in_(latest_by_symbol.keys()),
-            Price.timestamp.in_(latest_by_symbol.values()),
-        )
-        .all()
-    )
-    return {row.symbol: row for row in rows}
-
-
 def _coin_metadata(db: Session, bases: list[str]) -> dict[str, Coin]:
     if not bases:
         return {}
@@ -349,7 +325,7 @@ def _signal_map(
 def _market_payload(
     market: ExchangeMarket,
     status: AssetDataStatus | None,
-    latest: Price | None,
+    latest: PriceLatest | None,
     coin: Coin | None,
     signal: dict[str, Any] | None,
 ) -> dict[str, Any]:
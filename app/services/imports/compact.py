@@ -0,0 +1,215 @@
+"""
+Compact tick encoding and the online backfill to it.
+
+`ticks` rows store side as a smallint code, numeric exchange trade ids as
+bigint (`trade_id`, text `exchange_trade_id` only for ids that are not
+numeric) and the ingest source as a `tick_sources` id. Rows written before
+migration 20261017_0002 still carry the legacy text columns; the backfill
+converts them window by window, one transaction per window, so it can run
+while the writer and readers keep going and can be stopped and resumed:
+
+    python -m app.services.imports.compact --window-hours 24
+    python -m app.services.imports.compact --start 2025-01-01 --end 2025-02-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.models.ticks import TickSource
+
+
+logger = logging.getLogger("cryptoinsight.imports.compact")
+
+SIDE_CODES = {"buy": 1, "sell": 2}
+SIDE_NAMES = {code: name for name, code in SIDE_CODES.items()}
+_MAX_TRADE_ID = 2**63 - 1
+
+_source_ids: "weakref.WeakKeyDictionary[object, dict[str, int]]" = weakref.WeakKeyDictionary()
+_PENDING_KEY = "tick_sources_pending"
+
+
+def side_code(side: str | None) -> int | None:
+    return SIDE_CODES.get((side or "").lower())
+
+
+def split_trade_id(raw: str | None) -> tuple[int | None, str | None]:
+    """``(trade_id, exchange_trade_id)``: bigint when the id is numeric, else the text."""
+    if not raw:
+        return None, None
+    if raw.isascii() and raw.isdigit():
+        value = int(raw)
+        if value <= _MAX_TRADE_ID:
+            return value, None
+    return None, raw
+
+
+def tick_source_id(db: Session, name: str | None) -> int | None:
+    """
+    Id of ingest source `name`, created on first use and cached per engine.
+    An id inserted by the current transaction is only cached once it commits.
+    """
+    if not name:
+        return None
+    cache = _source_ids.setdefault(db.get_bind(), {})
+    source_id = cache.get(name) or db.info.get(_PENDING_KEY, {}).get(name)
+    if source_id is not None:
+        return source_id
+    if db.get_bind().dialect.name == "postgresql":
+        source_id, inserted = db.execute(
+            text(
+                """
+                WITH inserted AS (
+                    INSERT INTO tick_sources (name) VALUES (:name)
+                    ON CONFLICT (name) DO NOTHING
+                    RETURNING id
+                )
+                SELECT id, true FROM inserted
+                UNION ALL
+                SELECT id, false FROM tick_sources WHERE name = :name
+                LIMIT 1
+                """
+            ),
+            {"name": name},
+        ).one()
+    else:
+        source = db.query(TickSource).filter(TickSource.name == name).one_or_none()
+        inserted = source is None
+        if source is None:
+            source = TickSource(name=name)
+            db.add(source)
+            db.flush()
+        source_id = source.id
+    if inserted:
+        db.info.setdefault(_PENDING_KEY, {})[name] = int(source_id)
+    else:
+        cache[name] = int(source_id)
+    return int(source_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _share_committed_sources(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _source_ids.setdefault(session.get_bind(), {}).update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_sources(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# SQL twin of `split_trade_id`: ASCII digits whose value fits a bigint. The
+# nested CASE keeps the cast away from non-numeric ids.
+_NUMERIC_TRADE_ID = (
+    "(CASE WHEN exchange_trade_id ~ '^[0-9]+$' "
+    f"THEN CAST(exchange_trade_id AS numeric) <= {_MAX_TRADE_ID} ELSE false END)"
+)
+
+_BACKFILL_SQL = text(
+    f"""
+    UPDATE ticks
+    SET side_code = CASE lower(side) WHEN 'buy' THEN 1 WHEN 'sell' THEN 2 END,
+        trade_id = CASE WHEN {_NUMERIC_TRADE_ID} THEN CAST(exchange_trade_id AS bigint) END,
+        exchange_trade_id = CASE WHEN {_NUMERIC_TRADE_ID} THEN NULL ELSE exchange_trade_id END,
+        source_id = (SELECT s.id FROM tick_sources s WHERE s.name = ticks.ingest_source),
+        side = NULL,
+        ingest_source = NULL,
+        received_at = NULL
+    WHERE time >= :start
+      AND time < :end
+      AND (side IS NOT NULL OR ingest_source IS NOT NULL OR received_at IS NOT NULL
+           OR {_NUMERIC_TRADE_ID})
+    """
+)
+
+_SOURCES_SQL = text(
+    """
+    INSERT INTO tick_sources (name)
+    SELECT DISTINCT ingest_source FROM ticks
+    WHERE time >= :start AND time < :end AND ingest_source IS NOT NULL
+    ON CONFLICT (name) DO NOTHING
+    """
+)
+
+
+def backfill_window(db: Session, start: datetime, end: datetime) -> int:
+    """Convert the legacy columns of ticks in ``[start, end)``; returns rows updated."""
+    db.execute(_SOURCES_SQL, {"start": start, "end": end})
+    result = db.execute(_BACKFILL_SQL, {"start": start, "end": end})
+    return int(result.rowcount or 0)
+
+
+def backfill(
+    session_factory,
+    *,
+    start: datetime,
+    end: datetime,
+    window: timedelta = timedelta(hours=24),
+    pause_seconds: float = 0.0,
+) -> int:
+    """Run `backfill_window` over ``[start, end)``, newest first, committing each window."""
+    total = 0
+    window_end = end
+    while window_end > start:
+        window_start = max(start, window_end - window)
+        with session_factory() as db:
+            updated = backfill_window(db, window_start, window_end)
+        total += updated
+        logger.info("Compacted %d ticks in [%s, %s)", updated, window_start.isoformat(), window_end.isoformat())
+        window_end = window_start
+        if pause_seconds > 0:
+            time.sleep(pause_seconds)
+    return total
+
+
+def _parse_dt(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    from app.services.candle_cache import invalidate_all
+    from database import init_db, session_scope
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=_parse_dt, default=None, help="Oldest tick time to convert (default: oldest tick).")
+    parser.add_argument("--end", type=_parse_dt, default=None, help="Newest tick time to convert (default: now).")
+    parser.add_argument("--window-hours", type=float, default=24.0, help="Tick time covered by one transaction.")
+    parser.add_argument("--pause-seconds", type=float, default=0.0, help="Sleep between windows to limit load.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    end = args.end or datetime.now(timezone.utc)
+    start = args.start
+    if start is None:
+        with session_scope() as db:
+            start = db.execute(text("SELECT min(time) FROM ticks")).scalar()
+        if start is None:
+            logger.info("No ticks to compact")
+            return
+    total = backfill(
+        session_scope,
+        start=start,
+        end=end,
+        window=timedelta(hours=args.window_hours),
+        pause_seconds=args.pause_seconds,
+    )
+    logger.info("Compacted %d ticks", total)
+    if total:
+        try:
+            invalidate_all()
+        except Exception as exc:
+            logger.warning("Candle cache invalidation failed: %s", exc)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,11 @@ from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.models.imports import ImportRun
+from app.services.asset_registry import asset_registry
 from app.services.imports.base import BaseTickImporter
-from app.services.imports.storage import bulk_insert_ticks, get_or_create_asset
+from app.services.imports.storage import bulk_insert_ticks
 from app.services.imports.types import TickRecord
 
 
@@ -108,8 +110,9 @@ def ingest_ticks(
     source_key: str,
     owner_id: str | None = None,
     ingest_source: str | None = None,
-    batch_size: int = 5000,
+    batch_size: int | None = None,
 ) -> int:
+    batch_size = batch_size or settings.IMPORT_TICK_BATCH_SIZE
     if already_imported(
         db,
         source=source,
@@ -132,11 +135,7 @@ def ingest_ticks(
         file_path=str(getattr(importer, "path", "") or ""),
     )
 
-    asset = get_or_create_asset(
-        db,
-        symbol=importer.symbol,
-        exchange=importer.exchange,
-    )
+    asset_id = asset_registry.get_or_create(db, exchange=importer.exchange, symbol=importer.symbol)
 
     total = 0
     batch: list[TickRecord] = []
@@ -146,7 +145,7 @@ def ingest_ticks(
             if len(batch) >= batch_size:
                 total += bulk_insert_ticks(
                     db,
-                    asset_id=asset.id,
+                    asset_id=asset_id,
                     rows=batch,
                     ingest_source=ingest_source,
                     owner_id=owner_id,
@@ -156,7 +155,7 @@ def ingest_ticks(
         if batch:
             total += bulk_insert_ticks(
                 db,
-                asset_id=asset.id,
+                asset_id=asset_id,
                 rows=batch,
                 ingest_source=ingest_source,
                 owner_id=owner_id,
@@ -0,0 +1,192 @@
+"""
+PostgreSQL binary COPY encoding for tick rows.
+
+Rows are produced lazily and handed to ``cursor.copy_expert`` through
+`CopyStream`, so a batch is never materialized as one text buffer. Binary
+COPY skips the server-side text parsing of every timestamp and float:
+
+    header   "PGCOPY\\n\\377\\r\\n\\0" | flags i32 | extension length i32
+    tuple    field count i16, then per field: length i32 (-1 = NULL) + bytes
+    trailer  -1 as i16
+
+timestamptz is microseconds since 2000-01-01 UTC as i64, float8 an IEEE double,
+int2/int4/int8/bool fixed width and text raw UTF-8, all big-endian.
+"""
+
+from __future__ import annotations
+
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+from app.services.imports.compact import SIDE_NAMES, side_code, split_trade_id
+from app.services.imports.types import TickRecord
+
+
+HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+TRAILER = struct.pack(">h", -1)
+NULL = struct.pack(">i", -1)
+
+TICK_COLUMNS = (
+    "time",
+    "asset_id",
+    "price",
+    "volume",
+    "side_code",
+    "trade_id",
+    "exchange_trade_id",
+    "source_id",
+    "is_aggregated",
+    "owner_id",
+)
+FOCUS_COLUMNS = (
+    "time",
+    "asset_id",
+    "price",
+    "volume",
+    "side",
+    "exchange_trade_id",
+    "received_at",
+    "ingest_source",
+    "focus_reason",
+    "focus_score",
+    "owner_id",
+)
+
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_TEXT_LEN = struct.Struct(">i")
+# field count, then time, asset_id, price and volume with their lengths.
+_TICK_HEAD = struct.Struct(">hiqiiidid")
+_BOOL = {False: struct.pack(">ib", 1, 0), True: struct.pack(">ib", 1, 1)}
+_SIDE = {None: NULL, **{code: struct.pack(">ih", 2, code) for code in SIDE_NAMES}}
+_BIGINT = struct.Struct(">iq")
+
+
+def pg_timestamp(dt: datetime) -> int:
+    """Microseconds since the PostgreSQL epoch; naive datetimes are taken as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _PG_EPOCH) // _MICROSECOND
+
+
+def text_field(value: str | None) -> bytes:
+    if value is None:
+        return NULL
+    data = value.encode("utf-8")
+    return _TEXT_LEN.pack(len(data)) + data
+
+
+def timestamp_field(value: datetime | None) -> bytes:
+    return NULL if value is None else struct.pack(">iq", 8, pg_timestamp(value))
+
+
+def float_field(value: float | None) -> bytes:
+    return NULL if value is None else struct.pack(">id", 8, float(value))
+
+
+def smallint_field(value: int | None) -> bytes:
+    return NULL if value is None else struct.pack(">ih", 2, value)
+
+
+def iter_tick_rows(
+    batches: Iterable[tuple[int, Iterable[TickRecord]]],
+    *,
+    source_id: int | None,
+    owner_id: str | None,
+) -> Iterator[bytes]:
+    """Binary COPY tuples (`TICK_COLUMNS`, compact layout) for ``(asset_id, ticks)`` batches."""
+    # source_id/owner_id are the same for every row: encode once.
+    source = smallint_field(source_id)
+    owner = text_field(owner_id)
+    head = _TICK_HEAD.pack
+    bigint = _BIGINT.pack
+    field_count = len(TICK_COLUMNS)
+    for asset_id, rows in batches:
+        for row in rows:
+            trade_id, trade_id_text = split_trade_id(row.exchange_trade_id)
+            yield b"".join(
+                (
+                    head(field_count, 8, pg_timestamp(row.time), 4, asset_id, 8, row.price, 8, row.volume),
+                    _SIDE[side_code(row.side)],
+                    NULL if trade_id is None else bigint(8, trade_id),
+                    text_field(trade_id_text),
+                    source,
+                    _BOOL[bool(row.is_aggregated)],
+                    owner,
+                )
+            )
+
+
+def iter_focus_rows(
+    asset_id: int,
+    rows: Iterable[TickRecord],
+    *,
+    received_at: datetime,
+    ingest_source: str | None,
+    focus_reason: str | None,
+    focus_score: float | None,
+    owner_id: str | None,
+) -> Iterator[bytes]:
+    """Binary COPY tuples (`FOCUS_COLUMNS`) for `ticks_focus`."""
+    tail = b"".join(
+        (
+            timestamp_field(received_at),
+            text_field(ingest_source),
+            text_field(focus_reason),
+            float_field(focus_score),
+            text_field(owner_id),
+        )
+    )
+    head = _TICK_HEAD.pack
+    field_count = len(FOCUS_COLUMNS)
+    for row in rows:
+        yield b"".join(
+            (
+                head(field_count, 8, pg_timestamp(row.time), 4, asset_id, 8, row.price, 8, row.volume),
+                text_field(row.side),
+                text_field(row.exchange_trade_id),
+                tail,
+            )
+        )
+
+
+class CopyStream:
+    """
+    Read-only file object over binary COPY tuples for ``copy_expert``.
+
+    Emits the header, the tuples and the trailer, `chunk_rows` tuples at a
+    time. `rows` counts the tuples handed to PostgreSQL so far.
+    """
+
+    def __init__(self, tuples: Iterable[bytes], *, chunk_rows: int = 10_000) -> None:
+        self._tuples = iter(tuples)
+        self._chunk_rows = max(1, int(chunk_rows))
+        self._buffer = bytearray(HEADER)
+        self._done = False
+        self.rows = 0
+
+    def _fill(self, size: int) -> None:
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            count = 0
+            for data in self._tuples:
+                self._buffer += data
+                count += 1
+                if count >= self._chunk_rows:
+                    break
+            self.rows += count
+            if count < self._chunk_rows:
+                self._buffer += TRAILER
+                self._done = True
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = bytes(self._buffer), bytearray()
+            return data
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        return self.read(size)
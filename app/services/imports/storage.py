@@ -1,26 +1,19 @@
 from __future__ import annotations
 
-import csv
-import io
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Iterable, Mapping
 
 from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.models.ticks import Asset, Tick, TickFocus
-from app.streaming.symbols import parse_symbol
+from app.services.asset_registry import asset_registry
+from app.services.imports.compact import side_code, split_trade_id, tick_source_id
+from app.services.imports.pgcopy import FOCUS_COLUMNS, TICK_COLUMNS, CopyStream, iter_focus_rows, iter_tick_rows
 from app.services.imports.types import TickRecord
 
 
-def normalize_symbol(symbol: str) -> str:
-    raw = symbol.strip().upper()
-    if "/" in raw:
-        base, quote = raw.split("/", 1)
-        return f"{base.strip()}-{quote.strip()}"
-    return raw
-
-
 def _normalize_time(dt: datetime) -> datetime:
     if dt.tzinfo is None:
         return dt.replace(tzinfo=timezone.utc)
@@ -34,30 +27,10 @@ def get_or_create_asset(
     exchange: str,
     tick_precision: int | None = None,
 ) -> Asset:
-    symbol = normalize_symbol(symbol)
-    exchange = exchange.strip().lower()
-
-    parsed = parse_symbol(symbol)
-    asset = (
-        db.query(Asset)
-        .filter(Asset.symbol == symbol, Asset.exchange == exchange)
-        .one_or_none()
-    )
-    if asset:
-        if tick_precision is not None and asset.tick_precision != tick_precision:
-            asset.tick_precision = tick_precision
-        return asset
-
-    asset = Asset(
-        symbol=symbol,
-        exchange=exchange,
-        base=parsed.base,
-        quote=parsed.quote,
-        tick_precision=tick_precision,
-        active=True,
-    )
-    db.add(asset)
-    db.flush()
+    """The `Asset` row for the pair; callers that only need the id use `asset_registry`."""
+    asset = db.get(Asset, asset_registry.get_or_create(db, exchange=exchange, symbol=symbol))
+    if tick_precision is not None and asset.tick_precision != tick_precision:
+        asset.tick_precision = tick_precision
     return asset
 
 
@@ -78,16 +51,17 @@ def bulk_insert_ticks(
 
     dialect = db.get_bind().dialect.name
     if dialect == "postgresql":
-        return _copy_ticks(
-            db,
-            asset_id=asset_id,
-            rows=rows,
-            ingest_source=ingest_source,
-            owner_id=owner_id,
-            focus=focus,
-            focus_reason=focus_reason,
-            focus_score=focus_score,
-        )
+        if focus:
+            return _copy_focus_ticks(
+                db,
+                asset_id=asset_id,
+                rows=rows,
+                ingest_source=ingest_source,
+                owner_id=owner_id,
+                focus_reason=focus_reason,
+                focus_score=focus_score,
+            )
+        return _copy_tick_batches(db, [(asset_id, rows)], ingest_source=ingest_source, owner_id=owner_id)
 
     objects = []
     now = datetime.now(timezone.utc)
@@ -110,154 +84,159 @@ def bulk_insert_ticks(
                 )
             )
     else:
+        source_id = tick_source_id(db, ingest_source)
+        payload = []
+        for row in rows:
+            trade_id, trade_id_text = split_trade_id(row.exchange_trade_id)
+            payload.append(
+                {
+                    "time": _normalize_time(row.time),
+                    "asset_id": asset_id,
+                    "price": row.price,
+                    "volume": row.volume,
+                    "side_code": side_code(row.side),
+                    "trade_id": trade_id,
+                    "exchange_trade_id": trade_id_text,
+                    "source_id": source_id,
+                    "is_aggregated": row.is_aggregated,
+                    "owner_id": owner_id,
+                }
+            )
         if dialect == "sqlite":
-            rows_payload = []
-            for row in rows:
-                ts = _normalize_time(row.time)
-                rows_payload.append(
-                    {
-                        "time": ts,
-                        "asset_id": asset_id,
-                        "price": row.price,
-                        "volume": row.volume,
-                        "side": row.side,
-                        "exchange_trade_id": row.exchange_trade_id,
-                        "received_at": now,
-                        "ingest_source": ingest_source,
-                        "is_aggregated": row.is_aggregated,
-                        "owner_id": owner_id,
-                    }
-                )
-            stmt = insert(Tick).values(rows_payload).prefix_with("OR IGNORE")
+            stmt = insert(Tick).values(payload).prefix_with("OR IGNORE")
             result = db.execute(stmt)
             return int(result.rowcount or 0)
-
-        for row in rows:
-            ts = _normalize_time(row.time)
-            objects.append(
-                Tick(
-                    time=ts,
-                    asset_id=asset_id,
-                    price=row.price,
-                    volume=row.volume,
-                    side=row.side,
-                    exchange_trade_id=row.exchange_trade_id,
-                    received_at=now,
-                    ingest_source=ingest_source,
-                    is_aggregated=row.is_aggregated,
-                    owner_id=owner_id,
-                )
-            )
+        objects = [Tick(**values) for values in payload]
     db.bulk_save_objects(objects)
     return len(objects)
 
 
-def _copy_ticks(
+def bulk_insert_tick_batches(
     db: Session,
+    batches: Mapping[int, Iterable[TickRecord]],
     *,
-    asset_id: int,
-    rows: list[TickRecord],
-    ingest_source: str | None,
-    owner_id: str | None,
-    focus: bool,
-    focus_reason: str | None,
-    focus_score: float | None,
+    ingest_source: str | None = None,
+    owner_id: str | None = None,
 ) -> int:
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    now = datetime.now(timezone.utc)
+    """
+    Insert ticks of several assets at once (``{asset_id: ticks}``). On
+    PostgreSQL this is a single binary COPY instead of one per asset.
+    """
+    items = [(asset_id, list(rows)) for asset_id, rows in batches.items()]
+    items = [(asset_id, rows) for asset_id, rows in items if rows]
+    if not items:
+        return 0
+    if db.get_bind().dialect.name == "postgresql":
+        return _copy_tick_batches(db, items, ingest_source=ingest_source, owner_id=owner_id)
+    return sum(
+        bulk_insert_ticks(db, asset_id=asset_id, rows=rows, ingest_source=ingest_source, owner_id=owner_id)
+        for asset_id, rows in items
+    )
 
-    if focus:
-        for row in rows:
-            ts = _normalize_time(row.time)
-            writer.writerow(
-                [
-                    ts.isoformat(),
-                    asset_id,
-                    row.price,
-                    row.volume,
-                    row.side,
-                    row.exchange_trade_id,
-                    now.isoformat(),
-                    ingest_source,
-                    focus_reason,
-                    focus_score,
-                    owner_id,
-                ]
-            )
-        columns = (
-            "time,asset_id,price,volume,side,exchange_trade_id,received_at,"
-            "ingest_source,focus_reason,focus_score,owner_id"
-        )
-        target = "ticks_focus"
-    else:
-        for row in rows:
-            ts = _normalize_time(row.time)
-            writer.writerow(
-                [
-                    ts.isoformat(),
-                    asset_id,
-                    row.price,
-                    row.volume,
-                    row.side,
-                    row.exchange_trade_id,
-                    now.isoformat(),
-                    ingest_source,
-                    row.is_aggregated,
-                    owner_id,
-                ]
-            )
-        columns = (
-            "time,asset_id,price,volume,side,exchange_trade_id,received_at,"
-            "ingest_source,is_aggregated,owner_id"
-        )
-        target = "ticks"
 
-    buffer.seek(0)
+_COPY_READ_BYTES = 1 << 20
+_STAGE_TABLE = "ticks_copy_stage"
 
-    conn = db.connection()
-    raw = conn.connection
-    cursor = raw.cursor()
-    if focus:
-        cursor.copy_expert(
-            f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)",
-            buffer,
-        )
-        cursor.close()
-        return len(rows)
 
+def _prepare_stage(cursor) -> None:
+    """
+    Empty session-private staging table. PostgreSQL empties it at commit; the
+    TRUNCATE covers a second COPY in the same transaction or one after a
+    rollback, with no per-transaction bookkeeping to go stale.
+    """
     cursor.execute(
-        """
-        CREATE TEMP TABLE IF NOT EXISTS ticks_stage (
+        f"""
+        CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} (
             time timestamptz,
             asset_id integer,
             price double precision,
             volume double precision,
-            side text,
+            side_code smallint,
+            trade_id bigint,
             exchange_trade_id text,
-            received_at timestamptz,
-            ingest_source text,
+            source_id smallint,
             is_aggregated boolean,
             owner_id text
-        ) ON COMMIT DROP;
+        ) ON COMMIT DELETE ROWS;
         """
     )
-    cursor.execute("TRUNCATE ticks_stage;")
-    cursor.copy_expert(
-        f"COPY ticks_stage ({columns}) FROM STDIN WITH (FORMAT csv)",
-        buffer,
+    cursor.execute(f"TRUNCATE {_STAGE_TABLE};")
+
+
+def _copy_tick_batches(
+    db: Session,
+    batches: list[tuple[int, list[TickRecord]]],
+    *,
+    ingest_source: str | None,
+    owner_id: str | None,
+) -> int:
+    """
+    Binary COPY of ``(asset_id, ticks)`` batches into `ticks`.
+
+    Batches without trade ids cannot hit the dedupe indexes (numeric
+    `trade_id` or text `exchange_trade_id`) and are copied straight into
+    `ticks`; otherwise rows go through the staging table and
+    ``INSERT ... ON CONFLICT DO NOTHING``.
+    """
+    stream = CopyStream(
+        iter_tick_rows(batches, source_id=tick_source_id(db, ingest_source), owner_id=owner_id),
+        chunk_rows=settings.TICK_COPY_CHUNK_ROWS,
     )
-    cursor.execute(
-        """
-        INSERT INTO ticks (time, asset_id, price, volume, side, exchange_trade_id, received_at,
-                           ingest_source, is_aggregated, owner_id)
-        SELECT time, asset_id, price, volume, side, exchange_trade_id, received_at,
-               ingest_source, is_aggregated, owner_id
-        FROM ticks_stage
-        ON CONFLICT (asset_id, exchange_trade_id, time) WHERE exchange_trade_id IS NOT NULL
-        DO NOTHING;
-        """
+    columns = ",".join(TICK_COLUMNS)
+    cursor = db.connection().connection.cursor()
+    try:
+        if not any(row.exchange_trade_id for _asset_id, rows in batches for row in rows):
+            cursor.copy_expert(f"COPY ticks ({columns}) FROM STDIN WITH (FORMAT binary)", stream, size=_COPY_READ_BYTES)
+            return stream.rows
+
+        _prepare_stage(cursor)
+        cursor.copy_expert(
+            f"COPY {_STAGE_TABLE} ({columns}) FROM STDIN WITH (FORMAT binary)",
+            stream,
+            size=_COPY_READ_BYTES,
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO ticks ({columns})
+            SELECT {columns}
+            FROM {_STAGE_TABLE}
+            ON CONFLICT DO NOTHING;
+            """
+        )
+        return int(cursor.rowcount or 0)
+    finally:
+        cursor.close()
+
+
+def _copy_focus_ticks(
+    db: Session,
+    *,
+    asset_id: int,
+    rows: list[TickRecord],
+    ingest_source: str | None,
+    owner_id: str | None,
+    focus_reason: str | None,
+    focus_score: float | None,
+) -> int:
+    stream = CopyStream(
+        iter_focus_rows(
+            asset_id,
+            rows,
+            received_at=datetime.now(timezone.utc),
+            ingest_source=ingest_source,
+            focus_reason=focus_reason,
+            focus_score=focus_score,
+            owner_id=owner_id,
+        ),
+        chunk_rows=settings.TICK_COPY_CHUNK_ROWS,
     )
-    inserted = cursor.rowcount
-    cursor.close()
-    return int(inserted or 0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY ticks_focus ({','.join(FOCUS_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+            stream,
+            size=_COPY_READ_BYTES,
+        )
+    finally:
+        cursor.close()
+    return stream.rows
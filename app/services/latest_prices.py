@@ -0,0 +1,74 @@
+"""
+Read helpers for the live latest-price cache.
+
+The streamer keeps one Redis hash per exchange (`latest_prices:{exchange}`)
+whose fields are symbols and whose values are JSON snapshots holding the last
+trade plus rolling 24h volume / trade count. Older streamers only wrote the
+per-symbol `latest:{exchange}:{symbol}` strings, so every helper falls back to
+those keys for symbols missing from the hash.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+def latest_hash_key(exchange: str) -> str:
+    return f"latest_prices:{exchange.strip().lower()}"
+
+
+def legacy_latest_key(exchange: str | None, symbol: str) -> str:
+    if exchange:
+        return f"latest:{exchange.strip().lower()}:{symbol}"
+    return f"latest:{symbol}"
+
+
+def _decode(raw: Any) -> dict | None:
+    if not raw:
+        return None
+    try:
+        payload = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+async def get_latest(redis, exchange: str, symbol: str) -> dict | None:
+    try:
+        raw = await redis.hget(latest_hash_key(exchange), symbol)
+    except Exception:
+        raw = None
+    payload = _decode(raw)
+    if payload is not None:
+        return payload
+    return _decode(await redis.get(legacy_latest_key(exchange, symbol)))
+
+
+async def get_latest_many(redis, exchange: str, symbols: list[str]) -> dict[str, dict | None]:
+    """One HMGET for the exchange hash; legacy MGET only for symbols it does not have."""
+    if not symbols:
+        return {}
+    try:
+        raw_values = await redis.hmget(latest_hash_key(exchange), symbols)
+    except Exception:
+        raw_values = [None] * len(symbols)
+    result = {sym: _decode(raw) for sym, raw in zip(symbols, raw_values)}
+
+    missing = [sym for sym, payload in result.items() if payload is None]
+    if missing:
+        legacy = await redis.mget([legacy_latest_key(exchange, sym) for sym in missing])
+        for sym, raw in zip(missing, legacy):
+            result[sym] = _decode(raw)
+    return result
+
+
+async def get_latest_all(redis, exchange: str) -> dict[str, dict]:
+    """Every symbol currently cached for an exchange, in one HGETALL."""
+    raw = await redis.hgetall(latest_hash_key(exchange))
+    result: dict[str, dict] = {}
+    for sym, value in (raw or {}).items():
+        payload = _decode(value)
+        if payload is not None:
+            result[sym] = payload
+    return result
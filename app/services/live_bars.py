@@ -0,0 +1,135 @@
+"""
+Redis layout, readers and `prices` persistence for live streamer bars.
+
+The bar builder keeps the open bar of every symbol/interval in one hash per
+exchange (`bars:open:{exchange}`, field `{symbol}:{timeframe}`), appends closed
+bars to the `market_bars` stream and publishes them on
+`bars:{exchange}:{symbol}:{timeframe}`. Closed bars of the `prices` timeframe
+are upserted into `prices` (and folded into `price_latest`).
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.instrument import Price
+from app.services.bucketing import CANDLE_FIELDS, Columns
+from app.services.price_latest import record_prices
+from app.streaming.bars import Bar
+
+
+BAR_STREAM_KEY = "market_bars"
+
+
+def open_bars_key(exchange: str) -> str:
+    return f"bars:open:{exchange.strip().lower()}"
+
+
+def bar_channel(exchange: str, symbol: str, timeframe: str) -> str:
+    return f"bars:{exchange.strip().lower()}:{symbol}:{timeframe}"
+
+
+async def get_open_bar(redis, exchange: str, symbol: str, timeframe: str) -> dict | None:
+    raw = await redis.hget(open_bars_key(exchange), f"{symbol}:{timeframe}")
+    if not raw:
+        return None
+    try:
+        payload = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def merge_open_bar(candles: Columns, bar: dict | None, *, bucket_seconds: int) -> Columns:
+    """
+    Overlay the live open bar on candle columns with the same bucket size.
+
+    The open bar replaces a stored candle for the same bucket (the DB only has
+    the trades flushed so far) or is appended when it is newer than the last one.
+    """
+    if not bar:
+        return candles
+    try:
+        start = float(bar["start"])
+        values = {
+            "open": float(bar["open"]),
+            "high": float(bar["high"]),
+            "low": float(bar["low"]),
+            "close": float(bar["close"]),
+            "volume": float(bar["volume"]),
+            "trades": int(bar.get("trades") or 0),
+        }
+    except (KeyError, TypeError, ValueError):
+        return candles
+    if int(start) % bucket_seconds:
+        return candles
+
+    start_ns = int(start) * 1_000_000_000
+    candle = Columns(
+        np.array([start_ns], dtype=np.int64),
+        {name: np.array([values[name]], dtype=np.int64 if name == "trades" else np.float64) for name in CANDLE_FIELDS},
+    )
+    if len(candles):
+        last = int(candles.times_ns[-1])
+        if last > start_ns:
+            return candles
+        if last == start_ns:
+            candles = candles.take(slice(0, len(candles) - 1))
+    return Columns.concat([candles, candle])
+
+
+def upsert_price_bars(db: Session, bars: Iterable[Bar]) -> int:
+    """Insert closed bars into `prices`, overwriting an existing row for the same bucket."""
+    rows = [
+        {
+            "exchange": bar.exchange,
+            "symbol": bar.symbol,
+            "timestamp": datetime.fromtimestamp(bar.start, tz=timezone.utc),
+            "open": bar.open,
+            "high": bar.high,
+            "low": bar.low,
+            "close": bar.close,
+            "volume": bar.volume,
+        }
+        for bar in bars
+    ]
+    if not rows:
+        return 0
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            existing = (
+                db.query(Price)
+                .filter(
+                    Price.exchange == row["exchange"],
+                    Price.symbol == row["symbol"],
+                    Price.timestamp == row["timestamp"],
+                )
+                .first()
+            )
+            if existing is None:
+                db.add(Price(**row))
+            else:
+                for field in ("open", "high", "low", "close", "volume"):
+                    setattr(existing, field, row[field])
+        record_prices(db, rows, source="live_bars", overwrites=True)
+        return len(rows)
+
+    stmt = insert(Price).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Price.exchange, Price.symbol, Price.timestamp],
+        set_={field: stmt.excluded[field] for field in ("open", "high", "low", "close", "volume")},
+    )
+    db.execute(stmt)
+    record_prices(db, rows, source="live_bars", overwrites=True)
+    return len(rows)
@@ -4,13 +4,15 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 import math
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import desc, func, select
 from sqlalchemy.orm import Session
 
 from app.models.instrument import Price
-from app.models.market import MarketTrade
-from app.models.ticks import Asset, Tick
+from app.services import bucketing
+from app.services.candle_planner import SOURCES, CandlePlan, load_candle_columns
+from app.services.tick_aggregates import align_bucket_seconds
 
 
 @dataclass
@@ -19,6 +21,7 @@ class CandleLoadResult:
     requested_bucket_seconds: int
     bucket_seconds: int
     source: str
+    plan: CandlePlan | None = None
 
 
 def load_candles_df(
@@ -44,37 +47,18 @@ def load_candles_df(
     bucket_seconds = int(requested_bucket_seconds)
 
     if max_points > 0 and range_seconds / bucket_seconds > max_points:
-        bucket_seconds = int(math.ceil(range_seconds / max_points))
+        bucket_seconds = align_bucket_seconds(int(math.ceil(range_seconds / max_points)))
 
-    candles: list[dict] = []
-    source_used = "none"
     source_key = (source or "auto").strip().lower()
+    sources = SOURCES if source_key == "auto" else (source_key,)
+    columns, plan = load_candle_columns(db, exchange, symbol, start_dt, end_dt, bucket_seconds, sources=sources)
 
-    def _load(kind: str) -> list[dict]:
-        if kind == "ticks":
-            return _load_ticks(db, exchange, symbol, start_dt, end_dt, bucket_seconds)
-        if kind == "market_trades":
-            return _load_market_trades(db, exchange, symbol, start_dt, end_dt, bucket_seconds)
-        if kind == "prices":
-            return _load_prices(db, exchange, symbol, start_dt, end_dt, timeframe)
-        return []
-
-    if source_key == "auto":
-        for kind in ("ticks", "market_trades", "prices"):
-            candles = _load(kind)
-            if candles:
-                source_used = kind
-                break
-    else:
-        candles = _load(source_key)
-        source_used = source_key
-
-    df = _candles_to_df(candles)
     return CandleLoadResult(
-        df=df,
+        df=columns.to_frame(),
         requested_bucket_seconds=requested_bucket_seconds,
         bucket_seconds=bucket_seconds,
-        source=source_used,
+        source=plan.source if source_key == "auto" else source_key,
+        plan=plan,
     )
 
 
@@ -107,288 +91,63 @@ def parse_timeframe_seconds(timeframe: str) -> int:
     raise ValueError(f"Invalid timeframe '{timeframe}'")
 
 
-def _timeframe_rule(timeframe: str) -> str:
-    tf = timeframe.strip().lower()
-    unit = tf[-1]
-    value = int(tf[:-1])
-    if unit == "s":
-        return f"{value}S"
-    if unit == "m":
-        return f"{value}min"
-    if unit == "h":
-        return f"{value}H"
-    if unit == "d":
-        return f"{value}D"
-    raise ValueError(f"Invalid timeframe '{timeframe}'")
-
+_PRICE_COLUMNS = (Price.open, Price.high, Price.low, Price.close, Price.volume)
 
-def _load_ticks(
-    db: Session,
-    exchange: str,
-    symbol: str,
-    start_dt: datetime,
-    end_dt: datetime,
-    bucket_seconds: int,
-) -> list[dict]:
-    asset = (
-        db.query(Asset)
-        .filter(Asset.exchange == exchange, Asset.symbol == symbol)
-        .first()
-    )
-    if not asset:
-        return []
 
-    dialect = db.get_bind().dialect.name
-    if dialect == "postgresql":
-        bucket_interval = f"{bucket_seconds} seconds"
-        sql = text(
-            """
-            SELECT
-              time_bucket(CAST(:bucket AS interval), time) AS bucket,
-              first(price, time) AS open,
-              max(price) AS high,
-              min(price) AS low,
-              last(price, time) AS close,
-              SUM(volume) AS volume,
-              COUNT(*) AS trades
-            FROM ticks
-            WHERE asset_id = :asset_id
-              AND time >= :start
-              AND time <= :end
-            GROUP BY bucket
-            ORDER BY bucket ASC
-            """
-        )
-        rows = (
-            db.execute(
-                sql,
-                {
-                    "bucket": bucket_interval,
-                    "asset_id": asset.id,
-                    "start": start_dt,
-                    "end": end_dt,
-                },
-            )
-            .mappings()
-            .all()
-        )
-        return _rows_to_candles(rows)
-
-    rows = (
-        db.query(Tick)
-        .filter(
-            Tick.asset_id == asset.id,
-            Tick.time >= start_dt,
-            Tick.time <= end_dt,
-        )
-        .order_by(Tick.time.asc())
-        .all()
-    )
-    return _bucket_rows(
-        rows,
-        bucket_seconds=bucket_seconds,
-        ts_attr="time",
-        price_attr="price",
-        volume_attr="volume",
+def _price_frame(times: list, values: list[list]) -> pd.DataFrame:
+    close = bucketing.as_float(values[3])
+    return bucketing.frame(
+        bucketing.epoch_ns(times),
+        {
+            "open": bucketing.as_float(values[0]),
+            "high": bucketing.as_float(values[1]),
+            "low": bucketing.as_float(values[2]),
+            "close": close,
+            "volume": bucketing.as_float(values[4]),
+        },
     )
 
 
-def _load_market_trades(
-    db: Session,
-    exchange: str,
-    symbol: str,
-    start_dt: datetime,
-    end_dt: datetime,
-    bucket_seconds: int,
-) -> list[dict]:
-    dialect = db.get_bind().dialect.name
-    if dialect == "postgresql":
-        bucket_interval = f"{bucket_seconds} seconds"
-        sql = text(
-            """
-            SELECT
-              time_bucket(CAST(:bucket AS interval), timestamp) AS bucket,
-              first(price, timestamp) AS open,
-              max(price) AS high,
-              min(price) AS low,
-              last(price, timestamp) AS close,
-              SUM(amount) AS volume,
-              COUNT(*) AS trades
-            FROM market_trades
-            WHERE exchange = :exchange
-              AND symbol = :symbol
-              AND timestamp >= :start
-              AND timestamp <= :end
-            GROUP BY bucket
-            ORDER BY bucket ASC
-            """
-        )
-        rows = (
-            db.execute(
-                sql,
-                {
-                    "bucket": bucket_interval,
-                    "exchange": exchange,
-                    "symbol": symbol,
-                    "start": start_dt,
-                    "end": end_dt,
-                },
-            )
-            .mappings()
-            .all()
-        )
-        return _rows_to_candles(rows)
-
-    rows = (
-        db.query(MarketTrade)
-        .filter(
-            MarketTrade.exchange == exchange,
-            MarketTrade.symbol == symbol,
-            MarketTrade.timestamp >= start_dt,
-            MarketTrade.timestamp <= end_dt,
-        )
-        .order_by(MarketTrade.timestamp.asc())
-        .all()
-    )
-    return _bucket_rows(
-        rows,
-        bucket_seconds=bucket_seconds,
-        ts_attr="timestamp",
-        price_attr="price",
-        volume_attr="amount",
+def load_price_frame(db: Session, exchange: str, symbol: str, limit: int) -> pd.DataFrame:
+    """
+    The newest `limit` stored bars of a market as a time-ascending OHLCV
+    DataFrame, read column-wise into numpy (NULL prices and volumes become 0).
+    """
+    stmt = (
+        select(bucketing.time_text(Price.timestamp), *_PRICE_COLUMNS)
+        .where(Price.exchange == exchange, Price.symbol == symbol)
+        .order_by(Price.timestamp.desc())
+        .limit(limit)
     )
-
-
-def _load_prices(
-    db: Session,
-    exchange: str,
-    symbol: str,
-    start_dt: datetime,
-    end_dt: datetime,
-    timeframe: str,
-) -> list[dict]:
-    rows = (
-        db.query(Price)
-        .filter(
-            Price.exchange == exchange,
-            Price.symbol == symbol,
-            Price.timestamp >= start_dt,
-            Price.timestamp <= end_dt,
+    times, *values = bucketing.fetch_columns(db, stmt)
+    return _price_frame(times[::-1], [column[::-1] for column in values])
+
+
+def load_price_frames(db: Session, exchange: str, symbols: list[str], limit: int) -> dict[str, pd.DataFrame]:
+    """`load_price_frame` for several symbols of one exchange in a single query."""
+    ranked = (
+        select(
+            Price.symbol,
+            Price.timestamp,
+            bucketing.time_text(Price.timestamp).label("time_text"),
+            *_PRICE_COLUMNS,
+            func.row_number().over(partition_by=Price.symbol, order_by=desc(Price.timestamp)).label("rn"),
         )
-        .order_by(Price.timestamp.asc())
-        .all()
+        .where(Price.exchange == exchange, Price.symbol.in_(symbols))
+        .subquery()
     )
-    if not rows:
-        return []
-
-    df = pd.DataFrame(
-        [
-            {
-                "timestamp": _to_utc(row.timestamp),
-                "open": float(row.open or 0.0),
-                "high": float(row.high or 0.0),
-                "low": float(row.low or 0.0),
-                "close": float(row.close or 0.0),
-                "volume": float(row.volume or 0.0),
-            }
-            for row in rows
-        ]
+    stmt = (
+        select(*(column for column in ranked.c if column.name not in ("timestamp", "rn")))
+        .where(ranked.c.rn <= limit)
+        .order_by(ranked.c.symbol, ranked.c.timestamp)
     )
-
-    df = df.sort_values("timestamp").set_index("timestamp")
-    rule = _timeframe_rule(timeframe)
-    resampled = df.resample(rule).agg(
-        {
-            "open": "first",
-            "high": "max",
-            "low": "min",
-            "close": "last",
-            "volume": "sum",
-        }
-    )
-    resampled = resampled.dropna(subset=["open", "high", "low", "close"])
-    resampled = resampled.reset_index()
-
-    return [
-        {
-            "timestamp": ts.to_pydatetime().isoformat(),
-            "open": float(open_p),
-            "high": float(high_p),
-            "low": float(low_p),
-            "close": float(close_p),
-            "volume": float(volume),
-            "trades": 0,
-        }
-        for ts, open_p, high_p, low_p, close_p, volume in resampled.itertuples(index=False)
-    ]
-
-
-def _rows_to_candles(rows) -> list[dict]:
-    candles: list[dict] = []
-    for row in rows:
-        bucket = row.get("bucket")
-        if bucket is None:
-            continue
-        open_p = row.get("open")
-        high_p = row.get("high")
-        low_p = row.get("low")
-        close_p = row.get("close")
-        if open_p is None or high_p is None or low_p is None or close_p is None:
-            continue
-        candles.append(
-            {
-                "timestamp": _to_utc(bucket).isoformat(),
-                "open": float(open_p),
-                "high": float(high_p),
-                "low": float(low_p),
-                "close": float(close_p),
-                "volume": float(row.get("volume") or 0.0),
-                "trades": int(row.get("trades") or 0),
-            }
-        )
-    return candles
-
-
-def _bucket_rows(
-    rows,
-    bucket_seconds: int,
-    ts_attr: str,
-    price_attr: str,
-    volume_attr: str,
-) -> list[dict]:
-    buckets: dict[int, dict] = {}
-    for row in rows:
-        ts = getattr(row, ts_attr)
-        ts = _to_utc(ts)
-        bucket_epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
-        price = float(getattr(row, price_attr))
-        volume = float(getattr(row, volume_attr))
-        item = buckets.get(bucket_epoch)
-        if item is None:
-            buckets[bucket_epoch] = {
-                "timestamp": datetime.fromtimestamp(bucket_epoch, tz=timezone.utc).isoformat(),
-                "open": price,
-                "high": price,
-                "low": price,
-                "close": price,
-                "volume": volume,
-                "trades": 1,
-            }
-        else:
-            item["high"] = max(item["high"], price)
-            item["low"] = min(item["low"], price)
-            item["close"] = price
-            item["volume"] += volume
-            item["trades"] += 1
-    return [buckets[key] for key in sorted(buckets.keys())]
-
-
-def _candles_to_df(candles: list[dict]) -> pd.DataFrame:
-    if not candles:
-        return pd.DataFrame()
-    df = pd.DataFrame(candles)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
-    df = df.sort_values("timestamp").reset_index(drop=True)
-    return df
-
-
+    symbol_column, times, *values = bucketing.fetch_columns(db, stmt)
+    if not symbol_column:
+        return {}
+    keys = np.asarray(symbol_column, dtype=object)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], keys.size]
+    return {
+        keys[start]: _price_frame(times[start:end], [column[start:end] for column in values])
+        for start, end in zip(starts.tolist(), ends.tolist())
+    }
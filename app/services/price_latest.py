@@ -0,0 +1,196 @@
+"""
+`price_latest`: the newest `prices` bar of every market.
+
+Every writer of `prices` (live bar builder, backfill and ingest tasks) calls
+`record_prices` in the same transaction, so "latest close / latest candle
+time / number of bars" for a page of symbols is one primary-key lookup instead
+of a ``max(timestamp)`` scan per symbol plus a second query for the close.
+
+Markets without a `price_latest` row (rows written outside those paths) are
+answered from `prices` directly. Deleting bars (retention, manual cleanup)
+leaves `row_count` too high; recompute the table with
+
+    python -m app.services.price_latest
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Iterable, Mapping
+
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.instrument import Price, PriceLatest
+
+
+logger = logging.getLogger("cryptoinsight.price_latest")
+
+_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+REBUILD_SQL = """
+    INSERT INTO price_latest (exchange, symbol, timestamp, close, row_count, source, updated_at)
+    SELECT p.exchange, p.symbol, p.timestamp, p.close, s.row_count, 'prices', CURRENT_TIMESTAMP
+    FROM (
+      SELECT exchange, symbol, max(timestamp) AS latest, count(*) AS row_count
+      FROM prices
+      GROUP BY exchange, symbol
+    ) s
+    JOIN prices p ON p.exchange = s.exchange AND p.symbol = s.symbol AND p.timestamp = s.latest
+"""
+
+
+def record_prices(db: Session, rows: Iterable[Mapping], *, source: str, overwrites: bool = False) -> int:
+    """
+    Fold newly written `prices` rows (exchange, symbol, timestamp, close) into
+    `price_latest`: the newest bar wins and `row_count` grows by the number of
+    rows. With `overwrites` (upserts that may replace a stored bar) rows only
+    count when they are newer than the stored latest bar. Returns the number
+    of markets touched.
+    """
+    latest: dict[tuple[str, str], dict] = {}
+    for row in rows:
+        key = (row["exchange"], row["symbol"])
+        current = latest.get(key)
+        if current is None:
+            latest[key] = {
+                "exchange": row["exchange"],
+                "symbol": row["symbol"],
+                "timestamp": row["timestamp"],
+                "close": row["close"],
+                "row_count": 1,
+                "source": source,
+            }
+            continue
+        current["row_count"] += 1
+        if row["timestamp"] >= current["timestamp"]:
+            current["timestamp"] = row["timestamp"]
+            current["close"] = row["close"]
+    if not latest:
+        return 0
+    # Fixed key order so concurrent writers lock rows in the same order.
+    values = [latest[key] for key in sorted(latest)]
+
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        for value in values:
+            existing = db.get(PriceLatest, (value["exchange"], value["symbol"]))
+            if existing is None:
+                db.add(PriceLatest(**value))
+                continue
+            if not overwrites or value["timestamp"] > existing.timestamp:
+                existing.row_count = (existing.row_count or 0) + value["row_count"]
+            if value["timestamp"] >= existing.timestamp:
+                existing.timestamp = value["timestamp"]
+                existing.close = value["close"]
+                existing.source = source
+        return len(values)
+
+    stmt = insert(PriceLatest).values(values)
+    excluded = stmt.excluded
+    newer = excluded.timestamp >= PriceLatest.timestamp
+    added = excluded.row_count
+    if overwrites:
+        added = case((excluded.timestamp > PriceLatest.timestamp, excluded.row_count), else_=0)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PriceLatest.exchange, PriceLatest.symbol],
+        set_={
+            "timestamp": case((newer, excluded.timestamp), else_=PriceLatest.timestamp),
+            "close": case((newer, excluded.close), else_=PriceLatest.close),
+            "source": case((newer, excluded.source), else_=PriceLatest.source),
+            "row_count": PriceLatest.row_count + added,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    return len(values)
+
+
+def _from_prices(db: Session, exchange: str, symbols: list[str]) -> dict[str, PriceLatest]:
+    stats = (
+        db.query(
+            Price.symbol,
+            func.count(Price.id).label("row_count"),
+            func.max(Price.timestamp).label("latest_ts"),
+        )
+        .filter(Price.exchange == exchange, Price.symbol.in_(symbols))
+        .group_by(Price.symbol)
+        .all()
+    )
+    stats = [row for row in stats if row.latest_ts is not None]
+    if not stats:
+        return {}
+    closes = {
+        (symbol, ts): close
+        for symbol, ts, close in db.query(Price.symbol, Price.timestamp, Price.close).filter(
+            Price.exchange == exchange,
+            Price.symbol.in_([row.symbol for row in stats]),
+            Price.timestamp.in_({row.latest_ts for row in stats}),
+        )
+    }
+    return {
+        row.symbol: PriceLatest(
+            exchange=exchange,
+            symbol=row.symbol,
+            timestamp=row.latest_ts,
+            close=closes.get((row.symbol, row.latest_ts)),
+            row_count=int(row.row_count or 0),
+            source="prices",
+        )
+        for row in stats
+    }
+
+
+def get_latest_many(db: Session, exchange: str, symbols: Iterable[str]) -> dict[str, PriceLatest]:
+    """Latest bar per symbol on `exchange`; symbols without any bar are left out."""
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    found = {
+        row.symbol: row
+        for row in db.query(PriceLatest).filter(PriceLatest.exchange == exchange, PriceLatest.symbol.in_(symbols))
+    }
+    missing = [symbol for symbol in symbols if symbol not in found]
+    if missing:
+        found.update(_from_prices(db, exchange, missing))
+    return found
+
+
+def get_latest(db: Session, exchange: str, symbol: str) -> PriceLatest | None:
+    return get_latest_many(db, exchange, [symbol]).get(symbol)
+
+
+def latest_by_exchange(db: Session, symbol: str) -> dict[str, datetime]:
+    """Latest bar time of `symbol` on every exchange that has it."""
+    rows = db.query(PriceLatest.exchange, PriceLatest.timestamp).filter(PriceLatest.symbol == symbol).all()
+    if not rows:
+        rows = (
+            db.query(Price.exchange, func.max(Price.timestamp))
+            .filter(Price.symbol == symbol)
+            .group_by(Price.exchange)
+            .all()
+        )
+    return {exchange: ts for exchange, ts in rows if ts is not None}
+
+
+def rebuild(db: Session) -> int:
+    """Recompute `price_latest` from `prices`; returns the number of markets."""
+    db.query(PriceLatest).delete(synchronize_session=False)
+    db.execute(text(REBUILD_SQL))
+    return db.query(func.count()).select_from(PriceLatest).scalar() or 0
+
+
+def main() -> None:
+    from database import session_scope
+
+    logging.basicConfig(level=logging.INFO)
+    with session_scope() as db:
+        count = rebuild(db)
+    logger.info("Rebuilt price_latest for %s markets", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app.models.instrument import Price
 from app.services.market_resolution import configured_exchange_priority
+from app.services.price_latest import latest_by_exchange
 
 
 def _normalize_exchange(value: str) -> str:
@@ -34,12 +32,7 @@ def resolve_price_exchange(
             return normalized
 
     priority = _priority_exchanges()
-    rows = (
-        db.query(Price.exchange, func.max(Price.timestamp).label("latest"))
-        .filter(Price.symbol == symbol)
-        .group_by(Price.exchange)
-        .all()
-    )
+    rows = latest_by_exchange(db, symbol)
 
     if not rows:
         return priority[0] if priority else None
@@ -48,11 +41,8 @@ def resolve_price_exchange(
     best_exchange = None
     best_latest = None
 
-    for row in rows:
-        exchange_key = _normalize_exchange(row.exchange or "")
-        latest = row.latest
-        if latest is None:
-            continue
+    for exchange_key, latest in rows.items():
+        exchange_key = _normalize_exchange(exchange_key or "")
         if best_latest is None or latest > best_latest:
             best_latest = latest
             best_exchange = exchange_key
@@ -64,7 +54,7 @@ def resolve_price_exchange(
     if best_exchange:
         return best_exchange
 
-    available = {_normalize_exchange(row.exchange or "") for row in rows if row.exchange}
+    available = {_normalize_exchange(exchange_key) for exchange_key in rows if exchange_key}
     for exchange_key in priority:
         if exchange_key in available:
             return exchange_key
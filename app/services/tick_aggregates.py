@@ -0,0 +1,118 @@
+"""
+Hierarchical continuous aggregates over `ticks`.
+
+    ticks -> ticks_1m -> ticks_5m -> ticks_15m -> ticks_1h -> ticks_4h -> ticks_1d
+
+Each level is a real-time aggregate (``materialized_only = false``) built on
+the level below: buckets past the refresh watermark are computed at query
+time, so a level is complete as soon as ticks are written. The views and their
+refresh policies are created by migration 20261017_0003.
+
+Refresh policies only look back a bounded window. The Binance Vision and
+Dukascopy import tasks (also queued by `/market/gaps/repair`) refresh the
+range they imported; other ticks written further in the past are
+materialized with
+
+    python -m app.services.tick_aggregates --start 2024-01-01 --end 2024-02-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+
+logger = logging.getLogger("cryptoinsight.tick_aggregates")
+
+
+@dataclass(frozen=True)
+class TickAggregate:
+    view: str
+    bucket_seconds: int
+
+
+TICK_AGGREGATES = (
+    TickAggregate("ticks_1m", 60),
+    TickAggregate("ticks_5m", 300),
+    TickAggregate("ticks_15m", 900),
+    TickAggregate("ticks_1h", 3600),
+    TickAggregate("ticks_4h", 14_400),
+    TickAggregate("ticks_1d", 86_400),
+)
+
+# A bucket is only widened to line up with an aggregate by at most this much.
+_ALIGN_SLACK = 1.1
+
+
+def coarsest_aggregate(bucket_seconds: int) -> TickAggregate | None:
+    """Coarsest aggregate whose buckets tile `bucket_seconds` exactly, if any."""
+    for aggregate in reversed(TICK_AGGREGATES):
+        if bucket_seconds >= aggregate.bucket_seconds and bucket_seconds % aggregate.bucket_seconds == 0:
+            return aggregate
+    return None
+
+
+def align_bucket_seconds(bucket_seconds: int) -> int:
+    """
+    Round a computed bucket up to a multiple of an aggregate bucket (largest
+    first) when that widens it by at most 10%, so it can be served from an
+    aggregate. Buckets under a minute are returned unchanged.
+    """
+    for aggregate in reversed(TICK_AGGREGATES):
+        if bucket_seconds < aggregate.bucket_seconds:
+            continue
+        aligned = math.ceil(bucket_seconds / aggregate.bucket_seconds) * aggregate.bucket_seconds
+        if aligned <= bucket_seconds * _ALIGN_SLACK:
+            return aligned
+    return bucket_seconds
+
+
+def _bucket_window(start: datetime, end: datetime, bucket_seconds: int) -> tuple[datetime, datetime]:
+    """``[start, end)`` widened to whole buckets; a refresh skips partially covered ones."""
+    first = math.floor(start.timestamp() / bucket_seconds) * bucket_seconds
+    last = math.ceil(end.timestamp() / bucket_seconds) * bucket_seconds
+    return datetime.fromtimestamp(first, tz=timezone.utc), datetime.fromtimestamp(last, tz=timezone.utc)
+
+
+def refresh(engine, start: datetime, end: datetime) -> None:
+    """Materialize every level for ``[start, end)``, finest first (no-op off PostgreSQL)."""
+    if engine.dialect.name != "postgresql":
+        return
+    # refresh_continuous_aggregate cannot run inside a transaction block.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for aggregate in TICK_AGGREGATES:
+            window_start, window_end = _bucket_window(start, end, aggregate.bucket_seconds)
+            conn.execute(
+                text("CALL refresh_continuous_aggregate(:view, :start, :end)"),
+                {"view": aggregate.view, "start": window_start, "end": window_end},
+            )
+            logger.info(
+                "Refreshed %s for [%s, %s)", aggregate.view, window_start.isoformat(), window_end.isoformat()
+            )
+
+
+def _parse_dt(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    import database
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=_parse_dt, required=True)
+    parser.add_argument("--end", type=_parse_dt, default=None, help="Default: now.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    database.init_db()
+    refresh(database.engine, args.start, args.end or datetime.now(timezone.utc))
+
+
+if __name__ == "__main__":
+    main()
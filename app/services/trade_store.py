@@ -0,0 +1,97 @@
+"""
+Read path for stream trades.
+
+With ``STREAM_TRADE_STORAGE=both`` (the default) the writer stores every trade
+twice, as a `MarketTrade` row and as a `Tick`, and trade readers use the
+`market_trades` table. With ``ticks`` the writer only stores ticks and the same
+readers see `ticks` + `assets` shaped like `market_trades`:
+
+    id, exchange, symbol, timestamp, receipt_timestamp, price, amount, side
+
+`trades_source()` is that shape for ORM queries and `trades_relation()` names it
+for raw (PostgreSQL) SQL; the `market_trades_ticks` view is created by migration
+20261017_0001, which also copies existing `market_trades` rows into `ticks`,
+and redefined by 20261017_0002 for the compact tick columns (`side` decoded
+from `side_code`; `receipt_timestamp` is NULL for compact rows).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import case, select
+from sqlalchemy.orm import Query, Session
+
+from app.config import settings
+from app.models.market import MarketTrade
+from app.models.ticks import Asset, Tick
+from app.services.imports.compact import SIDE_NAMES
+
+
+STORAGE_MODES = ("both", "ticks")
+TICKS_VIEW = "market_trades_ticks"
+
+
+def storage_mode() -> str:
+    mode = (settings.STREAM_TRADE_STORAGE or "both").strip().lower()
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unsupported trade storage: {mode!r} (supported: {','.join(STORAGE_MODES)})")
+    return mode
+
+
+def ticks_only() -> bool:
+    return storage_mode() == "ticks"
+
+
+def ticks_as_trades():
+    """`ticks` joined to `assets`, with `market_trades` column names (global ticks only)."""
+    return (
+        select(
+            Tick.id.label("id"),
+            Asset.exchange.label("exchange"),
+            Asset.symbol.label("symbol"),
+            Tick.time.label("timestamp"),
+            Tick.received_at.label("receipt_timestamp"),
+            Tick.price.label("price"),
+            Tick.volume.label("amount"),
+            case(
+                *((Tick.side_code == code, name) for code, name in SIDE_NAMES.items()),
+                else_=Tick.side,
+            ).label("side"),
+        )
+        .join(Asset, Asset.id == Tick.asset_id)
+        .where(Tick.owner_id.is_(None))
+    )
+
+
+def trades_source():
+    """Selectable with the `market_trades` columns for the configured storage mode."""
+    if ticks_only():
+        return ticks_as_trades().subquery("market_trades")
+    return MarketTrade.__table__
+
+
+def trades_relation() -> str:
+    """Table or view name to use in raw SQL in place of `market_trades`."""
+    return TICKS_VIEW if ticks_only() else "market_trades"
+
+
+def query_trades(
+    db: Session,
+    *,
+    symbol: str,
+    exchange: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    descending: bool = False,
+) -> Query:
+    source = trades_source()
+    columns = source.c
+    query = db.query(source).filter(columns.symbol == symbol)
+    if exchange:
+        query = query.filter(columns.exchange == exchange)
+    if start is not None:
+        query = query.filter(columns.timestamp >= start)
+    if end is not None:
+        query = query.filter(columns.timestamp <= end)
+    return query.order_by(columns.timestamp.desc() if descending else columns.timestamp.asc())
@@ -14,9 +14,8 @@ import logging
 
 import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
 
-from app.models.instrument import Price
+from app.services.market_candles import load_price_frame, load_price_frames
 from app.config import settings
 from app.analysis import add_technical_indicators
 from app.connectors.sentiment import Sentiment
@@ -118,29 +117,11 @@ class SignalEngine:
         symbol = _normalize_symbol_for_exchange(exchange_key, symbol)
         
         if prefetched_df is None:
-            # Fetch historical data
-            prices = (
-                self.db.query(Price)
-                .filter(Price.exchange == exchange_key, Price.symbol == symbol)
-                .order_by(Price.timestamp.desc())
-                .limit(lookback)
-                .all()
-            )
-
-            if len(prices) < 50:
-                logger.warning(f"Insufficient data for {symbol}: {len(prices)} rows")
+            prefetched_df = load_price_frame(self.db, exchange_key, symbol, lookback)
+            if len(prefetched_df) < 50:
+                logger.warning(f"Insufficient data for {symbol}: {len(prefetched_df)} rows")
                 return None
 
-            # Convert to DataFrame
-            prefetched_df = pd.DataFrame([{
-                "timestamp": p.timestamp,
-                "open": float(p.open or 0),
-                "high": float(p.high or 0),
-                "low": float(p.low or 0),
-                "close": float(p.close or 0),
-                "volume": float(p.volume or 0),
-            } for p in reversed(prices)])
-
         df = prefetched_df.sort_values("timestamp").reset_index(drop=True)
         if len(df) < 50:
              return None
@@ -479,45 +460,11 @@ class SignalEngine:
             symbol_norm_map[symbol] = norm_symbol
             buckets.setdefault(ex, []).append(norm_symbol)
 
-        grouped: dict[str, list[dict]] = {}
+        grouped: dict[str, pd.DataFrame] = {}
         try:
             for ex, syms in buckets.items():
-                if not syms:
-                    continue
-                subquery = (
-                    self.db.query(
-                        Price.symbol,
-                        Price.timestamp,
-                        Price.open,
-                        Price.high,
-                        Price.low,
-                        Price.close,
-                        Price.volume,
-                        func.row_number().over(
-                            partition_by=Price.symbol,
-                            order_by=desc(Price.timestamp)
-                        ).label("rn")
-                    )
-                    .filter(
-                        Price.symbol.in_(syms),
-                        Price.exchange == ex
-                    )
-                    .subquery()
-                )
-
-                rows = self.db.query(subquery).filter(subquery.c.rn <= lookback).all()
-
-                for r in rows:
-                    if r.symbol not in grouped:
-                        grouped[r.symbol] = []
-                    grouped[r.symbol].append({
-                        "timestamp": r.timestamp,
-                        "open": float(r.open or 0),
-                        "high": float(r.high or 0),
-                        "low": float(r.low or 0),
-                        "close": float(r.close or 0),
-                        "volume": float(r.volume or 0)
-                    })
+                if syms:
+                    grouped.update(load_price_frames(self.db, ex, syms, lookback))
         except Exception as e:
             logger.error(f"Batch query failed: {e}")
             return []
@@ -526,12 +473,10 @@ class SignalEngine:
         for symbol in symbols:
             try:
                 norm_symbol = symbol_norm_map.get(symbol, symbol)
-                data = grouped.get(norm_symbol, [])
-                if not data:
+                df = grouped.get(norm_symbol)
+                if df is None:
                     continue
 
-                df = pd.DataFrame(data)
-
                 signal = self.generate_signal(
                     norm_symbol,
                     exchange=(exchange_map or {}).get(symbol),
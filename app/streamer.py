@@ -6,11 +6,9 @@ import logging
 
 from app.config import settings
 from app.redis_client import RedisClient
-from app.streaming.base_ws import BaseTradeStreamer
-from app.streaming.binance_ws import BinanceTradeStreamer
-from app.streaming.coinbase_ws import CoinbaseTradeStreamer
-from app.streaming.kraken_ws import KrakenTradeStreamer
-from app.streaming.publisher import RedisPublisher
+from app.streaming.sharding import ExchangeShardPlan
+from app.streaming.subscriptions import SubscriptionManager
+from app.streaming.supervisor import SUPPORTED_EXCHANGES, StreamSupervisor
 from app.streaming.symbols import parse_symbol_list
 
 
@@ -23,7 +21,31 @@ def _enabled_stream_exchanges() -> list[str]:
         return [e.strip().upper() for e in raw.split(",") if e.strip()]
     return [settings.STREAM_EXCHANGE.strip().upper()]
 
-async def _command_listener(redis, streamers: dict[str, BaseTradeStreamer]):
+
+def _symbol_cap(exchange: str) -> int:
+    if exchange == "KRAKEN":
+        return max(settings.STREAM_MAX_SYMBOLS_PER_EXCHANGE, settings.KRAKEN_STREAM_TOP_N)
+    return settings.STREAM_MAX_SYMBOLS_PER_EXCHANGE
+
+
+def build_shard_plans(exchanges: list[str], symbols: list[str]) -> dict[str, ExchangeShardPlan]:
+    plans: dict[str, ExchangeShardPlan] = {}
+    for exchange in exchanges:
+        if exchange not in SUPPORTED_EXCHANGES:
+            raise SystemExit(
+                f"Unsupported STREAM_EXCHANGE: {exchange!r} (supported: {','.join(SUPPORTED_EXCHANGES)})"
+            )
+        plans[exchange] = ExchangeShardPlan(
+            exchange,
+            symbols[: _symbol_cap(exchange)],
+            min_connections=settings.STREAM_CONNECTIONS_PER_EXCHANGE,
+            max_connections=settings.STREAM_MAX_CONNECTIONS_PER_EXCHANGE,
+            max_symbols_per_connection=settings.STREAM_MAX_SYMBOLS_PER_CONNECTION,
+        )
+    return plans
+
+
+async def _command_listener(redis, supervisor: StreamSupervisor):
     pubsub = redis.pubsub()
     await pubsub.subscribe("streamer:commands")
     logger.info("Listening for dynamic commands on 'streamer:commands'")
@@ -31,64 +53,49 @@ async def _command_listener(redis, streamers: dict[str, BaseTradeStreamer]):
     async for message in pubsub.listen():
         if message["type"] != "message":
             continue
-        
+
         try:
-            data = json.loads(message["data"])
-            action = data.get("action")
-            
-            if action == "subscribe":
-                symbol = data.get("symbol")
-                exchange = data.get("exchange", "COINBASE").upper()
-                
-                streamer = streamers.get(exchange)
-                if streamer and symbol:
-                    logger.info(f"Received dynamic subscription for {symbol} on {exchange}")
-                    await streamer.subscribe([symbol])
-                else:
-                    logger.warning(f"No streamer found for exchange {exchange} or invalid symbol {symbol}")
-                    
+            await supervisor.handle_command(json.loads(message["data"]))
         except Exception as e:
             logger.error(f"Error processing command: {e}")
 
+
 async def run_all() -> None:
     exchanges = _enabled_stream_exchanges()
-    symbols = parse_symbol_list(settings.CORE_UNIVERSE)
+    symbols = [s.dash() for s in parse_symbol_list(settings.CORE_UNIVERSE)]
     if not symbols:
         raise SystemExit("CORE_UNIVERSE is empty; set it to e.g. BTC-USD,ETH-USD")
 
+    plans = build_shard_plans(exchanges, symbols)
+    subscriptions = SubscriptionManager(
+        plans,
+        window_seconds=settings.STREAM_SUBSCRIBE_WINDOW_MS / 1000.0,
+        idle_seconds=settings.STREAM_DYNAMIC_IDLE_SECONDS,
+        max_dynamic_per_connection=settings.STREAM_DYNAMIC_MAX_PER_CONNECTION,
+    )
+    supervisor = StreamSupervisor(
+        plans,
+        worker_processes=settings.STREAM_WORKER_PROCESSES,
+        subscriptions=subscriptions,
+    )
     redis = RedisClient.get_redis()
-    publisher = RedisPublisher(redis)
 
-    tasks: list[asyncio.Task] = []
-    streamers: dict[str, BaseTradeStreamer] = {}
-
-    for exchange in exchanges:
-        if exchange == "COINBASE":
-            # Pass initial symbols
-            initial_ids = [s.dash() for s in symbols][: settings.STREAM_MAX_SYMBOLS_PER_EXCHANGE]
-            streamer = CoinbaseTradeStreamer(initial_ids)
-            streamers["COINBASE"] = streamer
-            tasks.append(asyncio.create_task(streamer.run_forever(publisher)))
-            
-        elif exchange == "BINANCE":
-            streamer = BinanceTradeStreamer(symbols[: settings.STREAM_MAX_SYMBOLS_PER_EXCHANGE])
-            streamers["BINANCE"] = streamer
-            tasks.append(asyncio.create_task(streamer.run_forever(publisher)))
-            
-        elif exchange == "KRAKEN":
-            streamer = KrakenTradeStreamer(symbols[: settings.STREAM_MAX_SYMBOLS_PER_EXCHANGE])
-            streamers["KRAKEN"] = streamer
-            tasks.append(asyncio.create_task(streamer.run_forever(publisher)))
-            
-        else:
-            raise SystemExit(f"Unsupported STREAM_EXCHANGE: {exchange!r} (supported: COINBASE,BINANCE,KRAKEN)")
-
-    logger.info("Streamer started: exchanges=%s symbols=%s", ",".join(exchanges), ",".join([s.dash() for s in symbols]))
-    
-    # Add command listener
-    tasks.append(asyncio.create_task(_command_listener(redis, streamers)))
-    
-    await asyncio.gather(*tasks)
+    logger.info(
+        "Streamer started: exchanges=%s symbols=%s workers=%d connections=%s",
+        ",".join(exchanges),
+        ",".join(symbols),
+        supervisor.worker_count,
+        {name: len(plan.connections) for name, plan in plans.items()},
+    )
+
+    await supervisor.start()
+    try:
+        await asyncio.gather(
+            _command_listener(redis, supervisor),
+            supervisor.monitor(),
+        )
+    finally:
+        await supervisor.close()
 
 
 def main():
@@ -0,0 +1,184 @@
+"""
+Rolling OHLCV bars built from the live trade stream.
+
+`BarAggregator` keeps one flat `array('d')` per (exchange, symbol) holding the
+open bar of every configured interval, laid out as consecutive
+``[start, open, high, low, close, volume, trades, closed]`` slots. A trade that
+falls into a later window closes the previous bar; `close_due` closes bars
+whose window ended without a follow-up trade. Trades older than the open bar,
+or at or before the last closed bar, are counted as late and ignored (the DB
+aggregates still see them via `ticks`), so a closed bar is never reopened with
+a partial one.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+
+DEFAULT_INTERVALS = (1, 60, 300)
+
+# Offsets inside each interval's slot.
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _TRADES, _CLOSED = range(8)
+_SLOT = 8
+
+
+class Bar(NamedTuple):
+    exchange: str
+    symbol: str
+    interval: int
+    start: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    trades: int
+
+    @property
+    def timeframe(self) -> str:
+        return interval_label(self.interval)
+
+    def to_dict(self) -> dict:
+        return {
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "timestamp": datetime.fromtimestamp(self.start, tz=timezone.utc).isoformat(),
+            "start": self.start,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "trades": self.trades,
+        }
+
+    def stream_fields(self) -> dict[str, str]:
+        return {
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "interval": str(self.interval),
+            "start": str(self.start),
+            "open": str(self.open),
+            "high": str(self.high),
+            "low": str(self.low),
+            "close": str(self.close),
+            "volume": str(self.volume),
+            "trades": str(self.trades),
+        }
+
+
+def interval_label(seconds: int) -> str:
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}d"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def parse_intervals(raw: str) -> tuple[int, ...]:
+    """Parse e.g. "1s,1m,5m" into sorted interval seconds."""
+    from app.services.market_candles import parse_timeframe_seconds
+
+    seconds = {parse_timeframe_seconds(part.strip()) for part in (raw or "").split(",") if part.strip()}
+    if not seconds or min(seconds) <= 0:
+        raise ValueError(f"Invalid bar intervals: {raw!r}")
+    return tuple(sorted(seconds))
+
+
+class BarAggregator:
+    def __init__(self, intervals: tuple[int, ...] = DEFAULT_INTERVALS) -> None:
+        self.intervals = tuple(int(i) for i in intervals)
+        self._state: dict[tuple[str, str], array] = {}
+        self.trades = 0
+        self.late = 0
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def add(self, exchange: str, symbol: str, ts: float, price: float, amount: float) -> list[Bar]:
+        """Fold one trade into the open bars and return any bars it closed."""
+        key = (exchange, symbol)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = array("d", [-1.0] * (_SLOT * len(self.intervals)))
+        self.trades += 1
+
+        closed: list[Bar] = []
+        late = False
+        for index, interval in enumerate(self.intervals):
+            base = index * _SLOT
+            start = float(int(ts // interval) * interval)
+            current = state[base + _START]
+            if start == current:
+                if price > state[base + _HIGH]:
+                    state[base + _HIGH] = price
+                if price < state[base + _LOW]:
+                    state[base + _LOW] = price
+                state[base + _CLOSE] = price
+                state[base + _VOLUME] += amount
+                state[base + _TRADES] += 1
+                continue
+            if start < current or start <= state[base + _CLOSED]:
+                late = True
+                continue
+            if current >= 0:
+                closed.append(self._bar(key, index, state))
+                state[base + _CLOSED] = current
+            state[base + _START] = start
+            state[base + _OPEN] = state[base + _HIGH] = state[base + _LOW] = state[base + _CLOSE] = price
+            state[base + _VOLUME] = amount
+            state[base + _TRADES] = 1
+        if late:
+            self.late += 1
+        return closed
+
+    def close_due(self, now: float, grace_seconds: float = 0.0) -> list[Bar]:
+        """Close open bars whose window ended more than `grace_seconds` before `now`."""
+        closed: list[Bar] = []
+        for key, state in self._state.items():
+            for index, interval in enumerate(self.intervals):
+                base = index * _SLOT
+                start = state[base + _START]
+                if start >= 0 and start + interval + grace_seconds <= now:
+                    closed.append(self._bar(key, index, state))
+                    state[base + _CLOSED] = start
+                    state[base + _START] = -1.0
+        return closed
+
+    def open_bars(self) -> list[Bar]:
+        bars: list[Bar] = []
+        for key, state in self._state.items():
+            for index in range(len(self.intervals)):
+                if state[index * _SLOT + _START] >= 0:
+                    bars.append(self._bar(key, index, state))
+        return bars
+
+    def open_bar(self, exchange: str, symbol: str, interval: int) -> Bar | None:
+        state = self._state.get((exchange, symbol))
+        if state is None or interval not in self.intervals:
+            return None
+        index = self.intervals.index(interval)
+        if state[index * _SLOT + _START] < 0:
+            return None
+        return self._bar((exchange, symbol), index, state)
+
+    def _bar(self, key: tuple[str, str], index: int, state: array) -> Bar:
+        base = index * _SLOT
+        return Bar(
+            key[0],
+            key[1],
+            self.intervals[index],
+            state[base + _START],
+            state[base + _OPEN],
+            state[base + _HIGH],
+            state[base + _LOW],
+            state[base + _CLOSE],
+            state[base + _VOLUME],
+            int(state[base + _TRADES]),
+        )
@@ -3,12 +3,17 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Any
 
 import websockets
 
+from app.config import settings
+from app.streaming.decoding import DecodeError, TradeTuple, loads
+from app.streaming.ingest_queue import IngestQueue, latest_flags
 from app.streaming.publisher import RedisPublisher
+from app.streaming.recorder import FrameRecorder
 from app.streaming.symbols import CanonicalSymbol
 
 logger = logging.getLogger("cryptoinsight.streaming")
@@ -22,8 +27,16 @@ class BaseTradeStreamer(ABC):
     - Persistent connection loop with exponential backoff.
     - Connection parameters (URL, timeouts).
     - Standardized error logging.
+    - Frame decoding: `decode_frame` turns a raw frame into `TradeTuple`s.
+      Subclasses implement `parse_message` for decoded JSON and may override
+      `decode_frame` with a fast path that skips building the full message.
+    - Decoupled publishing: the read loop only enqueues trades on a bounded
+      `IngestQueue`; a separate publish loop drains it and retries Redis
+      failures with backoff instead of dropping the websocket.
     """
 
+    exchange: str = ""
+
     def __init__(
         self,
         symbols: list[CanonicalSymbol],
@@ -32,6 +45,9 @@ class BaseTradeStreamer(ABC):
         ping_interval: int = 20,
         ping_timeout: int = 20,
         max_queue: int = 4096,
+        ingest_queue_size: int | None = None,
+        overflow_policy: str | None = None,
+        publish_batch: int = 256,
     ) -> None:
         self.symbols = symbols
         self.name = name
@@ -39,7 +55,20 @@ class BaseTradeStreamer(ABC):
         self.ping_interval = ping_interval
         self.ping_timeout = ping_timeout
         self.max_queue = max_queue
-        
+        # Dynamic (un)subscriptions waiting for the write loop, last request per
+        # symbol wins (True = subscribe). Kept outside the connection so requests
+        # made before the first connection are sent once the write loop starts.
+        self._pending_subscriptions: dict[str, bool] = {}
+        self._subscriptions_changed = asyncio.Event()
+        self.subscribe_window_seconds = 0.05
+        self.ingest_queue = IngestQueue(
+            ingest_queue_size if ingest_queue_size is not None else settings.STREAM_INGEST_QUEUE_SIZE,
+            overflow_policy or settings.STREAM_INGEST_OVERFLOW_POLICY,
+        )
+        self.publish_batch = max(1, int(publish_batch))
+        # Optional raw-frame recorder (see app.streaming.recorder); set by the worker.
+        self.recorder: FrameRecorder | None = None
+
         # Sub-logger for this exchange
         self.logger = logging.getLogger(f"cryptoinsight.streaming.{name.lower()}")
 
@@ -49,20 +78,67 @@ class BaseTradeStreamer(ABC):
         pass
 
     @abstractmethod
-    async def process_message(self, message: Any, publisher: RedisPublisher) -> None:
-        """Parse the raw message and publish trades if present."""
+    def parse_message(self, message: Any) -> list[TradeTuple]:
+        """Extract trades from a decoded JSON message (empty list if none)."""
         pass
 
+    def decode_frame(self, raw: str | bytes) -> list[TradeTuple]:
+        """Decode a raw websocket frame into trades. Raises DecodeError on bad JSON."""
+        return self.parse_message(loads(raw))
+
+    async def process_message(self, message: Any, publisher: RedisPublisher) -> None:
+        """Parse a decoded message and publish trades if present."""
+        await self.publish_trades(self.parse_message(message), publisher)
+
+    async def publish_trades(self, trades: list[TradeTuple], publisher: RedisPublisher) -> None:
+        for trade in trades:
+            await self._publish_one(trade, publisher)
+
+    async def _publish_one(
+        self,
+        trade: TradeTuple,
+        publisher: RedisPublisher,
+        update_latest: bool = True,
+    ) -> None:
+        await publisher.publish_trade(
+            exchange=self.exchange,
+            symbol=trade.symbol,
+            ts=trade.ts,
+            recv_ts=trade.recv_ts,
+            price=trade.price,
+            amount=trade.amount,
+            side=trade.side,
+            trade_id=trade.trade_id,
+            update_latest=update_latest,
+        )
+
     async def subscribe(self, symbols: list[str]) -> None:
         """Queue a subscription request for new symbols."""
-        if not self._write_queue:
-            return
-        await self._write_queue.put({"type": "subscribe", "symbols": symbols})
+        self._queue_subscriptions(symbols, True)
+
+    async def unsubscribe(self, symbols: list[str]) -> None:
+        """Queue an unsubscribe request for symbols this connection no longer needs."""
+        self._queue_subscriptions(symbols, False)
+
+    def _queue_subscriptions(self, symbols: list[str], subscribe: bool) -> None:
+        for symbol in symbols:
+            self._pending_subscriptions[symbol] = subscribe
+        if symbols:
+            self._subscriptions_changed.set()
 
     async def run_forever(self, publisher: RedisPublisher) -> None:
-        self._write_queue = asyncio.Queue()
+        # The publish loop outlives individual connections so queued trades
+        # survive reconnects.
+        publish_task = asyncio.create_task(self._publish_loop(publisher))
+        try:
+            await self._connect_loop()
+        finally:
+            publish_task.cancel()
+            if self.recorder is not None:
+                self.recorder.close()
+
+    async def _connect_loop(self) -> None:
         backoff_seconds = 1.0
-        
         while True:
             try:
                 self.logger.info(f"Connecting to {self.url}...")
@@ -75,13 +151,14 @@ class BaseTradeStreamer(ABC):
                 ) as ws:
                     backoff_seconds = 1.0
                     
-                    # Initial Subscription
+                    # Initial subscription: the full active set, so dynamic
+                    # symbols added before a reconnect are replayed.
                     sub_msg = self.get_subscription_message()
                     await ws.send(json.dumps(sub_msg, separators=(",", ":")))
                     self.logger.info("Subscribed to initial symbols")
 
                     # Run Read and Write loops concurrently
-                    read_task = asyncio.create_task(self._read_loop(ws, publisher))
+                    read_task = asyncio.create_task(self._read_loop(ws))
                     write_task = asyncio.create_task(self._write_loop(ws))
                     
                     done, pending = await asyncio.wait(
@@ -107,24 +184,90 @@ class BaseTradeStreamer(ABC):
                 await asyncio.sleep(backoff_seconds)
                 backoff_seconds = min(backoff_seconds * 2.0, 30.0)
 
-    async def _read_loop(self, ws, publisher):
+    async def _read_loop(self, ws):
+        queue = self.ingest_queue
+        recorder = self.recorder
         async for raw in ws:
+            if recorder is not None:
+                recorder.write(time.time(), raw)
             try:
-                msg = json.loads(raw)
-            except json.JSONDecodeError:
+                trades = self.decode_frame(raw)
+            except DecodeError:
                 continue
-            await self.process_message(msg, publisher)
+            if trades:
+                await queue.put_many(trades)
+
+    async def _publish_loop(self, publisher: RedisPublisher) -> None:
+        queue = self.ingest_queue
+        retry_seconds = 0.5
+        while True:
+            batch, coalesce = await queue.get_batch(self.publish_batch)
+            flags = latest_flags(batch) if coalesce else None
+            if flags is not None:
+                queue.stats.coalesced += flags.count(False)
+
+            index = 0
+            retry_flush = False
+            while index < len(batch):
+                try:
+                    if retry_flush:
+                        # A buffering publisher kept the trade (and its earlier batch) after
+                        # the failed flush; retry the flush instead of publishing it twice.
+                        await publisher.flush()
+                    else:
+                        await self._publish_one(batch[index], publisher, True if flags is None else flags[index])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Keep the socket up; the queue's overflow policy absorbs the backlog.
+                    queue.stats.publish_errors += 1
+                    retry_flush = publisher.pending > 0
+                    self.logger.warning(
+                        f"Publish failed ({e}); depth={len(queue)} retrying in {retry_seconds:.1f}s"
+                    )
+                    await asyncio.sleep(retry_seconds)
+                    retry_seconds = min(retry_seconds * 2.0, 10.0)
+                    continue
+                retry_flush = False
+                index += 1
+                retry_seconds = 0.5
+            queue.stats.published += len(batch)
+
+    def queue_stats(self) -> dict[str, Any]:
+        return {"exchange": self.exchange, **self.ingest_queue.snapshot()}
 
     async def _write_loop(self, ws):
         while True:
-            msg = await self._write_queue.get()
-            if msg["type"] == "subscribe":
-                payload = self._make_subscription_payload(msg["symbols"])
+            await self._subscriptions_changed.wait()
+            # Let a burst of requests settle into one frame per direction.
+            await asyncio.sleep(self.subscribe_window_seconds)
+            self._subscriptions_changed.clear()
+            pending, self._pending_subscriptions = self._pending_subscriptions, {}
+
+            added = [symbol for symbol, subscribe in pending.items() if subscribe]
+            removed = [symbol for symbol, subscribe in pending.items() if not subscribe]
+            if removed:
+                payload = self._make_unsubscription_payload(removed)
+                if payload:
+                    await ws.send(json.dumps(payload))
+                    self.logger.info(f"Dynamically unsubscribed from {removed}")
+            if added:
+                payload = self._make_subscription_payload(added)
                 if payload:
                     await ws.send(json.dumps(payload))
-                    self.logger.info(f"Dynamically subscribed to {msg['symbols']}")
+                    self.logger.info(f"Dynamically subscribed to {added}")
 
     def _make_subscription_payload(self, symbols: list[str]) -> dict | None:
-        """Override this in subclasses to format dynamic subscription."""
+        """
+        Override this in subclasses to format dynamic subscription.
+
+        Implementations add the symbols to the state `get_subscription_message`
+        reads (so they are replayed after a reconnect) and return None when
+        every symbol is already subscribed.
+        """
         # Default behavior: generic
         return None
+
+    def _make_unsubscription_payload(self, symbols: list[str]) -> dict | None:
+        """Counterpart of `_make_subscription_payload`; removes symbols from the active set."""
+        return None
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import re
 import time
 from typing import Any
 
 from app.streaming.base_ws import BaseTradeStreamer
-from app.streaming.publisher import RedisPublisher
+from app.streaming.decoding import TradeTuple, loads
 from app.streaming.symbols import CanonicalSymbol, parse_symbol
 from app.config import settings
 
 
+# Binance trade payloads are compact JSON with a fixed key order:
+# {"e":"trade","E":..,"s":"BTCUSDT","t":..,"p":"..","q":"..",["b":..,"a":..,]"T":..,"m":true,"M":true}
+_TRADE_MARKER = '"e":"trade"'
+_TRADE_RE = re.compile(
+    r'"s":"(?P<s>[^"]*)","t":(?P<t>-?\d+),"p":"(?P<p>[^"]*)","q":"(?P<q>[^"]*)"'
+    r'.*?"T":(?P<T>\d+),"m":(?P<m>true|false)'
+)
+
+
 def get_binance_ws_url() -> str:
     tld = settings.BINANCE_TLD.lower()
     return f"wss://stream.binance.{tld}:9443/ws"
@@ -29,6 +39,8 @@ def _to_stream_symbol(sym: CanonicalSymbol) -> tuple[str, str]:
 
 
 class BinanceTradeStreamer(BaseTradeStreamer):
+    exchange = "binance"
+
     def __init__(self, symbols: list[CanonicalSymbol]) -> None:
         url = get_binance_ws_url()
         super().__init__(symbols, name="Binance", url=url)
@@ -49,9 +61,33 @@ class BinanceTradeStreamer(BaseTradeStreamer):
             "id": 1,
         }
 
-    async def process_message(self, msg: Any, publisher: RedisPublisher) -> None:
-        if msg.get("e") != "trade":
-            return
+    def decode_frame(self, raw: str | bytes) -> list[TradeTuple]:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        if _TRADE_MARKER in raw:
+            match = _TRADE_RE.search(raw)
+            if match is not None:
+                symbol_raw = match.group("s").upper()
+                trade_time_ms = int(match.group("T"))
+                recv_ts = time.time()
+                # Positional TradeTuple(symbol, ts, recv_ts, price, amount, side, trade_id).
+                return [
+                    TradeTuple(
+                        self._market_id_to_symbol.get(symbol_raw, symbol_raw),
+                        trade_time_ms / 1000.0 if trade_time_ms else recv_ts,
+                        recv_ts,
+                        float(match.group("p") or 0.0),
+                        float(match.group("q") or 0.0),
+                        # Binance: m=true means buyer is the market maker => taker was seller.
+                        "sell" if match.group("m") == "true" else "buy",
+                        match.group("t"),
+                    )
+                ]
+        return self.parse_message(loads(raw))
+
+    def parse_message(self, msg: Any) -> list[TradeTuple]:
+        if not isinstance(msg, dict) or msg.get("e") != "trade":
+            return []
 
         recv_ts = time.time()
         symbol_raw = str(msg.get("s") or "").upper()
@@ -63,17 +99,18 @@ class BinanceTradeStreamer(BaseTradeStreamer):
 
         trade_time_ms = msg.get("T") or msg.get("E") or 0
         ts = float(trade_time_ms) / 1000.0 if trade_time_ms else recv_ts
-        
-        await publisher.publish_trade(
-            exchange="binance",
-            symbol=symbol,
-            ts=ts,
-            recv_ts=recv_ts,
-            price=float(msg.get("p") or 0.0),
-            amount=float(msg.get("q") or 0.0),
-            side=side,
-            trade_id=str(msg.get("t")) if msg.get("t") is not None else None,
-        )
+
+        return [
+            TradeTuple(
+                symbol=symbol,
+                ts=ts,
+                recv_ts=recv_ts,
+                price=float(msg.get("p") or 0.0),
+                amount=float(msg.get("q") or 0.0),
+                side=side,
+                trade_id=str(msg.get("t")) if msg.get("t") is not None else None,
+            )
+        ]
 
     def _make_subscription_payload(self, symbols: list[str]) -> dict | None:
         new_params: list[str] = []
@@ -83,9 +120,10 @@ class BinanceTradeStreamer(BaseTradeStreamer):
             except ValueError:
                 continue
             market_id, stream = _to_stream_symbol(sym)
-            if stream not in self._subscribe_params:
-                self._subscribe_params.append(stream)
             self._market_id_to_symbol[market_id.upper()] = f"{sym.base}-{('USDT' if sym.quote == 'USD' else sym.quote)}"
+            if stream in self._subscribe_params or stream in new_params:
+                continue
+            self._subscribe_params.append(stream)
             new_params.append(stream)
 
         if not new_params:
@@ -95,3 +133,22 @@ class BinanceTradeStreamer(BaseTradeStreamer):
             "params": new_params,
             "id": int(time.time() * 1000),
         }
+
+    def _make_unsubscription_payload(self, symbols: list[str]) -> dict | None:
+        removed: list[str] = []
+        for raw in symbols:
+            try:
+                _market_id, stream = _to_stream_symbol(parse_symbol(raw))
+            except ValueError:
+                continue
+            if stream in self._subscribe_params:
+                self._subscribe_params.remove(stream)
+                removed.append(stream)
+
+        if not removed:
+            return None
+        return {
+            "method": "UNSUBSCRIBE",
+            "params": removed,
+            "id": int(time.time() * 1000),
+        }
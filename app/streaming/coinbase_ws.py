@@ -1,33 +1,35 @@
 from __future__ import annotations
 
+import re
 import time
-from datetime import datetime
 from typing import Any
 
 from app.streaming.base_ws import BaseTradeStreamer
-from app.streaming.publisher import RedisPublisher
+from app.streaming.decoding import TradeTuple, loads, parse_iso8601
 
 
 COINBASE_WS_URL = "wss://ws-feed.exchange.coinbase.com"
 
-
-def _parse_iso8601(ts: str | None) -> float | None:
-    if not ts:
-        return None
-    try:
-        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
-    except ValueError:
-        return None
+# Coinbase "match" messages keep a stable key order:
+# {"type":"match","trade_id":..,"maker_order_id":..,"taker_order_id":..,"side":..,"size":..,
+#  "price":..,"product_id":..,"sequence":..,"time":..}
+_MATCH_MARKER = '"type":"match"'
+_MATCH_RE = re.compile(
+    r'"trade_id":(?P<trade_id>\d+),.*?"side":"(?P<side>[a-z]*)","size":"(?P<size>[^"]*)",'
+    r'"price":"(?P<price>[^"]*)","product_id":"(?P<product_id>[^"]*)",.*?"time":"(?P<time>[^"]*)"'
+)
 
 
 class CoinbaseTradeStreamer(BaseTradeStreamer):
+    exchange = "coinbase"
+
     # Note: legacy code passed string symbols directly (product_ids).
     # New architecture passes CanonicalSymbol. We adapt for backwards compatibility
     
     def __init__(self, symbols: list[str]) -> None:
         # Base class expects symbols for logging mostly. We pass them up.
         super().__init__(symbols, name="Coinbase", url=COINBASE_WS_URL) 
-        self._product_ids = symbols
+        self._product_ids = list(dict.fromkeys(symbols))
 
     def get_subscription_message(self) -> dict:
         return {
@@ -36,27 +38,64 @@ class CoinbaseTradeStreamer(BaseTradeStreamer):
             "channels": ["matches"],
         }
 
-    async def process_message(self, msg: Any, publisher: RedisPublisher) -> None:
-        if msg.get("type") != "match":
-            return
+    def decode_frame(self, raw: str | bytes) -> list[TradeTuple]:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        if raw.startswith(_MATCH_MARKER, 1):
+            match = _MATCH_RE.search(raw)
+            if match is not None:
+                recv_ts = time.time()
+                # Positional TradeTuple(symbol, ts, recv_ts, price, amount, side, trade_id).
+                return [
+                    TradeTuple(
+                        match.group("product_id") or "UNKNOWN",
+                        parse_iso8601(match.group("time")) or recv_ts,
+                        recv_ts,
+                        float(match.group("price") or 0.0),
+                        float(match.group("size") or 0.0),
+                        match.group("side") or None,
+                        match.group("trade_id"),
+                    )
+                ]
+        return self.parse_message(loads(raw))
+
+    def parse_message(self, msg: Any) -> list[TradeTuple]:
+        if not isinstance(msg, dict) or msg.get("type") != "match":
+            return []
 
         recv_ts = time.time()
-        ts = _parse_iso8601(str(msg.get("time") or "")) or recv_ts
-        
-        await publisher.publish_trade(
-            exchange="coinbase",
-            symbol=str(msg.get("product_id") or "UNKNOWN"),
-            ts=ts,
-            recv_ts=recv_ts,
-            price=float(msg.get("price") or 0.0),
-            amount=float(msg.get("size") or 0.0),
-            side=str(msg.get("side") or "").lower() or None,
-            trade_id=str(msg.get("trade_id")) if msg.get("trade_id") is not None else None,
-        )
+        ts = parse_iso8601(str(msg.get("time") or "")) or recv_ts
+
+        return [
+            TradeTuple(
+                symbol=str(msg.get("product_id") or "UNKNOWN"),
+                ts=ts,
+                recv_ts=recv_ts,
+                price=float(msg.get("price") or 0.0),
+                amount=float(msg.get("size") or 0.0),
+                side=str(msg.get("side") or "").lower() or None,
+                trade_id=str(msg.get("trade_id")) if msg.get("trade_id") is not None else None,
+            )
+        ]
 
     def _make_subscription_payload(self, symbols: list[str]) -> dict | None:
+        new_ids = [s for s in dict.fromkeys(symbols) if s not in self._product_ids]
+        if not new_ids:
+            return None
+        self._product_ids.extend(new_ids)
         return {
             "type": "subscribe",
-            "product_ids": symbols,
+            "product_ids": new_ids,
+            "channels": ["matches"],
+        }
+
+    def _make_unsubscription_payload(self, symbols: list[str]) -> dict | None:
+        removed = [s for s in dict.fromkeys(symbols) if s in self._product_ids]
+        if not removed:
+            return None
+        self._product_ids = [s for s in self._product_ids if s not in removed]
+        return {
+            "type": "unsubscribe",
+            "product_ids": removed,
             "channels": ["matches"],
         }
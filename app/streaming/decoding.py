@@ -0,0 +1,77 @@
+"""
+Frame decoding helpers shared by the websocket trade streamers.
+
+`loads` uses orjson when it is installed (see requirements-optional.txt) and the
+stdlib json module otherwise. Both raise a ValueError subclass on bad input.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Callable, NamedTuple
+
+try:  # pragma: no cover - exercised only when the optional backend is installed
+    import orjson as _orjson
+except ImportError:  # pragma: no cover
+    _orjson = None
+
+
+class TradeTuple(NamedTuple):
+    """Compact, allocation-light representation of one normalized trade."""
+
+    symbol: str
+    ts: float
+    recv_ts: float
+    price: float
+    amount: float
+    side: str | None
+    trade_id: str | None = None
+
+
+def _select_loads() -> tuple[str, Callable[[str | bytes], Any]]:
+    if _orjson is not None:
+        return "orjson", _orjson.loads
+    return "json", json.loads
+
+
+JSON_BACKEND, loads = _select_loads()
+
+# json.JSONDecodeError and orjson.JSONDecodeError both subclass ValueError.
+DecodeError = ValueError
+
+
+_EPOCH_CACHE: dict[str, float] = {}
+_EPOCH_CACHE_MAX = 4096
+
+
+def parse_iso8601(ts: str | None) -> float | None:
+    """
+    Parse an exchange ISO-8601 UTC timestamp (e.g. 2024-01-01T12:00:00.123456Z)
+    into epoch seconds.
+
+    Whole seconds are cached because consecutive trades share the same
+    `YYYY-MM-DDTHH:MM:SS` prefix; only the fractional part is parsed per call.
+    """
+    if not ts:
+        return None
+    head = ts[:19]
+    tail = ts[19:]
+    frac = tail[1:-1] if tail.startswith(".") and tail.endswith("Z") else ""
+    if len(head) == 19 and (tail in ("", "Z") or frac.isdigit()):
+        base = _EPOCH_CACHE.get(head)
+        if base is None:
+            try:
+                base = datetime.fromisoformat(head + "+00:00").timestamp()
+            except ValueError:
+                return None
+            if len(_EPOCH_CACHE) >= _EPOCH_CACHE_MAX:
+                _EPOCH_CACHE.clear()
+            _EPOCH_CACHE[head] = base
+        if frac:
+            return base + int(frac) / (10 ** len(frac))
+        return base
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
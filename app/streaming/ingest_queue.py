@@ -0,0 +1,129 @@
+"""
+Bounded in-process queue between websocket decode and Redis publish.
+
+The read loop only enqueues decoded trades, so a slow or briefly unavailable
+Redis degrades freshness instead of stalling the socket. What happens when the
+queue is full is controlled by the overflow policy:
+
+- ``block``: the read loop waits for space (backpressure onto the socket).
+- ``drop_oldest``: the oldest queued trade is discarded.
+- ``coalesce``: every trade is kept for the durable stream (up to a hard cap of
+  ``maxsize * coalesce_factor``), but while the queue is over ``maxsize`` the
+  publisher only refreshes the hot cache with the latest trade per symbol.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from app.streaming.decoding import TradeTuple
+
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+# Redis hash of "{EXCHANGE}:{connection}" -> JSON queue stats, refreshed by stream workers.
+QUEUE_STATS_KEY = "streamer:queues"
+
+
+@dataclass(slots=True)
+class QueueStats:
+    enqueued: int = 0
+    published: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    blocked: int = 0
+    publish_errors: int = 0
+    max_depth: int = 0
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        policy: str = COALESCE,
+        *,
+        coalesce_factor: int = 4,
+    ) -> None:
+        policy = (policy or COALESCE).strip().lower()
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {policy!r} (supported: {','.join(OVERFLOW_POLICIES)})")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.hard_limit = self.maxsize * max(1, int(coalesce_factor)) if policy == COALESCE else self.maxsize
+        self.stats = QueueStats()
+        self._items: deque[TradeTuple] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def overflowing(self) -> bool:
+        return len(self._items) > self.maxsize
+
+    async def put_many(self, trades: Iterable[TradeTuple]) -> None:
+        for trade in trades:
+            if len(self._items) >= self.hard_limit:
+                if self.policy == BLOCK:
+                    self.stats.blocked += 1
+                    while len(self._items) >= self.hard_limit:
+                        self._not_full.clear()
+                        await self._not_full.wait()
+                else:
+                    self._items.popleft()
+                    self.stats.dropped += 1
+            self._items.append(trade)
+            self.stats.enqueued += 1
+        depth = len(self._items)
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+        if depth:
+            self._not_empty.set()
+
+    async def get_batch(self, max_items: int = 256) -> tuple[list[TradeTuple], bool]:
+        """
+        Wait for at least one trade and return up to `max_items` of them.
+
+        The flag is True when the batch was taken while the queue was over its
+        soft limit under the coalesce policy, i.e. hot-cache updates for this
+        batch may be collapsed to the latest trade per symbol.
+        """
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        coalesce = self.policy == COALESCE and self.overflowing
+        count = min(max_items, len(self._items))
+        batch = [self._items.popleft() for _ in range(count)]
+        if len(self._items) < self.hard_limit:
+            self._not_full.set()
+        return batch, coalesce
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "enqueued": self.stats.enqueued,
+            "published": self.stats.published,
+            "dropped": self.stats.dropped,
+            "coalesced": self.stats.coalesced,
+            "blocked": self.stats.blocked,
+            "publish_errors": self.stats.publish_errors,
+            "max_depth": self.stats.max_depth,
+        }
+
+
+def latest_flags(batch: list[TradeTuple]) -> list[bool]:
+    """For each trade, whether it is the last one for its symbol within the batch."""
+    last: dict[str, int] = {}
+    for index, trade in enumerate(batch):
+        last[trade.symbol] = index
+    return [last[trade.symbol] == index for index, trade in enumerate(batch)]
@@ -4,7 +4,7 @@ import time
 from typing import Any
 
 from app.streaming.base_ws import BaseTradeStreamer
-from app.streaming.publisher import RedisPublisher
+from app.streaming.decoding import TradeTuple, loads
 from app.streaming.symbols import CanonicalSymbol, parse_symbol
 
 KRAKEN_WS_URL = "wss://ws.kraken.com"
@@ -27,6 +27,8 @@ def _to_kraken_pair(sym: CanonicalSymbol) -> tuple[str, str]:
 
 
 class KrakenTradeStreamer(BaseTradeStreamer):
+    exchange = "kraken"
+
     def __init__(self, symbols: list[CanonicalSymbol]) -> None:
         super().__init__(symbols, name="Kraken", url=KRAKEN_WS_URL)
         
@@ -45,40 +47,47 @@ class KrakenTradeStreamer(BaseTradeStreamer):
             "subscription": {"name": "trade"}
         }
 
-    async def process_message(self, msg: Any, publisher: RedisPublisher) -> None:
-        # System events are dicts.
-        if isinstance(msg, dict):
-            return
+    def decode_frame(self, raw: str | bytes) -> list[TradeTuple]:
+        # System events and heartbeats are JSON objects; trades are arrays.
+        head = raw[:1]
+        if head == "{" or head == b"{":
+            return []
+        return self.parse_message(loads(raw))
 
+    def parse_message(self, msg: Any) -> list[TradeTuple]:
         # Trade messages are arrays: [channel_id, trades, "trade", pair]
         if not (isinstance(msg, list) and len(msg) >= 4 and msg[2] == "trade"):
-            return
+            return []
 
         pair = str(msg[3])
-        symbol = self._pair_to_symbol.get(pair, pair.replace("/", "-"))
+        symbol = self._pair_to_symbol.get(pair)
+        if symbol is None:
+            symbol = pair.replace("/", "-")
         trades = msg[1]
-        
+
         if not isinstance(trades, list):
-            return
+            return []
 
         recv_ts = time.time()
+        out: list[TradeTuple] = []
         for t in trades:
             if not (isinstance(t, list) and len(t) >= 4):
                 continue
-            
+
             # [price, volume, time, side, orderType, misc]
-            price_s, amount_s, ts_s, side_s = t[0], t[1], t[2], t[3]
-            side = "buy" if str(side_s).lower().startswith("b") else "sell"
-            
-            await publisher.publish_trade(
-                exchange="kraken",
-                symbol=symbol,
-                ts=float(ts_s),
-                recv_ts=recv_ts,
-                price=float(price_s),
-                amount=float(amount_s),
-                side=side,
+            # -> positional TradeTuple(symbol, ts, recv_ts, price, amount, side).
+            side_s = t[3]
+            out.append(
+                TradeTuple(
+                    symbol,
+                    float(t[2]),
+                    recv_ts,
+                    float(t[0]),
+                    float(t[1]),
+                    "buy" if side_s == "b" or str(side_s).lower().startswith("b") else "sell",
+                )
             )
+        return out
 
     def _make_subscription_payload(self, symbols: list[str]) -> dict | None:
         new_pairs: list[str] = []
@@ -88,9 +97,10 @@ class KrakenTradeStreamer(BaseTradeStreamer):
             except ValueError:
                 continue
             pair, canonical = _to_kraken_pair(sym)
-            if pair not in self._pairs:
-                self._pairs.append(pair)
             self._pair_to_symbol[pair] = canonical
+            if pair in self._pairs:
+                continue
+            self._pairs.append(pair)
             new_pairs.append(pair)
 
         if not new_pairs:
@@ -101,3 +111,22 @@ class KrakenTradeStreamer(BaseTradeStreamer):
             "subscription": {"name": "trade"},
         }
 
+    def _make_unsubscription_payload(self, symbols: list[str]) -> dict | None:
+        removed: list[str] = []
+        for raw in symbols:
+            try:
+                pair, _canonical = _to_kraken_pair(parse_symbol(raw))
+            except ValueError:
+                continue
+            if pair in self._pairs:
+                self._pairs.remove(pair)
+                removed.append(pair)
+
+        if not removed:
+            return None
+        return {
+            "event": "unsubscribe",
+            "pair": removed,
+            "subscription": {"name": "trade"},
+        }
+
@@ -0,0 +1,159 @@
+"""
+Throttled latest-price cache written by the streamer.
+
+Trades update in-memory per-symbol state; dirty symbols are flushed at most
+`max_hz` times per second in one pipeline (one HSET per exchange hash). The
+trailing value is always flushed, so readers see the last trade within
+1/max_hz seconds. See `app.services.latest_prices` for the read side.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any
+
+from app.services.latest_prices import latest_hash_key, legacy_latest_key
+
+
+logger = logging.getLogger("cryptoinsight.streaming.latest")
+
+ROLLING_WINDOW_SECONDS = 24 * 60 * 60
+_BUCKET_SECONDS = 60
+
+
+class _SymbolState:
+    __slots__ = ("payload", "message", "buckets", "volume_24h", "trades_24h", "trade_count")
+
+    def __init__(self) -> None:
+        self.payload: dict[str, Any] = {}
+        self.message: str = ""
+        # [minute_start, volume, trades] buckets covering the rolling window.
+        self.buckets: deque[list[float]] = deque()
+        self.volume_24h = 0.0
+        self.trades_24h = 0
+        self.trade_count = 0
+
+    def record(self, payload: dict[str, Any], message: str, now: float) -> None:
+        self.payload = payload
+        self.message = message
+        self.trade_count += 1
+
+        amount = float(payload.get("amount") or 0.0)
+        minute = now - (now % _BUCKET_SECONDS)
+        if self.buckets and self.buckets[-1][0] == minute:
+            bucket = self.buckets[-1]
+            bucket[1] += amount
+            bucket[2] += 1
+        else:
+            self.buckets.append([minute, amount, 1])
+        self.volume_24h += amount
+        self.trades_24h += 1
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - ROLLING_WINDOW_SECONDS
+        while self.buckets and self.buckets[0][0] < cutoff:
+            _, volume, trades = self.buckets.popleft()
+            self.volume_24h -= volume
+            self.trades_24h -= int(trades)
+
+    def snapshot(self, now: float) -> dict[str, Any]:
+        self._expire(now)
+        return {
+            **self.payload,
+            "last_side": self.payload.get("side"),
+            "volume_24h": max(self.volume_24h, 0.0),
+            "trades_24h": self.trades_24h,
+            "trade_count": self.trade_count,
+            "updated_at": now,
+        }
+
+
+class LatestPriceCache:
+    def __init__(
+        self,
+        redis,
+        *,
+        max_hz: float = 10.0,
+        ttl_seconds: int = 60 * 60,
+        legacy_keys: bool = True,
+    ) -> None:
+        self._redis = redis
+        self._interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self._ttl_seconds = ttl_seconds
+        self._legacy_keys = legacy_keys
+        self._state: dict[tuple[str, str], _SymbolState] = {}
+        self._dirty: set[tuple[str, str]] = set()
+        self._timer: asyncio.Task | None = None
+        self._closed = False
+        self.writes = 0
+        self.recorded = 0
+
+    @property
+    def dirty(self) -> int:
+        return len(self._dirty)
+
+    def record(self, exchange: str, symbol: str, payload: dict[str, Any], message: str) -> None:
+        key = (exchange, symbol)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = _SymbolState()
+        state.record(payload, message, time.time())
+        self.recorded += 1
+        self._dirty.add(key)
+        if self._timer is None and not self._closed:
+            self._timer = asyncio.create_task(self._flush_after_interval())
+
+    async def _flush_after_interval(self) -> None:
+        try:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Latest-price flush failed; %d symbols will retry", len(self._dirty))
+        finally:
+            if self._timer is asyncio.current_task():
+                self._timer = None
+            if self._dirty and self._timer is None and not self._closed:
+                self._timer = asyncio.create_task(self._flush_after_interval())
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        now = time.time()
+
+        by_exchange: dict[str, dict[str, str]] = {}
+        for exchange, symbol in dirty:
+            state = self._state[(exchange, symbol)]
+            by_exchange.setdefault(exchange, {})[symbol] = json.dumps(state.snapshot(now), separators=(",", ":"))
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for exchange, mapping in by_exchange.items():
+                    hash_key = latest_hash_key(exchange)
+                    pipe.hset(hash_key, mapping=mapping)
+                    pipe.expire(hash_key, self._ttl_seconds)
+                    if self._legacy_keys:
+                        for symbol in mapping:
+                            message = self._state[(exchange, symbol)].message
+                            pipe.set(legacy_latest_key(exchange, symbol), message, ex=self._ttl_seconds)
+                            pipe.set(legacy_latest_key(None, symbol), message, ex=self._ttl_seconds)
+                await pipe.execute()
+        except Exception:
+            # Keep the symbols dirty so the next flush writes their newest state.
+            self._dirty |= dirty
+            raise
+        self.writes += len(dirty)
+
+    async def aclose(self) -> None:
+        self._closed = True
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        await self.flush()
@@ -0,0 +1,44 @@
+"""
+Optional partitioning of the `market_trades` stream.
+
+With one partition (the default) every trade goes to `market_trades`, as
+before. With N > 1 trades are routed to `market_trades:0` ... `market_trades:{N-1}`
+by a stable hash of the symbol (or of the exchange), so each symbol's trades
+stay ordered on one stream and writers can be pinned to a subset of partitions.
+"""
+
+from __future__ import annotations
+
+from app.streaming.sharding import stable_hash
+
+
+STREAM_KEY = "market_trades"
+PARTITION_BY = ("symbol", "exchange")
+
+
+def partition_stream_keys(base: str = STREAM_KEY, partitions: int = 1) -> list[str]:
+    partitions = max(1, int(partitions))
+    if partitions == 1:
+        return [base]
+    return [f"{base}:{index}" for index in range(partitions)]
+
+
+class StreamPartitioner:
+    def __init__(self, base: str = STREAM_KEY, partitions: int = 1, by: str = "symbol") -> None:
+        by = (by or "symbol").strip().lower()
+        if by not in PARTITION_BY:
+            raise ValueError(f"Unsupported partition key: {by!r} (supported: {','.join(PARTITION_BY)})")
+        self.base = base
+        self.by = by
+        self.keys = partition_stream_keys(base, partitions)
+        self._cache: dict[tuple[str, str], str] = {}
+
+    def key_for(self, exchange: str, symbol: str) -> str:
+        if len(self.keys) == 1:
+            return self.keys[0]
+        cache_key = (exchange, symbol)
+        key = self._cache.get(cache_key)
+        if key is None:
+            hashed = exchange if self.by == "exchange" else f"{exchange}|{symbol}"
+            key = self._cache[cache_key] = self.keys[stable_hash(hashed) % len(self.keys)]
+        return key
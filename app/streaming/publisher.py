@@ -1,9 +1,88 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import time
+from dataclasses import dataclass
 from typing import Any
 
+from app.streaming.latest_cache import LatestPriceCache
+from app.streaming.partitions import STREAM_KEY, StreamPartitioner, partition_stream_keys
+from app.streaming.stream_codec import (
+    BINARY_FORMAT,
+    SUPPORTED_FORMATS,
+    TEXT_FORMAT,
+    StreamFormatNegotiator,
+    encode_batch,
+)
+
+logger = logging.getLogger("cryptoinsight.streaming.publisher")
+
+
+@dataclass(slots=True)
+class EncodedTrade:
+    exchange: str
+    symbol: str
+    payload: dict[str, Any]
+    message: str
+    stream_fields: dict[str, str]
+    update_latest: bool = True
+
+
+def encode_trade(
+    *,
+    exchange: str,
+    symbol: str,
+    ts: float,
+    price: float,
+    amount: float,
+    side: str | None,
+    trade_id: str | None = None,
+    recv_ts: float | None = None,
+    extra: dict[str, Any] | None = None,
+    update_latest: bool = True,
+) -> EncodedTrade:
+    """Build the pub/sub JSON message and durable stream fields for one trade."""
+    exchange = exchange.strip().lower()
+    symbol = symbol.strip().upper()
+    recv_ts = float(recv_ts if recv_ts is not None else time.time())
+
+    payload: dict[str, Any] = {
+        "exchange": exchange,
+        "symbol": symbol,
+        "ts": float(ts),
+        "recv_ts": float(recv_ts),
+        "price": float(price),
+        "amount": float(amount),
+        "side": (side or "").lower() or None,
+    }
+    if trade_id is not None:
+        payload["trade_id"] = trade_id
+    if extra:
+        payload["extra"] = extra
+
+    stream_fields: dict[str, str] = {
+        "exchange": exchange,
+        "symbol": symbol,
+        "ts": str(ts),
+        "recv_ts": str(recv_ts),
+        "price": str(price),
+        "amount": str(amount),
+        "side": str((side or "").lower()),
+    }
+    if trade_id is not None:
+        stream_fields["trade_id"] = str(trade_id)
+
+    return EncodedTrade(
+        exchange=exchange,
+        symbol=symbol,
+        payload=payload,
+        message=json.dumps(payload, separators=(",", ":")),
+        stream_fields=stream_fields,
+        update_latest=update_latest,
+    )
+
 
 class RedisPublisher:
     def __init__(
@@ -13,11 +92,18 @@ class RedisPublisher:
         stream_key: str = "market_trades",
         latest_ttl_seconds: int = 60 * 60,
         stream_maxlen: int = 100_000,
+        latest_cache: LatestPriceCache | None = None,
+        partitions: int = 1,
+        partition_by: str = "symbol",
     ) -> None:
         self._redis = redis
         self._stream_key = stream_key
+        self._partitioner = StreamPartitioner(stream_key, partitions, partition_by)
         self._latest_ttl_seconds = latest_ttl_seconds
         self._stream_maxlen = stream_maxlen
+        # When set, latest-price writes are throttled through the cache and
+        # only the ticks:* pub/sub messages are sent per trade.
+        self._latest_cache = latest_cache
 
     async def publish_trade(
         self,
@@ -31,58 +117,314 @@ class RedisPublisher:
         trade_id: str | None = None,
         recv_ts: float | None = None,
         extra: dict[str, Any] | None = None,
+        update_latest: bool = True,
     ) -> None:
-        exchange = exchange.strip().lower()
-        symbol = symbol.strip().upper()
-        recv_ts = float(recv_ts if recv_ts is not None else time.time())
-
-        payload: dict[str, Any] = {
-            "exchange": exchange,
-            "symbol": symbol,
-            "ts": float(ts),
-            "recv_ts": float(recv_ts),
-            "price": float(price),
-            "amount": float(amount),
-            "side": (side or "").lower() or None,
-        }
-        if trade_id is not None:
-            payload["trade_id"] = trade_id
-        if extra:
-            payload["extra"] = extra
-
-        message = json.dumps(payload, separators=(",", ":"))
-
-        # Exchange-aware hot cache (preferred).
-        await self._redis.set(
-            f"latest:{exchange}:{symbol}",
-            message,
-            ex=self._latest_ttl_seconds,
+        trade = encode_trade(
+            exchange=exchange,
+            symbol=symbol,
+            ts=ts,
+            price=price,
+            amount=amount,
+            side=side,
+            trade_id=trade_id,
+            recv_ts=recv_ts,
+            extra=extra,
         )
-        await self._redis.publish(f"ticks:{exchange}:{symbol}", message)
 
-        # Backwards-compatible keys (single-exchange UI/API).
-        await self._redis.set(
-            f"latest:{symbol}",
-            message,
-            ex=self._latest_ttl_seconds,
-        )
-        await self._redis.publish(f"ticks:{symbol}", message)
+        if self._latest_cache is not None:
+            if update_latest:
+                await self._redis.publish(f"ticks:{trade.exchange}:{trade.symbol}", trade.message)
+                await self._redis.publish(f"ticks:{trade.symbol}", trade.message)
+        elif update_latest:
+            # Exchange-aware hot cache (preferred).
+            await self._redis.set(
+                f"latest:{trade.exchange}:{trade.symbol}",
+                trade.message,
+                ex=self._latest_ttl_seconds,
+            )
+            await self._redis.publish(f"ticks:{trade.exchange}:{trade.symbol}", trade.message)
+
+            # Backwards-compatible keys (single-exchange UI/API).
+            await self._redis.set(
+                f"latest:{trade.symbol}",
+                trade.message,
+                ex=self._latest_ttl_seconds,
+            )
+            await self._redis.publish(f"ticks:{trade.symbol}", trade.message)
 
         # Durable stream for DB ingestion.
-        stream_fields: dict[str, str] = {
-            "exchange": exchange,
-            "symbol": symbol,
-            "ts": str(ts),
-            "recv_ts": str(recv_ts),
-            "price": str(price),
-            "amount": str(amount),
-            "side": str((side or "").lower()),
-        }
-        if trade_id is not None:
-            stream_fields["trade_id"] = str(trade_id)
         await self._redis.xadd(
-            self._stream_key,
-            stream_fields,
+            self._partitioner.key_for(trade.exchange, trade.symbol),
+            trade.stream_fields,
             maxlen=self._stream_maxlen,
             approximate=True,
         )
+        self._record_latest([trade])
+
+    @property
+    def pending(self) -> int:
+        """Trades accepted but not yet written to Redis (always 0 when unbuffered)."""
+        return 0
+
+    async def flush(self) -> None:
+        """No-op for the unbuffered publisher; kept so callers can treat publishers uniformly."""
+
+    async def aclose(self) -> None:
+        await self.flush()
+        if self._latest_cache is not None:
+            await self._latest_cache.aclose()
+
+    def _record_latest(self, trades: list[EncodedTrade]) -> None:
+        """
+        Fold published trades into the latest-price cache. Only called once
+        Redis accepted them, so retried publishes do not count trades twice.
+        """
+        if self._latest_cache is None:
+            return
+        for trade in trades:
+            self._latest_cache.record(trade.exchange, trade.symbol, trade.payload, trade.message)
+
+    def _queue_trade(self, pipe, trade: EncodedTrade, *, stream: bool = True) -> None:
+        """Queue the same commands `publish_trade` issues onto a pipeline (XADD only if `stream`)."""
+        if self._latest_cache is not None:
+            if trade.update_latest:
+                pipe.publish(f"ticks:{trade.exchange}:{trade.symbol}", trade.message)
+                pipe.publish(f"ticks:{trade.symbol}", trade.message)
+        elif trade.update_latest:
+            pipe.set(
+                f"latest:{trade.exchange}:{trade.symbol}",
+                trade.message,
+                ex=self._latest_ttl_seconds,
+            )
+            pipe.publish(f"ticks:{trade.exchange}:{trade.symbol}", trade.message)
+            pipe.set(
+                f"latest:{trade.symbol}",
+                trade.message,
+                ex=self._latest_ttl_seconds,
+            )
+            pipe.publish(f"ticks:{trade.symbol}", trade.message)
+        if stream:
+            pipe.xadd(
+                self._partitioner.key_for(trade.exchange, trade.symbol),
+                trade.stream_fields,
+                maxlen=self._stream_maxlen,
+                approximate=True,
+            )
+
+
+@dataclass(slots=True)
+class FlushStats:
+    flushes: int = 0
+    trades: int = 0
+    failures: int = 0
+    requeued: int = 0
+    binary_flushes: int = 0
+    last_size: int = 0
+    last_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "trades": self.trades,
+            "failures": self.failures,
+            "requeued": self.requeued,
+            "binary_flushes": self.binary_flushes,
+            "last_size": self.last_size,
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "max_latency_ms": round(self.max_latency_ms, 3),
+            "avg_batch_size": round(self.trades / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+class BatchingRedisPublisher(RedisPublisher):
+    """
+    Micro-batching publisher for the streamer hot path.
+
+    Trades are buffered and written in one non-transactional pipeline once
+    `max_batch` trades are pending or `max_delay_ms` has elapsed since the first
+    buffered trade, whichever comes first. Keys, channels and stream fields are
+    identical to `RedisPublisher`, unless a `negotiator` allows the packed
+    `mt1` format: then each flush adds one stream entry for the whole batch
+    (see `app.streaming.stream_codec`).
+
+    A failed flush puts its batch back at the front of the buffer and
+    re-raises; the next flush (by size, timer or an explicit `flush()`)
+    retries it, so a Redis error never loses trades that were accepted.
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        max_batch: int = 256,
+        max_delay_ms: float = 5.0,
+        negotiator: StreamFormatNegotiator | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(redis, **kwargs)
+        self._max_batch = max(1, int(max_batch))
+        self._max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self._buffer: list[EncodedTrade] = []
+        self._timer: asyncio.Task | None = None
+        self._negotiator = negotiator
+        # Running mean of trades per binary entry; keeps MAXLEN (counted in
+        # entries) retaining roughly `stream_maxlen` trades.
+        self._avg_binary_batch = float(self._max_batch)
+        self.stats = FlushStats()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def publish_trade(
+        self,
+        *,
+        exchange: str,
+        symbol: str,
+        ts: float,
+        price: float,
+        amount: float,
+        side: str | None,
+        trade_id: str | None = None,
+        recv_ts: float | None = None,
+        extra: dict[str, Any] | None = None,
+        update_latest: bool = True,
+    ) -> None:
+        self._buffer.append(
+            encode_trade(
+                exchange=exchange,
+                symbol=symbol,
+                ts=ts,
+                price=price,
+                amount=amount,
+                side=side,
+                trade_id=trade_id,
+                recv_ts=recv_ts,
+                extra=extra,
+                update_latest=update_latest,
+            )
+        )
+        if len(self._buffer) >= self._max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_delay())
+
+    async def flush(self) -> None:
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            packed: dict[str, bytes] | None = None
+            if self._negotiator is not None and await self._negotiator.format() == BINARY_FORMAT:
+                packed = self._pack(batch)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for trade in batch:
+                    self._queue_trade(pipe, trade, stream=packed is None)
+                if packed is not None:
+                    self._avg_binary_batch += (len(batch) / len(packed) - self._avg_binary_batch) * 0.1
+                    for stream_key, data in packed.items():
+                        pipe.xadd(
+                            stream_key,
+                            {"fmt": BINARY_FORMAT, "data": data},
+                            maxlen=max(1, int(self._stream_maxlen / self._avg_binary_batch)),
+                            approximate=True,
+                        )
+                await pipe.execute()
+        except Exception:
+            self.stats.failures += 1
+            self.stats.requeued += len(batch)
+            self._buffer[:0] = batch
+            raise
+        self._record_latest(batch)
+
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        if packed is not None:
+            self.stats.binary_flushes += 1
+        self.stats.flushes += 1
+        self.stats.trades += len(batch)
+        self.stats.last_size = len(batch)
+        self.stats.last_latency_ms = latency_ms
+        self.stats.max_latency_ms = max(self.stats.max_latency_ms, latency_ms)
+        logger.debug("Flushed %d trades in %.2fms", len(batch), latency_ms)
+
+    def _pack(self, batch: list[EncodedTrade]) -> dict[str, bytes] | None:
+        """One packed entry per stream partition, or None to publish the batch as text."""
+        by_stream: dict[str, list[EncodedTrade]] = {}
+        for trade in batch:
+            by_stream.setdefault(self._partitioner.key_for(trade.exchange, trade.symbol), []).append(trade)
+        packed: dict[str, bytes] = {}
+        for stream_key, trades in by_stream.items():
+            data = encode_batch(trades)
+            if data is None:
+                return None
+            packed[stream_key] = data
+        return packed
+
+    async def _flush_after_delay(self) -> None:
+        delay = self._max_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                if self._timer is not None:
+                    return  # a newer timer owns the requeued batch
+                delay = min(max(delay * 2.0, 0.5), 10.0)
+                logger.warning(
+                    f"Timed publisher flush failed ({e}); {self.pending} trades requeued, retrying in {delay:.1f}s"
+                )
+                self._timer = asyncio.current_task()
+
+
+def build_publisher(
+    redis,
+    *,
+    batch_size: int = 0,
+    batch_delay_ms: float = 5.0,
+    latest_max_hz: float = 0.0,
+    latest_legacy_keys: bool = True,
+    stream_format: str = TEXT_FORMAT,
+    **kwargs: Any,
+) -> RedisPublisher:
+    """
+    Return a batching publisher when `batch_size` > 1, otherwise the per-trade
+    publisher. `latest_max_hz` > 0 routes latest-price writes through a
+    throttled `LatestPriceCache`. `stream_format="mt1"` lets the batching
+    publisher switch to packed stream entries once every consumer supports them.
+    """
+    if stream_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported stream format: {stream_format!r} (supported: {','.join(SUPPORTED_FORMATS)})")
+    if latest_max_hz and latest_max_hz > 0:
+        kwargs["latest_cache"] = LatestPriceCache(
+            redis,
+            max_hz=latest_max_hz,
+            ttl_seconds=kwargs.get("latest_ttl_seconds", 60 * 60),
+            legacy_keys=latest_legacy_keys,
+        )
+    if batch_size and batch_size > 1:
+        negotiator = None
+        if stream_format == BINARY_FORMAT:
+            negotiator = StreamFormatNegotiator(
+                redis,
+                stream_keys=partition_stream_keys(
+                    kwargs.get("stream_key", STREAM_KEY),
+                    kwargs.get("partitions", 1),
+                ),
+                preferred=BINARY_FORMAT,
+            )
+        return BatchingRedisPublisher(
+            redis,
+            max_batch=batch_size,
+            max_delay_ms=batch_delay_ms,
+            negotiator=negotiator,
+            **kwargs,
+        )
+    return RedisPublisher(redis, **kwargs)
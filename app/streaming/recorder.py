@@ -0,0 +1,130 @@
+"""
+Raw websocket frame recorder.
+
+Every frame a streamer receives is appended, with its receive timestamp, to a
+gzip-compressed JSON-lines file. The first line of each file is a header with
+the exchange and the connection's symbols so `app.streaming.replay` can rebuild
+an identical streamer. Files rotate by (uncompressed) size or age:
+
+    {directory}/{exchange}-{connection}-{YYYYmmddTHHMMSS}-{seq}.jsonl.gz
+
+Each line after the header is ``[recv_ts, frame]``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.config import settings
+
+
+logger = logging.getLogger("cryptoinsight.streaming.recorder")
+
+RECORD_FORMAT = 1
+
+
+class FrameRecorder:
+    def __init__(
+        self,
+        directory: str | Path,
+        exchange: str,
+        *,
+        connection: int = 0,
+        symbols: list[str] | None = None,
+        rotate_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 60 * 60,
+        compresslevel: int = 1,
+    ) -> None:
+        self.directory = Path(directory)
+        self.exchange = exchange.strip().lower()
+        self.connection = int(connection)
+        self.symbols = list(symbols or [])
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_seconds = float(rotate_seconds)
+        self.compresslevel = compresslevel
+        self.frames = 0
+        self.files: list[Path] = []
+        self._file: gzip.GzipFile | None = None
+        self._written = 0
+        self._opened_at = 0.0
+        self._seq = 0
+
+    @property
+    def path(self) -> Path | None:
+        return self.files[-1] if self._file is not None else None
+
+    def write(self, recv_ts: float, raw: str | bytes) -> None:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        if self._file is None or self._should_rotate(recv_ts):
+            self._rotate(recv_ts)
+        line = json.dumps([recv_ts, raw], separators=(",", ":")).encode("utf-8") + b"\n"
+        self._file.write(line)
+        self._written += len(line)
+        self.frames += 1
+
+    def _should_rotate(self, now: float) -> bool:
+        return self._written >= self.rotate_bytes or now - self._opened_at >= self.rotate_seconds
+
+    def _rotate(self, now: float) -> None:
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        while True:
+            self._seq += 1
+            path = self.directory / f"{self.exchange}-{self.connection}-{stamp}-{self._seq:04d}.jsonl.gz"
+            if not path.exists():
+                break
+        self._file = gzip.open(path, "ab", compresslevel=self.compresslevel)
+        header = {
+            "format": RECORD_FORMAT,
+            "exchange": self.exchange,
+            "connection": self.connection,
+            "symbols": self.symbols,
+            "started_at": now,
+        }
+        self._file.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+        self._written = 0
+        self._opened_at = now
+        self.files.append(path)
+        logger.info("Recording %s frames to %s", self.exchange, path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_header(path: str | Path) -> dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return json.loads(fh.readline())
+
+
+def iter_frames(path: str | Path) -> Iterator[tuple[float, str]]:
+    """Yield ``(recv_ts, frame)`` pairs from a recording, skipping the header."""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        fh.readline()
+        for line in fh:
+            if not line.strip():
+                continue
+            recv_ts, raw = json.loads(line)
+            yield float(recv_ts), raw
+
+
+def build_recorder(directory: str, exchange: str, connection: int, symbols: list[str]) -> FrameRecorder | None:
+    """Recorder using the rotation settings, or None when recording is disabled."""
+    if not directory:
+        return None
+    return FrameRecorder(
+        directory,
+        exchange,
+        connection=connection,
+        symbols=symbols,
+        rotate_bytes=int(settings.STREAM_RECORD_ROTATE_MB * 1024 * 1024),
+        rotate_seconds=settings.STREAM_RECORD_ROTATE_MINUTES * 60,
+    )
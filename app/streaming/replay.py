@@ -0,0 +1,213 @@
+"""
+Replay recorded websocket frames through the streamer publish path.
+
+Recordings from `app.streaming.recorder` are decoded with the same streamer
+class that recorded them (`decode_frame` -> `publish_trades`) and published to
+Redis, so the writer and everything downstream see a realistic burst profile.
+Files of one connection are replayed in order; different connections replay
+concurrently against a shared clock.
+
+    python -m app.streaming.replay recordings/ --speed 10
+    python -m app.streaming.replay recordings/kraken-0-*.jsonl.gz --speed 0 --wait-writer
+
+`--speed 1` keeps the recorded pacing, `--speed N` compresses it N times and
+`--speed 0` publishes as fast as possible.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.streaming.decoding import DecodeError
+from app.streaming.partitions import partition_stream_keys
+from app.streaming.publisher import RedisPublisher, build_publisher
+from app.streaming.recorder import iter_frames, read_header
+from app.streaming.supervisor import create_streamer
+
+
+@dataclass
+class ReplayStats:
+    files: int = 0
+    frames: int = 0
+    trades: int = 0
+    decode_errors: int = 0
+    recorded_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    writer_drain_seconds: float | None = None
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def trades_per_second(self) -> float:
+        return self.trades / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "frames_per_second": round(self.frames_per_second, 1),
+            "trades_per_second": round(self.trades_per_second, 1),
+        }
+
+
+def collect_recordings(paths: Iterable[str | Path]) -> dict[tuple[str, int], list[Path]]:
+    """Group recording files by (exchange, connection), each group in recording order."""
+    groups: dict[tuple[str, int], list[tuple[float, Path]]] = {}
+    for raw in paths:
+        path = Path(raw)
+        files = sorted(path.glob("*.jsonl.gz")) if path.is_dir() else [path]
+        for file in files:
+            header = read_header(file)
+            key = (str(header["exchange"]), int(header.get("connection", 0)))
+            groups.setdefault(key, []).append((float(header.get("started_at", 0.0)), file))
+    return {key: [file for _, file in sorted(items)] for key, items in groups.items()}
+
+
+def _first_frame_ts(path: Path) -> float | None:
+    frames = iter_frames(path)
+    try:
+        return next(frames)[0]
+    except StopIteration:
+        return None
+    finally:
+        frames.close()
+
+
+async def _replay_connection(
+    files: list[Path],
+    publisher: RedisPublisher,
+    stats: ReplayStats,
+    *,
+    speed: float,
+    origin: float | None,
+    started: float,
+) -> None:
+    for file in files:
+        header = read_header(file)
+        streamer = create_streamer(header["exchange"], header.get("symbols") or [])
+        stats.files += 1
+        for recv_ts, raw in iter_frames(file):
+            if origin is not None:
+                offset = recv_ts - origin
+                if offset > stats.recorded_seconds:
+                    stats.recorded_seconds = offset
+                if speed > 0:
+                    delay = offset / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+            stats.frames += 1
+            try:
+                trades = streamer.decode_frame(raw)
+            except DecodeError:
+                stats.decode_errors += 1
+                continue
+            if trades:
+                stats.trades += len(trades)
+                await streamer.publish_trades(trades, publisher)
+
+
+async def replay(
+    paths: Iterable[str | Path],
+    publisher: RedisPublisher,
+    *,
+    speed: float = 1.0,
+) -> ReplayStats:
+    groups = collect_recordings(paths)
+    stats = ReplayStats()
+
+    origin = min((ts for ts in (_first_frame_ts(files[0]) for files in groups.values()) if ts is not None), default=None)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _replay_connection(files, publisher, stats, speed=speed, origin=origin, started=started)
+            for files in groups.values()
+        )
+    )
+    await publisher.flush()
+    stats.elapsed_seconds = time.perf_counter() - started
+    return stats
+
+
+async def wait_for_writer(
+    redis,
+    *,
+    stream_keys: list[str],
+    group: str,
+    timeout_seconds: float = 300.0,
+) -> float | None:
+    """Seconds until `group` has read and acked everything on `stream_keys` (None on timeout)."""
+    started = time.perf_counter()
+    remaining = set(stream_keys)
+    while time.perf_counter() - started < timeout_seconds:
+        for stream_key in sorted(remaining):
+            for info in await redis.xinfo_groups(stream_key):
+                if info.get("name") == group and not info.get("pending") and not info.get("lag"):
+                    remaining.discard(stream_key)
+        if not remaining:
+            return time.perf_counter() - started
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def _main(args: argparse.Namespace) -> ReplayStats:
+    redis = aioredis.from_url(args.redis_url, decode_responses=True)
+    publisher = build_publisher(
+        redis,
+        stream_key=args.stream_key,
+        batch_size=args.batch_size,
+        batch_delay_ms=settings.STREAM_PUBLISH_BATCH_MS,
+        latest_max_hz=settings.STREAM_LATEST_MAX_HZ,
+        latest_legacy_keys=settings.STREAM_LATEST_LEGACY_KEYS,
+        stream_format=settings.STREAM_TRADE_FORMAT.strip().lower(),
+        partitions=settings.STREAM_PARTITIONS,
+        partition_by=settings.STREAM_PARTITION_BY,
+    )
+    try:
+        stats = await replay(args.paths, publisher, speed=args.speed)
+        if args.wait_writer:
+            from app.writer import GROUP
+
+            stats.writer_drain_seconds = await wait_for_writer(
+                redis,
+                stream_keys=partition_stream_keys(args.stream_key, settings.STREAM_PARTITIONS),
+                group=GROUP,
+            )
+    finally:
+        await publisher.aclose()
+        await redis.aclose()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Recording files or directories of recordings.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier; 0 = as fast as possible.")
+    parser.add_argument("--redis-url", default=settings.CELERY_BROKER_URL)
+    parser.add_argument("--stream-key", default="market_trades")
+    parser.add_argument("--batch-size", type=int, default=settings.STREAM_PUBLISH_BATCH_SIZE)
+    parser.add_argument(
+        "--wait-writer",
+        action="store_true",
+        help="After publishing, wait until app.writer has drained the stream and report how long it took.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(_main(args))
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Consistent-hash placement of streamed symbols onto websocket connections."""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+from dataclasses import dataclass, field
+from typing import Iterable
+
+
+def stable_hash(key: str) -> int:
+    """Process-independent 64-bit hash (unlike the builtin, which is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring over integer node ids.
+
+    Each node is placed at `replicas` virtual points so keys spread evenly and
+    adding a node only moves roughly 1/len(nodes) of the keys.
+    """
+
+    def __init__(self, nodes: Iterable[int] = (), *, replicas: int = 64) -> None:
+        self._replicas = max(1, int(replicas))
+        self._points: list[int] = []
+        self._owners: list[int] = []
+        self._nodes: set[int] = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @property
+    def nodes(self) -> list[int]:
+        return sorted(self._nodes)
+
+    def add_node(self, node: int) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for replica in range(self._replicas):
+            point = stable_hash(f"node:{node}:{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def node_for(self, key: str) -> int:
+        if not self._points:
+            raise ValueError("HashRing has no nodes")
+        index = bisect.bisect(self._points, stable_hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+@dataclass
+class ShardOp:
+    """
+    Instruction for a stream worker.
+
+    `assign` (re)starts the connection with exactly `symbols`; `subscribe`
+    adds `symbols` to an already running connection and `unsubscribe`
+    removes them from it.
+    """
+
+    op: str
+    exchange: str
+    connection: int
+    symbols: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "op": self.op,
+            "exchange": self.exchange,
+            "connection": self.connection,
+            "symbols": list(self.symbols),
+        }
+
+
+class ExchangeShardPlan:
+    """
+    Symbol -> connection placement for one exchange.
+
+    Starts with enough connections to keep each under `max_symbols_per_connection`
+    (at least `min_connections`), and grows by one connection whenever an added
+    symbol would overflow its owner, up to `max_connections`.
+    """
+
+    def __init__(
+        self,
+        exchange: str,
+        symbols: Iterable[str],
+        *,
+        min_connections: int = 1,
+        max_connections: int = 16,
+        max_symbols_per_connection: int = 50,
+        replicas: int = 64,
+    ) -> None:
+        self.exchange = exchange.strip().upper()
+        self.max_connections = max(1, int(max_connections))
+        self.max_symbols_per_connection = max(1, int(max_symbols_per_connection))
+        self._replicas = replicas
+
+        unique = list(dict.fromkeys(symbols))
+        needed = -(-len(unique) // self.max_symbols_per_connection) if unique else 1
+        count = min(self.max_connections, max(int(min_connections), needed, 1))
+        self._ring = HashRing(range(count), replicas=replicas)
+        self._symbols: list[str] = unique
+        self.assignments: dict[int, list[str]] = self._place(unique)
+
+    @property
+    def connections(self) -> list[int]:
+        return self._ring.nodes
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def connection_for(self, symbol: str) -> int:
+        return self._ring.node_for(symbol)
+
+    def _place(self, symbols: Iterable[str]) -> dict[int, list[str]]:
+        placed: dict[int, list[str]] = {node: [] for node in self._ring.nodes}
+        for symbol in symbols:
+            placed[self._ring.node_for(symbol)].append(symbol)
+        return placed
+
+    def assign_ops(self) -> list[ShardOp]:
+        return [
+            ShardOp("assign", self.exchange, conn, list(symbols))
+            for conn, symbols in sorted(self.assignments.items())
+        ]
+
+    def add(self, symbols: Iterable[str]) -> list[ShardOp]:
+        """Place new symbols and return the worker ops needed to apply the change."""
+        new = [s for s in dict.fromkeys(symbols) if s not in self.assignments.get(self.connection_for(s), [])]
+        if not new:
+            return []
+        self._symbols.extend(new)
+
+        overflow = any(
+            len(self.assignments[self.connection_for(s)]) >= self.max_symbols_per_connection for s in new
+        )
+        if overflow and len(self._ring.nodes) < self.max_connections:
+            return self._rebalance()
+
+        added: dict[int, list[str]] = {}
+        for symbol in new:
+            conn = self.connection_for(symbol)
+            self.assignments[conn].append(symbol)
+            added.setdefault(conn, []).append(symbol)
+        return [ShardOp("subscribe", self.exchange, conn, syms) for conn, syms in sorted(added.items())]
+
+    def remove(self, symbols: Iterable[str]) -> list[ShardOp]:
+        """Drop symbols from their connections and return the unsubscribe ops."""
+        removed: dict[int, list[str]] = {}
+        for symbol in dict.fromkeys(symbols):
+            conn = self.connection_for(symbol)
+            current = self.assignments.get(conn, [])
+            if symbol in current:
+                current.remove(symbol)
+                removed.setdefault(conn, []).append(symbol)
+        if not removed:
+            return []
+        gone = {s for syms in removed.values() for s in syms}
+        self._symbols = [s for s in self._symbols if s not in gone]
+        return [ShardOp("unsubscribe", self.exchange, conn, syms) for conn, syms in sorted(removed.items())]
+
+    def _rebalance(self) -> list[ShardOp]:
+        self._ring.add_node(max(self._ring.nodes) + 1)
+        previous = self.assignments
+        self.assignments = self._place(self._symbols)
+
+        ops: list[ShardOp] = []
+        for conn, symbols in sorted(self.assignments.items()):
+            before = previous.get(conn)
+            if before is None or not set(before) <= set(symbols):
+                # New connection, or symbols moved away: restart with the exact set.
+                ops.append(ShardOp("assign", self.exchange, conn, list(symbols)))
+            else:
+                added = [s for s in symbols if s not in set(before)]
+                if added:
+                    ops.append(ShardOp("subscribe", self.exchange, conn, added))
+        return ops
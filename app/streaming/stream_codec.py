@@ -0,0 +1,284 @@
+"""
+Record formats for the `market_trades` Redis stream.
+
+``text`` (the original format) is one stream entry per trade with every field
+stringified. ``mt1`` packs a whole publisher batch into one entry
+``{"fmt": "mt1", "data": <bytes>}``:
+
+    header   "MT" | version u8 | flags u8 | count u32 | nsym u16   (little-endian)
+    symbols  nsym x (u16 length + utf-8 "exchange|symbol")
+    records  count x TRADE_DTYPE (packed numpy structured array)
+
+Exchange/symbol pairs are interned per batch, so a trade costs 43 bytes instead
+of ~100 bytes of field names and decimal strings plus a stream entry of its own.
+Trade ids must be integers; batches with other ids are published as text.
+
+Which format the publisher uses is negotiated: every consumer that can read
+``mt1`` advertises it in the `CODECS_KEY` hash, and `StreamFormatNegotiator`
+only switches to binary while every recently active consumer of every group
+on the stream has done so. Unregistered (older) consumers keep it on text.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+
+logger = logging.getLogger("cryptoinsight.streaming.codec")
+
+TEXT_FORMAT = "text"
+BINARY_FORMAT = "mt1"
+SUPPORTED_FORMATS = (TEXT_FORMAT, BINARY_FORMAT)
+
+CODECS_KEY = "market_trades:codecs"
+
+_MAGIC = b"MT"
+_VERSION = 1
+_HEADER = struct.Struct("<2sBBIH")
+_SYMBOL_LEN = struct.Struct("<H")
+
+TRADE_DTYPE = np.dtype(
+    [
+        ("sym", "<u2"),
+        ("side", "u1"),
+        ("ts", "<f8"),
+        ("recv_ts", "<f8"),
+        ("price", "<f8"),
+        ("amount", "<f8"),
+        ("trade_id", "<i8"),
+    ]
+)
+
+_SIDE_CODES = {"buy": 1, "sell": 2}
+SIDE_NAMES = (None, "buy", "sell")
+NO_TRADE_ID = -1
+
+
+@dataclass(slots=True)
+class TradeColumns:
+    """A decoded `mt1` batch: interned symbol table plus one numpy column per field."""
+
+    symbols: list[tuple[str, str]]
+    records: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def iter_trades(self) -> Iterator[tuple[str, str, float, float, float, float, str | None, str | None]]:
+        """Yield ``(exchange, symbol, ts, recv_ts, price, amount, side, trade_id)`` rows."""
+        records = self.records
+        for sym, side, ts, recv_ts, price, amount, trade_id in zip(
+            records["sym"].tolist(),
+            records["side"].tolist(),
+            records["ts"].tolist(),
+            records["recv_ts"].tolist(),
+            records["price"].tolist(),
+            records["amount"].tolist(),
+            records["trade_id"].tolist(),
+        ):
+            exchange, symbol = self.symbols[sym]
+            yield (
+                exchange,
+                symbol,
+                ts,
+                recv_ts,
+                price,
+                amount,
+                SIDE_NAMES[side] if side < len(SIDE_NAMES) else None,
+                None if trade_id == NO_TRADE_ID else str(trade_id),
+            )
+
+
+def encode_batch(trades: Iterable[Any]) -> bytes | None:
+    """
+    Pack `EncodedTrade`-like objects (``exchange``, ``symbol``, ``payload``) into
+    one `mt1` record, or return None when the batch cannot be represented.
+    """
+    table: dict[tuple[str, str], int] = {}
+    rows: list[tuple] = []
+    for trade in trades:
+        payload = trade.payload
+        key = (trade.exchange, trade.symbol)
+        index = table.get(key)
+        if index is None:
+            index = table[key] = len(table)
+            if index > 0xFFFF:
+                return None
+        trade_id = payload.get("trade_id")
+        if trade_id is None:
+            packed_id = NO_TRADE_ID
+        else:
+            try:
+                packed_id = int(trade_id)
+            except (TypeError, ValueError):
+                return None
+        rows.append(
+            (
+                index,
+                _SIDE_CODES.get(payload.get("side") or "", 0),
+                payload["ts"],
+                payload["recv_ts"],
+                payload["price"],
+                payload["amount"],
+                packed_id,
+            )
+        )
+    if not rows:
+        return None
+
+    parts = [_HEADER.pack(_MAGIC, _VERSION, 0, len(rows), len(table))]
+    for exchange, symbol in table:
+        name = f"{exchange}|{symbol}".encode("utf-8")
+        parts.append(_SYMBOL_LEN.pack(len(name)))
+        parts.append(name)
+    parts.append(np.array(rows, dtype=TRADE_DTYPE).tobytes())
+    return b"".join(parts)
+
+
+def decode_batch(data: bytes) -> TradeColumns:
+    magic, version, _flags, count, nsym = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"Unsupported market_trades record (magic={magic!r}, version={version})")
+    offset = _HEADER.size
+    symbols: list[tuple[str, str]] = []
+    for _ in range(nsym):
+        (length,) = _SYMBOL_LEN.unpack_from(data, offset)
+        offset += _SYMBOL_LEN.size
+        exchange, _, symbol = data[offset : offset + length].decode("utf-8").partition("|")
+        symbols.append((exchange, symbol))
+        offset += length
+    records = np.frombuffer(data, dtype=TRADE_DTYPE, count=count, offset=offset)
+    return TradeColumns(symbols=symbols, records=records)
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def entry_format(fields: dict) -> str:
+    fmt = fields.get("fmt", fields.get(b"fmt"))
+    return _text(fmt) if fmt is not None else TEXT_FORMAT
+
+
+def text_fields(fields: dict) -> dict[str, str]:
+    """Normalize a text entry read with or without `decode_responses`."""
+    return {_text(key): _text(value) for key, value in fields.items()}
+
+
+def binary_payload(fields: dict) -> bytes:
+    data = fields.get(b"data", fields.get("data"))
+    if isinstance(data, str):
+        raise ValueError("mt1 entries must be read with decode_responses=False")
+    return data
+
+
+async def advertise_formats(
+    redis,
+    *,
+    group: str,
+    consumer: str,
+    formats: Iterable[str] = SUPPORTED_FORMATS,
+) -> None:
+    await redis.hset(
+        CODECS_KEY,
+        f"{group}:{consumer}",
+        json.dumps({"formats": list(formats), "ts": time.time()}),
+    )
+
+
+async def advertise_forever(
+    redis,
+    *,
+    group: str,
+    consumer: str,
+    interval_seconds: float = 15.0,
+) -> None:
+    """Keep this consumer's format advert fresh (run as a background task)."""
+    while True:
+        try:
+            await advertise_formats(redis, group=group, consumer=consumer)
+        except Exception as e:
+            logger.warning(f"Failed to advertise stream formats for {group}:{consumer}: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+class StreamFormatNegotiator:
+    """
+    Picks the stream format the publisher may use.
+
+    Binary is chosen only when it is preferred and every consumer that read
+    from any of the streams within `active_idle_ms` (across all groups) advertised
+    `BINARY_FORMAT` within `advert_ttl_seconds`. Any error falls back to text.
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        stream_keys: Iterable[str] = ("market_trades",),
+        preferred: str = BINARY_FORMAT,
+        refresh_seconds: float = 10.0,
+        active_idle_ms: int = 60_000,
+        advert_ttl_seconds: float = 60.0,
+    ) -> None:
+        self._redis = redis
+        self._stream_keys = list(stream_keys)
+        self.preferred = preferred
+        self._refresh_seconds = refresh_seconds
+        self._active_idle_ms = active_idle_ms
+        self._advert_ttl_seconds = advert_ttl_seconds
+        self.current = TEXT_FORMAT
+        self._checked_at = float("-inf")
+
+    async def format(self) -> str:
+        now = time.monotonic()
+        if now - self._checked_at >= self._refresh_seconds:
+            self._checked_at = now
+            await self.refresh()
+        return self.current
+
+    async def refresh(self) -> str:
+        if self.preferred != BINARY_FORMAT:
+            self.current = TEXT_FORMAT
+            return self.current
+        try:
+            chosen = BINARY_FORMAT if await self._all_consumers_support_binary() else TEXT_FORMAT
+        except Exception as e:
+            logger.warning(f"Stream format negotiation failed ({e}); using text")
+            chosen = TEXT_FORMAT
+        if chosen != self.current:
+            logger.info("market_trades stream format: %s -> %s", self.current, chosen)
+        self.current = chosen
+        return chosen
+
+    async def _all_consumers_support_binary(self) -> bool:
+        adverts = await self._redis.hgetall(CODECS_KEY) or {}
+        now = time.time()
+        supported: set[str] = set()
+        for name, raw in adverts.items():
+            try:
+                advert = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+            if BINARY_FORMAT in advert.get("formats", []) and now - float(advert.get("ts", 0)) <= self._advert_ttl_seconds:
+                supported.add(_text(name))
+
+        active = 0
+        for stream_key in self._stream_keys:
+            for group in await self._redis.xinfo_groups(stream_key):
+                group_name = _text(group.get("name"))
+                for consumer in await self._redis.xinfo_consumers(stream_key, group_name):
+                    if int(consumer.get("idle", 0)) > self._active_idle_ms:
+                        continue
+                    active += 1
+                    if f"{group_name}:{_text(consumer.get('name'))}" not in supported:
+                        return False
+        return active > 0
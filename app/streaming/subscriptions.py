@@ -0,0 +1,123 @@
+"""
+Dynamic subscription bookkeeping for the streamer supervisor.
+
+API views publish a `subscribe` command on every page load. The manager turns
+that stream of requests into few shard ops:
+
+- requests are deduplicated and applied in batches (`flush`), so a burst of
+  page views for the same symbols becomes one subscribe per connection;
+- every request refreshes the symbol's last-viewed time;
+- dynamic symbols idle for `idle_seconds` are unsubscribed (`sweep`);
+- each connection holds at most `max_dynamic_per_connection` dynamic symbols,
+  evicting the least recently viewed first.
+
+Symbols from the startup plan (the core universe) are never evicted.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from app.streaming.sharding import ExchangeShardPlan, ShardOp
+
+
+class SubscriptionManager:
+    def __init__(
+        self,
+        plans: dict[str, ExchangeShardPlan],
+        *,
+        window_seconds: float = 0.25,
+        idle_seconds: float = 900.0,
+        max_dynamic_per_connection: int = 25,
+    ) -> None:
+        self.plans = plans
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.idle_seconds = float(idle_seconds)
+        self.max_dynamic_per_connection = max(1, int(max_dynamic_per_connection))
+        self._core: dict[str, set[str]] = {name: set(plan.symbols) for name, plan in plans.items()}
+        # Least recently viewed first; values are last-viewed monotonic times.
+        self._dynamic: dict[str, OrderedDict[str, float]] = {name: OrderedDict() for name in plans}
+        self._pending: dict[str, dict[str, None]] = {}
+        self.requests = 0
+        self.evicted = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(symbols) for symbols in self._pending.values())
+
+    def dynamic_symbols(self, exchange: str) -> list[str]:
+        return list(self._dynamic.get(exchange, {}))
+
+    def touch(self, exchange: str, symbols: Iterable[str], now: float | None = None) -> bool:
+        """Record a view of `symbols`; returns True if any of them still needs subscribing."""
+        if exchange not in self.plans:
+            return False
+        now = time.monotonic() if now is None else now
+        core = self._core[exchange]
+        dynamic = self._dynamic[exchange]
+        queued = False
+        for symbol in symbols:
+            self.requests += 1
+            if symbol in core:
+                continue
+            if symbol in dynamic:
+                dynamic[symbol] = now
+                dynamic.move_to_end(symbol)
+                continue
+            self._pending.setdefault(exchange, {})[symbol] = None
+            queued = True
+        return queued
+
+    def flush(self, now: float | None = None) -> list[ShardOp]:
+        """Subscribe every pending symbol and enforce the per-connection cap."""
+        now = time.monotonic() if now is None else now
+        pending, self._pending = self._pending, {}
+        ops: list[ShardOp] = []
+        for exchange, symbols in pending.items():
+            plan = self.plans[exchange]
+            dynamic = self._dynamic[exchange]
+            new = [s for s in symbols if s not in dynamic and s not in self._core[exchange]]
+            if not new:
+                continue
+            for symbol in new:
+                dynamic[symbol] = now
+            ops.extend(plan.add(new))
+            ops.extend(self._enforce_cap(exchange))
+        return ops
+
+    def sweep(self, now: float | None = None) -> list[ShardOp]:
+        """Unsubscribe dynamic symbols nobody has viewed for `idle_seconds`."""
+        now = time.monotonic() if now is None else now
+        ops: list[ShardOp] = []
+        for exchange, dynamic in self._dynamic.items():
+            idle: list[str] = []
+            for symbol, last_viewed in dynamic.items():
+                if now - last_viewed < self.idle_seconds:
+                    break
+                idle.append(symbol)
+            if idle:
+                for symbol in idle:
+                    del dynamic[symbol]
+                ops.extend(self.plans[exchange].remove(idle))
+        return ops
+
+    def _enforce_cap(self, exchange: str) -> list[ShardOp]:
+        plan = self.plans[exchange]
+        dynamic = self._dynamic[exchange]
+        per_connection: dict[int, list[str]] = {}
+        for symbol in dynamic:
+            per_connection.setdefault(plan.connection_for(symbol), []).append(symbol)
+
+        evict: list[str] = []
+        for symbols in per_connection.values():
+            overflow = len(symbols) - self.max_dynamic_per_connection
+            if overflow > 0:
+                evict.extend(symbols[:overflow])
+        if not evict:
+            return []
+        for symbol in evict:
+            del dynamic[symbol]
+        self.evicted += len(evict)
+        return plan.remove(evict)
@@ -0,0 +1,377 @@
+"""
+Sharded streamer supervisor.
+
+Each exchange's symbol list is split across websocket connections by an
+`ExchangeShardPlan`, and connections are spread across worker processes by a
+consistent hash ring. A `StreamWorker` runs the connections assigned to it and
+restarts any shard whose task dies; the `StreamSupervisor` routes dynamic
+subscriptions to the owning worker and respawns crashed worker processes
+without touching the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from typing import Any
+
+from app.config import settings
+from app.redis_client import RedisClient
+from app.streaming.base_ws import BaseTradeStreamer
+from app.streaming.binance_ws import BinanceTradeStreamer
+from app.streaming.coinbase_ws import CoinbaseTradeStreamer
+from app.streaming.ingest_queue import QUEUE_STATS_KEY
+from app.streaming.kraken_ws import KrakenTradeStreamer
+from app.streaming.publisher import BatchingRedisPublisher, RedisPublisher, build_publisher
+from app.streaming.recorder import build_recorder
+from app.streaming.sharding import ExchangeShardPlan, HashRing, ShardOp
+from app.streaming.subscriptions import SubscriptionManager
+from app.streaming.symbols import parse_symbol
+
+
+logger = logging.getLogger("cryptoinsight.streamer.supervisor")
+
+SUPPORTED_EXCHANGES = ("COINBASE", "BINANCE", "KRAKEN")
+
+
+def create_streamer(exchange: str, symbols: list[str]) -> BaseTradeStreamer:
+    exchange = exchange.strip().upper()
+    if exchange == "COINBASE":
+        return CoinbaseTradeStreamer(list(symbols))
+    if exchange == "BINANCE":
+        return BinanceTradeStreamer([parse_symbol(s) for s in symbols])
+    if exchange == "KRAKEN":
+        return KrakenTradeStreamer([parse_symbol(s) for s in symbols])
+    raise ValueError(f"Unsupported stream exchange: {exchange!r} (supported: {','.join(SUPPORTED_EXCHANGES)})")
+
+
+def build_stream_publisher() -> RedisPublisher:
+    return build_publisher(
+        RedisClient.get_redis(),
+        batch_size=settings.STREAM_PUBLISH_BATCH_SIZE,
+        batch_delay_ms=settings.STREAM_PUBLISH_BATCH_MS,
+        latest_max_hz=settings.STREAM_LATEST_MAX_HZ,
+        latest_legacy_keys=settings.STREAM_LATEST_LEGACY_KEYS,
+        stream_format=settings.STREAM_TRADE_FORMAT.strip().lower(),
+        partitions=settings.STREAM_PARTITIONS,
+        partition_by=settings.STREAM_PARTITION_BY,
+    )
+
+
+class StreamWorker:
+    """Runs a set of exchange connections (shards) inside one asyncio loop."""
+
+    def __init__(
+        self,
+        publisher: RedisPublisher,
+        *,
+        stats_redis=None,
+        restart_delay_seconds: float = 5.0,
+    ) -> None:
+        self._publisher = publisher
+        self._stats_redis = stats_redis
+        self._restart_delay_seconds = restart_delay_seconds
+        self._shards: dict[tuple[str, int], list[str]] = {}
+        self._streamers: dict[tuple[str, int], BaseTradeStreamer] = {}
+        self._tasks: dict[tuple[str, int], asyncio.Task] = {}
+
+    @property
+    def shards(self) -> dict[tuple[str, int], list[str]]:
+        return {key: list(symbols) for key, symbols in self._shards.items()}
+
+    async def apply(self, op: dict[str, Any]) -> None:
+        key = (str(op["exchange"]).upper(), int(op["connection"]))
+        symbols = list(op.get("symbols") or [])
+        action = op.get("op")
+
+        if action == "assign":
+            self._start(key, symbols)
+        elif action == "subscribe":
+            current = self._shards.get(key)
+            if current is None or key not in self._tasks:
+                self._start(key, (current or []) + symbols)
+                return
+            added = [s for s in symbols if s not in current]
+            if not added:
+                return
+            current.extend(added)
+            streamer = self._streamers.get(key)
+            if streamer is not None:
+                await streamer.subscribe(added)
+        elif action == "unsubscribe":
+            current = self._shards.get(key)
+            if not current:
+                return
+            removed = [s for s in symbols if s in current]
+            if not removed:
+                return
+            self._shards[key] = [s for s in current if s not in removed]
+            if not self._shards[key]:
+                self._stop(key)
+                return
+            streamer = self._streamers.get(key)
+            if streamer is not None:
+                await streamer.unsubscribe(removed)
+        elif action == "stop":
+            self._stop(key)
+            self._shards.pop(key, None)
+        else:
+            logger.warning("Ignoring unknown shard op %r", action)
+
+    def _start(self, key: tuple[str, int], symbols: list[str]) -> None:
+        self._stop(key)
+        self._shards[key] = list(dict.fromkeys(symbols))
+        if not self._shards[key]:
+            return
+        self._tasks[key] = asyncio.create_task(self._run_shard(key), name=f"stream:{key[0]}:{key[1]}")
+        logger.info("Shard %s:%d assigned %d symbols", key[0], key[1], len(self._shards[key]))
+
+    def _stop(self, key: tuple[str, int]) -> None:
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+        self._streamers.pop(key, None)
+
+    async def _run_shard(self, key: tuple[str, int]) -> None:
+        while True:
+            streamer = create_streamer(key[0], self._shards[key])
+            streamer.recorder = build_recorder(settings.STREAM_RECORD_DIR, key[0], key[1], self._shards[key])
+            self._streamers[key] = streamer
+            try:
+                await streamer.run_forever(self._publisher)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Shard %s:%d crashed; restarting in %.1fs",
+                    key[0],
+                    key[1],
+                    self._restart_delay_seconds,
+                )
+                await asyncio.sleep(self._restart_delay_seconds)
+
+    def queue_stats(self) -> dict[str, dict[str, Any]]:
+        now = time.time()
+        return {
+            f"{key[0]}:{key[1]}": {**streamer.queue_stats(), "connection": key[1], "updated_at": now}
+            for key, streamer in self._streamers.items()
+        }
+
+    async def publish_stats(self) -> dict[str, dict[str, Any]]:
+        stats = self.queue_stats()
+        if isinstance(self._publisher, BatchingRedisPublisher):
+            logger.info("Publisher flush stats: %s", self._publisher.stats.as_dict())
+        for shard, snapshot in stats.items():
+            if snapshot["dropped"] or snapshot["depth"] > snapshot["maxsize"]:
+                logger.warning("Ingest queue %s under pressure: %s", shard, snapshot)
+        if self._stats_redis is not None and stats:
+            try:
+                await self._stats_redis.hset(
+                    QUEUE_STATS_KEY,
+                    mapping={shard: json.dumps(snapshot) for shard, snapshot in stats.items()},
+                )
+            except Exception as e:
+                logger.warning(f"Failed to publish streamer stats: {e}")
+        return stats
+
+    async def report_stats(self, interval_seconds: float = 15.0) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.publish_stats()
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for key in list(self._tasks):
+            self._stop(key)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._publisher.aclose()
+
+
+async def _worker_process_loop(queue) -> None:
+    worker = StreamWorker(build_stream_publisher(), stats_redis=RedisClient.get_redis())
+    stats_task = asyncio.create_task(worker.report_stats())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            op = await loop.run_in_executor(None, queue.get)
+            if op is None:
+                break
+            await worker.apply(op)
+    finally:
+        stats_task.cancel()
+        await worker.close()
+
+
+def _worker_process_main(index: int, queue) -> None:
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Stream worker %d started", index)
+    try:
+        asyncio.run(_worker_process_loop(queue))
+    except KeyboardInterrupt:
+        pass
+
+
+class StreamSupervisor:
+    """
+    Owns the shard plans and the workers that execute them.
+
+    With `worker_processes <= 1` all shards run in the supervisor's own event
+    loop; otherwise each worker is a spawned process fed over a
+    multiprocessing queue. Dynamic subscribe commands go through a
+    `SubscriptionManager`; with a zero window they are applied immediately.
+    """
+
+    def __init__(
+        self,
+        plans: dict[str, ExchangeShardPlan],
+        *,
+        worker_processes: int = 1,
+        health_check_seconds: float = 5.0,
+        subscriptions: SubscriptionManager | None = None,
+        sweep_seconds: float = 30.0,
+    ) -> None:
+        self.plans = plans
+        self.subscriptions = subscriptions or SubscriptionManager(plans, window_seconds=0.0)
+        self._sweep_seconds = sweep_seconds
+        self._flush_task: asyncio.Task | None = None
+        self._sweep_task: asyncio.Task | None = None
+        self.worker_count = max(1, int(worker_processes))
+        self._worker_ring = HashRing(range(self.worker_count))
+        self._health_check_seconds = health_check_seconds
+        self._ctx = multiprocessing.get_context("spawn")
+        self._processes: dict[int, Any] = {}
+        self._queues: dict[int, Any] = {}
+        self._local: StreamWorker | None = None
+
+    def worker_for(self, exchange: str, connection: int) -> int:
+        return self._worker_ring.node_for(f"{exchange.upper()}:{connection}")
+
+    def ops_for_worker(self, index: int) -> list[ShardOp]:
+        ops: list[ShardOp] = []
+        for plan in self.plans.values():
+            ops.extend(op for op in plan.assign_ops() if self.worker_for(op.exchange, op.connection) == index)
+        return ops
+
+    @property
+    def in_process(self) -> bool:
+        return self.worker_count <= 1
+
+    async def start(self, publisher: RedisPublisher | None = None) -> None:
+        if self.in_process:
+            self._local = StreamWorker(
+                publisher or build_stream_publisher(),
+                stats_redis=RedisClient.get_redis(),
+            )
+        else:
+            for index in range(self.worker_count):
+                self._spawn(index)
+        for index in range(self.worker_count):
+            for op in self.ops_for_worker(index):
+                await self._dispatch(index, op)
+        self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    def _spawn(self, index: int) -> None:
+        queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_process_main,
+            args=(index, queue),
+            name=f"stream-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._queues[index] = queue
+        self._processes[index] = process
+
+    async def _dispatch(self, index: int, op: ShardOp) -> None:
+        if self._local is not None:
+            await self._local.apply(op.to_dict())
+        else:
+            self._queues[index].put(op.to_dict())
+
+    async def handle_command(self, data: dict[str, Any]) -> list[ShardOp]:
+        if data.get("action") != "subscribe":
+            return []
+        exchange = str(data.get("exchange") or "COINBASE").strip().upper()
+        plan = self.plans.get(exchange)
+        raw_symbols = data.get("symbols") or ([data["symbol"]] if data.get("symbol") else [])
+        if plan is None or not raw_symbols:
+            logger.warning("No streamer found for exchange %s or invalid symbol %s", exchange, raw_symbols)
+            return []
+
+        symbols: list[str] = []
+        for raw in raw_symbols:
+            try:
+                symbols.append(parse_symbol(str(raw)).dash())
+            except ValueError:
+                logger.warning("Ignoring invalid symbol %r for %s", raw, exchange)
+
+        if not self.subscriptions.touch(exchange, symbols):
+            return []
+        if self.subscriptions.window_seconds <= 0:
+            return await self.apply_subscriptions()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return []
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.subscriptions.window_seconds)
+        await self.apply_subscriptions()
+
+    async def apply_subscriptions(self) -> list[ShardOp]:
+        """Dispatch the batched subscribe requests (and any LRU evictions they cause)."""
+        ops = self.subscriptions.flush()
+        await self._dispatch_ops(ops, "Routed dynamic subscriptions")
+        return ops
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_seconds)
+            try:
+                await self._dispatch_ops(self.subscriptions.sweep(), "Unsubscribed idle symbols")
+            except Exception:
+                logger.exception("Subscription sweep failed")
+
+    async def _dispatch_ops(self, ops: list[ShardOp], message: str) -> None:
+        for op in ops:
+            await self._dispatch(self.worker_for(op.exchange, op.connection), op)
+        if ops:
+            logger.info(
+                "%s: %s",
+                message,
+                ", ".join(f"{op.op} {op.exchange}@{op.connection} {op.symbols}" for op in ops),
+            )
+
+    async def monitor(self) -> None:
+        if self.in_process:
+            await self._local.report_stats()
+            return
+        while True:
+            await asyncio.sleep(self._health_check_seconds)
+            for index, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+                logger.warning(
+                    "Stream worker %d exited (code=%s); restarting its shards",
+                    index,
+                    process.exitcode,
+                )
+                self._spawn(index)
+                for op in self.ops_for_worker(index):
+                    await self._dispatch(index, op)
+
+    async def close(self) -> None:
+        for task in (self._flush_task, self._sweep_task):
+            if task is not None:
+                task.cancel()
+        if self._local is not None:
+            await self._local.close()
+            return
+        for queue in self._queues.values():
+            queue.put(None)
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
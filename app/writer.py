@@ -1,24 +1,58 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import math
+import os
+import socket
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from decimal import Decimal
 
 from redis.exceptions import ResponseError
 
+from app.config import settings
 from app.redis_client import RedisClient
 from app.models.market import MarketTrade
-from app.services.imports.storage import bulk_insert_ticks, get_or_create_asset
+from app.services.asset_registry import AssetRegistry, asset_registry, listen_for_invalidations
+from app.services.imports.storage import bulk_insert_tick_batches
 from app.services.imports.types import TickRecord
+from app.services.trade_store import ticks_only
+from app.streaming.partitions import STREAM_KEY, partition_stream_keys
+from app.streaming.stream_codec import (
+    BINARY_FORMAT,
+    TradeColumns,
+    advertise_forever,
+    binary_payload,
+    decode_batch,
+    entry_format,
+    text_fields,
+)
 from database import init_db, session_scope
 
 
 logger = logging.getLogger("cryptoinsight.writer")
 
-STREAM_KEY = "market_trades"
 GROUP = "trade_writers"
-CONSUMER = "writer-1"
+METRICS_KEY = "writer:metrics"
+
+
+def default_consumer_name() -> str:
+    return f"writer-{socket.gethostname()}-{os.getpid()}"
+
+
+def parse_partitions(raw: str, partitions: int) -> list[int]:
+    """Partition indexes from a comma list such as ``"0,2"``; empty means all."""
+    partitions = max(1, int(partitions))
+    if not raw or not raw.strip():
+        return list(range(partitions))
+    indexes = sorted({int(part) for part in raw.split(",") if part.strip()})
+    invalid = [index for index in indexes if not 0 <= index < partitions]
+    if invalid:
+        raise ValueError(f"Writer partitions {invalid} out of range for {partitions} partition(s)")
+    return indexes
 
 
 def _to_dt(ts_seconds: str | float | None) -> datetime | None:
@@ -27,91 +61,470 @@ def _to_dt(ts_seconds: str | float | None) -> datetime | None:
     return datetime.fromtimestamp(float(ts_seconds), tz=timezone.utc)
 
 
-async def ensure_consumer_group(redis) -> None:
-    try:
-        await redis.xgroup_create(STREAM_KEY, GROUP, id="$", mkstream=True)
-    except ResponseError as e:
-        if "BUSYGROUP" not in str(e):
-            raise
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _entry_ms(message_id) -> int:
+    return int(_text(message_id).split("-", 1)[0])
+
+
+async def ensure_consumer_group(redis, stream_keys: list[str] | None = None, group: str = GROUP) -> None:
+    for stream_key in stream_keys or [STREAM_KEY]:
+        try:
+            await redis.xgroup_create(stream_key, group, id="$", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+
+def _append_trade(
+    rows: list[MarketTrade] | None,
+    tick_batches: dict[tuple[str, str], list[TickRecord]],
+    exchange: str,
+    symbol: str,
+    ts: datetime,
+    recv_ts: datetime | None,
+    price: float | str,
+    amount: float | str,
+    side: str | None,
+    trade_id: str | None,
+) -> None:
+    if rows is not None:
+        rows.append(
+            MarketTrade(
+                exchange=exchange,
+                symbol=symbol,
+                timestamp=ts,
+                receipt_timestamp=recv_ts,
+                price=Decimal(str(price)),
+                amount=Decimal(str(amount)),
+                side=side,
+            )
+        )
+    tick_batches.setdefault((exchange, symbol), []).append(
+        TickRecord(
+            time=ts,
+            price=float(price),
+            volume=float(amount),
+            side=side,
+            exchange_trade_id=trade_id,
+            is_aggregated=False,
+        )
+    )
+
+
+def _collect_text(
+    fields: dict[str, str],
+    rows: list[MarketTrade] | None,
+    tick_batches: dict[tuple[str, str], list[TickRecord]],
+) -> None:
+    exchange = str(fields.get("exchange", "")).strip().lower()
+    symbol = str(fields.get("symbol", "")).strip().upper()
+    ts = _to_dt(fields.get("ts"))
+    if not exchange or not symbol or ts is None:
+        return
+    _append_trade(
+        rows,
+        tick_batches,
+        exchange,
+        symbol,
+        ts,
+        _to_dt(fields.get("recv_ts")),
+        fields.get("price", "0"),
+        fields.get("amount", "0"),
+        str(fields.get("side", "")) or None,
+        str(fields.get("trade_id")) if fields.get("trade_id") else None,
+    )
+
+
+def _collect_batch(
+    columns: TradeColumns,
+    rows: list[MarketTrade] | None,
+    tick_batches: dict[tuple[str, str], list[TickRecord]],
+) -> None:
+    for exchange, symbol, ts, recv_ts, price, amount, side, trade_id in columns.iter_trades():
+        _append_trade(
+            rows,
+            tick_batches,
+            exchange,
+            symbol,
+            datetime.fromtimestamp(ts, tz=timezone.utc),
+            datetime.fromtimestamp(recv_ts, tz=timezone.utc),
+            price,
+            amount,
+            side,
+            trade_id,
+        )
+
+
+def collect_messages(
+    messages: list[tuple],
+    rows: list[MarketTrade] | None,
+    tick_batches: dict[tuple[str, str], list[TickRecord]],
+) -> None:
+    """
+    Decode text and packed `mt1` stream entries into per-asset ticks and, unless
+    `rows` is None (ticks-only storage), `MarketTrade` rows.
+    """
+    for message_id, fields in messages:
+        try:
+            if entry_format(fields) == BINARY_FORMAT:
+                _collect_batch(decode_batch(binary_payload(fields)), rows, tick_batches)
+            else:
+                _collect_text(text_fields(fields), rows, tick_batches)
+        except Exception:
+            logger.exception("Skipping bad message id=%s fields=%s", message_id, fields)
+
+
+@dataclass
+class WriteBatch:
+    """Decoded stream entries waiting for one database commit."""
+
+    acks: dict[str, list] = field(default_factory=dict)
+    rows: list[MarketTrade] | None = field(default_factory=list)
+    tick_batches: dict[tuple[str, str], list[TickRecord]] = field(default_factory=dict)
+    entries: int = 0
+    trades: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def add(self, stream_name, messages: list[tuple]) -> None:
+        self.acks.setdefault(_text(stream_name), []).extend(message_id for message_id, _fields in messages)
+        self.entries += len(messages)
+        # XAUTOCLAIM reports entries trimmed from the stream with no fields.
+        collect_messages([m for m in messages if m[1]], self.rows, self.tick_batches)
+        self.trades = sum(len(ticks) for ticks in self.tick_batches.values())
+
+
+class AdaptiveBatchSize:
+    """
+    Trade batch size steered by commit latency: doubles while full batches
+    commit in under half of `target_ms`, halves when a commit overshoots it.
+    """
+
+    def __init__(self, initial: int = 500, *, minimum: int = 100, maximum: int = 5000, target_ms: float = 250.0) -> None:
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.target_ms = float(target_ms)
+        self.size = min(self.maximum, max(self.minimum, int(initial)))
+
+    def observe(self, rows: int, commit_ms: float) -> int:
+        if commit_ms > self.target_ms:
+            self.size = max(self.minimum, self.size // 2)
+        elif commit_ms < self.target_ms / 2 and rows >= self.size:
+            self.size = min(self.maximum, self.size * 2)
+        return self.size
+
+
+class TradeWriter:
+    """
+    One member of the `trade_writers` consumer group.
+
+    Any number of writers can run side by side: each uses a unique consumer
+    name and reads either every `market_trades` partition or the subset in
+    `partitions`. Entries left pending by a writer that died mid-batch are
+    taken over with XAUTOCLAIM once idle for `claim_idle_seconds`, at startup
+    and every `claim_interval_seconds`. Delivery is at-least-once.
+
+    `run_forever` is a two-stage pipeline: the event loop reads and decodes
+    batch N+1 while batch N is committed in a worker thread, and entries are
+    acked only after their commit succeeded. Batches close at `sizer.size`
+    trades or `max_batch_age_ms` after their first entry, whichever is first.
+
+    With `store_market_trades=False` trades are written to `ticks` only.
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        consumer: str,
+        stream_keys: list[str],
+        group: str = GROUP,
+        batch_size: int = 500,
+        claim_idle_seconds: float = 60.0,
+        claim_interval_seconds: float = 30.0,
+        assets: AssetRegistry | None = None,
+        sizer: AdaptiveBatchSize | None = None,
+        max_batch_age_ms: float = 200.0,
+        store_market_trades: bool = True,
+    ) -> None:
+        self._redis = redis
+        self.consumer = consumer
+        self.stream_keys = list(stream_keys)
+        self.group = group
+        self._batch_size = batch_size
+        self._claim_idle_ms = int(claim_idle_seconds * 1000)
+        self._claim_interval_seconds = claim_interval_seconds
+        self.assets = assets or asset_registry
+        self.sizer = sizer or AdaptiveBatchSize(batch_size, minimum=batch_size, maximum=batch_size)
+        self._max_batch_age = max_batch_age_ms / 1000.0
+        self.store_market_trades = store_market_trades
+        self._next_maintenance = 0.0
+        self.written = 0
+        self.claimed = 0
+        self.failed_commits = 0
+        self.last_commit_ms = 0.0
+        # Packed mt1 entries hold a whole publisher batch: the COUNT of
+        # XREADGROUP and XAUTOCLAIM is sized from the running mean of trades
+        # per entry, and entries read past the trade target wait in `_carry`
+        # for the next batch.
+        self._trades_per_entry = 1.0
+        self._carry: list[tuple] = []
+
+    def _new_batch(self) -> WriteBatch:
+        return WriteBatch(rows=[] if self.store_market_trades else None)
+
+    async def read(self, block_ms: int = 1000, count: int | None = None) -> list[tuple]:
+        return await self._redis.xreadgroup(
+            groupname=self.group,
+            consumername=self.consumer,
+            streams={stream_key: ">" for stream_key in self.stream_keys},
+            count=count or self._batch_size,
+            block=block_ms,
+        ) or []
+
+    async def next_batch(self, idle_block_ms: int = 1000) -> WriteBatch | None:
+        """
+        Read until the batch holds `sizer.size` trades or its first entry is
+        `max_batch_age_ms` old. None when nothing arrived within `idle_block_ms`.
+        """
+        batch: WriteBatch | None = None
+        deadline = 0.0
+        while batch is None or batch.trades < self.sizer.size:
+            if self._carry:
+                streams, self._carry = self._carry, []
+            else:
+                if batch is None:
+                    block_ms = idle_block_ms
+                    count = self._entry_count(self.sizer.size)
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    block_ms = max(1, int(remaining * 1000))
+                    count = self._entry_count(self.sizer.size - batch.trades)
+                streams = await self.read(block_ms=block_ms, count=count)
+            if not streams:
+                if batch is None:
+                    return None
+                continue
+            if batch is None:
+                batch = self._new_batch()
+                deadline = batch.started + self._max_batch_age
+            self._fill(batch, streams)
+        return batch
+
+    def _entry_count(self, trades: int, trades_per_entry: float | None = None) -> int:
+        """Stream entries to read for about `trades` trades."""
+        return max(1, math.ceil(trades / (trades_per_entry or self._trades_per_entry)))
+
+    def _fill(self, batch: WriteBatch, streams: list[tuple]) -> None:
+        """
+        Add entries to `batch` until it holds `sizer.size` trades; the rest go
+        to `_carry`. Chunks start at one entry and at most double, so a batch
+        ends within about twice the target even when the estimate is off.
+        """
+        step = 1
+        last = 0.0
+        for index, (stream_name, messages) in enumerate(streams):
+            position = 0
+            while position < len(messages):
+                if batch.trades >= self.sizer.size:
+                    self._carry = [(stream_name, messages[position:]), *streams[index + 1 :]]
+                    return
+                per_entry = max(self._trades_per_entry, last)
+                size = min(step, self._entry_count(self.sizer.size - batch.trades, per_entry))
+                chunk = messages[position : position + size]
+                entries, trades = batch.entries, batch.trades
+                batch.add(stream_name, chunk)
+                position += len(chunk)
+                step *= 2
+                if batch.trades > trades:
+                    last = (batch.trades - trades) / (batch.entries - entries)
+                    self._trades_per_entry += (last - self._trades_per_entry) * 0.2
+
+    def _write_rows(self, batch: WriteBatch) -> None:
+        with session_scope() as db:
+            if batch.rows:
+                db.bulk_save_objects(batch.rows)
+            # One COPY for every asset in the batch.
+            bulk_insert_tick_batches(
+                db,
+                {self.assets.get_or_create(db, *key): ticks for key, ticks in batch.tick_batches.items()},
+                ingest_source="stream",
+            )
+
+    async def commit(self, batch: WriteBatch) -> int:
+        """Write `batch` in a worker thread, then ack its entries."""
+        if batch.trades:
+            started = time.perf_counter()
+            await asyncio.to_thread(self._write_rows, batch)
+            self.last_commit_ms = (time.perf_counter() - started) * 1000.0
+            self.sizer.observe(batch.trades, self.last_commit_ms)
+
+        for stream_key, ids in batch.acks.items():
+            if ids:
+                await self._redis.xack(stream_key, self.group, *ids)
+        self.written += batch.trades
+        return batch.trades
+
+    async def process(self, streams: list[tuple]) -> int:
+        """Write one XREADGROUP/XAUTOCLAIM result to the database, then ack it."""
+        batch = self._new_batch()
+        for stream_name, messages in streams:
+            batch.add(stream_name, messages)
+        return await self.commit(batch)
+
+    async def _claimed_batches(self):
+        claimed = 0
+        for stream_key in self.stream_keys:
+            start_id = "0-0"
+            while True:
+                reply = await self._redis.xautoclaim(
+                    stream_key,
+                    self.group,
+                    self.consumer,
+                    min_idle_time=self._claim_idle_ms,
+                    start_id=start_id,
+                    count=self._entry_count(self.sizer.size),
+                )
+                start_id, messages = reply[0], reply[1]
+                if messages:
+                    claimed += len(messages)
+                    batch = self._new_batch()
+                    batch.add(stream_key, messages)
+                    yield batch
+                if _text(start_id) == "0-0":
+                    break
+        if claimed:
+            self.claimed += claimed
+            logger.warning("Writer %s recovered %d stale pending entries", self.consumer, claimed)
+
+    async def claim_stale(self, sink=None) -> int:
+        """
+        XAUTOCLAIM entries idle longer than `claim_idle_seconds` and hand each
+        claimed batch to `sink` (default: commit it right away).
+        """
+        sink = sink or self.commit
+        claimed = 0
+        async for batch in self._claimed_batches():
+            claimed += batch.entries
+            await sink(batch)
+        return claimed
+
+    async def lag_metrics(self) -> dict[str, dict]:
+        """Per stream: length, pending count and age of the oldest pending entry."""
+        now_ms = int(time.time() * 1000)
+        metrics: dict[str, dict] = {}
+        for stream_key in self.stream_keys:
+            length = await self._redis.xlen(stream_key)
+            pending = await self._redis.xpending(stream_key, self.group)
+            oldest = pending.get("min") if pending else None
+            metrics[stream_key] = {
+                "length": int(length or 0),
+                "pending": int(pending.get("pending", 0)) if pending else 0,
+                "oldest_pending_age_seconds": max(0, now_ms - _entry_ms(oldest)) / 1000.0 if oldest else None,
+                "consumers": len(pending.get("consumers") or []) if pending else 0,
+                "checked_at": now_ms / 1000.0,
+            }
+        return metrics
+
+    async def publish_metrics(self) -> dict[str, dict]:
+        metrics = await self.lag_metrics()
+        await self._redis.hset(
+            METRICS_KEY,
+            mapping={stream_key: json.dumps(values) for stream_key, values in metrics.items()},
+        )
+        for stream_key, values in metrics.items():
+            logger.info(
+                "Writer lag %s: length=%d pending=%d oldest_pending=%ss",
+                stream_key,
+                values["length"],
+                values["pending"],
+                values["oldest_pending_age_seconds"],
+            )
+        return metrics
+
+    async def maintain(self, now: float, sink=None) -> None:
+        if now < self._next_maintenance:
+            return
+        self._next_maintenance = now + self._claim_interval_seconds
+        try:
+            await self.claim_stale(sink)
+            await self.publish_metrics()
+        except Exception:
+            logger.exception("Writer maintenance failed")
+
+    async def _flush_loop(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await queue.get()
+            try:
+                await self.commit(batch)
+            except Exception:
+                # Unacked entries stay pending and are reclaimed after claim_idle_seconds.
+                self.failed_commits += 1
+                logger.exception("Writer commit failed (%d trades left pending)", batch.trades)
+            finally:
+                queue.task_done()
+
+    async def run_forever(self) -> None:
+        # maxsize=1: one batch committing, one decoded and waiting, one being read.
+        queue: asyncio.Queue[WriteBatch] = asyncio.Queue(maxsize=1)
+        flusher = asyncio.create_task(self._flush_loop(queue))
+        try:
+            while True:
+                await self.maintain(time.monotonic(), sink=queue.put)
+                batch = await self.next_batch()
+                if batch is not None:
+                    await queue.put(batch)
+        finally:
+            flusher.cancel()
+
+
+def build_writer(redis, batch_size: int = 500) -> TradeWriter:
+    indexes = parse_partitions(settings.WRITER_PARTITIONS, settings.STREAM_PARTITIONS)
+    keys = partition_stream_keys(STREAM_KEY, settings.STREAM_PARTITIONS)
+    return TradeWriter(
+        redis,
+        consumer=settings.WRITER_CONSUMER_NAME.strip() or default_consumer_name(),
+        stream_keys=[keys[index] for index in indexes],
+        batch_size=batch_size,
+        claim_idle_seconds=settings.WRITER_CLAIM_IDLE_SECONDS,
+        claim_interval_seconds=settings.WRITER_CLAIM_INTERVAL_SECONDS,
+        sizer=AdaptiveBatchSize(
+            batch_size,
+            minimum=settings.WRITER_BATCH_MIN,
+            maximum=settings.WRITER_BATCH_MAX,
+            target_ms=settings.WRITER_TARGET_COMMIT_MS,
+        ),
+        max_batch_age_ms=settings.WRITER_MAX_BATCH_AGE_MS,
+        store_market_trades=not ticks_only(),
+    )
 
 
 async def run_writer(batch_size: int = 500) -> None:
     init_db()
-    redis = RedisClient.get_redis()
-    await ensure_consumer_group(redis)
-    logger.info("Writer started: stream=%s group=%s consumer=%s", STREAM_KEY, GROUP, CONSUMER)
-
-    asset_cache: dict[tuple[str, str], int] = {}
-
-    while True:
-        streams = await redis.xreadgroup(
-            groupname=GROUP,
-            consumername=CONSUMER,
-            streams={STREAM_KEY: ">"},
-            count=batch_size,
-            block=1000,
-        )
-        if not streams:
-            continue
-
-        message_ids: list[str] = []
-        rows: list[MarketTrade] = []
-        tick_batches: dict[tuple[str, str], list[TickRecord]] = {}
-
-        for _stream_name, messages in streams:
-            for message_id, fields in messages:
-                message_ids.append(message_id)
-
-                try:
-                    exchange = str(fields.get("exchange", "")).strip().lower()
-                    symbol = str(fields.get("symbol", "")).strip().upper()
-                    ts = _to_dt(fields.get("ts"))
-                    if not exchange or not symbol or ts is None:
-                        continue
-                    rows.append(
-                        MarketTrade(
-                            exchange=exchange,
-                            symbol=symbol,
-                            timestamp=ts,
-                            receipt_timestamp=_to_dt(fields.get("recv_ts")),
-                            price=Decimal(str(fields.get("price", "0"))),
-                            amount=Decimal(str(fields.get("amount", "0"))),
-                            side=str(fields.get("side", "")) or None,
-                        )
-                    )
-
-                    key = (exchange, symbol)
-                    tick_batches.setdefault(key, []).append(
-                        TickRecord(
-                            time=ts,
-                            price=float(fields.get("price", 0.0)),
-                            volume=float(fields.get("amount", 0.0)),
-                            side=str(fields.get("side", "")) or None,
-                            exchange_trade_id=str(fields.get("trade_id")) if fields.get("trade_id") else None,
-                            is_aggregated=False,
-                        )
-                    )
-                except Exception:
-                    logger.exception("Skipping bad message id=%s fields=%s", message_id, fields)
-
-        if rows:
-            with session_scope() as db:
-                db.bulk_save_objects(rows)
-                for key, ticks in tick_batches.items():
-                    asset_id = asset_cache.get(key)
-                    if asset_id is None:
-                        asset = get_or_create_asset(db, symbol=key[1], exchange=key[0])
-                        asset_id = asset.id
-                        asset_cache[key] = asset_id
-                    bulk_insert_ticks(
-                        db,
-                        asset_id=asset_id,
-                        rows=ticks,
-                        ingest_source="stream",
-                    )
-
-        if message_ids:
-            await redis.xack(STREAM_KEY, GROUP, *message_ids)
+    # Bytes replies: packed mt1 entries are not valid UTF-8.
+    redis = RedisClient.get_binary_redis()
+    writer = build_writer(redis, batch_size=batch_size)
+    await ensure_consumer_group(redis, writer.stream_keys)
+    with session_scope() as db:
+        writer.assets.warm(db)
+    advertise_task = asyncio.create_task(advertise_forever(redis, group=GROUP, consumer=writer.consumer))
+    invalidation_task = asyncio.create_task(listen_for_invalidations(redis, writer.assets))
+    logger.info(
+        "Writer started: streams=%s group=%s consumer=%s",
+        ",".join(writer.stream_keys),
+        GROUP,
+        writer.consumer,
+    )
+
+    try:
+        await writer.run_forever()
+    finally:
+        advertise_task.cancel()
+        invalidation_task.cancel()
 
 
 def main() -> None:
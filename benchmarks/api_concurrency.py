@@ -0,0 +1,98 @@
+"""
+Mixed-load latency benchmark for the async API handlers.
+
+Fires concurrent candle requests over a wide range (slow, database bound)
+mixed with `/market/latest` requests (Redis only) at an in-process app, once
+with database work run inline on the event loop (the old behaviour) and once
+through `database.run_db`, and reports p50/p99 latency per endpoint. Needs
+DATABASE_URL and REDIS_URL pointing at a populated stack.
+
+    python -m benchmarks.api_concurrency --exchange kraken --symbol BTC-USD --days 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import httpx
+
+from app.config import settings
+from app.main import create_app
+
+
+async def _inline(fn, /, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _round(app, *, exchange: str, symbol: str, days: int, requests: int, concurrency: int) -> dict:
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    slow = (
+        f"{settings.API_PREFIX}/market/candles/{exchange}/{symbol}",
+        {"start": start.isoformat(), "end": end.isoformat(), "timeframe": "1m", "max_points": 5000},
+    )
+    fast = (f"{settings.API_PREFIX}/market/latest/{exchange}/{symbol}", {})
+    latencies: dict[str, list[float]] = {"candles": [], "latest": []}
+    gate = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+
+        async def one(name: str, path: str, params: dict) -> None:
+            async with gate:
+                started = time.perf_counter()
+                await client.get(path, params=params)
+                latencies[name].append((time.perf_counter() - started) * 1000)
+
+        jobs = [one("candles", *slow) if i % 4 == 0 else one("latest", *fast) for i in range(requests)]
+        await asyncio.gather(*jobs)
+
+    return {
+        name: {
+            "n": len(values),
+            "p50_ms": round(statistics.median(values), 1) if values else 0.0,
+            "p99_ms": round(_percentile(values, 99), 1),
+        }
+        for name, values in latencies.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exchange", default="kraken")
+    parser.add_argument("--symbol", default="BTC-USD")
+    parser.add_argument("--days", type=int, default=30, help="Candle range of the slow requests.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    app = create_app()
+    options = dict(
+        exchange=args.exchange,
+        symbol=args.symbol,
+        days=args.days,
+        requests=args.requests,
+        concurrency=args.concurrency,
+    )
+    with patch("app.main.run_db", _inline):
+        before = asyncio.run(_round(app, **options))
+    after = asyncio.run(_round(app, **options))
+
+    for label, result in (("inline", before), ("run_db", after)):
+        for name, row in result.items():
+            print(f"{label:<7} {name:<8} n={row['n']:<5} p50={row['p50_ms']:>9} ms  p99={row['p99_ms']:>9} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Dashboard chart polls with and without the Redis candle cache.
+
+Loads synthetic ticks for the last `--hours` into an in-memory SQLite database
+and times repeated polls of that window as 1-minute candles: the planner's
+full re-aggregation versus `CandleCache.load` (closed buckets from Redis plus a
+query for the open tail). Needs a Redis server; the benchmark market's hash is
+deleted afterwards.
+
+    python -m benchmarks.candle_cache --redis-url redis://localhost:6379/15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import redis.asyncio as redis
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models.instrument  # noqa: F401
+import app.models.market  # noqa: F401
+from app.models.ticks import Asset, Tick
+from app.services.candle_cache import CandleCache
+from app.services.candle_planner import load_candle_columns
+from database import Base
+
+
+def _load(db, n: int, start: datetime, end: datetime) -> None:
+    asset = Asset(symbol="BENCH-USD", exchange="bench", base="BENCH", quote="USD", active=True)
+    db.add(asset)
+    db.flush()
+    rng = np.random.default_rng(1)
+    offsets = np.sort(rng.uniform(0, (end - start).total_seconds(), n))
+    prices = 50_000 + np.cumsum(rng.normal(0, 2, n))
+    volumes = rng.exponential(0.01, n)
+    rows = [
+        {"asset_id": asset.id, "time": start + timedelta(seconds=float(o)), "price": float(p), "volume": float(v)}
+        for o, p, v in zip(offsets, prices, volumes)
+    ]
+    for i in range(0, n, 100_000):
+        db.execute(insert(Tick), rows[i : i + 100_000])
+    db.commit()
+
+
+def _ms(samples: list[float]) -> str:
+    return f"p50={statistics.median(samples) * 1000:8.2f}ms  max={max(samples) * 1000:8.2f}ms"
+
+
+async def _run(args) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(hours=args.hours)
+    _load(db, args.rows, start, end)
+
+    client = redis.from_url(args.redis_url, decode_responses=False)
+    cache = CandleCache(client, ttl_seconds=3600)
+    await cache.invalidate("bench", "BENCH-USD")
+    try:
+        uncached = []
+        for _ in range(args.polls):
+            started = time.perf_counter()
+            load_candle_columns(db, "bench", "BENCH-USD", start, datetime.now(timezone.utc), 60)
+            uncached.append(time.perf_counter() - started)
+
+        await cache.load(db, "candles", "bench", "BENCH-USD", start, datetime.now(timezone.utc), 60)
+        cached = []
+        for _ in range(args.polls):
+            started = time.perf_counter()
+            columns, _, info = await cache.load(db, "candles", "bench", "BENCH-USD", start, datetime.now(timezone.utc), 60)
+            cached.append(time.perf_counter() - started)
+    finally:
+        await cache.invalidate("bench", "BENCH-USD")
+        await client.aclose()
+
+    print(f"{args.hours}h of 1m candles, rows={args.rows}, {len(columns)} candles, {info['cached_buckets']} from cache")
+    print(f"  full query   {_ms(uncached)}")
+    print(f"  cache + tail {_ms(cached)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--polls", type=int, default=20)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+SQLite candle/gap bucketing: per-row ORM loops versus numpy.
+
+Loads synthetic ticks (one every ~86 ms, about a day of BTC trades per million
+rows) into an in-memory SQLite database and times the non-Timescale read
+paths end to end: 1-minute candles (`candle_planner.load_candles`) and
+5-second gap detection (`data_quality.detect_gaps_data`). The loop side is the
+per-row code those paths ran before `app.services.bucketing`.
+
+    python -m benchmarks.python_bucketing --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models.instrument  # noqa: F401
+import app.models.market  # noqa: F401
+from app.models.ticks import Asset, Tick
+from app.services.candle_planner import load_candles
+from app.services.data_quality import detect_gaps_data
+from database import Base
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+GAP_BUCKET = 5
+
+
+def _load(db, n: int) -> tuple[int, datetime]:
+    asset = Asset(symbol="BTC-USD", exchange="coinbase", base="BTC", quote="USD", active=True)
+    db.add(asset)
+    db.flush()
+    rng = np.random.default_rng(1)
+    offsets = np.cumsum(rng.exponential(0.086, n))
+    prices = 50_000 + np.cumsum(rng.normal(0, 2, n))
+    volumes = rng.exponential(0.01, n)
+    rows = [
+        {"asset_id": asset.id, "time": START + timedelta(seconds=float(o)), "price": float(p), "volume": float(v)}
+        for o, p, v in zip(offsets, prices, volumes)
+    ]
+    for i in range(0, n, 100_000):
+        db.execute(insert(Tick), rows[i : i + 100_000])
+    db.commit()
+    return asset.id, rows[-1]["time"]
+
+
+def _loop_candles(db, asset_id: int, end: datetime, bucket_seconds: int) -> int:
+    rows = (
+        db.query(Tick.time, Tick.price, Tick.volume)
+        .filter(Tick.asset_id == asset_id, Tick.time >= START, Tick.time <= end)
+        .order_by(Tick.time.asc())
+        .all()
+    )
+    buckets: dict[int, dict] = {}
+    for row in rows:
+        ts = row.time.replace(tzinfo=timezone.utc)
+        epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
+        price, volume = float(row.price), float(row.volume)
+        item = buckets.get(epoch)
+        if item is None:
+            buckets[epoch] = {
+                "timestamp": datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat(),
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "volume": volume,
+                "trades": 1,
+            }
+            continue
+        item["high"] = max(item["high"], price)
+        item["low"] = min(item["low"], price)
+        item["close"] = price
+        item["volume"] += volume
+        item["trades"] += 1
+    return len(buckets)
+
+
+def _loop_gaps(db, asset_id: int, start: datetime, end: datetime, bucket_seconds: int) -> int:
+    rows = db.query(Tick.time).filter(Tick.asset_id == asset_id, Tick.time >= start, Tick.time <= end).all()
+    counts: dict[int, int] = {}
+    for row in rows:
+        ts = row.time.replace(tzinfo=timezone.utc)
+        epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
+        counts[epoch] = counts.get(epoch, 0) + 1
+    missing = 0
+    epoch, end_epoch = int(start.timestamp()), int(end.timestamp())
+    while epoch <= end_epoch:
+        missing += counts.get(epoch, 0) == 0
+        epoch += bucket_seconds
+    return missing
+
+
+def _timed(fn, *args, **kwargs) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    asset_id, end = _load(db, args.rows)
+
+    loop_s, count = _timed(_loop_candles, db, asset_id, end, 60)
+    numpy_s, (candles, plan) = _timed(load_candles, db, "coinbase", "BTC-USD", START, end, 60)
+    assert plan.method == "python" and len(candles) == count
+    print(f"candles 1m  rows={args.rows:<9} loop={loop_s:7.3f}s  numpy={numpy_s:7.3f}s  x{loop_s / numpy_s:5.1f}")
+
+    gap_end = START + timedelta(seconds=GAP_BUCKET * 19_999)
+    loop_s, missing = _timed(_loop_gaps, db, asset_id, START, gap_end, GAP_BUCKET)
+    numpy_s, report = _timed(
+        detect_gaps_data,
+        db,
+        exchange="coinbase",
+        symbol="BTC-USD",
+        start_dt=START,
+        end_dt=gap_end,
+        bucket_seconds=GAP_BUCKET,
+        max_points=20_000,
+        source="ticks",
+    )
+    assert report["missing_buckets"] == missing
+    print(f"gaps {GAP_BUCKET}s     rows={args.rows:<9} loop={loop_s:7.3f}s  numpy={numpy_s:7.3f}s  x{loop_s / numpy_s:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
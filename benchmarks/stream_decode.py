@@ -0,0 +1,130 @@
+"""
+Frames/s benchmark for the websocket streamer decode path.
+
+Compares the per-exchange `decode_frame` fast path against the generic
+stdlib `json.loads` + `parse_message` path for Binance, Kraken and Coinbase.
+
+    python -m benchmarks.stream_decode --frames 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from app.streaming.binance_ws import BinanceTradeStreamer
+from app.streaming.coinbase_ws import CoinbaseTradeStreamer
+from app.streaming.decoding import JSON_BACKEND
+from app.streaming.kraken_ws import KrakenTradeStreamer
+from app.streaming.symbols import parse_symbol_list
+
+
+SYMBOLS = parse_symbol_list("BTC-USD,ETH-USD,SOL-USD")
+
+
+def _binance_frames(n: int) -> list[str]:
+    return [
+        json.dumps(
+            {
+                "e": "trade",
+                "E": 1700000000000 + i,
+                "s": "BTCUSDT",
+                "t": 1000 + i,
+                "p": f"{50000 + i % 100}.12000000",
+                "q": "0.00150000",
+                "T": 1700000000000 + i,
+                "m": bool(i % 2),
+                "M": True,
+            },
+            separators=(",", ":"),
+        )
+        for i in range(n)
+    ]
+
+
+def _kraken_frames(n: int) -> list[str]:
+    return [
+        json.dumps(
+            [
+                336,
+                [
+                    [f"{50000 + i % 100}.10000", "0.01500000", f"{1700000000 + i}.123456", "b", "l", ""],
+                    [f"{50000 + i % 100}.20000", "0.02500000", f"{1700000000 + i}.223456", "s", "m", ""],
+                ],
+                "trade",
+                "XBT/USD",
+            ],
+            separators=(",", ":"),
+        )
+        for i in range(n)
+    ]
+
+
+def _coinbase_frames(n: int) -> list[str]:
+    return [
+        json.dumps(
+            {
+                "type": "match",
+                "trade_id": 1000 + i,
+                "maker_order_id": "ac928c66-ca53-498f-9c13-a110027a60e8",
+                "taker_order_id": "132fb6ae-456b-4654-b4e0-d681ac05cea1",
+                "side": "buy" if i % 2 else "sell",
+                "size": "0.00150000",
+                "price": f"{50000 + i % 100}.12",
+                "product_id": "BTC-USD",
+                "sequence": 50 + i,
+                "time": f"2024-01-01T12:00:{i % 60:02d}.{i % 1000000:06d}Z",
+            },
+            separators=(",", ":"),
+        )
+        for i in range(n)
+    ]
+
+
+def _measure(decode: Callable[[str], list], frames: list[str]) -> float:
+    started = time.perf_counter()
+    for raw in frames:
+        decode(raw)
+    elapsed = time.perf_counter() - started
+    return len(frames) / elapsed if elapsed > 0 else float("inf")
+
+
+def run(frame_count: int) -> list[dict]:
+    cases = [
+        ("binance", BinanceTradeStreamer(SYMBOLS), _binance_frames(frame_count)),
+        ("kraken", KrakenTradeStreamer(SYMBOLS), _kraken_frames(frame_count)),
+        ("coinbase", CoinbaseTradeStreamer([s.dash() for s in SYMBOLS]), _coinbase_frames(frame_count)),
+    ]
+    results = []
+    for name, streamer, frames in cases:
+        baseline = _measure(lambda raw, s=streamer: s.parse_message(json.loads(raw)), frames)
+        fast = _measure(streamer.decode_frame, frames)
+        results.append(
+            {
+                "exchange": name,
+                "frames": len(frames),
+                "baseline_frames_per_s": round(baseline),
+                "fast_frames_per_s": round(fast),
+                "speedup": round(fast / baseline, 2) if baseline else None,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"json backend: {JSON_BACKEND}")
+    for row in run(args.frames):
+        print(
+            f"{row['exchange']:<9} baseline={row['baseline_frames_per_s']:>10,} f/s  "
+            f"fast={row['fast_frames_per_s']:>10,} f/s  x{row['speedup']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Bytes/row benchmark for the legacy and compact `ticks` layouts.
+
+Creates two scratch hypertables on DATABASE_URL (TimescaleDB), loads the same
+synthetic trades into both with binary COPY and reports the size per row
+before and after compressing every chunk. The tables are dropped afterwards.
+
+    python -m benchmarks.tick_storage --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import struct
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.services.imports.pgcopy import HEADER, TRAILER, pg_timestamp, text_field
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ASSETS = 20
+
+LEGACY_DDL = """
+    CREATE TABLE bench_ticks_legacy (
+      time timestamptz NOT NULL,
+      asset_id integer NOT NULL,
+      price double precision NOT NULL,
+      volume double precision NOT NULL,
+      side varchar(8),
+      exchange_trade_id varchar(64),
+      received_at timestamptz,
+      ingest_source varchar(32),
+      is_aggregated boolean NOT NULL DEFAULT FALSE
+    )
+"""
+COMPACT_DDL = """
+    CREATE TABLE bench_ticks_compact (
+      time timestamptz NOT NULL,
+      asset_id integer NOT NULL,
+      price double precision NOT NULL,
+      volume double precision NOT NULL,
+      side_code smallint,
+      trade_id bigint,
+      source_id smallint,
+      is_aggregated boolean NOT NULL DEFAULT FALSE
+    )
+"""
+
+
+def _legacy_rows(n: int):
+    for i in range(n):
+        ts = START + timedelta(milliseconds=37 * i)
+        yield b"".join(
+            (
+                struct.pack(">hiqiiidid", 8, 8, pg_timestamp(ts), 4, i % ASSETS, 8, 50000 + (i % 1000) / 10, 8, 0.0015),
+                text_field("buy" if i % 2 else "sell"),
+                text_field(str(1_000_000_000 + i)),
+                struct.pack(">iq", 8, pg_timestamp(ts + timedelta(milliseconds=5))),
+                text_field("stream"),
+            )
+        )
+
+
+def _compact_rows(n: int):
+    for i in range(n):
+        ts = START + timedelta(milliseconds=37 * i)
+        yield b"".join(
+            (
+                struct.pack(">hiqiiidid", 7, 8, pg_timestamp(ts), 4, i % ASSETS, 8, 50000 + (i % 1000) / 10, 8, 0.0015),
+                struct.pack(">ih", 2, 1 if i % 2 else 2),
+                struct.pack(">iq", 8, 1_000_000_000 + i),
+                struct.pack(">ih", 2, 1),
+            )
+        )
+
+
+def _load(engine, table: str, ddl: str, columns: str, rows) -> dict:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(ddl))
+        conn.execute(text(f"SELECT create_hypertable('{table}', 'time', chunk_time_interval => INTERVAL '1 day')"))
+        conn.execute(
+            text(
+                f"ALTER TABLE {table} SET (timescaledb.compress, "
+                "timescaledb.compress_segmentby = 'asset_id', timescaledb.compress_orderby = 'time')"
+            )
+        )
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)",
+                io.BytesIO(HEADER + b"".join(rows) + TRAILER),
+            )
+        raw.commit()
+    finally:
+        raw.close()
+    with engine.begin() as conn:
+        count = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+        before = conn.execute(text(f"SELECT hypertable_size('{table}')")).scalar_one()
+        conn.execute(text(f"SELECT compress_chunk(c) FROM show_chunks('{table}') c"))
+        after = conn.execute(text(f"SELECT hypertable_size('{table}')")).scalar_one()
+        conn.execute(text(f"DROP TABLE {table}"))
+    return {
+        "table": table,
+        "rows": count,
+        "bytes_per_row": round(before / count, 1) if count else None,
+        "compressed_bytes_per_row": round(after / count, 1) if count else None,
+    }
+
+
+def run(row_count: int, database_url: str) -> list[dict]:
+    engine = create_engine(database_url)
+    try:
+        return [
+            _load(
+                engine,
+                "bench_ticks_legacy",
+                LEGACY_DDL,
+                "time, asset_id, price, volume, side, exchange_trade_id, received_at, ingest_source",
+                _legacy_rows(row_count),
+            ),
+            _load(
+                engine,
+                "bench_ticks_compact",
+                COMPACT_DDL,
+                "time, asset_id, price, volume, side_code, trade_id, source_id",
+                _compact_rows(row_count),
+            ),
+        ]
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    for row in run(args.rows, args.database_url):
+        print(
+            f"{row['table']:<20} rows={row['rows']:>10,}  "
+            f"raw={row['bytes_per_row']:>7} B/row  compressed={row['compressed_bytes_per_row']:>7} B/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
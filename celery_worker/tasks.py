@@ -6,7 +6,6 @@ from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 import ccxt.async_support as ccxt
-from sqlalchemy import func
 
 import app.models.portfolio  # noqa: F401
 from app.connectors.fundamental import CoinGeckoConnector
@@ -15,8 +14,10 @@ from app.models.paper import PaperAccount, PaperSchedule
 from app.models.research import AgentGuardrailProfile
 from app.models.user import User
 from celery_app import celery_app
+import database
 from database import session_scope
 from app.services.asset_status import classify_asset, update_asset_status
+from app.services.candle_cache import invalidate_markets
 from app.services.imports.download import (
     binance_vision_daily_url,
     build_download_spec,
@@ -27,6 +28,8 @@ from app.services.imports.download import (
 from app.services.imports.ingest import ingest_ticks
 from app.services.imports.registry import get_importer
 from app.services.paper_trading import PaperStepPayload, execute_paper_step
+from app.services import tick_aggregates
+from app.services.price_latest import get_latest, record_prices
 from app.services.market_resolution import (
     ResolvedMarket,
     is_unsupported_market_error,
@@ -82,6 +85,58 @@ def _normalize_dukascopy_symbol(symbol: str) -> str:
     return raw
 
 
+def _invalidate_candle_cache(markets) -> None:
+    """Drop cached candle buckets of markets whose history was just committed."""
+    markets = set(markets)
+    try:
+        invalidate_markets(markets)
+    except Exception as exc:
+        logger.warning("Candle cache invalidation failed for %s: %s", sorted(markets), exc)
+
+
+def _refresh_tick_aggregates(start: datetime | None, end: datetime | None) -> None:
+    """Materialize the tick aggregates over an imported range once it committed."""
+    if start is None or end is None:
+        return
+    try:
+        tick_aggregates.refresh(database.engine, start, end)
+    except Exception as exc:
+        logger.warning("Tick aggregate refresh failed for [%s, %s): %s", start, end, exc)
+
+
+def _day_range(days: list[date]) -> tuple[datetime | None, datetime | None]:
+    if not days:
+        return None, None
+    start = datetime.combine(min(days), datetime.min.time(), tzinfo=timezone.utc)
+    return start, datetime.combine(max(days), datetime.min.time(), tzinfo=timezone.utc) + timedelta(days=1)
+
+
+def _hour_range(hours: list[datetime]) -> tuple[datetime | None, datetime | None]:
+    if not hours:
+        return None, None
+    start = min(hours).replace(minute=0, second=0, microsecond=0)
+    return start, max(hours).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+
+def _after_tick_import(markets, start: datetime | None, end: datetime | None) -> None:
+    """Make committed tick imports visible: tick aggregates over their range, then the candle cache."""
+    _refresh_tick_aggregates(start, end)
+    _invalidate_candle_cache(markets)
+
+
+def _existing_price_timestamps(db, exchange: str, symbol: str, timestamps: list[datetime]) -> set[datetime]:
+    if not timestamps:
+        return set()
+    existing = set()
+    for (ts,) in db.query(Price.timestamp).filter(
+        Price.exchange == exchange,
+        Price.symbol == symbol,
+        Price.timestamp.in_(timestamps),
+    ):
+        existing.add(ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc))
+    return existing
+
+
 def _parse_coingecko_timestamp(value: str | None) -> datetime | None:
     if not value:
         return None
@@ -125,8 +180,14 @@ def ingest_historical_data(
     ohlcv = asyncio.run(fetch())
 
     with session_scope() as db:
-        for row in ohlcv:
-            ts = datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc)
+        rows = []
+        timestamps = [datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc) for row in ohlcv]
+        # Live 1m bars from the bar builder may already own some of these buckets.
+        existing = _existing_price_timestamps(db, exchange_key, symbol_db, timestamps)
+        for row, ts in zip(ohlcv, timestamps):
+            if ts in existing:
+                continue
+            existing.add(ts)
             price = Price(
                 symbol=symbol_db,
                 exchange=exchange_key,
@@ -138,7 +199,11 @@ def ingest_historical_data(
                 volume=row[5],
             )
             db.add(price)
-    return f"Successfully ingested {len(ohlcv)} data points for {symbol_db}"
+            rows.append({"exchange": exchange_key, "symbol": symbol_db, "timestamp": ts, "close": row[4]})
+        record_prices(db, rows, source="ingest")
+    if rows:
+        _invalidate_candle_cache([(exchange_key, symbol_db)])
+    return f"Successfully ingested {len(rows)} data points for {symbol_db}"
 
 
 @celery_app.task(bind=True, soft_time_limit=300, time_limit=360, max_retries=0)
@@ -335,6 +400,7 @@ def backfill_historical_candles(
     
     latest_ts = None
     with session_scope() as db:
+        inserted_rows = []
         for row in candles:
             ts = datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc)
             latest_ts = ts if latest_ts is None or ts > latest_ts else latest_ts
@@ -362,15 +428,12 @@ def backfill_historical_candles(
             )
             db.add(price)
             inserted += 1
+            inserted_rows.append({"exchange": exchange_key, "symbol": symbol_db, "timestamp": ts, "close": row[4]})
 
-        total_rows = db.query(Price).filter(
-            Price.exchange == exchange_key,
-            Price.symbol == symbol_db,
-        ).count()
-        latest_ts = db.query(func.max(Price.timestamp)).filter(
-            Price.exchange == exchange_key,
-            Price.symbol == symbol_db,
-        ).scalar()
+        record_prices(db, inserted_rows, source="backfill")
+        latest = get_latest(db, exchange_key, symbol_db)
+        total_rows = int(latest.row_count or 0) if latest else 0
+        latest_ts = latest.timestamp if latest else None
         update_asset_status(
             db,
             exchange=exchange_key,
@@ -382,6 +445,9 @@ def backfill_historical_candles(
             latest_candle_at=latest_ts,
             task_id=getattr(self.request, "id", None),
         )
+
+    if inserted:
+        _invalidate_candle_cache([(exchange_key, symbol_db)])
     
     result = {
         "status": "success",
@@ -464,6 +530,18 @@ def backfill_core_universe(
                 task_symbol = resolved.db_symbol
                 task_exchange = resolved.exchange
 
+            if settings.CORE_BACKFILL_FRESH_MINUTES > 0:
+                # Symbols fed by the live bar builder already have current 1m rows.
+                with session_scope() as db:
+                    latest = get_latest(db, task_exchange, task_symbol)
+                    newest = latest.timestamp if latest else None
+                if isinstance(newest, datetime):
+                    if newest.tzinfo is None:
+                        newest = newest.replace(tzinfo=timezone.utc)
+                    if datetime.now(timezone.utc) - newest < timedelta(minutes=settings.CORE_BACKFILL_FRESH_MINUTES):
+                        results.append({"symbol": task_symbol, "exchange": task_exchange, "status": "fresh"})
+                        continue
+
             result = backfill_historical_candles.delay(
                 symbol=task_symbol,
                 exchange_id=task_exchange,
@@ -621,6 +699,8 @@ def import_binance_vision_range(
     days = date_range(start, end)
 
     imported = 0
+    markets: set[tuple[str, str]] = set()
+    imported_days: list[date] = []
     total_days = max(1, len(days))
     registry_kind = "agg_trades" if kind == "aggTrades" else "trades"
     for idx, day in enumerate(days):
@@ -640,15 +720,19 @@ def import_binance_vision_range(
                     owner_id=owner_id,
                     ingest_source="binance_vision",
                 )
+            markets.add((importer.exchange, importer.symbol))
+            imported_days.append(day)
         except FileNotFoundError:
             logger.warning("Binance Vision file not found: %s", url)
         except Exception as exc:
             logger.exception("Binance Vision import failed: %s", exc)
+            _after_tick_import(markets, *_day_range(imported_days))
             raise
 
         progress = int(((idx + 1) / total_days) * 100)
         self.update_state(state="PROGRESS", meta={"progress": progress, "days": len(days)})
 
+    _after_tick_import(markets, *_day_range(imported_days))
     return {"status": "success", "imported": imported, "days": len(days)}
 
 
@@ -700,6 +784,8 @@ def import_dukascopy_range(
         raise ValueError("symbol must be BASE-QUOTE (e.g. BTC-USD) or include a known quote suffix")
 
     imported = 0
+    markets: set[tuple[str, str]] = set()
+    imported_hours: list[datetime] = []
     total_hours = int(((end - start).total_seconds() // 3600) + 1)
     current = start
     processed = 0
@@ -730,10 +816,13 @@ def import_dukascopy_range(
                     owner_id=owner_id,
                     ingest_source="dukascopy",
                 )
+            markets.add((importer.exchange, importer.symbol))
+            imported_hours.append(current)
         except FileNotFoundError:
             logger.warning("Dukascopy file not found: %s", url)
         except Exception as exc:
             logger.exception("Dukascopy import failed: %s", exc)
+            _after_tick_import(markets, *_hour_range(imported_hours))
             raise
 
         processed += 1
@@ -741,6 +830,7 @@ def import_dukascopy_range(
         self.update_state(state="PROGRESS", meta={"progress": progress, "hours": total_hours})
         current += timedelta(hours=1)
 
+    _after_tick_import(markets, *_hour_range(imported_hours))
     return {"status": "success", "imported": imported, "hours": total_hours}
 
 
@@ -1,3 +1,8 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from contextlib import contextmanager
@@ -6,40 +11,154 @@ from app.config import settings
 Base = declarative_base()
 engine = None
 SessionLocal = None
+# Dashboard reads (read replica, or the analytics pool) and heavy analytical
+# reads get their own pools so they cannot exhaust the connections that paper
+# trading, crew audit inserts and auth need on the primary.
+read_engine = None
+ReadSessionLocal = None
+analytics_engine = None
+AnalyticsSessionLocal = None
+_db_executor = None
 
-def init_db():
-    global engine
-    global SessionLocal
-    engine = create_engine(
-        settings.DATABASE_URL,
+
+def _create_engine(url: str, *, role: str, pool_size: int, max_overflow: int, statement_timeout_ms: int):
+    options = {}
+    if not url.startswith("sqlite"):
+        options = {"pool_size": pool_size, "max_overflow": max_overflow}
+    if url.startswith("postgresql"):
+        pg_options = f"-c application_name=cryptoinsight-{role}"
+        if statement_timeout_ms > 0:
+            pg_options += f" -c statement_timeout={statement_timeout_ms}"
+        options["connect_args"] = {"options": pg_options}
+    return create_engine(
+        url,
         pool_pre_ping=True,
         echo=False,  # Set to True to see generated SQL
+        **options,
     )
-    SessionLocal = sessionmaker(
+
+
+def _sessionmaker(bind):
+    return sessionmaker(
         autocommit=False,
         autoflush=False,
-        bind=engine
+        bind=bind
     )
 
 
-def get_db():
+def init_db():
+    global engine, SessionLocal
+    global read_engine, ReadSessionLocal
+    global analytics_engine, AnalyticsSessionLocal
+    engine = _create_engine(
+        settings.DATABASE_URL,
+        role="primary",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        statement_timeout_ms=settings.DB_STATEMENT_TIMEOUT_MS,
+    )
+    SessionLocal = _sessionmaker(engine)
+
+    analytics_options = dict(
+        pool_size=settings.DB_ANALYTICS_POOL_SIZE,
+        max_overflow=settings.DB_ANALYTICS_MAX_OVERFLOW,
+        statement_timeout_ms=settings.DB_ANALYTICS_STATEMENT_TIMEOUT_MS,
+    )
+    analytics_url = settings.DATABASE_ANALYTICS_URL or settings.DATABASE_READ_URL or settings.DATABASE_URL
+    if analytics_url.startswith("sqlite") and analytics_url == settings.DATABASE_URL:
+        # No pool to protect, and an in-memory database only exists on its own engine.
+        analytics_engine = engine
+    else:
+        analytics_engine = _create_engine(analytics_url, role="analytics", **analytics_options)
+    AnalyticsSessionLocal = _sessionmaker(analytics_engine)
+
+    read_url = settings.DATABASE_READ_URL
+    if read_url and read_url != analytics_url:
+        read_engine = _create_engine(read_url, role="read", **analytics_options)
+    else:
+        read_engine = analytics_engine
+    ReadSessionLocal = _sessionmaker(read_engine)
+
+
+def _session_factory(role: str):
     if SessionLocal is None:
         init_db()
-    db = SessionLocal()
+    factory = {"read": ReadSessionLocal, "analytics": AnalyticsSessionLocal}.get(role)
+    return factory or SessionLocal
+
+
+def get_db():
+    """Primary session: writes and read-your-writes paths (orders, crew, auth)."""
+    db = _session_factory("primary")()
     try:
         yield db
     finally:
         db.close()
 
 
+def get_read_db():
+    """
+    Read-only dashboard session. Served by DATABASE_READ_URL when configured,
+    otherwise by the analytics pool; may lag the primary by replication delay.
+    """
+    db = _session_factory("read")()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_analytics_db():
+    """Read-only session for heavy scans (coverage, gaps, batch signals, walk-forward loads)."""
+    db = _session_factory("analytics")()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def db_thread_count() -> int:
+    """
+    DB_THREADS, or when it is 0 the capacity of the smallest connection pool
+    `run_db` work can check out from (primary, or the read/analytics pool most
+    handlers use), so a thread never waits on a pool checkout.
+    """
+    if settings.DB_THREADS > 0:
+        return settings.DB_THREADS
+    return max(
+        1,
+        min(
+            settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+            settings.DB_ANALYTICS_POOL_SIZE + settings.DB_ANALYTICS_MAX_OVERFLOW,
+        ),
+    )
+
+
+async def run_db(fn, /, *args, **kwargs):
+    """
+    `asyncio.to_thread` for blocking database work in async handlers.
+
+    Runs on a dedicated pool of `db_thread_count()` threads, so slow queries
+    queue up there instead of stalling the event loop or starving the default
+    executor used for HTTP connectors. A session may be handed to it but must
+    not be used concurrently from the event loop meanwhile.
+    """
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(max_workers=db_thread_count(), thread_name_prefix="db")
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_db_executor, call)
+
+
 @contextmanager
-def session_scope():
+def session_scope(role: str = "primary"):
     """
     Provide a transactional scope around a series of operations.
+
+    `role` picks the pool: "primary" (default), "read" or "analytics".
     """
-    if SessionLocal is None:
-        init_db()
-    session = SessionLocal()
+    session = _session_factory(role)()
     try:
         yield session
         session.commit()
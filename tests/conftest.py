@@ -15,7 +15,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from app.config import settings  # noqa: E402
 from app.auth import create_access_token, get_password_hash  # noqa: E402
 from app.main import create_app, get_coingecko_connector, get_db  # noqa: E402
-from database import Base  # noqa: E402
+from database import Base, get_analytics_db, get_read_db  # noqa: E402
 import app.models.backtest  # noqa: F401,E402
 import app.models.imports  # noqa: F401,E402
 import app.models.instrument  # noqa: F401,E402
@@ -60,9 +60,12 @@ def db_session(test_engine):
 
     # Patch the global SessionLocal so that any code importing usage sees this one
     with patch("database.SessionLocal", TestingSessionLocal), \
+         patch("database.ReadSessionLocal", TestingSessionLocal), \
+         patch("database.AnalyticsSessionLocal", TestingSessionLocal), \
          patch("database.init_db", return_value=None), \
          patch("database.engine", test_engine), \
-         patch("app.redis_client.redis_client", mock_redis):
+         patch("app.redis_client.redis_client", mock_redis), \
+         patch.object(settings, "CANDLE_CACHE_TTL_SECONDS", 0):
         session = TestingSessionLocal()
         try:
             yield session
@@ -81,6 +84,8 @@ def client(db_session, request):
 
     app = create_app()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_analytics_db] = override_get_db
 
     if hasattr(request, "param"):
         for mock_name, mock_fixture in request.param.items():
@@ -145,3 +145,27 @@ def test_alembic_upgrade_head_on_clean_timescale(clean_timescale_url: str) -> No
     )
 
     assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_latest_rows_are_ordered_index_scans(clean_timescale_url: str) -> None:
+    conn = psycopg2.connect(clean_timescale_url.replace("+psycopg2", ""))
+    try:
+        with conn.cursor() as cur:
+            # An empty hypertable has no chunks to plan against.
+            cur.execute("INSERT INTO prices (exchange, symbol, timestamp) VALUES ('coinbase', 'BTC-USD', now())")
+            cur.execute(
+                "INSERT INTO market_trades (exchange, symbol, timestamp, price, amount) "
+                "VALUES ('coinbase', 'BTC-USD', now(), 1, 1)"
+            )
+            cur.execute("SET enable_seqscan = off")
+            for table in ("prices", "market_trades"):
+                cur.execute(
+                    f"EXPLAIN SELECT * FROM {table} WHERE exchange = 'coinbase' AND symbol = 'BTC-USD' "
+                    "ORDER BY timestamp DESC LIMIT 500"
+                )
+                plan = "\n".join(row[0] for row in cur.fetchall())
+                assert "_exchange_symbol_" in plan, plan
+                assert "Sort" not in plan, plan
+    finally:
+        conn.rollback()
+        conn.close()
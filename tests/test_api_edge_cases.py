@@ -10,6 +10,7 @@ from app.main import (
     get_db,
     get_news_connector,
 )
+from database import get_read_db
 
 
 @pytest.fixture
@@ -21,6 +22,7 @@ def edge_client():
 
     app = create_app()
     app.dependency_overrides[get_db] = lambda: mock_db
+    app.dependency_overrides[get_read_db] = lambda: mock_db
     app.dependency_overrides[get_news_connector] = lambda: mock_news
     app.dependency_overrides[get_coingecko_connector] = lambda: mock_cg
     app.dependency_overrides[get_coinmarketcap_connector] = lambda: mock_cmc
@@ -0,0 +1,96 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.ticks import Asset
+from app.services.asset_registry import (
+    INVALIDATE_CHANNEL,
+    AssetRegistry,
+    asset_key,
+    listen_for_invalidations,
+    publish_invalidation,
+)
+
+
+def test_asset_key_is_canonical():
+    assert asset_key(" Kraken ", "btc/usd") == ("kraken", "BTC-USD")
+
+
+def test_get_or_create_inserts_once_and_serves_from_memory(db_session):
+    registry = AssetRegistry()
+
+    asset_id = registry.get_or_create(db_session, "kraken", "BTC-USD")
+    assert registry.get_or_create(db_session, "KRAKEN", "btc/usd") == asset_id
+    db_session.commit()
+
+    asset = db_session.query(Asset).one()
+    assert (asset.id, asset.base, asset.quote) == (asset_id, "BTC", "USD")
+    queries = MagicMock(side_effect=AssertionError("no query expected"))
+    db_session.query = queries
+    assert registry.lookup(db_session, "kraken", "BTC-USD") == asset_id
+    assert (registry.hits, registry.misses) == (2, 1)
+
+
+def test_rolled_back_asset_is_not_shared(db_session):
+    registry = AssetRegistry()
+
+    registry.get_or_create(db_session, "kraken", "ETH-USD")
+    db_session.rollback()
+
+    assert registry.lookup(db_session, "kraken", "ETH-USD") is None
+    asset_id = registry.get_or_create(db_session, "kraken", "ETH-USD")
+    db_session.commit()
+    assert registry.lookup(db_session, "kraken", "ETH-USD") == asset_id
+
+
+def test_warm_loads_all_assets_and_invalidate_forgets_them(db_session):
+    db_session.add_all(
+        [
+            Asset(exchange="kraken", symbol="BTC-USD", base="BTC", quote="USD", active=True),
+            Asset(exchange="coinbase", symbol="BTC-USD", base="BTC", quote="USD", active=True),
+        ]
+    )
+    db_session.commit()
+    registry = AssetRegistry()
+
+    assert registry.warm(db_session) == 2
+    assert registry.lookup(db_session, "coinbase", "BTC-USD") is not None
+    assert registry.misses == 0
+
+    registry.invalidate(exchange="kraken")
+    registry.lookup(db_session, "kraken", "BTC-USD")
+    registry.lookup(db_session, "coinbase", "BTC-USD")
+    assert registry.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidations_are_published_and_applied(db_session, monkeypatch):
+    registry = AssetRegistry()
+    asset_id = registry.get_or_create(db_session, "kraken", "BTC-USD")
+    db_session.commit()
+
+    redis = MagicMock()
+    redis.publish = AsyncMock()
+    monkeypatch.setattr("app.services.asset_registry.asset_registry", registry)
+    await publish_invalidation(redis, exchange="Kraken", symbol="btc/usd")
+    channel, payload = redis.publish.call_args.args
+    assert channel == INVALIDATE_CHANNEL
+    assert json.loads(payload) == {"exchange": "kraken", "symbol": "BTC-USD"}
+
+    assert registry.lookup(db_session, "kraken", "BTC-USD") == asset_id
+    assert registry.misses == 2
+
+    async def messages():
+        yield {"type": "subscribe", "data": 1}
+        yield {"type": "message", "data": json.dumps({"exchange": None, "symbol": None}).encode()}
+
+    pubsub = MagicMock()
+    pubsub.subscribe = AsyncMock()
+    pubsub.listen = messages
+    redis.pubsub.return_value = pubsub
+    await listen_for_invalidations(redis, registry)
+
+    pubsub.subscribe.assert_awaited_once_with(INVALIDATE_CHANNEL)
+    registry.lookup(db_session, "kraken", "BTC-USD")
+    assert registry.misses == 3
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.services.bucketing import as_float, bucket_ohlcv, columns, epoch_ns, missing_buckets
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _loop_ohlcv(rows, bucket_seconds):
+    buckets = {}
+    for ts, price, volume in rows:
+        epoch = int(ts.timestamp() // bucket_seconds) * bucket_seconds
+        item = buckets.get(epoch)
+        if item is None:
+            buckets[epoch] = [price, price, price, price, volume, 1]
+            continue
+        item[1] = max(item[1], price)
+        item[2] = min(item[2], price)
+        item[3] = price
+        item[4] += volume
+        item[5] += 1
+    return buckets
+
+
+def test_bucket_ohlcv_matches_a_row_loop():
+    rng = np.random.default_rng(7)
+    offsets = np.sort(rng.uniform(-120, 3600, 5000))
+    rows = [
+        (T0 + timedelta(seconds=float(offset)), float(price), float(volume))
+        for offset, price, volume in zip(offsets, rng.uniform(90, 110, 5000), rng.uniform(0, 2, 5000))
+    ]
+    times, prices, volumes = columns(rows, 3)
+
+    buckets = bucket_ohlcv(epoch_ns(times), *(as_float(prices),) * 4, as_float(volumes), 60)
+    expected = _loop_ohlcv(rows, 60)
+
+    assert [ns // 1_000_000_000 for ns in buckets.start_ns.tolist()] == sorted(expected)
+    for index, epoch in enumerate(sorted(expected)):
+        open_p, high, low, close, volume, trades = expected[epoch]
+        ohlc = (buckets.open[index], buckets.high[index], buckets.low[index], buckets.close[index])
+        assert ohlc == (open_p, high, low, close)
+        assert buckets.volume[index] == pytest.approx(volume)
+        assert buckets.trades[index] == trades
+    assert buckets.candles().timestamps()[0] == (T0 - timedelta(minutes=2)).isoformat()
+
+
+def test_naive_times_are_utc_and_nulls_are_filled():
+    times, closes, opens = columns([(T0.replace(tzinfo=None), 2.0, None), (T0, None, 1.0)], 3)
+
+    assert epoch_ns(times).tolist() == [int(T0.timestamp()) * 1_000_000_000] * 2
+    close = as_float(closes)
+    assert close.tolist() == [2.0, 0.0]
+    assert as_float(opens, close).tolist() == [2.0, 1.0]
+
+
+def test_missing_buckets():
+    times = epoch_ns([T0 + timedelta(seconds=s) for s in (0, 1, 62, 240)])
+
+    missing = missing_buckets(times, start_dt=T0, end_dt=T0 + timedelta(minutes=5), bucket_seconds=60)
+
+    assert missing == [T0 + timedelta(minutes=2), T0 + timedelta(minutes=3), T0 + timedelta(minutes=5)]
+    assert len(missing_buckets(epoch_ns([]), start_dt=T0, end_dt=T0 + timedelta(minutes=1), bucket_seconds=60)) == 2
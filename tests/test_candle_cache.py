@@ -0,0 +1,169 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.models.ticks import Asset, Tick
+from app.services.bucketing import CANDLE_FIELDS, Columns
+from app.services.candle_cache import CachedBuckets, CandleCache, market_key, pack, unpack
+from app.services.candle_planner import load_candle_columns
+from app.writer import METRICS_KEY
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def hset(self, key, field, value):
+        self._commands.append(lambda: self._redis.hashes.setdefault(key, {}).__setitem__(field, value))
+
+    def expire(self, key, seconds):
+        self._commands.append(lambda: self._redis.expiry.__setitem__(key, seconds))
+
+    async def execute(self):
+        for command in self._commands:
+            command()
+
+
+class _Redis:
+    def __init__(self):
+        self.hashes: dict[str, dict[str, bytes]] = {}
+        self.expiry: dict[str, int] = {}
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+
+def _ticks(db_session, minutes: range, origin: datetime = T0) -> None:
+    asset = Asset(symbol="BTC-USD", exchange="coinbase", base="BTC", quote="USD", active=True)
+    db_session.add(asset)
+    db_session.flush()
+    for minute in minutes:
+        for second in (0, 30):
+            db_session.add(
+                Tick(
+                    asset_id=asset.id,
+                    time=origin + timedelta(minutes=minute, seconds=second),
+                    price=100.0 + minute + second / 100,
+                    volume=1.0,
+                )
+            )
+    db_session.commit()
+
+
+def _assert_same(columns: Columns, expected: Columns) -> None:
+    assert columns.times_ns.tolist() == expected.times_ns.tolist()
+    for name in CANDLE_FIELDS:
+        assert columns.values[name].tolist() == expected.values[name].tolist()
+
+
+@pytest.mark.asyncio
+async def test_repeated_window_reads_closed_buckets_and_queries_the_tail(db_session):
+    _ticks(db_session, range(-30, 90))
+    redis = _Redis()
+    cache = CandleCache(redis, ttl_seconds=3600, max_buckets=1000, settle_seconds=60)
+
+    first, plan, info = await cache.load(db_session, "candles", "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=60), 60)
+    assert info == {"cached_buckets": 0, "queries": 1}
+    assert plan.source == "ticks"
+    assert list(redis.hashes[market_key("coinbase", "BTC-USD")]) == ["candles:60:ticks"]
+
+    again, _, info = await cache.load(db_session, "candles", "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=60), 60)
+    assert info == {"cached_buckets": 60, "queries": 1}
+    _assert_same(again, first)
+
+    # Wider window: one query before and one after the cached hour.
+    start, end = T0 - timedelta(minutes=30), T0 + timedelta(minutes=90)
+    wide, _, info = await cache.load(db_session, "candles", "coinbase", "BTC-USD", start, end, 60)
+    assert info == {"cached_buckets": 60, "queries": 2}
+    expected, _ = load_candle_columns(db_session, "coinbase", "BTC-USD", start, end, 60)
+    _assert_same(wide, expected)
+
+    entry = unpack(redis.hashes[market_key("coinbase", "BTC-USD")]["candles:60:ticks"], CANDLE_FIELDS)
+    assert (entry.start_ns, entry.end_ns) == (int(start.timestamp()) * 10**9, int(end.timestamp()) * 10**9)
+
+
+@pytest.mark.asyncio
+async def test_entries_are_bounded_by_size_and_age(db_session):
+    _ticks(db_session, range(0, 60))
+    redis = _Redis()
+    cache = CandleCache(redis, ttl_seconds=3600, max_buckets=10, settle_seconds=60)
+    key = market_key("coinbase", "BTC-USD")
+
+    await cache.load(db_session, "series", "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=60), 60)
+    entry = unpack(redis.hashes[key]["series:60:ticks"], ("price", "volume", "trades"))
+    assert len(entry.columns) == 10
+    assert entry.start_ns == int((T0 + timedelta(minutes=50)).timestamp()) * 10**9
+    assert redis.expiry[key] == 3600
+
+    points, _, info = await cache.load(db_session, "series", "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=60), 60)
+    assert info == {"cached_buckets": 10, "queries": 2}
+    assert points.values["price"][0] == pytest.approx(100.15)
+
+    # An entry older than the TTL is ignored and rebuilt.
+    redis.hashes[key]["series:60:ticks"] = pack(
+        CachedBuckets(entry.start_ns, entry.end_ns, entry.written_ns - 7200 * 10**9, entry.columns)
+    )
+    _, _, info = await cache.load(db_session, "series", "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=60), 60)
+    assert info == {"cached_buckets": 0, "queries": 1}
+
+    await cache.invalidate("coinbase", "BTC-USD")
+    assert key not in redis.hashes
+
+
+def test_pack_round_trip():
+    columns = Columns(
+        np.array([0, 60 * 10**9], dtype=np.int64),
+        {name: np.array([1, 2], dtype=np.int64 if name == "trades" else np.float64) for name in CANDLE_FIELDS},
+    )
+    raw = pack(CachedBuckets(0, 120 * 10**9, 5, columns))
+
+    entry = unpack(raw, CANDLE_FIELDS)
+    assert (entry.start_ns, entry.end_ns, entry.written_ns) == (0, 120 * 10**9, 5)
+    assert entry.columns.values["trades"].tolist() == [1, 2]
+    assert entry.columns.records()[1]["close"] == 2.0
+
+    with pytest.raises(ValueError):
+        unpack(raw[:-8], CANDLE_FIELDS)
+
+
+@pytest.mark.asyncio
+async def test_writer_lag_holds_back_recent_buckets(db_session):
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(minutes=30)
+    _ticks(db_session, range(0, 31), origin=start)
+    redis = _Redis()
+    redis.hashes[METRICS_KEY] = {
+        b"market_trades": json.dumps({"oldest_pending_age_seconds": 5.0, "checked_at": time.time()}).encode()
+    }
+    cache = CandleCache(redis, ttl_seconds=3600, max_buckets=1000, settle_seconds=60)
+
+    await cache.load(db_session, "candles", "coinbase", "BTC-USD", start, now, 60)
+    entry = unpack(redis.hashes[market_key("coinbase", "BTC-USD")]["candles:60:ticks"], CANDLE_FIELDS)
+    assert entry.end_ns <= time.time_ns() - 60 * 10**9
+
+    # A writer 20 minutes behind keeps those minutes out of the cache.
+    redis.hashes.pop(market_key("coinbase", "BTC-USD"))
+    redis.hashes[METRICS_KEY][b"market_trades"] = json.dumps(
+        {"oldest_pending_age_seconds": 1200.0, "checked_at": time.time()}
+    ).encode()
+    cache = CandleCache(redis, ttl_seconds=3600, max_buckets=1000, settle_seconds=60)
+
+    await cache.load(db_session, "candles", "coinbase", "BTC-USD", start, now, 60)
+    entry = unpack(redis.hashes[market_key("coinbase", "BTC-USD")]["candles:60:ticks"], CANDLE_FIELDS)
+    assert entry.end_ns <= time.time_ns() - 1200 * 10**9
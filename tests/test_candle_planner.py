@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app.models.instrument import Price
+from app.models.market import MarketTrade
+from app.models.ticks import Asset, Tick
+from app.services.candle_planner import load_candles, load_series
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _statements(db_session):
+    statements: list[str] = []
+
+    @event.listens_for(db_session.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+def _ticks(db_session, symbol: str, minutes: range) -> None:
+    asset = Asset(symbol=symbol, exchange="coinbase", base=symbol.split("-")[0], quote="USD", active=True)
+    db_session.add(asset)
+    db_session.flush()
+    for minute in minutes:
+        db_session.add(Tick(asset_id=asset.id, time=T0 + timedelta(minutes=minute), price=100.0 + minute, volume=1.0))
+
+
+def _prices(db_session, symbol: str, minutes: range) -> None:
+    for minute in minutes:
+        db_session.add(
+            Price(
+                exchange="coinbase",
+                symbol=symbol,
+                timestamp=T0 + timedelta(minutes=minute),
+                open=1.0,
+                high=2.0,
+                low=0.5,
+                close=1.5,
+                volume=3.0,
+            )
+        )
+
+
+def test_empty_range_costs_only_the_coverage_lookup(db_session):
+    statements = _statements(db_session)
+
+    candles, plan = load_candles(db_session, "coinbase", "BTC-USD", T0, T0 + timedelta(hours=1), 60)
+
+    assert candles == []
+    assert plan.source == "none"
+    # One statement reads the coverage of every source; no bucket query runs.
+    data = [s for s in statements if any(table in s for table in ("prices", "market_trades", "ticks"))]
+    assert len(data) == 1
+
+
+def test_cheapest_source_that_covers_the_range_wins(db_session):
+    # Ticks only cover the last five minutes, bars cover the whole hour.
+    _ticks(db_session, "BTC-USD", range(55, 60))
+    _prices(db_session, "BTC-USD", range(60))
+    # Both cover the whole hour: ticks are preferred.
+    _ticks(db_session, "ETH-USD", range(60))
+    _prices(db_session, "ETH-USD", range(60))
+    db_session.commit()
+
+    candles, plan = load_candles(db_session, "coinbase", "BTC-USD", T0, T0 + timedelta(minutes=59), 300)
+    assert plan.source == "prices"
+    assert len(candles) == 12
+    assert candles[0] == {
+        "timestamp": T0.isoformat(),
+        "open": 1.0,
+        "high": 2.0,
+        "low": 0.5,
+        "close": 1.5,
+        "volume": 15.0,
+        "trades": 5,
+    }
+
+    candles, plan = load_candles(db_session, "coinbase", "ETH-USD", T0, T0 + timedelta(minutes=59), 300)
+    assert plan.source == "ticks"
+    assert plan.method == "python"
+    assert candles[0]["open"] == 100.0 and candles[0]["close"] == 104.0
+    assert plan.to_dict()["coverage"]["ticks"]["earliest"] == T0.isoformat()
+
+
+def test_series_replans_when_cached_coverage_is_stale(db_session):
+    points, plan = load_series(db_session, "coinbase", "SOL-USD", T0, T0 + timedelta(minutes=1), 10)
+    assert points == [] and plan.source == "none"
+
+    db_session.add(MarketTrade(exchange="coinbase", symbol="SOL-USD", timestamp=T0, price=10, amount=2, side="buy"))
+    db_session.add(MarketTrade(exchange="coinbase", symbol="SOL-USD", timestamp=T0, price=12, amount=1, side="sell"))
+    db_session.commit()
+
+    points, plan = load_series(db_session, "coinbase", "SOL-USD", T0, T0 + timedelta(minutes=1), 10)
+    assert plan.source == "market_trades"
+    assert points == [{"timestamp": T0.isoformat(), "price": 11.0, "volume": 3.0, "trades": 2}]
+
+
+def test_candles_response_reports_the_plan(client, db_session):
+    _prices(db_session, "ADA-USD", range(10))
+    db_session.commit()
+
+    resp = client.get(
+        "/api/market/candles/coinbase/ADA-USD",
+        params={"start": T0.isoformat(), "end": (T0 + timedelta(minutes=10)).isoformat(), "timeframe": "1m"},
+    )
+
+    assert resp.status_code == 200
+    plan = resp.json()["plan"]
+    assert plan["source"] == "prices"
+    assert plan["relation"] == "prices"
+    assert plan["bucket_seconds"] == 60
@@ -1,6 +1,6 @@
 import pytest
 from types import SimpleNamespace
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from celery_worker.tasks import backfill_core_universe, ingest_historical_data
 
 @patch("celery_worker.tasks.backfill_historical_candles")
@@ -50,3 +50,81 @@ def test_ingest_historical_data_mock():
             # Assert it raises the network error
             with pytest.raises(Exception):
                 ingest_historical_data("BTC/USDT", "1h", 100, "binance")
+
+
+def test_ingest_historical_data_drops_cached_candles():
+    exchange = MagicMock()
+    exchange.parse_timeframe.return_value = 60
+    exchange.milliseconds.return_value = 1_700_000_000_000
+    exchange.fetch_ohlcv = AsyncMock(return_value=[[1_700_000_000_000, 1.0, 2.0, 0.5, 1.5, 10.0]])
+    exchange.close = AsyncMock()
+
+    with patch("celery_worker.tasks.session_scope") as mock_scope, patch(
+        "celery_worker.tasks.ccxt"
+    ) as mock_ccxt, patch("celery_worker.tasks.record_prices"), patch(
+        "celery_worker.tasks.invalidate_markets"
+    ) as invalidate:
+        mock_scope.return_value.__enter__.return_value = MagicMock()
+        mock_ccxt.coinbase.return_value = exchange
+
+        ingest_historical_data("BTC-USD", "1m", 1, "coinbase")
+
+    invalidate.assert_called_once_with({("coinbase", "BTC-USD")})
+
+
+def test_ingest_historical_data_skips_buckets_the_bar_builder_wrote(db_session):
+    from contextlib import contextmanager
+    from datetime import datetime, timezone
+
+    from app.models.instrument import Price
+
+    ts = datetime.fromtimestamp(1_700_000_000, tz=timezone.utc)
+    db_session.add(Price(exchange="coinbase", symbol="BTC-USD", timestamp=ts, open=1, high=1, low=1, close=1, volume=1))
+    db_session.commit()
+    exchange = MagicMock()
+    exchange.parse_timeframe.return_value = 60
+    exchange.milliseconds.return_value = 1_700_000_120_000
+    exchange.fetch_ohlcv = AsyncMock(
+        return_value=[[1_700_000_000_000, 2.0, 2.0, 2.0, 2.0, 2.0], [1_700_000_060_000, 3.0, 3.0, 3.0, 3.0, 3.0]]
+    )
+    exchange.close = AsyncMock()
+
+    @contextmanager
+    def scope():
+        yield db_session
+        db_session.commit()
+
+    with patch("celery_worker.tasks.session_scope", scope), patch("celery_worker.tasks.ccxt") as mock_ccxt, patch(
+        "celery_worker.tasks.record_prices"
+    ) as record, patch("celery_worker.tasks.invalidate_markets"):
+        mock_ccxt.coinbase.return_value = exchange
+        result = ingest_historical_data("BTC-USD", "1m", 2, "coinbase")
+
+    assert result == "Successfully ingested 1 data points for BTC-USD"
+    assert [row["close"] for row in record.call_args.args[1]] == [3.0]
+    assert [p.close for p in db_session.query(Price).order_by(Price.timestamp)] == [1.0, 3.0]
+
+
+def test_dukascopy_import_refreshes_tick_aggregates_over_imported_hours():
+    from datetime import datetime, timezone
+
+    from celery_worker import tasks
+
+    importer = SimpleNamespace(exchange="dukascopy", symbol="EUR-USD")
+    with patch("celery_worker.tasks.session_scope"), patch("celery_worker.tasks.download_file"), patch(
+        "celery_worker.tasks.get_importer", return_value=importer
+    ), patch("celery_worker.tasks.ingest_ticks", return_value=5), patch(
+        "celery_worker.tasks.invalidate_markets"
+    ) as invalidate, patch("celery_worker.tasks.tick_aggregates.refresh") as refresh, patch.object(
+        tasks.import_dukascopy_range, "update_state"
+    ):
+        result = tasks.import_dukascopy_range(
+            "EUR-USD", start_datetime="2024-01-01T10:30:00Z", end_datetime="2024-01-01T11:30:00Z"
+        )
+
+    assert result["imported"] == 10
+    assert refresh.call_args.args[1:] == (
+        datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+        datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+    )
+    invalidate.assert_called_once_with({("dukascopy", "EUR-USD")})
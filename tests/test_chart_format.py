@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.models.instrument import Price
+from app.services import chart_format
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+T0_MS = int(T0.timestamp()) * 1000
+
+
+class FakeRedisCache:
+    def __init__(self):
+        self.store: dict[str, str] = {}
+
+    async def get(self, key: str):
+        return self.store.get(key)
+
+    async def setex(self, key: str, ttl: int, value: str):
+        self.store[key] = value
+        return True
+
+    async def publish(self, channel: str, payload: str):
+        return 1
+
+
+def _prices(db_session, count: int) -> None:
+    for minute in range(count):
+        db_session.add(
+            Price(
+                exchange="coinbase",
+                symbol="BTC-USD",
+                timestamp=T0 + timedelta(minutes=minute),
+                open=1.0,
+                high=2.0,
+                low=0.5,
+                close=100.0 + minute,
+                volume=3.0,
+            )
+        )
+    db_session.commit()
+
+
+def _candles(client, **kwargs):
+    params = {"start": T0.isoformat(), "end": (T0 + timedelta(minutes=2)).isoformat(), "timeframe": "1m"}
+    return client.get("/api/market/candles/coinbase/BTC-USD", params={**params, **kwargs.pop("params", {})}, **kwargs)
+
+
+def test_candles_in_every_encoding(client, db_session):
+    _prices(db_session, 3)
+
+    rows = _candles(client).json()
+    assert [c["close"] for c in rows["candles"]] == [100.0, 101.0, 102.0]
+
+    columnar = _candles(client, params={"format": "columnar"}).json()
+    assert columnar["format"] == "columnar"
+    assert columnar["candles"]["timestamp"] == [T0_MS, T0_MS + 60_000, T0_MS + 120_000]
+    assert columnar["candles"]["close"] == [100.0, 101.0, 102.0]
+    assert columnar["candles"]["trades"] == [1, 1, 1]
+    assert columnar["plan"] == rows["plan"]
+
+    packed = _candles(client, headers={"Accept": "application/octet-stream"})
+    assert packed.headers["content-type"] == "application/octet-stream"
+    names = packed.headers["x-columns"].split(",")
+    assert names == ["timestamp", "open", "high", "low", "close", "volume", "trades"]
+    values = np.frombuffer(packed.content, dtype="<f8").reshape(len(names), int(packed.headers["x-rows"]))
+    assert values[names.index("timestamp")].tolist() == [T0_MS, T0_MS + 60_000, T0_MS + 120_000]
+    assert values[names.index("close")].tolist() == [100.0, 101.0, 102.0]
+    assert '"symbol":"BTC-USD"' in packed.headers["x-chart-meta"]
+
+    assert _candles(client, params={"format": "csv"}).status_code == 400
+
+
+def test_arrow_needs_pyarrow(client, db_session):
+    _prices(db_session, 3)
+
+    resp = _candles(client, headers={"Accept": chart_format.ARROW_MEDIA_TYPE})
+
+    if chart_format._pa is None:
+        assert resp.status_code == 406
+        return
+    table = chart_format._pa.ipc.open_stream(resp.content).read_all()
+    assert table.column("close").to_pylist() == [100.0, 101.0, 102.0]
+
+
+def test_analysis_columnar_is_cached_per_encoding(client, db_session):
+    _prices(db_session, 60)
+    cache = FakeRedisCache()
+
+    def fake_add_technical_indicators(df):
+        result = df.copy()
+        result["rsi"] = 55.0
+        return result
+
+    with patch("app.main.redis_client", cache), patch(
+        "app.main.add_technical_indicators",
+        side_effect=fake_add_technical_indicators,
+    ) as mock_analysis:
+        rows = client.get("/api/coin/BTC-USD/analysis", params={"exchange": "coinbase"})
+        columnar = client.get("/api/coin/BTC-USD/analysis", params={"exchange": "coinbase", "format": "columnar"})
+        again = client.get("/api/coin/BTC-USD/analysis", params={"exchange": "coinbase", "format": "columnar"})
+        packed = client.get(
+            "/api/coin/BTC-USD/analysis",
+            params={"exchange": "coinbase"},
+            headers={"Accept": "application/octet-stream"},
+        )
+
+    assert mock_analysis.call_count == 2
+    assert len(rows.json()["data"]) == 60
+    data = columnar.json()["data"]
+    assert data["timestamp"][0] == T0_MS and data["rsi"] == [55.0] * 60
+    assert again.content == columnar.content
+    assert packed.headers["x-rows"] == "60"
+    assert '"calculated_at"' in packed.headers["x-chart-meta"]
+
+
+def test_dumps_writes_numpy_columns():
+    payload = {"data": {"timestamp": np.array([1, 2], dtype=np.int64), "close": np.array([1.5, 2.5])}}
+
+    assert chart_format.dumps(payload) == b'{"data":{"timestamp":[1,2],"close":[1.5,2.5]}}'
+
+
+@pytest.mark.parametrize(
+    ("format", "accept", "expected"),
+    [
+        (None, None, "rows"),
+        ("COLUMNAR", "application/json", "columnar"),
+        ("rows", "application/octet-stream", "packed"),
+    ],
+)
+def test_negotiate(format, accept, expected):
+    assert chart_format.negotiate(format, accept) == expected
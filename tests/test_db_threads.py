@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from database import db_thread_count, run_db
+
+
+@pytest.mark.asyncio
+async def test_run_db_uses_the_db_pool():
+    name = await run_db(lambda: threading.current_thread().name)
+
+    assert name.startswith("db")
+    assert name != threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_does_not_stall_the_event_loop():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        await run_db(time.sleep, 0.2)
+    finally:
+        task.cancel()
+
+    assert ticks >= 5
+
+
+def test_db_threads_default_to_the_smallest_pool(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "DB_THREADS", 0)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(settings, "DB_ANALYTICS_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "DB_ANALYTICS_MAX_OVERFLOW", 5)
+    assert db_thread_count() == 10
+
+    monkeypatch.setattr(settings, "DB_THREADS", 4)
+    assert db_thread_count() == 4
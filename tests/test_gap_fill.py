@@ -1,4 +1,5 @@
 import pytest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta, timezone
 from app.services.backfill import StartupGapFiller
@@ -11,9 +12,10 @@ async def test_gap_fill_triggered_for_old_data():
     
     mock_db_session = MagicMock()
     # Mock finding a timestamp from 2 hours ago
-    mock_db_session.query.return_value.filter.return_value.scalar.return_value = two_hours_ago
+    latest = SimpleNamespace(timestamp=two_hours_ago)
     
     with patch("app.services.backfill.session_scope") as mock_scope, \
+         patch("app.services.backfill.get_latest", return_value=latest), \
          patch("app.services.backfill.celery_app.send_task") as mock_send_task, \
          patch("app.services.backfill.settings.CORE_UNIVERSE", "BTC-USD"):
         
@@ -38,9 +40,10 @@ async def test_no_gap_fill_for_fresh_data():
     
     mock_db_session = MagicMock()
     # Mock finding a timestamp from 2 minutes ago
-    mock_db_session.query.return_value.filter.return_value.scalar.return_value = two_mins_ago
+    latest = SimpleNamespace(timestamp=two_mins_ago)
     
     with patch("app.services.backfill.session_scope") as mock_scope, \
+         patch("app.services.backfill.get_latest", return_value=latest), \
          patch("app.services.backfill.celery_app.send_task") as mock_send_task, \
          patch("app.services.backfill.settings.CORE_UNIVERSE", "BTC-USD"):
         
@@ -58,9 +61,10 @@ async def test_full_backfill_if_empty():
     # Arrange
     mock_db_session = MagicMock()
     # Mock finding NO data (None)
-    mock_db_session.query.return_value.filter.return_value.scalar.return_value = None
+    latest = None
     
     with patch("app.services.backfill.session_scope") as mock_scope, \
+         patch("app.services.backfill.get_latest", return_value=latest), \
          patch("app.services.backfill.celery_app.send_task") as mock_send_task, \
          patch("app.services.backfill.settings.CORE_UNIVERSE", "BTC-USD"):
         
@@ -138,3 +138,122 @@ def test_ingest_ticks_dedupes_trade_id(tmp_path, db_session):
     )
     assert inserted == 1
     assert db_session.query(Tick).count() == 1
+    tick = db_session.query(Tick).one()
+    assert (tick.trade_id, tick.exchange_trade_id, tick.side_code) == (42, None, 2)
+    assert (tick.side, tick.ingest_source, tick.received_at) == (None, None, None)
+    assert tick.source_id is not None
+
+
+def _decode_copy(data: bytes) -> list[list[bytes | None]]:
+    assert data.startswith(b"PGCOPY\n\xff\r\n\x00")
+    offset = 19
+    rows = []
+    while True:
+        (count,) = struct.unpack_from(">h", data, offset)
+        offset += 2
+        if count == -1:
+            assert offset == len(data)
+            return rows
+        fields = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">i", data, offset)
+            offset += 4
+            if length == -1:
+                fields.append(None)
+                continue
+            fields.append(data[offset : offset + length])
+            offset += length
+        rows.append(fields)
+
+
+def test_binary_copy_stream_encodes_tick_rows():
+    from app.services.imports.pgcopy import TICK_COLUMNS, CopyStream, iter_tick_rows
+    from app.services.imports.types import TickRecord
+
+    ticks = [
+        TickRecord(time=datetime(2000, 1, 1, 0, 0, 1, tzinfo=timezone.utc), price=100.5, volume=0.25, side="buy", exchange_trade_id="42"),
+        TickRecord(time=datetime(2000, 1, 1, 0, 0, 2), price=101.0, volume=1.0, is_aggregated=True),
+        TickRecord(time=datetime(2000, 1, 1, 0, 0, 3), price=102.0, volume=1.0, side="SELL", exchange_trade_id="a-7"),
+    ]
+    stream = CopyStream(iter_tick_rows([(7, ticks), (8, ticks[:1])], source_id=3, owner_id=None), chunk_rows=2)
+
+    data = b""
+    while chunk := stream.read(16):
+        assert len(chunk) <= 16
+        data += chunk
+    rows = _decode_copy(data)
+
+    assert stream.rows == 4
+    assert [len(row) for row in rows] == [len(TICK_COLUMNS)] * 4
+    time, asset_id, price, volume, side, trade_id, trade_id_text, source, aggregated, owner = rows[1]
+    assert struct.unpack(">q", time)[0] == 2_000_000
+    assert struct.unpack(">i", asset_id)[0] == 7
+    assert struct.unpack(">d", price)[0] == 101.0 and struct.unpack(">d", volume)[0] == 1.0
+    assert (side, trade_id, trade_id_text, owner) == (None, None, None, None)
+    assert (struct.unpack(">h", source)[0], aggregated) == (3, b"\x01")
+    assert (struct.unpack(">h", rows[0][4])[0], struct.unpack(">q", rows[0][5])[0], rows[0][6]) == (1, 42, None)
+    assert (struct.unpack(">h", rows[2][4])[0], rows[2][5], rows[2][6]) == (2, None, b"a-7")
+    assert struct.unpack(">i", rows[3][1])[0] == 8
+
+
+def test_compact_tick_encoding_helpers(db_session):
+    from app.models.ticks import TickSource
+    from app.services.imports.compact import side_code, split_trade_id, tick_source_id
+
+    assert [side_code(s) for s in ("buy", "Sell", "", None, "x")] == [1, 2, None, None, None]
+    assert split_trade_id("123") == (123, None)
+    assert split_trade_id("0xff") == (None, "0xff")
+    assert split_trade_id(str(2**63)) == (None, str(2**63))
+    assert split_trade_id(str(2**63 - 1)) == (2**63 - 1, None)
+    assert split_trade_id("１２") == (None, "１２")
+    assert split_trade_id(None) == (None, None)
+
+    source_id = tick_source_id(db_session, "unit_test")
+    assert tick_source_id(db_session, "unit_test") == source_id
+    assert tick_source_id(db_session, None) is None
+    assert db_session.query(TickSource).filter(TickSource.name == "unit_test").count() == 1
+
+
+def test_tick_source_ids_are_cached_only_after_commit(db_session):
+    from app.models.ticks import TickSource
+    from app.services.imports.compact import _source_ids, tick_source_id
+
+    tick_source_id(db_session, "rolled_back")
+    db_session.rollback()
+    assert "rolled_back" not in _source_ids.get(db_session.get_bind(), {})
+    assert db_session.query(TickSource).filter(TickSource.name == "rolled_back").count() == 0
+
+    source_id = tick_source_id(db_session, "rolled_back")
+    db_session.commit()
+    assert _source_ids[db_session.get_bind()]["rolled_back"] == source_id
+    assert db_session.get(TickSource, source_id).name == "rolled_back"
+
+
+def test_postgres_tick_copy_uses_staging_only_with_trade_ids():
+    from unittest.mock import MagicMock
+
+    from app.services.imports.storage import bulk_insert_tick_batches
+    from app.services.imports.types import TickRecord
+
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    db.connection.return_value.connection.info = {}
+    cursor = db.connection.return_value.connection.cursor.return_value
+    cursor.rowcount = 1
+    copied: list[bytes] = []
+    cursor.copy_expert.side_effect = lambda _sql, stream, size: copied.append(stream.read())
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    assert bulk_insert_tick_batches(db, {1: [TickRecord(time=now, price=1.0, volume=1.0)], 2: []}) == 1
+    assert cursor.copy_expert.call_args.args[0].startswith("COPY ticks (")
+    assert "FORMAT binary" in cursor.copy_expert.call_args.args[0]
+    cursor.execute.assert_not_called()
+
+    with_ids = {1: [TickRecord(time=now, price=1.0, volume=1.0, exchange_trade_id="9")]}
+    bulk_insert_tick_batches(db, with_ids)
+    bulk_insert_tick_batches(db, with_ids)
+    statements = [call.args[0].split()[0] for call in cursor.execute.call_args_list]
+    # Staging table created if missing and emptied before every COPY.
+    assert statements == ["CREATE", "TRUNCATE", "INSERT", "CREATE", "TRUNCATE", "INSERT"]
+    assert cursor.copy_expert.call_args.args[0].startswith("COPY ticks_copy_stage")
+    assert len(_decode_copy(copied[-1])) == 1
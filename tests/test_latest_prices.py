@@ -0,0 +1,131 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.latest_prices import get_latest, get_latest_many, latest_hash_key
+from app.streaming.latest_cache import LatestPriceCache
+from app.streaming.publisher import RedisPublisher
+
+
+class _Pipeline:
+    def __init__(self, sink):
+        self._sink = sink
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return command
+
+    async def execute(self):
+        self._sink.append(self.commands)
+
+
+def _redis():
+    redis = MagicMock()
+    redis.flushes = []
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline(redis.flushes)
+    redis.publish = AsyncMock()
+    redis.xadd = AsyncMock()
+    redis.set = AsyncMock()
+    return redis
+
+
+def _payload(price: float, amount: float = 1.0, side: str = "buy") -> dict:
+    return {"exchange": "kraken", "symbol": "BTC-USD", "ts": 1.0, "price": price, "amount": amount, "side": side}
+
+
+@pytest.mark.asyncio
+async def test_cache_throttles_and_flushes_trailing_value():
+    redis = _redis()
+    cache = LatestPriceCache(redis, max_hz=20)
+
+    for price in range(100):
+        cache.record("kraken", "BTC-USD", _payload(price, side="sell" if price % 2 else "buy"), "{}")
+    await asyncio.sleep(0.1)
+
+    assert len(redis.flushes) == 1
+    hset = [c for c in redis.flushes[0] if c[0] == "hset"]
+    assert hset[0][1] == ("latest_prices:kraken",)
+    snapshot = json.loads(hset[0][2]["mapping"]["BTC-USD"])
+    assert snapshot["price"] == 99
+    assert snapshot["last_side"] == "sell"
+    assert snapshot["trade_count"] == 100
+    assert snapshot["trades_24h"] == 100
+    assert snapshot["volume_24h"] == pytest.approx(100.0)
+    assert {c[1][0] for c in redis.flushes[0] if c[0] == "set"} == {"latest:kraken:BTC-USD", "latest:BTC-USD"}
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cache_keeps_symbols_dirty_when_flush_fails():
+    redis = _redis()
+    cache = LatestPriceCache(redis, max_hz=1000, legacy_keys=False)
+    redis.pipeline.side_effect = ConnectionError("down")
+
+    cache.record("kraken", "ETH-USD", _payload(10), "{}")
+    with pytest.raises(ConnectionError):
+        await cache.flush()
+    assert cache.dirty == 1
+
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline(redis.flushes)
+    await cache.aclose()
+    assert cache.dirty == 0
+    assert [c[0] for c in redis.flushes[0]] == ["hset", "expire"]
+
+
+@pytest.mark.asyncio
+async def test_publisher_with_cache_skips_per_trade_sets():
+    redis = _redis()
+    cache = LatestPriceCache(redis, max_hz=1000)
+    publisher = RedisPublisher(redis, latest_cache=cache)
+
+    await publisher.publish_trade(exchange="kraken", symbol="BTC-USD", ts=1.0, price=5.0, amount=1.0, side="buy")
+
+    redis.set.assert_not_awaited()
+    assert redis.publish.await_count == 2
+    redis.xadd.assert_awaited_once()
+    assert cache.dirty == 1
+    await publisher.aclose()
+    assert cache.dirty == 0
+
+
+@pytest.mark.asyncio
+async def test_get_latest_many_uses_hash_then_legacy_fallback():
+    redis = MagicMock()
+    redis.hmget = AsyncMock(return_value=[json.dumps({"price": 1.5}), None])
+    redis.mget = AsyncMock(return_value=[json.dumps({"price": 2.5})])
+
+    result = await get_latest_many(redis, "Kraken", ["BTC-USD", "ETH-USD"])
+
+    assert result == {"BTC-USD": {"price": 1.5}, "ETH-USD": {"price": 2.5}}
+    redis.hmget.assert_awaited_once_with(latest_hash_key("kraken"), ["BTC-USD", "ETH-USD"])
+    redis.mget.assert_awaited_once_with(["latest:kraken:ETH-USD"])
+
+
+@pytest.mark.asyncio
+async def test_get_latest_prefers_hash():
+    redis = MagicMock()
+    redis.hget = AsyncMock(return_value=json.dumps({"price": 3.0}))
+    redis.get = AsyncMock()
+
+    assert await get_latest(redis, "kraken", "BTC-USD") == {"price": 3.0}
+    redis.get.assert_not_awaited()
+
+
+def test_latest_tick_endpoint_reads_exchange_hash(client):
+    mock_hget = AsyncMock(return_value=json.dumps({"exchange": "kraken", "symbol": "BTC-USD", "price": 42.0}))
+    with patch("app.main.redis_client.hget", new=mock_hget):
+        response = client.get("/api/market/latest/kraken/BTC-USD")
+
+    assert response.status_code == 200
+    assert response.json()["price"] == 42.0
+    mock_hget.assert_awaited_once_with("latest_prices:kraken", "BTC-USD")
@@ -0,0 +1,171 @@
+import json
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.bar_builder import BarBuilder
+from app.models.instrument import Price
+from app.services.bucketing import CANDLE_FIELDS, Columns
+from app.services.live_bars import merge_open_bar, upsert_price_bars
+from app.streaming.bars import BarAggregator, parse_intervals
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+class _Pipeline:
+    def __init__(self, sink):
+        self._sink = sink
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return command
+
+    async def execute(self):
+        self._sink.extend(self.commands)
+
+
+def test_parse_intervals():
+    assert parse_intervals("5m, 1s,1m") == (1, 60, 300)
+    with pytest.raises(ValueError):
+        parse_intervals("")
+
+
+def test_aggregator_rolls_bars_per_interval():
+    agg = BarAggregator((1, 60))
+    assert agg.add("kraken", "BTC-USD", T0 + 0.1, 100.0, 1.0) == []
+    assert agg.add("kraken", "BTC-USD", T0 + 0.5, 105.0, 2.0) == []
+    assert agg.add("kraken", "BTC-USD", T0 + 0.9, 99.0, 0.5) == []
+
+    closed = agg.add("kraken", "BTC-USD", T0 + 1.2, 101.0, 1.0)
+
+    assert len(closed) == 1
+    bar = closed[0]
+    assert (bar.interval, bar.start, bar.open, bar.high, bar.low, bar.close) == (1, T0, 100.0, 105.0, 99.0, 99.0)
+    assert bar.volume == pytest.approx(3.5)
+    assert bar.trades == 3
+
+    minute = agg.open_bar("kraken", "BTC-USD", 60)
+    assert (minute.open, minute.high, minute.low, minute.close, minute.trades) == (100.0, 105.0, 99.0, 101.0, 4)
+
+
+def test_aggregator_ignores_late_trades_and_closes_idle_bars():
+    agg = BarAggregator((1, 60))
+    agg.add("kraken", "ETH-USD", T0 + 5.0, 10.0, 1.0)
+    agg.add("kraken", "ETH-USD", T0 + 3.0, 1.0, 1.0)
+
+    assert agg.late == 1
+    assert agg.open_bar("kraken", "ETH-USD", 1).low == 10.0
+    # The 1m bar still accepts the late trade because it is inside its window.
+    assert agg.open_bar("kraken", "ETH-USD", 60).low == 1.0
+
+    assert agg.close_due(T0 + 6.5, grace_seconds=1.0) == []
+    closed = agg.close_due(T0 + 7.0, grace_seconds=1.0)
+    assert [bar.interval for bar in closed] == [1]
+    assert agg.open_bar("kraken", "ETH-USD", 1) is None
+
+
+def test_aggregator_never_reopens_a_closed_bar():
+    agg = BarAggregator((60,))
+    for offset, price in ((0.5, 100.0), (10.0, 105.0), (20.0, 99.0), (30.0, 102.0)):
+        agg.add("kraken", "BTC-USD", T0 + offset, price, 1.0)
+    (closed,) = agg.close_due(T0 + 62.5, grace_seconds=2.0)
+    assert closed.trades == 4
+
+    # A trade of the closed minute (after the grace period, or replayed) is late.
+    assert agg.add("kraken", "BTC-USD", T0 + 59.5, 101.0, 0.1) == []
+    assert agg.late == 1
+    assert agg.open_bar("kraken", "BTC-USD", 60) is None
+    assert agg.close_due(T0 + 200.0) == []
+
+    agg.add("kraken", "BTC-USD", T0 + 61.0, 103.0, 1.0)
+    assert agg.open_bar("kraken", "BTC-USD", 60).start == T0 + 60
+
+
+def test_merge_open_bar_replaces_or_appends():
+    candles = Columns(
+        np.array([int(T0) * 1_000_000_000], dtype=np.int64),
+        {name: np.array([1], dtype=np.int64 if name == "trades" else np.float64) for name in CANDLE_FIELDS},
+    )
+    bar = {"start": T0, "open": 1, "high": 3, "low": 1, "close": 2, "volume": 5, "trades": 4}
+
+    merged = merge_open_bar(candles, bar, bucket_seconds=60).records()
+    assert len(merged) == 1 and merged[0]["close"] == 2.0 and merged[0]["trades"] == 4
+    assert merged[0]["timestamp"] == datetime.fromtimestamp(T0, tz=timezone.utc).isoformat()
+
+    merged = merge_open_bar(candles, {**bar, "start": T0 + 60}, bucket_seconds=60)
+    assert len(merged) == 2
+
+    assert merge_open_bar(candles, {**bar, "start": T0 + 30}, bucket_seconds=60) is candles
+
+
+def test_upsert_price_bars_overwrites_bucket(db_session):
+    agg = BarAggregator((60,))
+    agg.add("kraken", "BTC-USD", T0 + 1, 100.0, 1.0)
+    first = agg.open_bar("kraken", "BTC-USD", 60)
+    upsert_price_bars(db_session, [first])
+    agg.add("kraken", "BTC-USD", T0 + 2, 120.0, 1.0)
+    upsert_price_bars(db_session, [agg.open_bar("kraken", "BTC-USD", 60)])
+    db_session.commit()
+
+    rows = db_session.query(Price).filter(Price.symbol == "BTC-USD").all()
+    assert len(rows) == 1
+    assert float(rows[0].high) == 120.0
+    assert float(rows[0].volume) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_bar_builder_ships_closed_and_open_bars():
+    redis = MagicMock()
+    commands = []
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline(commands)
+    builder = BarBuilder(redis, BarAggregator((1, 60)), prices_interval=60, close_grace_seconds=0.0)
+
+    closed = builder.handle(
+        [
+            ("1-0", {"exchange": "Kraken", "symbol": "btc-usd", "ts": str(T0 + 0.2), "price": "10", "amount": "1"}),
+            ("2-0", {"exchange": "kraken", "symbol": "BTC-USD", "ts": str(T0 + 1.2), "price": "11", "amount": "1"}),
+            ("3-0", {"exchange": "kraken", "symbol": "", "ts": str(T0 + 1.3)}),
+        ]
+    )
+    assert [bar.interval for bar in closed] == [1]
+
+    with patch.object(BarBuilder, "persist") as persist:
+        await builder.publish(closed, T0 + 1.5)
+
+    names = [c[0] for c in commands]
+    assert names.count("xadd") == 1
+    assert names.count("publish") == 1
+    hset = [c for c in commands if c[0] == "hset"][0]
+    assert hset[1] == ("bars:open:kraken",)
+    assert json.loads(hset[2]["mapping"]["BTC-USD:1m"])["trades"] == 2
+    persist.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_bar_builder_survives_persist_failures():
+    redis = MagicMock()
+    commands = []
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline(commands)
+    builder = BarBuilder(redis, BarAggregator((60,)), prices_interval=60, close_grace_seconds=0.0)
+    closed = builder.handle(
+        [
+            ("1-0", {"exchange": "kraken", "symbol": "BTC-USD", "ts": str(T0 + 1), "price": "10", "amount": "1"}),
+            ("2-0", {"exchange": "kraken", "symbol": "BTC-USD", "ts": str(T0 + 61), "price": "11", "amount": "1"}),
+        ]
+    )
+
+    with patch.object(BarBuilder, "persist", side_effect=RuntimeError("no unique index")):
+        await builder.publish(closed, T0 + 62)
+
+    assert [c[0] for c in commands].count("xadd") == 1
@@ -116,3 +116,102 @@ def test_market_candles_from_ticks(client, db_session):
     assert abs(candle["high"] - 201.0) < 1e-9
     assert abs(candle["low"] - 200.0) < 1e-9
     assert abs(candle["volume"] - 1.0) < 1e-9
+
+
+def test_coarsest_tick_aggregate_for_bucket():
+    from app.services.tick_aggregates import align_bucket_seconds, coarsest_aggregate
+
+    assert coarsest_aggregate(30) is None
+    assert coarsest_aggregate(90) is None
+    assert coarsest_aggregate(120).view == "ticks_1m"
+    assert coarsest_aggregate(1800).view == "ticks_15m"
+    assert coarsest_aggregate(7200).view == "ticks_1h"
+    assert coarsest_aggregate(86_400 * 7).view == "ticks_1d"
+
+    assert align_bucket_seconds(45) == 45
+    assert align_bucket_seconds(3500) == 3600
+    assert align_bucket_seconds(1234) == 1260
+    assert align_bucket_seconds(87_000) == 90_000
+
+
+def test_load_candles_reads_the_coarsest_aggregate_on_postgres(monkeypatch):
+    from unittest.mock import MagicMock
+
+    from app.services import candle_planner, market_candles
+
+    bucket = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    coverage = candle_planner.MarketCoverage(
+        asset_id=7,
+        sources={"ticks": candle_planner.SourceCoverage(bucket, bucket + timedelta(days=30))},
+        checked_at=datetime.now(timezone.utc),
+    )
+    monkeypatch.setattr(candle_planner.coverage_cache, "get", lambda db, exchange, symbol, refresh=False: coverage)
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    db.execute.return_value.all.return_value = [(bucket, 1.0, 2.0, 0.5, 1.5, 10.0, 42)]
+
+    result = market_candles.load_candles_df(
+        db, "coinbase", "BTC-USD", bucket, bucket + timedelta(days=30), timeframe="1h", max_points=1000
+    )
+
+    assert result.bucket_seconds == 3600
+    assert result.source == "ticks"
+    assert result.plan.relation == "ticks_1h"
+    sql, params = db.execute.call_args.args
+    assert "FROM ticks_1h" in str(sql)
+    assert params == {"bucket": "3600 seconds", "asset_id": 7, "start": bucket, "end": bucket + timedelta(days=30)}
+    assert result.df["trades"].tolist() == [42]
+
+
+def test_price_frames_are_columnar_and_time_ascending(db_session):
+    from app.models.instrument import Price
+    from app.services.market_candles import load_price_frame, load_price_frames
+
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    for symbol in ("BTC-USD", "ETH-USD"):
+        for minute in range(5):
+            db_session.add(
+                Price(
+                    exchange="coinbase",
+                    symbol=symbol,
+                    timestamp=start + timedelta(minutes=minute),
+                    open=1.0,
+                    high=2.0,
+                    low=0.5,
+                    close=float(minute),
+                    volume=None if minute == 4 else 3.0,
+                )
+            )
+    db_session.commit()
+
+    df = load_price_frame(db_session, "coinbase", "BTC-USD", 3)
+    assert str(df["timestamp"].dtype) == "datetime64[ns, UTC]"
+    assert df["timestamp"].tolist() == [start + timedelta(minutes=m) for m in (2, 3, 4)]
+    assert df["close"].dtype == "float64" and df["close"].tolist() == [2.0, 3.0, 4.0]
+    assert df["volume"].tolist() == [3.0, 3.0, 0.0]
+
+    frames = load_price_frames(db_session, "coinbase", ["BTC-USD", "ETH-USD", "SOL-USD"], 2)
+    assert sorted(frames) == ["BTC-USD", "ETH-USD"]
+    assert frames["ETH-USD"]["close"].tolist() == [3.0, 4.0]
+    assert load_price_frame(db_session, "coinbase", "SOL-USD", 10).empty
+
+
+def test_load_candles_df_builds_typed_columns(db_session):
+    from app.services.market_candles import load_candles_df
+
+    start = datetime(2025, 3, 2, tzinfo=timezone.utc)
+    asset = Asset(symbol="SOL-USD", exchange="coinbase", base="SOL", quote="USD", active=True)
+    db_session.add(asset)
+    db_session.flush()
+    for second in range(120):
+        db_session.add(Tick(asset_id=asset.id, time=start + timedelta(seconds=second), price=10.0 + second, volume=1.0))
+    db_session.commit()
+
+    result = load_candles_df(db_session, "coinbase", "SOL-USD", start, start + timedelta(seconds=119), timeframe="1m")
+
+    df = result.df
+    assert list(df.columns) == ["timestamp", "open", "high", "low", "close", "volume", "trades"]
+    assert str(df["timestamp"].dtype) == "datetime64[ns, UTC]"
+    assert df["timestamp"].tolist() == [start, start + timedelta(minutes=1)]
+    assert df["open"].tolist() == [10.0, 70.0] and df["close"].tolist() == [69.0, 129.0]
+    assert df["trades"].dtype == "int64" and df["trades"].tolist() == [60, 60]
@@ -79,3 +79,27 @@ def test_market_coverage_prefers_ticks(client, db_session):
     payload = resp.json()
     assert payload["trades"] == 2
     assert payload["source"] == "ticks"
+
+
+def test_market_coverage_bypasses_a_stale_planner_entry(client, db_session):
+    from app.services.candle_planner import coverage_cache
+
+    assert coverage_cache.get(db_session, "coinbase", "ETH-USD").sources["market_trades"].latest is None
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    db_session.add(
+        MarketTrade(
+            exchange="coinbase",
+            symbol="ETH-USD",
+            timestamp=now,
+            receipt_timestamp=now,
+            price=Decimal("10.0"),
+            amount=Decimal("1.0"),
+            side="buy",
+        )
+    )
+    db_session.commit()
+
+    payload = client.get("/api/market/coverage/coinbase/ETH-USD").json()
+    assert payload["trades"] == 1
+    assert payload["source"] == "market_trades"
+    assert coverage_cache.get(db_session, "coinbase", "ETH-USD").sources["market_trades"].latest is not None
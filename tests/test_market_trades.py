@@ -50,3 +50,37 @@ def test_get_recent_trades_sorted_and_filtered(client, db_session):
     assert len(data) == 1
     assert data[0]["exchange"] == "coinbase"
 
+
+
+def test_ticks_only_storage_serves_trades_from_ticks(client, db_session, monkeypatch):
+    from app.config import settings
+    from app.models.ticks import Asset, Tick
+    from app.services.crew_portfolio import latest_price
+
+    monkeypatch.setattr(settings, "STREAM_TRADE_STORAGE", "ticks")
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    asset = Asset(symbol="BTC-USD", exchange="kraken", base="BTC", quote="USD", active=True)
+    db_session.add(asset)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Tick(asset_id=asset.id, time=now - timedelta(seconds=2), price=100.0, volume=0.1, side="buy"),
+            # Compact row: side decoded from side_code.
+            Tick(asset_id=asset.id, time=now - timedelta(seconds=1), price=101.0, volume=0.2, side_code=2),
+            Tick(asset_id=asset.id, time=now, price=999.0, volume=1.0, side="buy", owner_id="user-1"),
+        ]
+    )
+    # Ignored in ticks mode: only written when storage is "both".
+    db_session.add(
+        MarketTrade(exchange="kraken", symbol="BTC-USD", timestamp=now, price=Decimal("1"), amount=Decimal("1"))
+    )
+    db_session.commit()
+
+    response = client.get("/api/market/trades/BTC-USD", params={"exchange": "kraken"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [(row["price"], row["amount"], row["side"]) for row in data] == [(100.0, 0.1, "buy"), (101.0, 0.2, "sell")]
+
+    price, ts = latest_price(db_session, "kraken", "BTC-USD")
+    assert price == 101.0
+    assert ts.replace(tzinfo=timezone.utc) == now - timedelta(seconds=1)
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func
+
+from app.models.instrument import Price
+from app.models.market import MarketTrade
+from app.services.trade_store import query_trades
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _plan(db, query) -> str:
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.fixture
+def markets(db_session):
+    for exchange in ("coinbase", "kraken"):
+        for symbol in ("BTC-USD", "ETH-USD"):
+            for minute in range(5):
+                ts = T0 + timedelta(minutes=minute)
+                db_session.add(Price(exchange=exchange, symbol=symbol, timestamp=ts, close=1))
+                db_session.add(MarketTrade(exchange=exchange, symbol=symbol, timestamp=ts, price=1, amount=1))
+    db_session.commit()
+    return db_session
+
+
+def _assert_index_scan(plan: str, index: str) -> None:
+    assert index in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_latest_bars_use_the_composite_index(markets):
+    query = (
+        markets.query(Price)
+        .filter(Price.exchange == "coinbase", Price.symbol == "BTC-USD")
+        .order_by(Price.timestamp.desc())
+        .limit(500)
+    )
+
+    _assert_index_scan(_plan(markets, query), "uix_price_exchange_symbol_timestamp")
+    assert [row.timestamp.minute for row in query.limit(2)] == [4, 3]
+
+
+def test_latest_timestamp_is_an_index_lookup(markets):
+    query = markets.query(func.max(Price.timestamp)).filter(Price.exchange == "kraken", Price.symbol == "ETH-USD")
+
+    _assert_index_scan(_plan(markets, query), "COVERING INDEX uix_price_exchange_symbol_timestamp")
+
+
+def test_latest_timestamp_per_symbol_uses_the_composite_index(markets):
+    query = (
+        markets.query(Price.symbol, func.max(Price.timestamp))
+        .filter(Price.exchange == "coinbase", Price.symbol.in_(["BTC-USD", "ETH-USD"]))
+        .group_by(Price.symbol)
+    )
+
+    _assert_index_scan(_plan(markets, query), "uix_price_exchange_symbol_timestamp")
+
+
+def test_latest_trades_use_the_composite_index(markets):
+    query = query_trades(markets, exchange="coinbase", symbol="BTC-USD", descending=True).limit(100)
+
+    _assert_index_scan(_plan(markets, query), "ix_market_trades_exchange_symbol_time")
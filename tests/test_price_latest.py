@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.instrument import Price, PriceLatest
+from app.services.live_bars import upsert_price_bars
+from app.services.price_latest import get_latest, get_latest_many, latest_by_exchange, rebuild, record_prices
+from app.streaming.bars import Bar
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _row(minute: int, close: float, symbol: str = "BTC-USD") -> dict:
+    return {"exchange": "kraken", "symbol": symbol, "timestamp": T0 + timedelta(minutes=minute), "close": close}
+
+
+def _bar(minute: int, close: float) -> Bar:
+    start = (T0 + timedelta(minutes=minute)).timestamp()
+    return Bar("kraken", "BTC-USD", 60, start, close, close, close, close, 1.0, 1)
+
+
+def test_record_prices_keeps_the_newest_bar_and_counts_rows(db_session):
+    record_prices(db_session, [_row(1, 101.0), _row(2, 102.0), _row(0, 100.0)], source="backfill")
+    # An older gap fill adds rows but does not replace the latest bar.
+    record_prices(db_session, [_row(-5, 95.0)], source="backfill")
+    db_session.commit()
+
+    latest = db_session.get(PriceLatest, ("kraken", "BTC-USD"))
+    assert float(latest.close) == 102.0
+    assert latest.timestamp.replace(tzinfo=timezone.utc) == T0 + timedelta(minutes=2)
+    assert latest.row_count == 4
+    assert latest.source == "backfill"
+
+
+def test_live_bar_overwrites_are_counted_once(db_session):
+    upsert_price_bars(db_session, [_bar(0, 100.0)])
+    upsert_price_bars(db_session, [_bar(0, 101.0)])
+    upsert_price_bars(db_session, [_bar(1, 102.0)])
+    db_session.commit()
+
+    latest = db_session.get(PriceLatest, ("kraken", "BTC-USD"))
+    assert float(latest.close) == 102.0
+    assert latest.row_count == db_session.query(Price).count() == 2
+    assert latest.source == "live_bars"
+
+
+def test_get_latest_many_falls_back_to_prices(db_session):
+    record_prices(db_session, [_row(3, 103.0)], source="live_bars")
+    for minute, close in ((0, 200.0), (1, 201.0)):
+        db_session.add(Price(exchange="kraken", symbol="ETH-USD", timestamp=T0 + timedelta(minutes=minute), close=close))
+    db_session.commit()
+
+    latest = get_latest_many(db_session, "kraken", ["BTC-USD", "ETH-USD", "SOL-USD"])
+
+    assert set(latest) == {"BTC-USD", "ETH-USD"}
+    assert float(latest["BTC-USD"].close) == 103.0
+    assert float(latest["ETH-USD"].close) == 201.0
+    assert latest["ETH-USD"].row_count == 2
+    assert latest["ETH-USD"].source == "prices"
+    assert get_latest(db_session, "coinbase", "BTC-USD") is None
+    assert set(latest_by_exchange(db_session, "BTC-USD")) == {"kraken"}
+
+
+def test_rebuild_recomputes_from_prices(db_session):
+    record_prices(db_session, [_row(9, 999.0)], source="live_bars")
+    for minute in range(3):
+        db_session.add(Price(exchange="kraken", symbol="BTC-USD", timestamp=T0 + timedelta(minutes=minute), close=minute))
+    db_session.commit()
+
+    assert rebuild(db_session) == 1
+    db_session.commit()
+
+    latest = db_session.get(PriceLatest, ("kraken", "BTC-USD"))
+    assert latest.row_count == 3
+    assert float(latest.close) == 2.0
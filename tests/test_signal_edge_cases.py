@@ -22,16 +22,9 @@ def engine(mock_sentiment):
     engine = SignalEngine(db=MagicMock(), sentiment_connector=mock_sentiment)
     return engine
 
-def test_signal_generation_insufficient_data(engine):
-    # Mock database query result using our new DI structure?
-    # Actually, the engine queries the DB directly: self.db.query(...)
-    # We need to mock the db session chaining: db.query().filter().order_by().limit().all()
-    
-    mock_query = engine.db.query.return_value
-    mock_filter = mock_query.filter.return_value
-    mock_order = mock_filter.order_by.return_value
-    mock_limit = mock_order.limit.return_value
-    mock_limit.all.return_value = [] # Empty list
+def test_signal_generation_insufficient_data(engine, monkeypatch):
+    # The engine loads bars through load_price_frame; no rows -> empty frame
+    monkeypatch.setattr("app.signals.engine.load_price_frame", lambda db, exchange, symbol, limit: pd.DataFrame())
     
     signal = engine.generate_signal("BTC-USD", exchange="coinbase")
     
@@ -39,21 +32,16 @@ def test_signal_generation_insufficient_data(engine):
     # Currently implementation returns None if df empty
     assert signal is None
 
-def test_signal_generation_graceful_api_failure(engine, mock_sentiment):
+def test_signal_generation_graceful_api_failure(engine, mock_sentiment, monkeypatch):
     # API raises exception
     mock_sentiment.get_sentiment.side_effect = Exception("API Timeout")
     
     # Mock valid price data so signal generation proceeds
-    dates = pd.date_range("2023-01-01", periods=100)
-    # Create list of Price objects (mocks)
-    prices = []
-    for d in dates:
-        p = MagicMock()
-        p.timestamp = d
-        p.open, p.high, p.low, p.close, p.volume = 100, 105, 95, 100, 1000
-        prices.append(p)
-        
-    engine.db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = prices
+    dates = pd.date_range("2023-01-01", periods=100, tz="UTC")
+    frame = pd.DataFrame(
+        {"timestamp": dates, "open": 100.0, "high": 105.0, "low": 95.0, "close": 100.0, "volume": 1000.0}
+    )
+    monkeypatch.setattr("app.signals.engine.load_price_frame", lambda db, exchange, symbol, limit: frame)
     
     # Should NOT raise exception, just ignore sentiment
     try:
@@ -64,20 +52,14 @@ def test_signal_generation_graceful_api_failure(engine, mock_sentiment):
     except Exception as e:
         pytest.fail(f"Engine crashed on API failure: {e}")
 
-def test_signal_conflicting_indicators(engine):
+def test_signal_conflicting_indicators(engine, monkeypatch):
     # Create a scenario where SMA suggests BUY (price > SMA) but RSI suggests SELL (Overbought)
-    dates = pd.date_range("2023-01-01", periods=500)
-    prices = []
-    val = 100
-    for i, d in enumerate(dates):
-        val += 0.5 
-        p = MagicMock()
-        p.timestamp = d
-        p.open = p.high = p.low = p.close = val
-        p.volume = 1000
-        prices.append(p)
-    
-    engine.db.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = prices
+    dates = pd.date_range("2023-01-01", periods=500, tz="UTC")
+    values = [100 + 0.5 * (i + 1) for i in range(len(dates))]
+    frame = pd.DataFrame(
+        {"timestamp": dates, "open": values, "high": values, "low": values, "close": values, "volume": 1000.0}
+    )
+    monkeypatch.setattr("app.signals.engine.load_price_frame", lambda db, exchange, symbol, limit: frame)
     
     signal = engine.generate_signal("BTC-USD", exchange="coinbase")
     
@@ -0,0 +1,147 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.publisher import BatchingRedisPublisher, encode_trade
+from app.streaming.stream_codec import (
+    BINARY_FORMAT,
+    CODECS_KEY,
+    TEXT_FORMAT,
+    StreamFormatNegotiator,
+    decode_batch,
+    encode_batch,
+)
+from app.writer import collect_messages
+
+
+def _trades(n: int = 4, trade_id=lambda i: str(100 + i)):
+    return [
+        encode_trade(
+            exchange="kraken" if i % 2 else "binance",
+            symbol="BTC-USD",
+            ts=1700000000.25 + i,
+            recv_ts=1700000000.5 + i,
+            price=50000.1 + i,
+            amount=0.125,
+            side="sell" if i % 3 else "buy",
+            trade_id=trade_id(i),
+        )
+        for i in range(n)
+    ]
+
+
+def test_binary_batch_round_trips():
+    trades = _trades()
+    data = encode_batch(trades)
+
+    columns = decode_batch(data)
+
+    assert columns.symbols == [("binance", "BTC-USD"), ("kraken", "BTC-USD")]
+    assert len(columns) == 4
+    assert columns.records["price"].tolist() == [50000.1, 50001.1, 50002.1, 50003.1]
+    rows = list(columns.iter_trades())
+    assert rows[1] == ("kraken", "BTC-USD", 1700000001.25, 1700000001.5, 50001.1, 0.125, "sell", "101")
+    assert rows[0][6] == "buy"
+    # Packed size is a fraction of the text fields it replaces.
+    many = _trades(256)
+    text_bytes = sum(len(k) + len(v) for t in many for k, v in t.stream_fields.items())
+    assert len(encode_batch(many)) < text_bytes / 2
+
+
+def test_binary_batch_requires_integer_trade_ids():
+    assert encode_batch(_trades(2, trade_id=lambda i: f"abc-{i}")) is None
+    columns = decode_batch(encode_batch(_trades(2, trade_id=lambda i: None)))
+    assert [row[7] for row in columns.iter_trades()] == [None, None]
+
+
+def _negotiator_redis(adverts: dict, consumers: dict[str, list[dict]]):
+    redis = MagicMock()
+    redis.hgetall = AsyncMock(return_value=adverts)
+    redis.xinfo_groups = AsyncMock(return_value=[{"name": name} for name in consumers])
+    redis.xinfo_consumers = AsyncMock(side_effect=lambda stream, group: consumers[group])
+    return redis
+
+
+def _advert(*formats, age: float = 0.0) -> str:
+    import time
+
+    return json.dumps({"formats": list(formats), "ts": time.time() - age})
+
+
+@pytest.mark.asyncio
+async def test_negotiator_needs_every_active_consumer_to_support_binary():
+    consumers = {
+        "trade_writers": [{"name": "writer-1", "idle": 10}],
+        "bar_builders": [{"name": "bar-builder-1", "idle": 10}, {"name": "old", "idle": 10_000_000}],
+    }
+    adverts = {"trade_writers:writer-1": _advert("text", "mt1")}
+
+    negotiator = StreamFormatNegotiator(_negotiator_redis(adverts, consumers))
+    assert await negotiator.refresh() == TEXT_FORMAT
+
+    adverts["bar_builders:bar-builder-1"] = _advert("text", "mt1")
+    assert await negotiator.refresh() == BINARY_FORMAT
+
+    adverts["bar_builders:bar-builder-1"] = _advert("text", "mt1", age=600)
+    assert await negotiator.refresh() == TEXT_FORMAT
+
+    broken = MagicMock()
+    broken.hgetall = AsyncMock(side_effect=ConnectionError("down"))
+    assert await StreamFormatNegotiator(broken).refresh() == TEXT_FORMAT
+    assert CODECS_KEY == "market_trades:codecs"
+
+
+class _Pipeline:
+    def __init__(self, sink):
+        self._sink = sink
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._sink.append((name, args, kwargs))
+
+    async def execute(self):
+        return []
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_packs_batch_when_negotiated():
+    commands = []
+    redis = MagicMock()
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline(commands)
+    negotiator = MagicMock()
+    negotiator.format = AsyncMock(return_value=BINARY_FORMAT)
+    publisher = BatchingRedisPublisher(redis, max_batch=4, max_delay_ms=10_000, negotiator=negotiator)
+
+    for trade in _trades():
+        await publisher.publish_trade(**{k: v for k, v in trade.payload.items()})
+
+    xadds = [c for c in commands if c[0] == "xadd"]
+    assert len(xadds) == 1
+    fields = xadds[0][1][1]
+    assert fields["fmt"] == BINARY_FORMAT
+    assert len(decode_batch(fields["data"])) == 4
+    assert [c[0] for c in commands].count("publish") == 8
+    assert publisher.stats.binary_flushes == 1
+
+
+def test_writer_decodes_text_and_binary_entries():
+    trades = _trades(3)
+    messages = [
+        (b"1-0", {k.encode(): v.encode() for k, v in trades[0].stream_fields.items()}),
+        (b"2-0", {b"fmt": b"mt1", b"data": encode_batch(trades[1:])}),
+        (b"3-0", {b"fmt": b"mt1", b"data": b"garbage"}),
+    ]
+    rows, ticks = [], {}
+
+    collect_messages(messages, rows, ticks)
+
+    assert [(r.exchange, float(r.price)) for r in rows] == [("binance", 50000.1), ("kraken", 50001.1), ("binance", 50002.1)]
+    assert rows[1].timestamp.timestamp() == 1700000001.25
+    assert sorted(ticks) == [("binance", "BTC-USD"), ("kraken", "BTC-USD")]
+    assert ticks[("kraken", "BTC-USD")][0].exchange_trade_id == "101"
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.streaming.binance_ws import BinanceTradeStreamer
+from app.streaming.coinbase_ws import CoinbaseTradeStreamer
+from app.streaming.decoding import DecodeError, TradeTuple, parse_iso8601
+from app.streaming.kraken_ws import KrakenTradeStreamer
+from app.streaming.symbols import CanonicalSymbol
+
+
+@pytest.fixture
+def symbols():
+    return [CanonicalSymbol(base="BTC", quote="USD"), CanonicalSymbol(base="ETH", quote="USD")]
+
+
+def _compact(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def test_binance_fast_path_matches_dict_path(symbols):
+    streamer = BinanceTradeStreamer(symbols)
+    msg = {
+        "e": "trade",
+        "E": 1700000000123,
+        "s": "BTCUSDT",
+        "t": 12345,
+        "p": "98000.50",
+        "q": "0.1",
+        "b": 88,
+        "a": 50,
+        "T": 1700000000100,
+        "m": True,
+        "M": True,
+    }
+
+    fast = streamer.decode_frame(_compact(msg))
+    slow = streamer.parse_message(msg)
+
+    assert len(fast) == 1
+    assert fast[0]._replace(recv_ts=0) == slow[0]._replace(recv_ts=0)
+    assert fast[0].symbol == "BTC-USDT"
+    assert fast[0].ts == pytest.approx(1700000000.1)
+    assert fast[0].side == "sell"
+    assert fast[0].trade_id == "12345"
+
+
+def test_binance_non_trade_and_spaced_frames_fall_back(symbols):
+    streamer = BinanceTradeStreamer(symbols)
+    assert streamer.decode_frame('{"result":null,"id":1}') == []
+
+    spaced = json.dumps({"e": "trade", "s": "ETHUSDT", "t": 1, "p": "2000", "q": "2", "T": 1, "m": False})
+    trades = streamer.decode_frame(spaced)
+    assert trades[0].symbol == "ETH-USDT"
+    assert trades[0].side == "buy"
+
+
+def test_kraken_decode_frame_batches_and_skips_events(symbols):
+    streamer = KrakenTradeStreamer(symbols)
+    raw = _compact(
+        [
+            0,
+            [
+                ["50000.0", "1.5", "1616666666.666", "b", "m", ""],
+                ["50001.0", "0.5", "1616666667.000", "s", "l", ""],
+            ],
+            "trade",
+            "XBT/USD",
+        ]
+    )
+
+    trades = streamer.decode_frame(raw)
+
+    assert [t.side for t in trades] == ["buy", "sell"]
+    assert trades[0] == TradeTuple("BTC-USD", 1616666666.666, trades[0].recv_ts, 50000.0, 1.5, "buy")
+    assert streamer.decode_frame('{"event":"heartbeat"}') == []
+    assert streamer.decode_frame(b'{"event":"heartbeat"}') == []
+
+
+def test_coinbase_fast_path_matches_dict_path():
+    streamer = CoinbaseTradeStreamer(["BTC-USD"])
+    msg = {
+        "type": "match",
+        "trade_id": 10,
+        "maker_order_id": "ac928c-1",
+        "taker_order_id": "132fb6-2",
+        "side": "buy",
+        "size": "0.01",
+        "price": "100.00",
+        "product_id": "BTC-USD",
+        "sequence": 50,
+        "time": "2024-01-01T12:00:00.250000Z",
+    }
+
+    fast = streamer.decode_frame(_compact(msg))
+    slow = streamer.parse_message(msg)
+
+    assert fast[0]._replace(recv_ts=0) == slow[0]._replace(recv_ts=0)
+    assert fast[0].ts == pytest.approx(datetime.fromisoformat("2024-01-01T12:00:00.250000+00:00").timestamp())
+    assert streamer.decode_frame('{"type":"last_match","trade_id":1}') == []
+
+
+def test_decode_frame_raises_decode_error_on_bad_json(symbols):
+    with pytest.raises(DecodeError):
+        KrakenTradeStreamer(symbols).decode_frame("[not json")
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "2024-01-01T12:00:00Z",
+        "2024-01-01T12:00:00.5Z",
+        "2024-01-01T12:00:00.123456Z",
+        "2024-01-01T12:00:00.123456+00:00",
+    ],
+)
+def test_parse_iso8601_matches_fromisoformat(raw):
+    expected = datetime.fromisoformat(raw.replace("Z", "+00:00")).timestamp()
+    assert parse_iso8601(raw) == pytest.approx(expected)
+
+
+def test_parse_iso8601_rejects_garbage():
+    assert parse_iso8601("") is None
+    assert parse_iso8601("not-a-timestamp") is None
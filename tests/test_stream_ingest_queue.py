@@ -0,0 +1,131 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.decoding import TradeTuple
+from app.streaming.ingest_queue import IngestQueue, latest_flags
+from app.streaming.kraken_ws import KrakenTradeStreamer
+from app.streaming.publisher import BatchingRedisPublisher
+from app.streaming.symbols import CanonicalSymbol
+
+
+def _trade(symbol: str = "BTC-USD", price: float = 1.0) -> TradeTuple:
+    return TradeTuple(symbol, 1.0, 1.0, price, 1.0, "buy")
+
+
+def test_invalid_policy_rejected():
+    with pytest.raises(ValueError):
+        IngestQueue(10, "explode")
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_and_counts_drops():
+    queue = IngestQueue(3, "drop_oldest")
+    await queue.put_many([_trade(price=p) for p in range(5)])
+
+    batch, coalesce = await queue.get_batch(10)
+
+    assert [t.price for t in batch] == [2, 3, 4]
+    assert coalesce is False
+    assert queue.snapshot()["dropped"] == 2
+    assert queue.snapshot()["max_depth"] == 3
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_consumer():
+    queue = IngestQueue(2, "block")
+    await queue.put_many([_trade(price=1), _trade(price=2)])
+
+    producer = asyncio.create_task(queue.put_many([_trade(price=3)]))
+    await asyncio.sleep(0.01)
+    assert not producer.done()
+    assert queue.stats.blocked == 1
+
+    batch, _ = await queue.get_batch(1)
+    await asyncio.wait_for(producer, 1)
+
+    assert [t.price for t in batch] == [1]
+    assert len(queue) == 2
+    assert queue.stats.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_every_trade_and_flags_overflow():
+    queue = IngestQueue(2, "coalesce", coalesce_factor=4)
+    await queue.put_many([_trade("BTC-USD", 1), _trade("ETH-USD", 2), _trade("BTC-USD", 3), _trade("BTC-USD", 4)])
+
+    batch, coalesce = await queue.get_batch(10)
+
+    assert len(batch) == 4
+    assert coalesce is True
+    assert latest_flags(batch) == [False, True, False, True]
+    assert queue.stats.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_publish_loop_retries_and_coalesces_hot_cache():
+    streamer = KrakenTradeStreamer([CanonicalSymbol("BTC", "USD")])
+    streamer.ingest_queue = IngestQueue(1, "coalesce")
+    publisher = AsyncMock()
+    publisher.pending = 0
+    publisher.publish_trade.side_effect = [ConnectionError("redis down"), None, None, None]
+
+    await streamer.ingest_queue.put_many([_trade("BTC-USD", 1), _trade("BTC-USD", 2), _trade("ETH-USD", 3)])
+    task = asyncio.create_task(streamer._publish_loop(publisher))
+    await asyncio.sleep(0.7)
+    task.cancel()
+
+    calls = publisher.publish_trade.call_args_list
+    assert [c.kwargs["price"] for c in calls] == [1, 1, 2, 3]
+    assert [c.kwargs["update_latest"] for c in calls[1:]] == [False, True, True]
+    stats = streamer.queue_stats()
+    assert stats["exchange"] == "kraken"
+    assert stats["publish_errors"] == 1
+    assert stats["published"] == 3
+    assert stats["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_loop_retries_a_failed_batch_flush_without_losing_trades():
+    streamer = KrakenTradeStreamer([CanonicalSymbol("BTC", "USD")])
+    streamer.ingest_queue = IngestQueue(16, "block")
+    xadds = []
+    failures = [ConnectionError("redis down")]
+
+    class _Pipeline:
+        def __init__(self):
+            self.commands = []
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def set(self, *args, **kwargs):
+            pass
+
+        def publish(self, *args, **kwargs):
+            pass
+
+        def xadd(self, key, fields, maxlen=None, approximate=None):
+            self.commands.append(fields["price"])
+
+        async def execute(self):
+            if failures:
+                raise failures.pop()
+            xadds.extend(self.commands)
+
+    redis = MagicMock()
+    redis.pipeline.side_effect = lambda transaction=True: _Pipeline()
+    publisher = BatchingRedisPublisher(redis, max_batch=4, max_delay_ms=10_000)
+
+    await streamer.ingest_queue.put_many([_trade("BTC-USD", float(p)) for p in range(1, 9)])
+    task = asyncio.create_task(streamer._publish_loop(publisher))
+    await asyncio.sleep(0.7)
+    task.cancel()
+
+    assert xadds == [str(float(p)) for p in range(1, 9)]
+    assert streamer.queue_stats()["publish_errors"] == 1
+    assert publisher.pending == 0
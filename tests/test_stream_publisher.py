@@ -0,0 +1,193 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.publisher import BatchingRedisPublisher, RedisPublisher, build_publisher
+
+
+class _FakePipeline:
+    def __init__(self, sink):
+        self._sink = sink
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append(("set", key, value, ex))
+
+    def publish(self, channel, message):
+        self.commands.append(("publish", channel, message))
+
+    def xadd(self, key, fields, maxlen=None, approximate=None):
+        self.commands.append(("xadd", key, fields, maxlen))
+
+    async def execute(self):
+        self._sink.append(list(self.commands))
+        return [True] * len(self.commands)
+
+
+def _fake_redis():
+    redis = MagicMock()
+    redis.executed = []
+    redis.pipeline.side_effect = lambda transaction=True: _FakePipeline(redis.executed)
+    return redis
+
+
+def _trade(i: int = 0) -> dict:
+    return {
+        "exchange": "Kraken",
+        "symbol": "btc-usd",
+        "ts": 1700000000.0 + i,
+        "recv_ts": 1700000000.5 + i,
+        "price": 50000.0 + i,
+        "amount": 0.25,
+        "side": "BUY",
+        "trade_id": str(i),
+    }
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_flushes_on_size_with_same_keys():
+    redis = _fake_redis()
+    publisher = BatchingRedisPublisher(redis, max_batch=3, max_delay_ms=10_000)
+
+    for i in range(3):
+        await publisher.publish_trade(**_trade(i))
+
+    assert len(redis.executed) == 1
+    commands = redis.executed[0]
+    assert len(commands) == 15
+    assert commands[0][:2] == ("set", "latest:kraken:BTC-USD")
+    assert commands[1][:2] == ("publish", "ticks:kraken:BTC-USD")
+    assert commands[2][:2] == ("set", "latest:BTC-USD")
+    assert commands[3][:2] == ("publish", "ticks:BTC-USD")
+    assert commands[4][1] == "market_trades"
+    assert commands[4][2] == {
+        "exchange": "kraken",
+        "symbol": "BTC-USD",
+        "ts": "1700000000.0",
+        "recv_ts": "1700000000.5",
+        "price": "50000.0",
+        "amount": "0.25",
+        "side": "buy",
+        "trade_id": "0",
+    }
+    assert json.loads(commands[0][2])["price"] == 50000.0
+    redis.pipeline.assert_called_with(transaction=False)
+
+    assert publisher.pending == 0
+    assert publisher.stats.flushes == 1
+    assert publisher.stats.last_size == 3
+    assert publisher.stats.last_latency_ms >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_flushes_on_delay():
+    redis = _fake_redis()
+    publisher = BatchingRedisPublisher(redis, max_batch=100, max_delay_ms=1)
+
+    await publisher.publish_trade(**_trade())
+    assert publisher.pending == 1
+    assert redis.executed == []
+
+    await asyncio.sleep(0.05)
+
+    assert publisher.pending == 0
+    assert len(redis.executed) == 1
+    assert publisher.stats.as_dict()["trades"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_aclose_flushes_remaining():
+    redis = _fake_redis()
+    publisher = BatchingRedisPublisher(redis, max_batch=100, max_delay_ms=10_000)
+
+    await publisher.publish_trade(**_trade(1))
+    await publisher.publish_trade(**_trade(2))
+    await publisher.aclose()
+
+    assert len(redis.executed) == 1
+    assert len(redis.executed[0]) == 10
+
+
+@pytest.mark.asyncio
+async def test_unbatched_publisher_matches_pipeline_fields():
+    redis = AsyncMock()
+    publisher = RedisPublisher(redis)
+
+    await publisher.publish_trade(**_trade(7))
+
+    assert redis.set.await_count == 2
+    assert redis.publish.await_count == 2
+    stream_key, fields = redis.xadd.await_args.args
+    assert stream_key == "market_trades"
+    assert fields["trade_id"] == "7"
+    assert fields["side"] == "buy"
+
+
+def test_build_publisher_selects_mode():
+    redis = MagicMock()
+    assert type(build_publisher(redis, batch_size=0)) is RedisPublisher
+    assert type(build_publisher(redis, batch_size=1)) is RedisPublisher
+    assert isinstance(build_publisher(redis, batch_size=64), BatchingRedisPublisher)
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_requeues_failed_flush():
+    redis = _fake_redis()
+    failures = [ConnectionError("redis down")]
+
+    class _FlakyPipeline(_FakePipeline):
+        async def execute(self):
+            if failures:
+                raise failures.pop()
+            return await super().execute()
+
+    redis.pipeline.side_effect = lambda transaction=True: _FlakyPipeline(redis.executed)
+    publisher = BatchingRedisPublisher(redis, max_batch=3, max_delay_ms=10_000)
+
+    await publisher.publish_trade(**_trade(0))
+    await publisher.publish_trade(**_trade(1))
+    with pytest.raises(ConnectionError):
+        await publisher.publish_trade(**_trade(2))
+
+    assert publisher.pending == 3
+    assert publisher.stats.failures == 1
+    assert publisher.stats.requeued == 3
+
+    await publisher.publish_trade(**_trade(3))
+
+    xadds = [c[2]["trade_id"] for c in redis.executed[0] if c[0] == "xadd"]
+    assert xadds == ["0", "1", "2", "3"]
+    assert publisher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_requeued_trades_are_recorded_in_the_latest_cache_once():
+    redis = _fake_redis()
+    failures = [ConnectionError("redis down")]
+
+    class _FlakyPipeline(_FakePipeline):
+        async def execute(self):
+            if failures:
+                raise failures.pop()
+            return await super().execute()
+
+    redis.pipeline.side_effect = lambda transaction=True: _FlakyPipeline(redis.executed)
+    latest = MagicMock()
+    publisher = BatchingRedisPublisher(redis, max_batch=2, max_delay_ms=10_000, latest_cache=latest)
+
+    await publisher.publish_trade(**_trade(0))
+    with pytest.raises(ConnectionError):
+        await publisher.publish_trade(**_trade(1))
+    assert latest.record.call_count == 0
+
+    await publisher.flush()
+
+    assert [c.args[2]["trade_id"] for c in latest.record.call_args_list] == ["0", "1"]
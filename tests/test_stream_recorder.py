@@ -0,0 +1,61 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.recorder import FrameRecorder, iter_frames, read_header
+from app.streaming.replay import collect_recordings, replay
+
+
+def _kraken_frame(i: int) -> str:
+    return json.dumps([336, [[f"{100 + i}.0", "0.5", f"{1700000000 + i}.0", "b", "l", ""]], "trade", "XBT/USD"])
+
+
+def test_recorder_writes_header_and_rotates(tmp_path):
+    recorder = FrameRecorder(tmp_path, "Kraken", connection=2, symbols=["BTC-USD"], rotate_bytes=200)
+    for i in range(6):
+        recorder.write(1000.0 + i, _kraken_frame(i))
+    recorder.write(1006.0, b'{"event":"heartbeat"}')
+    recorder.close()
+
+    assert len(recorder.files) > 1
+    assert all(path.name.startswith("kraken-2-") and path.name.endswith(".jsonl.gz") for path in recorder.files)
+    header = read_header(recorder.files[0])
+    assert (header["exchange"], header["connection"], header["symbols"]) == ("kraken", 2, ["BTC-USD"])
+
+    frames = [frame for path in recorder.files for frame in iter_frames(path)]
+    assert [ts for ts, _raw in frames] == [1000.0 + i for i in range(7)]
+    assert frames[-1][1] == '{"event":"heartbeat"}'
+
+
+def test_recorder_rotates_by_age(tmp_path):
+    recorder = FrameRecorder(tmp_path, "kraken", rotate_seconds=10)
+    recorder.write(0.0, "a")
+    recorder.write(5.0, "b")
+    recorder.write(12.0, "c")
+    recorder.close()
+
+    assert len(recorder.files) == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_publishes_recorded_trades(tmp_path):
+    for connection in (0, 1):
+        recorder = FrameRecorder(tmp_path, "kraken", connection=connection, symbols=["BTC-USD"])
+        for i in range(3):
+            recorder.write(1000.0 + i * 0.01, _kraken_frame(i))
+        recorder.write(1000.05, "not json")
+        recorder.close()
+    publisher = MagicMock()
+    publisher.publish_trade = AsyncMock()
+    publisher.flush = AsyncMock()
+
+    assert sorted(collect_recordings([tmp_path])) == [("kraken", 0), ("kraken", 1)]
+    stats = await replay([tmp_path], publisher, speed=10.0)
+
+    assert (stats.files, stats.frames, stats.trades, stats.decode_errors) == (2, 8, 6, 2)
+    assert stats.recorded_seconds == pytest.approx(0.05)
+    assert publisher.publish_trade.await_count == 6
+    call = publisher.publish_trade.await_args_list[0].kwargs
+    assert (call["exchange"], call["symbol"], call["price"]) == ("kraken", "BTC-USD", 100.0)
+    publisher.flush.assert_awaited_once()
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.sharding import ExchangeShardPlan, HashRing, stable_hash
+from app.streaming.supervisor import StreamSupervisor, StreamWorker
+
+
+def _symbols(n: int) -> list[str]:
+    return [f"C{i:03d}-USD" for i in range(n)]
+
+
+def test_stable_hash_is_deterministic():
+    assert stable_hash("BTC-USD") == stable_hash("BTC-USD")
+    assert stable_hash("BTC-USD") != stable_hash("ETH-USD")
+
+
+def test_hash_ring_moves_few_keys_when_node_added():
+    keys = _symbols(500)
+    ring = HashRing(range(4))
+    before = {k: ring.node_for(k) for k in keys}
+    ring.add_node(4)
+    moved = [k for k in keys if ring.node_for(k) != before[k]]
+
+    assert all(ring.node_for(k) == 4 for k in moved)
+    assert len(moved) < len(keys) * 0.35
+
+
+def test_plan_sizes_connections_from_symbol_count():
+    plan = ExchangeShardPlan("kraken", _symbols(120), max_symbols_per_connection=50)
+
+    assert plan.exchange == "KRAKEN"
+    assert len(plan.connections) == 3
+    placed = sorted(s for symbols in plan.assignments.values() for s in symbols)
+    assert placed == sorted(_symbols(120))
+
+
+def test_plan_add_routes_to_owner_and_ignores_duplicates():
+    plan = ExchangeShardPlan("kraken", ["BTC-USD", "ETH-USD"], min_connections=2)
+
+    assert plan.add(["BTC-USD"]) == []
+    ops = plan.add(["SOL-USD"])
+
+    assert len(ops) == 1
+    assert ops[0].op == "subscribe"
+    assert ops[0].symbols == ["SOL-USD"]
+    assert ops[0].connection == plan.connection_for("SOL-USD")
+
+
+def test_plan_add_rebalances_when_connection_full():
+    plan = ExchangeShardPlan("kraken", _symbols(10), max_symbols_per_connection=10, max_connections=4)
+    assert plan.connections == [0]
+
+    ops = plan.add(["NEW-USD"])
+
+    assert plan.connections == [0, 1]
+    assert {op.connection for op in ops} == {0, 1}
+    assign_new = next(op for op in ops if op.connection == 1)
+    assert assign_new.op == "assign"
+    assert sorted(plan.assignments[0] + plan.assignments[1]) == sorted(_symbols(10) + ["NEW-USD"])
+
+
+@pytest.mark.asyncio
+async def test_worker_restarts_crashed_shard_without_touching_others(monkeypatch):
+    runs: dict[str, int] = {}
+
+    class FakeStreamer:
+        def __init__(self, exchange, symbols):
+            self.first = symbols[0]
+            self.subscribe = AsyncMock()
+
+        async def run_forever(self, publisher):
+            runs[self.first] = runs.get(self.first, 0) + 1
+            if self.first == "BTC-USD" and runs[self.first] == 1:
+                raise RuntimeError("boom")
+            await asyncio.sleep(3600)
+
+    monkeypatch.setattr("app.streaming.supervisor.create_streamer", FakeStreamer)
+    publisher = MagicMock()
+    publisher.aclose = AsyncMock()
+    worker = StreamWorker(publisher, restart_delay_seconds=0)
+
+    await worker.apply({"op": "assign", "exchange": "KRAKEN", "connection": 0, "symbols": ["BTC-USD"]})
+    await worker.apply({"op": "assign", "exchange": "KRAKEN", "connection": 1, "symbols": ["ETH-USD"]})
+    await asyncio.sleep(0.01)
+
+    assert worker.shards == {("KRAKEN", 0): ["BTC-USD"], ("KRAKEN", 1): ["ETH-USD"]}
+    assert runs == {"BTC-USD": 2, "ETH-USD": 1}
+
+    await worker.apply({"op": "subscribe", "exchange": "KRAKEN", "connection": 1, "symbols": ["SOL-USD"]})
+    assert worker.shards[("KRAKEN", 1)] == ["ETH-USD", "SOL-USD"]
+
+    await worker.close()
+    publisher.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_supervisor_routes_subscribe_commands_in_process():
+    plans = {"KRAKEN": ExchangeShardPlan("KRAKEN", ["BTC-USD"], min_connections=2)}
+    supervisor = StreamSupervisor(plans, worker_processes=1)
+    supervisor._local = MagicMock()
+    supervisor._local.apply = AsyncMock()
+
+    ops = await supervisor.handle_command({"action": "subscribe", "exchange": "kraken", "symbol": "eth/usd"})
+
+    assert [op.symbols for op in ops] == [["ETH-USD"]]
+    supervisor._local.apply.assert_awaited_once()
+    assert await supervisor.handle_command({"action": "subscribe", "exchange": "binance", "symbol": "BTC-USD"}) == []
+
+
+def test_supervisor_spreads_connections_across_workers():
+    plans = {"KRAKEN": ExchangeShardPlan("KRAKEN", _symbols(400), max_symbols_per_connection=25)}
+    supervisor = StreamSupervisor(plans, worker_processes=4)
+
+    per_worker = [supervisor.ops_for_worker(i) for i in range(4)]
+
+    assert sum(len(ops) for ops in per_worker) == len(plans["KRAKEN"].connections)
+    assert sum(1 for ops in per_worker if ops) >= 2
@@ -0,0 +1,106 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.streaming.kraken_ws import KrakenTradeStreamer
+from app.streaming.sharding import ExchangeShardPlan
+from app.streaming.subscriptions import SubscriptionManager
+from app.streaming.supervisor import StreamSupervisor
+from app.streaming.symbols import parse_symbol
+
+
+def _manager(**kwargs) -> SubscriptionManager:
+    plans = {"KRAKEN": ExchangeShardPlan("KRAKEN", ["BTC-USD"], max_symbols_per_connection=100)}
+    return SubscriptionManager(plans, **kwargs)
+
+
+def test_plan_remove_returns_unsubscribe_ops():
+    plan = ExchangeShardPlan("kraken", ["BTC-USD", "ETH-USD"])
+
+    ops = plan.remove(["ETH-USD", "DOGE-USD"])
+
+    assert [(op.op, op.symbols) for op in ops] == [("unsubscribe", ["ETH-USD"])]
+    assert plan.symbols == ["BTC-USD"]
+    assert plan.remove(["ETH-USD"]) == []
+
+
+def test_manager_dedups_requests_into_one_flush():
+    manager = _manager()
+
+    assert manager.touch("KRAKEN", ["ETH-USD", "SOL-USD"], now=0.0)
+    assert manager.touch("KRAKEN", ["ETH-USD"], now=0.1)
+    assert not manager.touch("KRAKEN", ["BTC-USD"], now=0.1)
+    assert manager.pending == 2
+
+    ops = manager.flush(now=0.2)
+
+    assert [(op.op, sorted(op.symbols)) for op in ops] == [("subscribe", ["ETH-USD", "SOL-USD"])]
+    assert not manager.touch("KRAKEN", ["ETH-USD"], now=0.3)
+    assert manager.flush(now=0.4) == []
+
+
+def test_manager_unsubscribes_idle_symbols_but_keeps_core():
+    manager = _manager(idle_seconds=60)
+    manager.touch("KRAKEN", ["ETH-USD", "SOL-USD"], now=0.0)
+    manager.flush(now=0.0)
+    manager.touch("KRAKEN", ["SOL-USD", "BTC-USD"], now=50.0)
+
+    ops = manager.sweep(now=70.0)
+
+    assert [(op.op, op.symbols) for op in ops] == [("unsubscribe", ["ETH-USD"])]
+    assert manager.dynamic_symbols("KRAKEN") == ["SOL-USD"]
+    assert "BTC-USD" in manager.plans["KRAKEN"].symbols
+
+
+def test_manager_evicts_least_recently_viewed_over_cap():
+    manager = _manager(max_dynamic_per_connection=2)
+    manager.touch("KRAKEN", ["A-USD", "B-USD"], now=0.0)
+    manager.flush(now=0.0)
+    manager.touch("KRAKEN", ["A-USD"], now=1.0)
+    manager.touch("KRAKEN", ["C-USD"], now=2.0)
+
+    ops = manager.flush(now=2.0)
+
+    assert [(op.op, op.symbols) for op in ops] == [("subscribe", ["C-USD"]), ("unsubscribe", ["B-USD"])]
+    assert manager.dynamic_symbols("KRAKEN") == ["A-USD", "C-USD"]
+    assert manager.evicted == 1
+
+
+@pytest.mark.asyncio
+async def test_supervisor_batches_commands_over_window():
+    plans = {"KRAKEN": ExchangeShardPlan("KRAKEN", ["BTC-USD"])}
+    supervisor = StreamSupervisor(plans, subscriptions=SubscriptionManager(plans, window_seconds=0.01))
+    supervisor._local = MagicMock()
+    supervisor._local.apply = AsyncMock()
+    supervisor._local.close = AsyncMock()
+
+    for _ in range(5):
+        assert await supervisor.handle_command({"action": "subscribe", "exchange": "kraken", "symbol": "eth/usd"}) == []
+    await supervisor.handle_command({"action": "subscribe", "exchange": "kraken", "symbols": ["SOL-USD"]})
+    await asyncio.sleep(0.05)
+
+    supervisor._local.apply.assert_awaited_once()
+    op = supervisor._local.apply.await_args.args[0]
+    assert (op["op"], sorted(op["symbols"])) == ("subscribe", ["ETH-USD", "SOL-USD"])
+    await supervisor.close()
+
+
+@pytest.mark.asyncio
+async def test_streamer_coalesces_frames_and_replays_on_reconnect():
+    streamer = KrakenTradeStreamer([parse_symbol("BTC-USD")])
+    streamer.subscribe_window_seconds = 0.01
+    ws = MagicMock()
+    ws.send = AsyncMock()
+
+    await streamer.subscribe(["ETH-USD"])
+    await streamer.subscribe(["ETH-USD", "SOL-USD"])
+    await streamer.unsubscribe(["SOL-USD"])
+    task = asyncio.create_task(streamer._write_loop(ws))
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    frames = [json.loads(call.args[0]) for call in ws.send.await_args_list]
+    assert frames == [{"event": "subscribe", "pair": ["ETH/USD"], "subscription": {"name": "trade"}}]
+    assert streamer.get_subscription_message()["pair"] == ["XBT/USD", "ETH/USD"]
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.market import MarketTrade
+from app.models.ticks import Asset, Tick
+from app.streaming.partitions import StreamPartitioner, partition_stream_keys
+from app.streaming.publisher import BatchingRedisPublisher, encode_trade
+from app.streaming.stream_codec import BINARY_FORMAT, encode_batch
+from app.writer import (
+    METRICS_KEY,
+    AdaptiveBatchSize,
+    TradeWriter,
+    WriteBatch,
+    parse_partitions,
+)
+
+
+def _fields(exchange="kraken", symbol="BTC-USD", ts=1700000000.0, trade_id="1"):
+    trade = encode_trade(
+        exchange=exchange,
+        symbol=symbol,
+        ts=ts,
+        recv_ts=ts + 0.1,
+        price=100.0,
+        amount=0.5,
+        side="buy",
+        trade_id=trade_id,
+    )
+    return {k.encode(): v.encode() for k, v in trade.stream_fields.items()}
+
+
+def _redis():
+    redis = MagicMock()
+    redis.hmget = AsyncMock(side_effect=lambda _key, fields: [None] * len(fields))
+    redis.hset = AsyncMock()
+    redis.xack = AsyncMock()
+    return redis
+
+
+def test_partitioner_is_stable_and_single_stream_by_default():
+    assert partition_stream_keys("market_trades", 1) == ["market_trades"]
+    assert partition_stream_keys("market_trades", 3) == ["market_trades:0", "market_trades:1", "market_trades:2"]
+
+    by_symbol = StreamPartitioner("market_trades", 4)
+    keys = {by_symbol.key_for("kraken", f"SYM{i}-USD") for i in range(50)}
+    assert len(keys) > 1
+    assert by_symbol.key_for("kraken", "BTC-USD") == StreamPartitioner("market_trades", 4).key_for("kraken", "BTC-USD")
+
+    by_exchange = StreamPartitioner("market_trades", 4, "exchange")
+    assert len({by_exchange.key_for("kraken", f"SYM{i}-USD") for i in range(50)}) == 1
+
+    with pytest.raises(ValueError):
+        StreamPartitioner("market_trades", 2, "venue")
+
+
+def test_parse_partitions():
+    assert parse_partitions("", 3) == [0, 1, 2]
+    assert parse_partitions("2, 0", 3) == [0, 2]
+    with pytest.raises(ValueError):
+        parse_partitions("3", 3)
+
+
+@pytest.mark.asyncio
+async def test_publisher_routes_trades_to_partitions():
+    redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+    publisher = BatchingRedisPublisher(redis, max_batch=100, partitions=4)
+    partitioner = StreamPartitioner("market_trades", 4)
+
+    for i in range(20):
+        await publisher.publish_trade(exchange="kraken", symbol=f"SYM{i}-USD", ts=1.0, price=1.0, amount=1.0, side="buy")
+    await publisher.flush()
+
+    streams = [call.args[0] for call in pipe.xadd.call_args_list]
+    assert streams == [partitioner.key_for("kraken", f"SYM{i}-USD") for i in range(20)]
+    await publisher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_writers_share_the_asset_registry(db_session):
+    from app.services.asset_registry import AssetRegistry
+
+    assets = AssetRegistry()
+    first = TradeWriter(_redis(), consumer="writer-a", stream_keys=["market_trades"], assets=assets)
+    second = TradeWriter(_redis(), consumer="writer-b", stream_keys=["market_trades"], assets=assets)
+
+    await first.process([(b"market_trades", [(b"1-0", _fields(trade_id="1"))])])
+    assert (assets.hits, assets.misses) == (0, 1)
+    await second.process([(b"market_trades", [(b"2-0", _fields(trade_id="2"))])])
+    assert (assets.hits, assets.misses) == (1, 1)
+    assert db_session.query(Asset).filter_by(exchange="kraken", symbol="BTC-USD").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_reclaims_stale_pending_entries(db_session):
+    redis = _redis()
+    redis.xautoclaim = AsyncMock(
+        side_effect=[
+            [b"5-0", [(b"1-0", _fields(trade_id="1")), (b"2-0", None)], []],
+            [b"0-0", [(b"5-0", _fields(ts=1700000001.0, trade_id="2"))], []],
+        ]
+    )
+    writer = TradeWriter(redis, consumer="writer-b", stream_keys=["market_trades"], claim_idle_seconds=30)
+
+    claimed = await writer.claim_stale()
+
+    assert claimed == 3
+    first = redis.xautoclaim.call_args_list[0]
+    assert first.args == ("market_trades", "trade_writers", "writer-b")
+    assert first.kwargs["min_idle_time"] == 30_000
+    assert redis.xautoclaim.call_args_list[1].kwargs["start_id"] == b"5-0"
+    acked = [call.args[2:] for call in redis.xack.call_args_list]
+    assert acked == [(b"1-0", b"2-0"), (b"5-0",)]
+    assert db_session.query(MarketTrade).count() == 2
+    asset = db_session.query(Asset).filter_by(exchange="kraken", symbol="BTC-USD").one()
+    assert db_session.query(Tick).filter_by(asset_id=asset.id).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_writer_reclaims_packed_entries_by_trades_per_entry():
+    redis = _redis()
+    redis.xautoclaim = AsyncMock(return_value=[b"0-0", [], []])
+    writer = TradeWriter(redis, consumer="writer-b", stream_keys=["market_trades"], batch_size=500)
+    writer._trades_per_entry = 100.0
+
+    await writer.claim_stale(sink=AsyncMock())
+
+    assert redis.xautoclaim.call_args.kwargs["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_writer_reads_its_partitions_and_acks_per_stream(db_session):
+    redis = _redis()
+    redis.xreadgroup = AsyncMock(
+        return_value=[
+            [b"market_trades:0", [(b"1-0", _fields(symbol="BTC-USD"))]],
+            [b"market_trades:2", [(b"1-0", _fields(symbol="ETH-USD"))]],
+        ]
+    )
+    writer = TradeWriter(redis, consumer="writer-a", stream_keys=["market_trades:0", "market_trades:2"])
+
+    written = await writer.process(await writer.read())
+
+    assert written == 2
+    assert redis.xreadgroup.call_args.kwargs["streams"] == {"market_trades:0": ">", "market_trades:2": ">"}
+    assert [call.args[0] for call in redis.xack.call_args_list] == ["market_trades:0", "market_trades:2"]
+
+
+@pytest.mark.asyncio
+async def test_writer_publishes_lag_metrics(monkeypatch):
+    monkeypatch.setattr("app.writer.time.time", lambda: 1700000010.0)
+    redis = _redis()
+    redis.xlen = AsyncMock(return_value=1200)
+    redis.xpending = AsyncMock(
+        return_value={"pending": 7, "min": b"1700000004000-0", "max": b"1700000009000-3", "consumers": [{"name": b"writer-a"}]}
+    )
+    writer = TradeWriter(redis, consumer="writer-a", stream_keys=["market_trades"])
+
+    metrics = await writer.publish_metrics()
+
+    assert metrics["market_trades"]["length"] == 1200
+    assert metrics["market_trades"]["pending"] == 7
+    assert metrics["market_trades"]["oldest_pending_age_seconds"] == 6.0
+    key, mapping = redis.hset.call_args.args[0], redis.hset.call_args.kwargs["mapping"]
+    assert key == METRICS_KEY
+    assert json.loads(mapping["market_trades"])["consumers"] == 1
+
+
+def test_adaptive_batch_size_follows_commit_latency():
+    sizer = AdaptiveBatchSize(500, minimum=100, maximum=2000, target_ms=200)
+
+    assert sizer.observe(500, 50) == 1000
+    assert sizer.observe(400, 50) == 1000  # partial batch: no signal to grow
+    assert sizer.observe(1000, 150) == 1000
+    assert sizer.observe(1000, 50) == 2000
+    assert sizer.observe(2000, 10) == 2000
+    assert sizer.observe(2000, 900) == 1000
+    for _ in range(5):
+        sizer.observe(1000, 900)
+    assert sizer.size == 100
+
+
+@pytest.mark.asyncio
+async def test_next_batch_flushes_partial_batch_after_max_age():
+    redis = _redis()
+    reads = [[[b"market_trades", [(b"1-0", _fields())]]], [], []]
+    redis.xreadgroup = AsyncMock(side_effect=lambda **_kw: reads.pop(0) if reads else [])
+    writer = TradeWriter(
+        redis,
+        consumer="writer-a",
+        stream_keys=["market_trades"],
+        sizer=AdaptiveBatchSize(500, minimum=100, maximum=1000),
+        max_batch_age_ms=20,
+    )
+
+    batch = await writer.next_batch()
+
+    assert batch is not None and len(batch.rows) == 1
+    first, second = redis.xreadgroup.call_args_list[:2]
+    assert first.kwargs["block"] == 1000 and first.kwargs["count"] == 500
+    assert second.kwargs["block"] <= 20 and second.kwargs["count"] == 499
+    assert await writer.next_batch(idle_block_ms=1) is None
+
+
+@pytest.mark.asyncio
+async def test_next_batch_bounds_trades_of_packed_entries():
+    redis = _redis()
+
+    def entry(i):
+        trades = [
+            encode_trade(
+                exchange="kraken",
+                symbol="BTC-USD",
+                ts=1700000000.0 + i,
+                price=100.0,
+                amount=0.5,
+                side="buy",
+                trade_id=str(i * 1000 + j),
+            )
+            for j in range(100)
+        ]
+        return (f"{i}-0".encode(), {b"fmt": BINARY_FORMAT.encode(), b"data": encode_batch(trades)})
+
+    reads = [
+        [[b"market_trades:0", [entry(i) for i in range(20)]], [b"market_trades:1", [entry(i) for i in range(20, 40)]]],
+    ]
+    redis.xreadgroup = AsyncMock(side_effect=lambda **_kw: reads.pop(0) if reads else [])
+    writer = TradeWriter(
+        redis,
+        consumer="writer-a",
+        stream_keys=["market_trades:0", "market_trades:1"],
+        sizer=AdaptiveBatchSize(500, minimum=500, maximum=500),
+        max_batch_age_ms=20,
+    )
+
+    batches = []
+    while (batch := await writer.next_batch(idle_block_ms=1)) is not None:
+        batches.append(batch)
+
+    assert redis.xreadgroup.call_count > 1
+    assert [b.trades for b in batches] == [500] * 8
+    assert sum(b.trades for b in batches) == 4000
+    acked = [message_id for b in batches for ids in b.acks.values() for message_id in ids]
+    assert sorted(acked) == sorted(f"{i}-0".encode() for i in range(40))
+    # Later reads ask for entries, not trades.
+    assert redis.xreadgroup.call_args_list[-1].kwargs["count"] < 50
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reads_next_batch_while_committing_and_acks_after_commit(monkeypatch):
+    redis = _redis()
+    committing = threading.Event()
+    release = threading.Event()
+    events: list[str] = []
+
+    def slow_write(batch):
+        events.append(f"commit:{batch.acks['market_trades'][0].decode()}")
+        committing.set()
+        release.wait(2)
+
+    async def read(**_kwargs):
+        if redis.xreadgroup.await_count == 1:
+            return [[b"market_trades", [(b"1-0", _fields())]]]
+        if redis.xreadgroup.await_count == 2:
+            # Batch 1 is still committing in its thread while batch 2 is read.
+            assert await asyncio.to_thread(committing.wait, 2)
+            assert redis.xack.await_count == 0
+            events.append("read:2-0")
+            return [[b"market_trades", [(b"2-0", _fields(ts=1700000001.0))]]]
+        release.set()
+        await asyncio.sleep(0.05)
+        raise asyncio.CancelledError
+
+    redis.xreadgroup = AsyncMock(side_effect=read)
+    redis.xautoclaim = AsyncMock(return_value=[b"0-0", [], []])
+    redis.xlen = AsyncMock(return_value=0)
+    redis.xpending = AsyncMock(return_value={"pending": 0, "min": None, "max": None, "consumers": []})
+    writer = TradeWriter(redis, consumer="writer-a", stream_keys=["market_trades"], max_batch_age_ms=0)
+    monkeypatch.setattr(writer, "_write_rows", slow_write)
+
+    with pytest.raises(asyncio.CancelledError):
+        await writer.run_forever()
+
+    assert events[:2] == ["commit:1-0", "read:2-0"]
+    assert redis.xack.call_args_list[0].args[2:] == (b"1-0",)
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_leaves_entries_pending(monkeypatch):
+    redis = _redis()
+    writer = TradeWriter(redis, consumer="writer-a", stream_keys=["market_trades"])
+
+    def fail(_batch):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(writer, "_write_rows", fail)
+    queue = asyncio.Queue()
+    flusher = asyncio.create_task(writer._flush_loop(queue))
+    batch = WriteBatch()
+    batch.add(b"market_trades", [(b"1-0", _fields())])
+    await queue.put(batch)
+    await queue.join()
+    flusher.cancel()
+
+    assert writer.failed_commits == 1
+    redis.xack.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ticks_only_writer_skips_market_trades(db_session):
+    redis = _redis()
+    writer = TradeWriter(redis, consumer="writer-a", stream_keys=["market_trades"], store_market_trades=False)
+
+    written = await writer.process([(b"market_trades", [(b"1-0", _fields()), (b"2-0", _fields(trade_id="2"))])])
+
+    assert written == 2
+    assert db_session.query(MarketTrade).count() == 0
+    assert db_session.query(Tick).count() == 2